@@ -94,7 +94,6 @@ class UserFactory(factory.django.DjangoModelFactory):
     description = factory.Faker(provider="text", locale="la", max_nb_chars=500)
     verified = factory.Faker("boolean")
     verification_method = factory.Faker("word")
-    verification_code = factory.Faker("uuid4")
     email = factory.Faker("email")
     is_private = factory.Faker("boolean")
     is_high_risk = factory.Faker("boolean")
@@ -5,16 +5,24 @@ Models for the authentication app.
 
 from __future__ import annotations
 
+import hashlib
 import logging
+from datetime import timedelta
 from typing import Any
-from uuid import uuid4
+from uuid import UUID, uuid4
 
+from django.conf import settings
 from django.contrib.auth.models import (
     AbstractUser,
     BaseUserManager,
     PermissionsMixin,
 )
-from django.db import models
+from django.db import connection, models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from authentication.authentication import invalidate_cached_user
 
 logger = logging.getLogger(__name__)
 
@@ -206,6 +214,16 @@ class SessionModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     last_activity = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # The latest session of a user, see SessionView.
+            models.Index(
+                fields=["user", "created_at"], name="session_user_created_idx"
+            ),
+            # Expired sessions, see the prune_sessions command.
+            models.Index(fields=["created_at"], name="session_created_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"Session {self.id} for {self.user.username}"
 
@@ -231,7 +249,6 @@ class UserModel(AbstractUser, PermissionsMixin):
     verification_partner = models.ForeignKey(
         "authentication.UserModel", on_delete=models.SET_NULL, null=True
     )
-    verification_code = models.UUIDField(blank=True, null=True)
     icon_url = models.ForeignKey(
         "content.Image", on_delete=models.SET_NULL, blank=True, null=True
     )
@@ -275,3 +292,210 @@ class UserFlag(models.Model):
     )
     created_by = models.ForeignKey("authentication.UserModel", on_delete=models.CASCADE)
     creation_date = models.DateTimeField(auto_now=True)
+
+
+# MARK: One-Time Token
+
+
+class OneTimeToken(models.Model):
+    """
+    A single use token that is sent to a user by email.
+
+    Notes
+    -----
+    Only the SHA-256 hash of a token is stored, so the table does not hold codes
+    that could be used if it were leaked. A user has at most one token per
+    purpose; issuing a new one invalidates the previous one. Expired tokens are
+    deleted by the prune_one_time_tokens command.
+    """
+
+    class Purpose(models.TextChoices):
+        VERIFY_EMAIL = "verify_email", "Verify email"
+        RESET_PASSWORD = "reset_password", "Reset password"
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    user = models.ForeignKey(
+        "authentication.UserModel",
+        on_delete=models.CASCADE,
+        related_name="one_time_tokens",
+    )
+    purpose = models.CharField(max_length=20, choices=Purpose.choices)
+    token_hash = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    creation_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The previous tokens of a user, see OneTimeToken.issue.
+            models.Index(fields=["user", "purpose"], name="one_time_token_user_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.purpose} token {self.id}"
+
+    @staticmethod
+    def hash_code(code: Any) -> str | None:
+        """
+        Return the hash a code is stored as.
+
+        Parameters
+        ----------
+        code : Any
+            The code from a link, a UUID or its string.
+
+        Returns
+        -------
+        str | None
+            The hex digest of the code, None if the code is not a valid UUID.
+        """
+        try:
+            canonical = str(code if isinstance(code, UUID) else UUID(str(code)))
+
+        except ValueError:
+            return None
+
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    @staticmethod
+    def lifetime(purpose: str) -> timedelta:
+        """
+        Return how long the tokens of a purpose are valid.
+
+        Parameters
+        ----------
+        purpose : str
+            The purpose of the tokens.
+
+        Returns
+        -------
+        timedelta
+            The lifetime from the settings.
+        """
+        if purpose == OneTimeToken.Purpose.RESET_PASSWORD:
+            return timedelta(hours=settings.PASSWORD_RESET_TOKEN_LIFETIME_HOURS)
+
+        return timedelta(hours=settings.EMAIL_VERIFICATION_TOKEN_LIFETIME_HOURS)
+
+    @classmethod
+    def issue(cls, user: UserModel, purpose: str) -> str:
+        """
+        Create a token for a user and invalidate their previous one.
+
+        Parameters
+        ----------
+        user : UserModel
+            The user the token is for.
+
+        purpose : str
+            What the token may be used for.
+
+        Returns
+        -------
+        str
+            The code to send to the user.
+        """
+        code = str(uuid4())
+        cls.objects.filter(user=user, purpose=purpose).delete()
+        cls.objects.create(
+            user=user,
+            purpose=purpose,
+            token_hash=cls.hash_code(code),
+            expires_at=timezone.now() + cls.lifetime(purpose),
+        )
+        return code
+
+    @classmethod
+    def consume(cls, code: Any, purpose: str) -> UserModel | None:
+        """
+        Use a token, so that it cannot be used again.
+
+        Parameters
+        ----------
+        code : Any
+            The code from a link.
+
+        purpose : str
+            What the token is used for.
+
+        Returns
+        -------
+        UserModel | None
+            The user of the token, None if the code is invalid or expired.
+
+        Notes
+        -----
+        The token is found and deleted in one statement through the unique index
+        of its hash, so two concurrent requests cannot both use it.
+        """
+        token_hash = cls.hash_code(code)
+        if token_hash is None:
+            return None
+
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE token_hash = %s AND purpose = %s "
+                "AND expires_at > %s RETURNING user_id",
+                [token_hash, purpose, timezone.now()],
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+
+        return UserModel.objects.filter(id=row[0]).first()
+
+    @classmethod
+    def find_user(cls, code: Any, purpose: str) -> UserModel | None:
+        """
+        Return the user of a valid token without using the token.
+
+        Parameters
+        ----------
+        code : Any
+            The code from a link.
+
+        purpose : str
+            What the token is for.
+
+        Returns
+        -------
+        UserModel | None
+            The user of the token, None if the code is invalid or expired.
+        """
+        token_hash = cls.hash_code(code)
+        if token_hash is None:
+            return None
+
+        return UserModel.objects.filter(
+            one_time_tokens__token_hash=token_hash,
+            one_time_tokens__purpose=purpose,
+            one_time_tokens__expires_at__gt=timezone.now(),
+        ).first()
+
+
+@receiver(post_save, sender=UserModel)
+@receiver(post_delete, sender=UserModel)
+def invalidate_user_cache(
+    sender: type[UserModel], instance: UserModel, **kwargs: Any
+) -> None:
+    """
+    Drop the cached snapshot of a user that was saved or deleted.
+
+    Parameters
+    ----------
+    sender : type[UserModel]
+        The model class that sent the signal.
+
+    instance : UserModel
+        The user that was saved or deleted.
+
+    **kwargs : Any
+        Additional keyword arguments passed to the receiver.
+
+    Notes
+    -----
+    Password changes save the user, so ``CachedJWTAuthentication`` sees a new
+    password hash on the next request.
+    """
+    invalidate_cached_user(instance.pk)
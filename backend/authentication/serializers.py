@@ -12,7 +12,7 @@ from django.contrib.auth import authenticate, get_user_model
 from rest_framework import serializers
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from authentication.models import SessionModel, UserFlag, UserModel
+from authentication.models import OneTimeToken, SessionModel, UserFlag, UserModel
 
 logger = logging.getLogger(__name__)
 USER = get_user_model()
@@ -265,7 +265,9 @@ class PasswordResetSerializer(serializers.Serializer[UserModel]):
             The user with a reset password.
         """
         if data.get("code") is not None:
-            user = UserModel.objects.filter(verification_code=data.get("code")).first()
+            user = OneTimeToken.find_user(
+                data.get("code"), OneTimeToken.Purpose.RESET_PASSWORD
+            )
             identifier = f"code: {data.get('code')}"
         else:
             user = UserModel.objects.filter(email=data.get("email")).first()
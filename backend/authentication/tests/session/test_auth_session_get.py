@@ -4,6 +4,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from authentication.factories import UserFactory
+from authentication.models import SessionModel
 
 pytestmark = pytest.mark.django_db
 
@@ -28,3 +29,12 @@ def test_auth_session_get_unauthorized_401():
     response = client.get(path="/v1/auth/sessions")
 
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_auth_session_get_pruned_not_found_404(authenticated_client):
+    client, user = authenticated_client
+    SessionModel.objects.filter(user=user).delete()
+
+    response = client.get(path="/v1/auth/sessions")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
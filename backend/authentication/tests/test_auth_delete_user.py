@@ -1,9 +1,14 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 import logging
+from io import StringIO
 
 import pytest
+from django.core.management import call_command
 from rest_framework import status
 
+from authentication.models import UserModel
+from core.models import DeletionJob
+
 logger = logging.getLogger(__name__)
 
 pytestmark = pytest.mark.django_db
@@ -29,4 +34,17 @@ def test_auth_delete_user_no_content_204(authenticated_client) -> None:
     response = client.delete(path="/v1/auth/delete")
 
     assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    # The account is deactivated at once and deleted by the deletion worker.
+    user.refresh_from_db()
+    assert user.is_active is False
+    assert DeletionJob.objects.filter(
+        entity_type=DeletionJob.ENTITY_USER,
+        entity_id=user.id,
+        status=DeletionJob.STATUS_PENDING,
+    ).exists()
+
+    call_command("run_deletion_jobs", "--once", stdout=StringIO())
+
+    assert not UserModel.objects.filter(id=user.id).exists()
     logger.info("Successfully deleted user")
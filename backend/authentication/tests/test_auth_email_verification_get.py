@@ -10,6 +10,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from authentication.factories import UserFactory
+from authentication.models import OneTimeToken
 
 pytestmark = pytest.mark.django_db  # noqa: N999
 
@@ -20,12 +21,11 @@ def test_auth_email_verification_get_valid_code_ok_200():
     """
     client = APIClient()
 
-    verification_code = str(uuid.uuid4())
     user = UserFactory(
         email="test@example.com",
-        verification_code=verification_code,
         is_confirmed=False,
     )
+    verification_code = OneTimeToken.issue(user, OneTimeToken.Purpose.VERIFY_EMAIL)
 
     response = client.get("/v1/auth/sign_up", {"verification_code": verification_code})
 
@@ -34,7 +34,7 @@ def test_auth_email_verification_get_valid_code_ok_200():
 
     user.refresh_from_db()
     assert user.is_confirmed is True
-    assert user.verification_code is None
+    assert not OneTimeToken.objects.filter(user=user).exists()
 
 
 def test_auth_email_verification_get_invalid_code_not_found_404():
@@ -43,12 +43,11 @@ def test_auth_email_verification_get_invalid_code_not_found_404():
     """
     client = APIClient()
 
-    verification_code = str(uuid.uuid4())
     user = UserFactory(
         email="test@example.com",
-        verification_code=verification_code,
         is_confirmed=False,
     )
+    OneTimeToken.issue(user, OneTimeToken.Purpose.VERIFY_EMAIL)
 
     invalid_code = str(uuid.uuid4())
     response = client.get("/v1/auth/sign_up", {"verification_code": invalid_code})
@@ -58,7 +57,7 @@ def test_auth_email_verification_get_invalid_code_not_found_404():
 
     user.refresh_from_db()
     assert user.is_confirmed is False
-    assert str(user.verification_code) == verification_code
+    assert OneTimeToken.objects.filter(user=user).exists()
 
 
 def test_auth_email_verification_get_nonexistent_code_not_found_404():
@@ -104,12 +103,11 @@ def test_auth_email_verification_get_already_confirmed_ok_200():
     """
     client = APIClient()
 
-    verification_code = str(uuid.uuid4())
     user = UserFactory(
         email="test@example.com",
-        verification_code=verification_code,
         is_confirmed=True,  # already confirmed
     )
+    verification_code = OneTimeToken.issue(user, OneTimeToken.Purpose.VERIFY_EMAIL)
 
     response = client.get("/v1/auth/sign_up", {"verification_code": verification_code})
 
@@ -118,7 +116,7 @@ def test_auth_email_verification_get_already_confirmed_ok_200():
 
     user.refresh_from_db()
     assert user.is_confirmed is True
-    assert user.verification_code is None
+    assert not OneTimeToken.objects.filter(user=user).exists()
 
 
 def test_auth_email_verification_get_user_with_empty_code_not_found_404():
@@ -129,7 +127,6 @@ def test_auth_email_verification_get_user_with_empty_code_not_found_404():
 
     UserFactory(
         email="test@example.com",
-        verification_code=None,  # None instead of empty string
         is_confirmed=False,
     )
 
@@ -171,12 +168,11 @@ def test_auth_email_verification_get_whitespace_handling_not_found_404():
     """
     client = APIClient()
 
-    verification_code = str(uuid.uuid4())
-    UserFactory(
+    user = UserFactory(
         email="test@example.com",
-        verification_code=verification_code,
         is_confirmed=False,
     )
+    verification_code = OneTimeToken.issue(user, OneTimeToken.Purpose.VERIFY_EMAIL)
 
     # Test with leading/trailing whitespace.
     response = client.get(
@@ -0,0 +1,95 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for CachedJWTAuthentication from authentication.py
+"""
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+import authentication.authentication
+from authentication.authentication import CachedJWTAuthentication, user_cache_key
+from authentication.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _authenticate(user) -> object:
+    token = AccessToken.for_user(user)
+    request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Token {token}")
+    result = CachedJWTAuthentication().authenticate(request)
+    assert result is not None
+    return result[0]
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+# MARK: User Cache
+
+
+def test_auth_jwt_user_cache_skips_the_user_query_when_cached():
+    user = UserFactory()
+    first = _authenticate(user)
+
+    with CaptureQueriesContext(connection) as queries:
+        second = _authenticate(user)
+
+    assert len(queries) == 0
+    assert second == first
+    assert second.username == user.username
+    assert second.is_authenticated
+    assert not second._state.adding
+
+
+def test_auth_jwt_user_cache_is_invalidated_on_save():
+    user = UserFactory()
+    _authenticate(user)
+    assert cache.get(user_cache_key(user.pk)) is not None
+
+    user.is_active = False
+    user.save()
+
+    assert cache.get(user_cache_key(user.pk)) is None
+    with pytest.raises(AuthenticationFailed):
+        _authenticate(user)
+
+
+def test_auth_jwt_user_cache_is_invalidated_on_delete():
+    user = UserFactory()
+    token = AccessToken.for_user(user)
+    request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Token {token}")
+    assert CachedJWTAuthentication().authenticate(request) is not None
+
+    user.delete()
+
+    with pytest.raises(AuthenticationFailed):
+        CachedJWTAuthentication().authenticate(request)
+
+
+def test_auth_jwt_user_cache_rejects_tokens_revoked_by_a_password_change(monkeypatch):
+    # simplejwt rebinds its settings on reload, so patch the instance its modules use.
+    monkeypatch.setattr(tokens.api_settings, "CHECK_REVOKE_TOKEN", True)
+    monkeypatch.setattr(
+        authentication.authentication.api_settings, "CHECK_REVOKE_TOKEN", True
+    )
+    user = UserFactory()
+    token = AccessToken.for_user(user)
+    request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Token {token}")
+    assert CachedJWTAuthentication().authenticate(request) is not None
+
+    # A stale snapshot still carries the password hash the token was issued for.
+    snapshot = cache.get(user_cache_key(user.pk))
+    cache.set(user_cache_key(user.pk), {**snapshot, "password": "changed"})
+
+    with pytest.raises(AuthenticationFailed):
+        CachedJWTAuthentication().authenticate(request)
@@ -6,6 +6,9 @@ import pytest
 from django.core import mail
 from rest_framework import status
 
+from core.models import EmailOutbox
+from core.outbox import send_pending_emails
+
 logger = logging.getLogger(__name__)
 
 pytestmark = pytest.mark.django_db
@@ -29,7 +32,13 @@ def test_auth_reset_pw_email_sent_successfully_ok_200(
     )
 
     assert response.status_code == status.HTTP_200_OK
+    # The email is queued in the outbox and sent by the send_outbox worker.
+    assert len(mail.outbox) == 0
+    assert EmailOutbox.objects.filter(recipients=[user.email]).count() == 1
+
+    assert send_pending_emails(limit=10)["sent"] == 1
     assert len(mail.outbox) == 1
+    assert mail.outbox[0].to == [user.email]
     logger.info(f"Password reset email sent successfully to: {user.email}")
 
 
@@ -64,25 +73,28 @@ def test_auth_reset_pw_invalid_verification_code_not_found_404(
     assert response.status_code == status.HTTP_404_NOT_FOUND
 
 
-def test_auth_reset_pw_email_sending_failure_500(authenticated_client) -> None:
+def test_auth_reset_pw_email_sending_failure_ok_200(authenticated_client) -> None:
     """
-    Test password reset when email sending fails.
+    Test password reset when the mail server is unavailable.
 
-    This test verifies that the except block in PasswordResetView is triggered
-    when send_mail raises an exception, and that the view returns a 500 error.
+    The email is queued, so the request succeeds and the worker retries it.
     """
     logger.info("Testing password reset email sending failure")
     client, user = authenticated_client
 
-    # Mock send_mail to raise an exception.
-    with patch("authentication.views.send_mail") as mock_send_mail:
-        mock_send_mail.side_effect = Exception("SMTP server error")
+    response = client.post(
+        path="/v1/auth/pwreset",
+        data={"email": user.email},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
 
-        response = client.post(
-            path="/v1/auth/pwreset",
-            data={"email": user.email},
-        )
+    with patch("core.outbox.get_connection") as mock_get_connection:
+        mock_get_connection.return_value.open.side_effect = OSError("SMTP down")
+        counts = send_pending_emails(limit=10)
 
-        assert response.status_code == 500
-        assert response.data["detail"] == "Failed to send password reset email."
-        mock_send_mail.assert_called_once()
+    email = EmailOutbox.objects.get(recipients=[user.email])
+    assert counts["retried"] == 1
+    assert email.status == EmailOutbox.STATUS_PENDING
+    assert email.attempts == 1
+    assert email.last_error == "SMTP down"
@@ -11,6 +11,7 @@ from unittest.mock import patch
 import pytest
 
 from authentication.factories import UserFactory
+from authentication.models import OneTimeToken
 from authentication.serializers import (
     DeleteUserResponseSerializer,
     PasswordResetSerializer,
@@ -179,9 +180,9 @@ class TestPasswordResetSerializer:
         user = UserFactory.create(
             email="testuser@activist.com", password="oldpassword123"
         )
-        verification_code = uuid.uuid4()
-        user.verification_code = verification_code
-        user.save()
+        verification_code = OneTimeToken.issue(
+            user, OneTimeToken.Purpose.RESET_PASSWORD
+        )
 
         return user, verification_code
 
@@ -76,20 +76,13 @@ def test_auth_sign_out_successful_logout_ok_200():
     logger.debug("User sessions successfully deleted")
 
     # Verify user is logged out (subsequent request should fail).
-    # Note: The session endpoint will raise an exception because no sessions exist after logout.
-    # This is expected behavior since logout deletes all user sessions.
-    try:
-        response_after_logout = client.get(path="/v1/auth/sessions")
-        assert response_after_logout.status_code in [401, 500]
-        logger.debug("User properly logged out - subsequent request returns error")
-
-    except Exception as e:
-        logger.debug(
-            f"User properly logged out - session request raised exception: {type(e).__name__}"
-        )
-        assert "SessionModel matching query does not exist" in str(
-            e
-        ) or "DoesNotExist" in str(e)
+    # Note: The session endpoint returns 404 because logout deletes all user sessions.
+    response_after_logout = client.get(path="/v1/auth/sessions")
+    assert response_after_logout.status_code in [
+        status.HTTP_401_UNAUTHORIZED,
+        status.HTTP_404_NOT_FOUND,
+    ]
+    logger.debug("User properly logged out - subsequent request returns error")
 
     logger.info("test_signout_successful_logout completed successfully")
 
@@ -1,6 +1,6 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 import logging
-from uuid import UUID
+import re
 
 import pytest
 from django.core import mail
@@ -8,7 +8,8 @@ from faker import Faker
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from authentication.models import UserModel
+from authentication.models import OneTimeToken, UserModel
+from core.outbox import send_pending_emails
 
 logger = logging.getLogger(__name__)
 
@@ -144,13 +145,19 @@ def test_auth_sign_up_created_201(client: APIClient) -> None:
 
     assert response.status_code == status.HTTP_201_CREATED
     assert UserModel.objects.filter(username=username)
-    assert isinstance(user.verification_code, UUID)
+    token = OneTimeToken.objects.get(user=user)
+    assert token.purpose == OneTimeToken.Purpose.VERIFY_EMAIL
     assert user.is_confirmed is False
+    assert len(mail.outbox) == 0
+    assert send_pending_emails(limit=10)["sent"] == 1
     assert len(mail.outbox) == 1
+    code = re.search(r"/auth/confirm/([0-9a-f-]{36})", mail.outbox[0].body)
+    assert code is not None
+    # Only the hash of the code is stored.
+    assert token.token_hash == OneTimeToken.hash_code(code.group(1))
+    assert code.group(1) not in token.token_hash
     assert user.password != strong_password
-    logger.info(
-        f"Successfully created user: {username} with verification code: {user.verification_code}"
-    )
+    logger.info(f"Successfully created user: {username} with a verification code")
 
 
 def test_auth_sign_up_with_duplicate_user_bad_request_400(client: APIClient) -> None:
@@ -1,10 +1,11 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 import logging
-import uuid
 
 import pytest
 from rest_framework import status
 
+from authentication.models import OneTimeToken
+
 logger = logging.getLogger(__name__)
 
 pytestmark = pytest.mark.django_db
@@ -22,13 +23,13 @@ def test_auth_verify_email_ok_200_and_bad_request_400(authenticated_client) -> N
     2) Using an invalid code
     """
     client, user = authenticated_client
-    user.verification_code = uuid.uuid4()
-    user.save()
+    code = OneTimeToken.issue(user, OneTimeToken.Purpose.VERIFY_EMAIL)
 
     # Valid verification code.
     logger.info("Testing valid email verification")
-    response = client.post(path=f"/v1/auth/verify_email/{user.verification_code}")
+    response = client.post(path=f"/v1/auth/verify_email/{code}")
     assert response.status_code == status.HTTP_200_OK
+    assert not OneTimeToken.objects.filter(user=user).exists()
 
     # Invalid verification code.
     logger.info("Testing invalid email verification")
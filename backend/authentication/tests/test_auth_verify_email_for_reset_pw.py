@@ -1,10 +1,14 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 import logging
 import uuid
+from datetime import timedelta
 
 import pytest
+from django.utils import timezone
 from rest_framework import status
 
+from authentication.models import OneTimeToken
+
 logger = logging.getLogger(__name__)
 
 pytestmark = pytest.mark.django_db
@@ -19,9 +23,10 @@ def test_auth_verify_email_for_reset_pw_ok_200(authenticated_client) -> None:
     """
     logger.info("Testing valid email verification for password reset")
     client, user = authenticated_client
+    code = OneTimeToken.issue(user, OneTimeToken.Purpose.RESET_PASSWORD)
     new_password = "Activist@123!?"
     response = client.post(
-        path=f"/v1/auth/verify_email_password/{user.verification_code}",
+        path=f"/v1/auth/verify_email_password/{code}",
         data={"new_password": new_password},
     )
     assert response.status_code == status.HTTP_200_OK
@@ -54,17 +59,75 @@ def test_auth_verify_email_for_reset_pw_reused_code_not_found_404(
     """
     logger.info("Testing reuse of already used verification code")
     client, user = authenticated_client
+    code = OneTimeToken.issue(user, OneTimeToken.Purpose.RESET_PASSWORD)
     new_password = "Activist@123!?"
 
     # Use the verification code once.
     response = client.post(
-        path=f"/v1/auth/verify_email_password/{user.verification_code}",
+        path=f"/v1/auth/verify_email_password/{code}",
         data={"new_password": new_password},
     )
     assert response.status_code == status.HTTP_200_OK
 
     # Attempt to reuse the same verification code.
+    response = client.post(path=f"/v1/auth/verify_email_password/{code}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_auth_verify_email_for_reset_pw_expired_code_not_found_404(
+    authenticated_client,
+) -> None:
+    """
+    Test that an expired verification code cannot be used.
+    """
+    client, user = authenticated_client
+    code = OneTimeToken.issue(user, OneTimeToken.Purpose.RESET_PASSWORD)
+    OneTimeToken.objects.filter(user=user).update(
+        expires_at=timezone.now() - timedelta(seconds=1)
+    )
+
+    response = client.post(
+        path=f"/v1/auth/verify_email_password/{code}",
+        data={"new_password": "Activist@123!?"},
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_auth_verify_email_for_reset_pw_superseded_code_not_found_404(
+    authenticated_client,
+) -> None:
+    """
+    Test that requesting a new code invalidates the previous one.
+    """
+    client, user = authenticated_client
+    old_code = OneTimeToken.issue(user, OneTimeToken.Purpose.RESET_PASSWORD)
+    new_code = OneTimeToken.issue(user, OneTimeToken.Purpose.RESET_PASSWORD)
+
+    response = client.post(
+        path=f"/v1/auth/verify_email_password/{old_code}",
+        data={"new_password": "Activist@123!?"},
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = client.post(
+        path=f"/v1/auth/verify_email_password/{new_code}",
+        data={"new_password": "Activist@123!?"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_auth_verify_email_for_reset_pw_email_code_not_found_404(
+    authenticated_client,
+) -> None:
+    """
+    Test that an email verification code cannot reset a password.
+    """
+    client, user = authenticated_client
+    code = OneTimeToken.issue(user, OneTimeToken.Purpose.VERIFY_EMAIL)
+
     response = client.post(
-        path=f"/v1/auth/verify_email_password/{user.verification_code}"
+        path=f"/v1/auth/verify_email_password/{code}",
+        data={"new_password": "Activist@123!?"},
     )
     assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert OneTimeToken.objects.filter(user=user).exists()
@@ -6,11 +6,11 @@ API views for authentication management.
 import logging
 import os
 import uuid
+from typing import cast
 
 import dotenv
 from django.contrib.auth import login, logout
-from django.core.exceptions import ValidationError
-from django.core.mail import send_mail
+from django.db import transaction
 from django.db.utils import IntegrityError, OperationalError
 from django.template.loader import render_to_string
 from django.utils.decorators import method_decorator
@@ -29,7 +29,7 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from authentication.models import SessionModel, UserFlag, UserModel
+from authentication.models import OneTimeToken, SessionModel, UserFlag, UserModel
 from authentication.serializers import (
     DeleteUserResponseSerializer,
     PasswordResetSerializer,
@@ -39,6 +39,8 @@ from authentication.serializers import (
     UserFlagSerializers,
     UserSerializer,
 )
+from core.deletion import schedule_deletion
+from core.models import EmailOutbox
 from core.permissions import IsAdminStaffCreatorOrReadOnly
 
 logger = logging.getLogger(__name__)
@@ -58,18 +60,7 @@ class VerifyEmailView(APIView):
     def post(self, request: Request, code: None | uuid.UUID = None) -> Response:
         logger.info(f"Email verification attempt with code: {code}")
 
-        # Handle invalid UUIDs gracefully.
-        try:
-            user = UserModel.objects.filter(verification_code=code).first()
-
-        except (ValueError, ValidationError):
-            # Invalid UUID format - treat as user not found.
-            logger.warning(f"Email verification failed: invalid UUID format {code}")
-            return Response(
-                {"detail": "User does not exist."},
-                status=status.HTTP_404_NOT_FOUND,
-            )
-
+        user = OneTimeToken.consume(code, OneTimeToken.Purpose.VERIFY_EMAIL)
         if user is None:
             logger.warning(f"Email verification failed: invalid code {code}")
             return Response(
@@ -78,8 +69,7 @@ class VerifyEmailView(APIView):
             )
 
         user.is_confirmed = True
-        user.verification_code = None  # None instead of empty string for UUIDField
-        user.save()
+        user.save(update_fields=["is_confirmed"])
 
         logger.info(
             f"Email verified successfully for user: {user.username} (ID: {user.id})"
@@ -134,41 +124,33 @@ class SignUpView(APIView):
         logger.info("User registration attempt")
         serializer = SignUpSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user: UserModel = serializer.save()
-
-        logger.info(f"User created successfully: {user.username} (ID: {user.id})")
-
-        if user.email:
-            user.verification_code = uuid.uuid4()
-
-            confirmation_link = (
-                f"{FRONTEND_BASE_URL}/auth/confirm/{user.verification_code}"
-            )
-            message = f"Welcome to activist.org, {user.username}!, Please confirm your email address by clicking the link: {confirmation_link}"
-            html_message = render_to_string(
-                template_name="signup_email.html",
-                context={
-                    "username": user.username,
-                    "confirmation_link": confirmation_link,
-                },
-            )
+        # The verification email is queued with the user so that neither exists
+        # without the other; the send_outbox worker delivers it.
+        with transaction.atomic():
+            user: UserModel = serializer.save()
+
+            logger.info(f"User created successfully: {user.username} (ID: {user.id})")
+
+            if user.email:
+                code = OneTimeToken.issue(user, OneTimeToken.Purpose.VERIFY_EMAIL)
+                confirmation_link = f"{FRONTEND_BASE_URL}/auth/confirm/{code}"
+                message = f"Welcome to activist.org, {user.username}!, Please confirm your email address by clicking the link: {confirmation_link}"
+                html_message = render_to_string(
+                    template_name="signup_email.html",
+                    context={
+                        "username": user.username,
+                        "confirmation_link": confirmation_link,
+                    },
+                )
 
-            try:
-                send_mail(
+                EmailOutbox.enqueue(
                     subject="Welcome to activist.org",
-                    message=message,
+                    body=message,
                     from_email=ACTIVIST_EMAIL,
-                    recipient_list=[user.email],
-                    html_message=html_message,
-                    fail_silently=False,
+                    recipients=[user.email],
+                    html_body=html_message,
                 )
-                logger.info(f"Verification email sent to {user.email}")
-
-            except Exception as e:
-                logger.error(f"Failed to send verification email to {user.email}: {e}")
-                # Continue with user creation even if email fails.
-
-            user.save()
+                logger.info(f"Verification email queued for {user.email}")
 
         return Response(
             {"message": "User was created successfully."},
@@ -182,20 +164,9 @@ class SignUpView(APIView):
         verification_code = request.GET.get("verification_code")
         logger.info(f"Email verification attempt with code: {verification_code}")
 
-        # Handle invalid UUIDs gracefully.
-        try:
-            user = UserModel.objects.filter(verification_code=verification_code).first()
-
-        except (ValueError, ValidationError):
-            # Invalid UUID format - treat as user not found.
-            logger.warning(
-                f"Email verification failed: invalid UUID format {verification_code}"
-            )
-            return Response(
-                {"detail": "User does not exist."},
-                status=status.HTTP_404_NOT_FOUND,
-            )
-
+        user = OneTimeToken.consume(
+            verification_code, OneTimeToken.Purpose.VERIFY_EMAIL
+        )
         if user is None:
             logger.warning(
                 f"Email verification failed: invalid code {verification_code}"
@@ -206,8 +177,7 @@ class SignUpView(APIView):
             )
 
         user.is_confirmed = True
-        user.verification_code = None  # None instead of empty string for UUIDField
-        user.save()
+        user.save(update_fields=["is_confirmed"])
 
         logger.info(
             f"Email verified successfully for user: {user.username} (ID: {user.id})"
@@ -261,6 +231,7 @@ class SessionView(APIView):
         responses={
             200: SessionSerializer,
             401: OpenApiResponse(response={"detail": "You are not authenticated."}),
+            404: OpenApiResponse(response={"detail": "No session found."}),
         }
     )
     def get(self, request: Request) -> Response:
@@ -271,7 +242,15 @@ class SessionView(APIView):
             )
         user_id = request.user.id
 
-        session = SessionModel.objects.filter(user=user_id).latest("created_at")
+        session = (
+            SessionModel.objects.filter(user=user_id).order_by("-created_at").first()
+        )
+        if session is None:
+            # Sessions older than SESSION_RETENTION_DAYS are deleted by prune_sessions.
+            return Response(
+                {"detail": "No session found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
 
         serializer = SessionSerializer(session)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -299,34 +278,23 @@ class PasswordResetView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        user.verification_code = uuid.uuid4()
-
-        pwreset_link = f"{FRONTEND_BASE_URL}/auth/pwreset/{user.verification_code}"
-        message = "Reset your password at activist.org"
-        html_message = render_to_string(
-            template_name="pwreset_email.html",
-            context={"username": user.username, "pwreset_link": pwreset_link},
-        )
-
-        try:
-            send_mail(
+        with transaction.atomic():
+            code = OneTimeToken.issue(user, OneTimeToken.Purpose.RESET_PASSWORD)
+            pwreset_link = f"{FRONTEND_BASE_URL}/auth/pwreset/{code}"
+            message = "Reset your password at activist.org"
+            html_message = render_to_string(
+                template_name="pwreset_email.html",
+                context={"username": user.username, "pwreset_link": pwreset_link},
+            )
+            EmailOutbox.enqueue(
                 subject="Reset your password at activist.org",
-                message=message,
+                body=message,
                 from_email=ACTIVIST_EMAIL,
-                recipient_list=[user.email],
-                html_message=html_message,
-                fail_silently=False,
+                recipients=[user.email],
+                html_body=html_message,
             )
-            logger.info(f"Password reset email sent to {user.email}")
 
-        except Exception as e:
-            logger.error(f"Failed to send password reset email to {user.email}: {e}")
-            return Response(
-                {"detail": "Failed to send password reset email."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
-
-        user.save()
+        logger.info(f"Password reset email queued for {user.email}")
 
         return Response(
             {"message": "Password reset email was sent successfully."},
@@ -345,7 +313,7 @@ class VerifyAccountResetPassword(APIView):
         parameters=[OpenApiParameter(name="new_password", type=str, required=True)]
     )
     def post(self, request: Request, code: None | uuid.UUID = None) -> Response:
-        user = UserModel.objects.filter(verification_code=code).first()
+        user = OneTimeToken.consume(code, OneTimeToken.Purpose.RESET_PASSWORD)
         if user is None:
             logger.warning(
                 f"Password reset failed: user not found from verification code {code}"
@@ -354,9 +322,8 @@ class VerifyAccountResetPassword(APIView):
                 {"detail": "User does not exist."},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        user.verification_code = None
         user.set_password(request.data.get("new_password"))
-        user.save()
+        user.save(update_fields=["password"])
         return Response(
             {"message": "Password has been reset successfully."},
             status=status.HTTP_200_OK,
@@ -375,7 +342,7 @@ class DeleteUserView(APIView):
         summary="Delete own account",
         responses={
             204: OpenApiResponse(
-                description="Account deleted successfully",
+                description="Account deactivated and queued for deletion",
             ),
             400: OpenApiResponse(
                 response=OpenApiTypes.OBJECT,
@@ -413,9 +380,13 @@ class DeleteUserView(APIView):
         username = request.user.username
         logger.info(f"User account deletion requested: {username} (ID: {user_id})")
 
-        request.user.delete()
+        # The account is deactivated right away and deleted with everything it
+        # created by the run_deletion_jobs worker.
+        schedule_deletion(cast(UserModel, request.user))
 
-        logger.info(f"User account deleted successfully: {username} (ID: {user_id})")
+        logger.info(
+            f"User account deactivated for deletion: {username} (ID: {user_id})"
+        )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
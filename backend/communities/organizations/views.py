@@ -11,6 +11,7 @@ from typing import Any
 from uuid import UUID
 
 from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
 from django.db.models import Case, IntegerField, Q, QuerySet, Value, When
 from django.db.utils import IntegrityError, OperationalError
 from django.utils import timezone
@@ -58,6 +59,7 @@ from communities.organizations.serializers import (
 )
 from content.models import Image
 from content.serializers import ImageSerializer
+from core.deletion import schedule_deletion
 from core.paginator import CustomPagination
 from core.permissions import IsAdminStaffCreatorOrReadOnly
 from events.models import Event
@@ -456,13 +458,18 @@ class OrganizationDetailAPIView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        org.status = StatusType.objects.get(id=3)  # 3 is the id of the deleted status
-        org.deletion_date = timezone.now()
-        org.is_high_risk = False
-        org.status_updated = None
-        org.tagline = ""
-        org.save()
-        logger.info(f"Organization deleted (soft): {org.id}")
+        with transaction.atomic():
+            # 3 is the id of the deleted status.
+            org.status = StatusType.objects.get(id=3)
+            org.deletion_date = timezone.now()
+            org.is_high_risk = False
+            org.status_updated = None
+            org.tagline = ""
+            org.save()
+            # The run_deletion_jobs worker deletes the organization and its dependents.
+            schedule_deletion(org)
+
+        logger.info(f"Organization deleted (soft), deletion scheduled: {org.id}")
 
         return Response(
             {"message": "Organization deleted successfully."},
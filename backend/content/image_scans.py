@@ -0,0 +1,169 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Background processing of image uploads staged for a deferred filescan.
+"""
+
+import logging
+import os
+from io import BytesIO
+from uuid import UUID
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.db import transaction
+
+from content.models import Image, ImageScanJob
+from content.serializers import link_image_to_carousel, scrub_exif, set_entity_icon
+from core.filescan import FilescanError, is_flagged, scan_file
+
+logger = logging.getLogger(__name__)
+
+
+def _read_staged_upload(job: ImageScanJob) -> InMemoryUploadedFile:
+    """
+    Load a staged upload into memory so that it can be scanned and scrubbed.
+
+    Parameters
+    ----------
+    job : ImageScanJob
+        The job whose staged file should be loaded.
+
+    Returns
+    -------
+    InMemoryUploadedFile
+        The staged upload; its size is bounded by ``IMAGE_UPLOAD_MAX_FILE_SIZE``.
+    """
+    with job.staged_file.open("rb") as staged:
+        data = staged.read()
+
+    ext = os.path.splitext(job.original_name)[1].lower().lstrip(".")
+    content_type = f"image/{'jpeg' if ext == 'jpg' else ext or 'octet-stream'}"
+
+    return InMemoryUploadedFile(
+        BytesIO(data), "file_object", job.original_name, content_type, len(data), None
+    )
+
+
+def _publish(job: ImageScanJob, upload: InMemoryUploadedFile) -> None:
+    """
+    Move a clean upload to public storage and link it to its entity.
+
+    Parameters
+    ----------
+    job : ImageScanJob
+        The finished job.
+
+    upload : InMemoryUploadedFile
+        The staged upload that passed the scan.
+    """
+    image = job.image
+    image.file_object.save(job.original_name, scrub_exif(upload), save=False)
+    image.scan_status = Image.SCAN_STATUS_CLEAN
+    image.save(update_fields=["file_object", "scan_status"])
+    logger.info(f"Published Image instance {image.id} after a deferred scan")
+
+    try:
+        if job.is_icon:
+            set_entity_icon(image, job.entity_type, job.entity_id)
+
+        else:
+            link_image_to_carousel(
+                image, job.entity_type, job.entity_id, job.sequence_index or 0
+            )
+
+    except Exception:
+        # The entity may have been deleted while the scan was pending.
+        logger.exception(f"Failed to link published Image instance {image.id}")
+
+
+def process_scan_job(job: ImageScanJob) -> str:
+    """
+    Scan a staged upload and publish, reject or reschedule its image.
+
+    Parameters
+    ----------
+    job : ImageScanJob
+        The job to process; it is deleted together with its staged file once done.
+
+    Returns
+    -------
+    str
+        The resulting ``scan_status`` of the image.
+    """
+    image = job.image
+    upload = _read_staged_upload(job)
+    try:
+        result = scan_file(upload, profile="image")
+
+    except FilescanError as exc:
+        job.attempts += 1
+        job.last_error = str(exc)
+        if job.attempts < settings.IMAGE_UPLOAD_SCAN_MAX_ATTEMPTS:
+            job.save(update_fields=["attempts", "last_error"])
+            logger.warning(
+                f"Deferred scan of Image instance {image.id} failed (attempt {job.attempts}): {exc}"
+            )
+            return image.scan_status
+
+        image.scan_status = Image.SCAN_STATUS_FAILED
+        image.save(update_fields=["scan_status"])
+        job.delete()
+        logger.error(
+            f"Giving up on deferred scan of Image instance {image.id} after {job.attempts} attempts: {exc}"
+        )
+        return image.scan_status
+
+    if is_flagged(result):
+        # Malware is quarantined by the filescan service; only the staged copy is removed here.
+        image.scan_status = Image.SCAN_STATUS_REJECTED
+        image.save(update_fields=["scan_status"])
+        job.delete()
+        logger.warning(
+            f"Deferred scan rejected Image instance {image.id} quarantine_id={result.get('quarantine_id')}"
+        )
+        return image.scan_status
+
+    upload.seek(0)
+    _publish(job, upload)
+    job.delete()
+
+    return image.scan_status
+
+
+def process_pending_scans(limit: int) -> int:
+    """
+    Process up to ``limit`` staged uploads, oldest first.
+
+    Parameters
+    ----------
+    limit : int
+        The maximum number of jobs to process.
+
+    Returns
+    -------
+    int
+        The number of jobs that were processed.
+
+    Notes
+    -----
+    Each job is locked with ``SKIP LOCKED`` for the duration of its scan, so several
+    workers can run side by side without scanning the same upload twice.
+    """
+    # Jobs that failed are retried on the next run rather than straight away.
+    seen: list[UUID] = []
+    while len(seen) < limit:
+        with transaction.atomic():
+            job = (
+                ImageScanJob.objects.select_for_update(skip_locked=True)
+                .select_related("image")
+                .exclude(id__in=seen)
+                .order_by("creation_date")
+                .first()
+            )
+            if job is None:
+                break
+
+            seen.append(job.id)
+            process_scan_job(job)
+
+    return len(seen)
@@ -3,12 +3,15 @@
 Models for the content app.
 """
 
+import hashlib
 import logging
 import os
 from typing import Any
 from uuid import uuid4
 
 from django.contrib.postgres.fields import ArrayField
+from django.core.files.storage import Storage, storages
+from django.core.files.uploadedfile import UploadedFile
 from django.core.validators import validate_image_file_extension
 from django.db import models
 from django.db.models.signals import post_delete
@@ -116,21 +119,111 @@ def set_filename_to_uuid(instance: Any, filename: str) -> str:
         raise
 
 
+def compute_content_hash(file_obj: UploadedFile) -> str:
+    """
+    Compute the SHA-256 hex digest of a file by streaming over its chunks.
+
+    Parameters
+    ----------
+    file_obj : UploadedFile
+        The uploaded file to hash.
+
+    Returns
+    -------
+    str
+        The hex encoded SHA-256 digest of the file contents.
+
+    Notes
+    -----
+    The file is rewound after hashing so that it can be scanned or saved afterwards.
+    """
+    digest = hashlib.sha256()
+    for chunk in file_obj.chunks():
+        digest.update(chunk)
+
+    file_obj.seek(0)
+
+    return digest.hexdigest()
+
+
 class Image(models.Model):
     """
     Image model for storing uploaded images.
+
+    Notes
+    -----
+    Images with the same ``content_hash`` share one stored file. The file is
+    only removed from storage once the last Image referencing it is deleted.
+
+    Images uploaded with deferred scanning have no file and a ``pending``
+    ``scan_status`` until the scan of their staged upload finishes.
     """
 
+    SCAN_STATUS_CLEAN = "clean"
+    SCAN_STATUS_PENDING = "pending"
+    SCAN_STATUS_REJECTED = "rejected"
+    SCAN_STATUS_FAILED = "failed"
+
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     file_object = models.ImageField(
         upload_to=set_filename_to_uuid,
         validators=[validate_image_file_extension],
     )
+    # SHA-256 of the original upload bytes used to deduplicate stored files.
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    SCAN_STATUS_CHOICES = [
+        (SCAN_STATUS_CLEAN, "Clean"),
+        (SCAN_STATUS_PENDING, "Pending"),
+        (SCAN_STATUS_REJECTED, "Rejected"),
+        (SCAN_STATUS_FAILED, "Failed"),
+    ]
+    scan_status = models.CharField(
+        max_length=16, choices=SCAN_STATUS_CHOICES, default=SCAN_STATUS_CLEAN
+    )
     creation_date = models.DateTimeField(auto_now_add=True)
 
     def __str__(self) -> str:
         return str(self.id)
 
+    @classmethod
+    def find_by_content_hash(cls, content_hash: str) -> "Image | None":
+        """
+        Return an existing Image whose stored file matches the given content hash.
+
+        Parameters
+        ----------
+        content_hash : str
+            The SHA-256 hex digest of the original upload.
+
+        Returns
+        -------
+        Image | None
+            The oldest Image with a file for this hash or None if there is no match.
+        """
+        if not content_hash:
+            return None
+
+        return (
+            cls.objects.filter(content_hash=content_hash)
+            .exclude(file_object="")
+            .order_by("creation_date")
+            .first()
+        )
+
+    def file_reference_count(self) -> int:
+        """
+        Count the Image records that reference the same stored file as this one.
+
+        Returns
+        -------
+        int
+            The number of Image rows pointing at ``file_object.name``.
+        """
+        if not self.file_object:
+            return 0
+
+        return Image.objects.filter(file_object=self.file_object.name).count()
+
 
 @receiver(post_delete, sender=Image)
 def delete_image_file(sender: type[Image], instance: Image, **kwargs: Any) -> None:
@@ -151,10 +244,17 @@ def delete_image_file(sender: type[Image], instance: Image, **kwargs: Any) -> No
     Notes
     -----
     This signal handler prevents orphaned files in the filesystem
-    when Image model instances are deleted.
+    when Image model instances are deleted. As deduplicated images share
+    a stored file, the file is kept while other Image rows still reference it.
     """
     logger = logging.getLogger(__name__)
     if instance.file_object:
+        if instance.file_reference_count() > 0:
+            logger.info(
+                f"Kept shared image file {instance.file_object.name} for deleted Image instance {instance.id}"
+            )
+            return
+
         try:
             instance.file_object.delete(save=False)
             logger.info(f"Deleted image file for Image instance {instance.id}")
@@ -164,6 +264,155 @@ def delete_image_file(sender: type[Image], instance: Image, **kwargs: Any) -> No
             )
 
 
+# MARK: Image Scan Job
+
+
+def get_staging_storage() -> Storage:
+    """
+    Return the non-public storage that holds uploads waiting for a scan.
+
+    Returns
+    -------
+    Storage
+        The ``image_staging`` storage from ``settings.STORAGES``.
+    """
+    return storages["image_staging"]
+
+
+def set_staged_filename(instance: "ImageScanJob", filename: str) -> str:
+    """
+    Name a staged upload after its image while keeping the original extension.
+
+    Parameters
+    ----------
+    instance : ImageScanJob
+        The job the staged file belongs to.
+
+    filename : str
+        The original filename of the upload.
+
+    Returns
+    -------
+    str
+        The path of the staged file within the staging storage.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+
+    return f"pending/{instance.image_id}{ext}"
+
+
+class ImageScanJob(models.Model):
+    """
+    An upload kept in the staging area until the filescan worker has scanned it.
+
+    Notes
+    -----
+    The job also records how the image should be linked to its entity, as links
+    are only created once the image has been published.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    image = models.OneToOneField(
+        "content.Image", on_delete=models.CASCADE, related_name="scan_job"
+    )
+    staged_file = models.FileField(
+        storage=get_staging_storage, upload_to=set_staged_filename, max_length=255
+    )
+    original_name = models.CharField(max_length=255)
+    entity_type = models.CharField(max_length=255, blank=True)
+    entity_id = models.CharField(max_length=255, blank=True)
+    sequence_index = models.IntegerField(blank=True, null=True)
+    is_icon = models.BooleanField(default=False)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    creation_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return str(self.id)
+
+    @classmethod
+    def stage(
+        cls,
+        file_obj: UploadedFile,
+        content_hash: str,
+        entity_type: str = "",
+        entity_id: str = "",
+        sequence_index: int | None = None,
+        is_icon: bool = False,
+    ) -> Image:
+        """
+        Store an upload in the staging area and create its pending Image.
+
+        Parameters
+        ----------
+        file_obj : UploadedFile
+            The uploaded file.
+
+        content_hash : str
+            The SHA-256 hex digest of the upload.
+
+        entity_type : str, default=""
+            The type of entity the image is uploaded for.
+
+        entity_id : str, default=""
+            The ID of the entity the image is uploaded for.
+
+        sequence_index : int | None, default=None
+            The position of the image in the entity's carousel.
+
+        is_icon : bool, default=False
+            Whether the image is the icon of the entity.
+
+        Returns
+        -------
+        Image
+            The pending image that is published once the scan passes.
+        """
+        image = Image.objects.create(
+            content_hash=content_hash, scan_status=Image.SCAN_STATUS_PENDING
+        )
+        job = cls(
+            image=image,
+            original_name=os.path.basename(file_obj.name or "") or "upload",
+            entity_type=entity_type or "",
+            entity_id=entity_id or "",
+            sequence_index=sequence_index,
+            is_icon=is_icon,
+        )
+        job.staged_file.save(job.original_name, file_obj, save=False)
+        job.save()
+
+        return image
+
+
+@receiver(post_delete, sender=ImageScanJob)
+def delete_staged_file(
+    sender: type[ImageScanJob], instance: ImageScanJob, **kwargs: Any
+) -> None:
+    """
+    Remove the staged upload once its scan job is finished or deleted.
+
+    Parameters
+    ----------
+    sender : type[ImageScanJob]
+        The model class that sent the signal.
+
+    instance : ImageScanJob
+        The actual instance being deleted.
+
+    **kwargs : Any
+        Additional keyword arguments passed to the receiver.
+    """
+    if instance.staged_file:
+        try:
+            instance.staged_file.delete(save=False)
+
+        except Exception:
+            logging.getLogger(__name__).exception(
+                f"Failed to delete staged file for ImageScanJob {instance.id}"
+            )
+
+
 # MARK: Location
 
 
@@ -4,6 +4,7 @@ Serializers for the content app.
 """
 
 import logging
+from collections.abc import Mapping
 from io import BytesIO
 from typing import Any
 
@@ -19,11 +20,14 @@ from content.models import (
     DiscussionEntry,
     Faq,
     Image,
+    ImageScanJob,
     Location,
     Resource,
     ResourceFlag,
     Topic,
+    compute_content_hash,
 )
+from core.filescan.scan_helpers import scan_uploads_and_rewind
 from events.models import Event
 from utils.utils import validate_creation_and_deprecation_dates
 
@@ -134,6 +138,200 @@ def scrub_exif(image_file: InMemoryUploadedFile) -> InMemoryUploadedFile:
         return image_file  # return original file in case of error
 
 
+def get_upload_content_hash(
+    context: Mapping[str, Any], index: int, file_obj: UploadedFile
+) -> str:
+    """
+    Return the content hash for an upload, reusing the one computed by the view.
+
+    Parameters
+    ----------
+    context : Mapping[str, Any]
+        The serializer context that may contain precomputed ``content_hashes``.
+
+    index : int
+        The position of the upload within ``request.FILES``.
+
+    file_obj : UploadedFile
+        The uploaded file that is hashed if no precomputed hash is available.
+
+    Returns
+    -------
+    str
+        The SHA-256 hex digest of the original upload.
+    """
+    content_hashes = context.get("content_hashes") or []
+    if index < len(content_hashes):
+        return str(content_hashes[index])
+
+    return compute_content_hash(file_obj)
+
+
+def scan_unscanned_upload(
+    context: Mapping[str, Any], content_hash: str, file_obj: UploadedFile
+) -> None:
+    """
+    Scan an upload that the view skipped because an identical image was stored.
+
+    Parameters
+    ----------
+    context : Mapping[str, Any]
+        The serializer context that may contain the ``scanned_hashes`` of the view.
+
+    content_hash : str
+        The SHA-256 hex digest of the upload.
+
+    file_obj : UploadedFile
+        The upload.
+
+    Raises
+    ------
+    ValidationError
+        If the upload was flagged or could not be scanned.
+
+    Notes
+    -----
+    The stored image may be deleted between the view's check and
+    ``reuse_stored_image``; the upload is then stored as a new file and has to
+    be scanned like any other.
+    """
+    if content_hash in context.get("scanned_hashes", ()):
+        return
+
+    if err := scan_uploads_and_rewind([file_obj], profile="image"):
+        raise serializers.ValidationError(err.data)
+
+
+def reuse_stored_image(content_hash: str) -> Image | None:
+    """
+    Create an Image that shares the stored file of an identical earlier upload.
+
+    Parameters
+    ----------
+    content_hash : str
+        The SHA-256 hex digest of the original upload.
+
+    Returns
+    -------
+    Image | None
+        The new Image referencing the existing file or None if no upload matches.
+
+    Notes
+    -----
+    The existing file has already been scanned and scrubbed, so both steps are skipped.
+    """
+    existing = Image.find_by_content_hash(content_hash)
+    if existing is None:
+        return None
+
+    image = Image.objects.create(
+        file_object=existing.file_object.name, content_hash=content_hash
+    )
+    logger.info(
+        f"Reused stored file {existing.file_object.name} for Image instance {image.id}"
+    )
+
+    return image
+
+
+def link_image_to_carousel(
+    image: Image, entity_type: str | None, entity_id: str | None, sequence_index: int
+) -> None:
+    """
+    Add an image to the carousel of an organization or group.
+
+    Parameters
+    ----------
+    image : Image
+        The image to add.
+
+    entity_type : str | None
+        The type of entity; only ``organization`` and ``group`` have carousels.
+
+    entity_id : str | None
+        The ID of the entity.
+
+    sequence_index : int
+        The position of the image in the carousel.
+    """
+    if entity_type == "organization":
+        OrganizationImage.objects.create(
+            org_id=entity_id, image=image, sequence_index=sequence_index
+        )
+        logger.info(
+            f"Added image {image.id} to organization {entity_id} carousel at index {sequence_index}"
+        )
+
+    if entity_type == "group":
+        GroupImage.objects.create(
+            group_id=entity_id, image=image, sequence_index=sequence_index
+        )
+        logger.info(
+            f"Added image {image.id} to group {entity_id} carousel at index {sequence_index}"
+        )
+
+
+def set_entity_icon(image: Image, entity: str | None, entity_id: str | None) -> None:
+    """
+    Set an image as the icon of an organization or event.
+
+    Parameters
+    ----------
+    image : Image
+        The image to use as the icon.
+
+    entity : str | None
+        The type of entity the icon is for.
+
+    entity_id : str | None
+        The ID of the entity.
+
+    Raises
+    ------
+    ValidationError
+        If the entity could not be updated.
+    """
+    if entity == "organization":
+        try:
+            organization = Organization.objects.get(id=entity_id)
+            organization.icon_url = image
+            organization.save()
+            logger.info(f"Updated Organization {entity_id} with icon {image.id}")
+
+        except Exception as e:
+            logger.exception(
+                f"An unexpected error occurred while updating the organization: {str(e)}"
+            )
+            raise serializers.ValidationError(
+                f"An unexpected error occurred while updating the event: {str(e)}"
+            ) from e
+
+    if entity == "group":
+        logger.warning("ENTITY:", entity)
+        logger.warning("GROUP-CAROUSEL group_id:", entity_id)
+        #       next_index = GroupImage.objects.filter(
+        #           group_id=group_id
+        #       ).count()
+        #       GroupImage.objects.create(
+        #           group_id=group_id, image=image, sequence_index=next_index
+        #       )
+
+    if entity == "event":
+        try:
+            event = Event.objects.get(id=entity_id)
+            event.icon_url = image
+            event.save()
+            logger.info(f"Updated Event {entity_id} with icon {image.id}")
+
+        except Exception as e:
+            logger.exception(
+                f"An unexpected error occurred while updating the event: {str(e)}"
+            )
+            raise serializers.ValidationError(
+                f"An unexpected error occurred while updating the event: {str(e)}"
+            ) from e
+
+
 # MARK: Image
 
 
@@ -144,8 +342,8 @@ class ImageSerializer(serializers.ModelSerializer[Image]):
 
     class Meta:
         model = Image
-        fields = ["id", "file_object", "creation_date"]
-        read_only_fields = ["id", "creation_date"]
+        fields = ["id", "file_object", "scan_status", "creation_date"]
+        read_only_fields = ["id", "scan_status", "creation_date"]
 
     def validate(self, data: dict[str, UploadedFile]) -> dict[str, UploadedFile]:
         """
@@ -228,7 +426,8 @@ class ImageSerializer(serializers.ModelSerializer[Image]):
         Notes
         -----
         This method:
-        1. Processes the uploaded file to remove metadata
+        1. Processes the uploaded file to remove metadata, or reuses the stored
+           file of an identical earlier upload
         2. Creates the image record
         3. Links the image to an organization or group carousel when
            ``entity_type`` indicates those entity types
@@ -243,29 +442,33 @@ class ImageSerializer(serializers.ModelSerializer[Image]):
         entity_id = request.data.get("entity_id")
 
         for i, file_obj in enumerate(files):
-            file_data = validated_data.copy()
-            file_data["file_object"] = scrub_exif(file_obj)
-            image = super().create(file_data)
+            content_hash = get_upload_content_hash(self.context, i, file_obj)
+            sequence_index = int(sequences[i]) if sequences else i
+            image = reuse_stored_image(content_hash)
+            if image is None and self.context.get("async_scan"):
+                # Carousel links are created by the worker once the scan passes.
+                image = ImageScanJob.stage(
+                    file_obj,
+                    content_hash,
+                    entity_type=entity_type,
+                    entity_id=entity_id,
+                    sequence_index=sequence_index,
+                )
+                images.append(image)
+                logger.info(f"Staged Image instance {image.id} for a deferred scan")
+                continue
+
+            if image is None:
+                scan_unscanned_upload(self.context, content_hash, file_obj)
+                file_data = validated_data.copy()
+                file_data["file_object"] = scrub_exif(file_obj)
+                file_data["content_hash"] = content_hash
+                image = super().create(file_data)
+
             images.append(image)
             logger.info(f"Created Image instance with ID {image.id}")
 
-            if entity_type == "organization":
-                sequence_index = sequences[i] if sequences else i
-                OrganizationImage.objects.create(
-                    org_id=entity_id, image=image, sequence_index=sequence_index
-                )
-                logger.info(
-                    f"Added image {image.id} to organization {entity_id} carousel at index {i}"
-                )
-
-            if entity_type == "group":
-                sequence_index = sequences[i] if sequences else i
-                GroupImage.objects.create(
-                    group_id=entity_id, image=image, sequence_index=sequence_index
-                )
-                logger.info(
-                    f"Added image {image.id} to group {entity_id} carousel at index {i}"
-                )
+            link_image_to_carousel(image, entity_type, entity_id, sequence_index)
 
         return images
 
@@ -280,8 +483,8 @@ class ImageIconSerializer(serializers.ModelSerializer[Image]):
 
     class Meta:
         model = Image
-        fields = ["id", "file_object", "creation_date"]
-        read_only_fields = ["id", "creation_date"]
+        fields = ["id", "file_object", "scan_status", "creation_date"]
+        read_only_fields = ["id", "scan_status", "creation_date"]
 
     def validate(self, data: dict[str, UploadedFile]) -> dict[str, UploadedFile]:
         """
@@ -364,7 +567,8 @@ class ImageIconSerializer(serializers.ModelSerializer[Image]):
         Notes
         -----
         This method:
-        1. Processes the uploaded file to remove metadata
+        1. Processes the uploaded file to remove metadata, or reuses the stored
+           file of an identical earlier upload
         2. Creates the image record
         3. Associates the image as an icon with the requested entity type
            (organization or event) when applicable
@@ -377,50 +581,30 @@ class ImageIconSerializer(serializers.ModelSerializer[Image]):
         if file_obj is None:
             raise serializers.ValidationError("No file was submitted.")
 
-        file_data = validated_data.copy()
-        file_data["file_object"] = scrub_exif(file_obj)
-        image = super().create(file_data)
-        logger.info(f"Created Image instance with ID {image.id}")
+        content_hash = get_upload_content_hash(self.context, 0, file_obj)
+        image = reuse_stored_image(content_hash)
+        if image is None and self.context.get("async_scan"):
+            # The icon is set by the worker once the scan passes.
+            image = ImageScanJob.stage(
+                file_obj,
+                content_hash,
+                entity_type=entity,
+                entity_id=entity_id,
+                is_icon=True,
+            )
+            logger.info(f"Staged Image instance {image.id} for a deferred scan")
+            return image
 
-        if entity == "organization":
-            try:
-                organization = Organization.objects.get(id=entity_id)
-                organization.icon_url = image
-                organization.save()
-                logger.info(f"Updated Organization {entity_id} with icon {image.id}")
+        if image is None:
+            scan_unscanned_upload(self.context, content_hash, file_obj)
+            file_data = validated_data.copy()
+            file_data["file_object"] = scrub_exif(file_obj)
+            file_data["content_hash"] = content_hash
+            image = super().create(file_data)
 
-            except Exception as e:
-                logger.exception(
-                    f"An unexpected error occurred while updating the organization: {str(e)}"
-                )
-                raise serializers.ValidationError(
-                    f"An unexpected error occurred while updating the event: {str(e)}"
-                ) from e
-
-        if entity == "group":
-            logger.warning("ENTITY:", request.data.get("entity_type"))
-            logger.warning("GROUP-CAROUSEL group_id:", entity_id)
-            #       next_index = GroupImage.objects.filter(
-            #           group_id=group_id
-            #       ).count()
-            #       GroupImage.objects.create(
-            #           group_id=group_id, image=image, sequence_index=next_index
-            #       )
-
-        if entity == "event":
-            try:
-                event = Event.objects.get(id=entity_id)
-                event.icon_url = image
-                event.save()
-                logger.info(f"Updated Event {entity_id} with icon {image.id}")
-
-            except Exception as e:
-                logger.exception(
-                    f"An unexpected error occurred while updating the event: {str(e)}"
-                )
-                raise serializers.ValidationError(
-                    f"An unexpected error occurred while updating the event: {str(e)}"
-                ) from e
+        logger.info(f"Created Image instance with ID {image.id}")
+
+        set_entity_icon(image, entity, entity_id)
 
         return image
 
@@ -38,7 +38,10 @@ def _wait_for_filescan_health() -> None:
     This avoids flakiness when ClamAV or other scanners are still warming up
     and would otherwise cause transient "could not be scanned" errors.
     """
-    health_url = os.getenv("FILESCAN_HEALTH_URL", "http://filescan:9101/health")
+    # A deep check asks clamd directly instead of reading the cached health state.
+    health_url = os.getenv(
+        "FILESCAN_HEALTH_URL", "http://filescan:9101/health?deep=true"
+    )
     max_attempts = 20
     for _ in range(max_attempts):
         with contextlib.suppress(httpx.RequestError):
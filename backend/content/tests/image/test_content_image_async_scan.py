@@ -0,0 +1,163 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Testing for deferred scanning of image uploads.
+"""
+
+import io
+import os
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image as TestImage
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from communities.organizations.factories import OrganizationFactory
+from communities.organizations.models import OrganizationImage
+from content.image_scans import process_pending_scans
+from content.models import Image, ImageScanJob
+from core.filescan import FilescanError
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _async_settings(settings, monkeypatch, tmp_path: Path) -> Path:
+    settings.IMAGE_UPLOAD_ASYNC_SCAN = True
+    settings.IMAGE_UPLOAD_SCAN_MAX_ATTEMPTS = 2
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    # The staging storage is resolved when the model is loaded.
+    monkeypatch.setattr(
+        ImageScanJob._meta.get_field("staged_file"),
+        "storage",
+        FileSystemStorage(location=str(tmp_path / "staging")),
+    )
+
+    return tmp_path
+
+
+def _upload_payload(org_id: str, async_scan: bool = True) -> dict[str, Any]:
+    img = TestImage.new("RGB", (100, 100), color="green")
+    img_file = io.BytesIO()
+    img.save(img_file, format="JPEG")
+
+    return {
+        "entity_id": org_id,
+        "entity_type": "organization",
+        "async_scan": "true" if async_scan else "false",
+        "file_object": SimpleUploadedFile(
+            "logo.jpg", img_file.getvalue(), content_type="image/jpeg"
+        ),
+    }
+
+
+def _staged_files(tmp_path: Path) -> list[str]:
+    staging = tmp_path / "staging" / "pending"
+
+    return os.listdir(staging) if staging.exists() else []
+
+
+def test_content_image_async_scan_publishes_clean_upload(
+    client: APIClient, tmp_path: Path
+) -> None:
+    org = OrganizationFactory()
+
+    with patch("core.filescan.scan_helpers.scan_files") as mock_sync_scan:
+        response = client.post(
+            "/v1/content/images", _upload_payload(str(org.id)), format="multipart"
+        )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    mock_sync_scan.assert_not_called()
+    image_id = response.json()[0]["id"]
+    assert response.json()[0]["scanStatus"] == Image.SCAN_STATUS_PENDING
+    assert response.json()[0]["fileObject"] is None
+    assert len(_staged_files(tmp_path)) == 1
+    assert not OrganizationImage.objects.filter(org=org).exists()
+
+    poll = client.get(f"/v1/content/images/{image_id}/scan_status")
+    assert poll.status_code == status.HTTP_200_OK
+    assert poll.json()["scanStatus"] == Image.SCAN_STATUS_PENDING
+
+    with patch(
+        "content.image_scans.scan_file", return_value={"malware_detected": False}
+    ):
+        assert process_pending_scans(limit=10) == 1
+
+    poll = client.get(f"/v1/content/images/{image_id}/scan_status")
+    assert poll.json()["scanStatus"] == Image.SCAN_STATUS_CLEAN
+    assert poll.json()["fileObject"].startswith("images/")
+    assert (tmp_path / "media" / poll.json()["fileObject"]).exists()
+    assert _staged_files(tmp_path) == []
+    assert OrganizationImage.objects.filter(org=org, image_id=image_id).exists()
+    assert not ImageScanJob.objects.exists()
+
+
+def test_content_image_async_scan_rejects_flagged_upload(
+    client: APIClient, tmp_path: Path
+) -> None:
+    org = OrganizationFactory()
+    response = client.post(
+        "/v1/content/image_icon", _upload_payload(str(org.id)), format="multipart"
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+
+    with patch(
+        "content.image_scans.scan_file", return_value={"malware_detected": True}
+    ):
+        call_command("scan_pending_images", "--once", stdout=io.StringIO())
+
+    image = Image.objects.get(id=response.json()["id"])
+    org.refresh_from_db()
+
+    assert image.scan_status == Image.SCAN_STATUS_REJECTED
+    assert not image.file_object
+    assert org.icon_url is None
+    assert _staged_files(tmp_path) == []
+
+
+def test_content_image_async_scan_retries_then_fails(
+    client: APIClient, tmp_path: Path
+) -> None:
+    org = OrganizationFactory()
+    response = client.post(
+        "/v1/content/images", _upload_payload(str(org.id)), format="multipart"
+    )
+    image_id = response.json()[0]["id"]
+
+    with patch("content.image_scans.scan_file", side_effect=FilescanError("down")):
+        process_pending_scans(limit=10)
+        assert ImageScanJob.objects.get(image_id=image_id).attempts == 1
+
+        process_pending_scans(limit=10)
+
+    assert Image.objects.get(id=image_id).scan_status == Image.SCAN_STATUS_FAILED
+    assert not ImageScanJob.objects.exists()
+    assert _staged_files(tmp_path) == []
+
+
+def test_content_image_async_scan_disabled_scans_synchronously(
+    client: APIClient, settings
+) -> None:
+    settings.IMAGE_UPLOAD_ASYNC_SCAN = False
+    org = OrganizationFactory()
+
+    with patch(
+        "core.filescan.scan_helpers.scan_files",
+        side_effect=lambda uploads, **kwargs: (
+            [{"malware_detected": False}] * len(uploads)
+        ),
+    ) as mock_sync_scan:
+        response = client.post(
+            "/v1/content/images", _upload_payload(str(org.id)), format="multipart"
+        )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()[0]["scanStatus"] == Image.SCAN_STATUS_CLEAN
+    mock_sync_scan.assert_called_once()
+    assert not ImageScanJob.objects.exists()
@@ -0,0 +1,165 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Testing for content-hash deduplication of uploaded images.
+"""
+
+import io
+import os
+from collections.abc import Generator
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image as TestImage
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from communities.organizations.factories import OrganizationFactory
+from content.models import Image, compute_content_hash
+
+
+@pytest.fixture
+def _mock_scan_file() -> Generator[MagicMock, None, None]:
+    """
+    Mock the filescan service and expose the mock to count scans.
+    """
+    with patch(
+        "core.filescan.scan_helpers.scan_files",
+        side_effect=lambda uploads, **kwargs: (
+            [{"malware_detected": False}] * len(uploads)
+        ),
+    ) as mock_scan:
+        yield mock_scan
+
+
+def _make_image_bytes(color: str = "red") -> bytes:
+    img = TestImage.new("RGB", (100, 100), color=color)
+    img_file = io.BytesIO()
+    img.save(img_file, format="JPEG")
+
+    return img_file.getvalue()
+
+
+def _upload_payload(org_id: str, image_bytes: bytes) -> dict[str, Any]:
+    return {
+        "entity_id": org_id,
+        "entity_type": "organization",
+        "file_object": SimpleUploadedFile(
+            "logo.jpg", image_bytes, content_type="image/jpeg"
+        ),
+    }
+
+
+def _cleanup_files() -> None:
+    for name in set(Image.objects.values_list("file_object", flat=True)):
+        file_path = os.path.join(settings.MEDIA_ROOT, name)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def test_content_image_dedup_compute_content_hash_rewinds() -> None:
+    image_bytes = _make_image_bytes()
+    upload = SimpleUploadedFile("logo.jpg", image_bytes, content_type="image/jpeg")
+
+    content_hash = compute_content_hash(upload)
+
+    assert len(content_hash) == 64
+    assert upload.read() == image_bytes
+
+
+@pytest.mark.django_db
+def test_content_image_dedup_reuses_stored_file(
+    client: APIClient, _mock_scan_file: MagicMock
+) -> None:
+    org = OrganizationFactory()
+    image_bytes = _make_image_bytes()
+
+    first = client.post(
+        "/v1/content/images",
+        _upload_payload(str(org.id), image_bytes),
+        format="multipart",
+    )
+    second = client.post(
+        "/v1/content/images",
+        _upload_payload(str(org.id), image_bytes),
+        format="multipart",
+    )
+
+    assert first.status_code == status.HTTP_201_CREATED
+    assert second.status_code == status.HTTP_201_CREATED
+
+    images = list(Image.objects.order_by("creation_date"))
+    assert len(images) == 2
+    assert images[0].id != images[1].id
+    assert images[0].content_hash == images[1].content_hash
+    assert images[0].file_object.name == images[1].file_object.name
+
+    # The second upload matched stored bytes, so it is neither scanned nor stored again.
+    assert _mock_scan_file.call_count == 1
+    # Image uploads are scanned with the image profile so non-images are turned away early.
+    assert _mock_scan_file.call_args.kwargs["profile"] == "image"
+
+    _cleanup_files()
+
+
+@pytest.mark.django_db
+def test_content_image_dedup_delete_keeps_shared_file(
+    client: APIClient, _mock_scan_file: MagicMock
+) -> None:
+    org = OrganizationFactory()
+    image_bytes = _make_image_bytes(color="blue")
+
+    for _ in range(2):
+        response = client.post(
+            "/v1/content/images",
+            _upload_payload(str(org.id), image_bytes),
+            format="multipart",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    first, second = Image.objects.order_by("creation_date")
+    file_path = os.path.join(settings.MEDIA_ROOT, first.file_object.name)
+    assert os.path.exists(file_path)
+
+    first.delete()
+    assert os.path.exists(file_path)
+    assert second.file_reference_count() == 1
+
+    second.delete()
+    assert not os.path.exists(file_path)
+
+
+@pytest.mark.django_db
+def test_content_image_dedup_scans_upload_when_stored_image_is_gone(
+    client: APIClient, _mock_scan_file: MagicMock
+) -> None:
+    org = OrganizationFactory()
+    image_bytes = _make_image_bytes(color="green")
+
+    first = client.post(
+        "/v1/content/images",
+        _upload_payload(str(org.id), image_bytes),
+        format="multipart",
+    )
+    assert first.status_code == status.HTTP_201_CREATED
+    assert _mock_scan_file.call_count == 1
+
+    # The stored image is deleted after the view skipped the scan, so the
+    # serializer finds nothing to reuse and has to scan the upload itself.
+    _mock_scan_file.side_effect = lambda uploads, **kwargs: (
+        [{"malware_detected": True}] * len(uploads)
+    )
+    with patch("content.serializers.reuse_stored_image", return_value=None):
+        second = client.post(
+            "/v1/content/images",
+            _upload_payload(str(org.id), image_bytes),
+            format="multipart",
+        )
+
+    assert second.status_code == status.HTTP_400_BAD_REQUEST
+    assert _mock_scan_file.call_count == 2
+    assert Image.objects.count() == 1
+
+    _cleanup_files()
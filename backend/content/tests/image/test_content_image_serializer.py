@@ -25,6 +25,20 @@ from events.models import Event
 MEDIA_ROOT = settings.MEDIA_ROOT  # ensure this points to the images folder
 
 
+@pytest.fixture(autouse=True)
+def _clean_scan():
+    """
+    Scans of uploads the serializers store are clean unless a test says otherwise.
+    """
+    with patch(
+        "core.filescan.scan_helpers.scan_files",
+        side_effect=lambda uploads, **kwargs: (
+            [{"malware_detected": False}] * len(uploads)
+        ),
+    ) as mock_scan:
+        yield mock_scan
+
+
 @pytest.mark.django_db
 def test_content_image_serializer_missing_entity_type() -> None:
     """
@@ -34,7 +34,10 @@ def _mock_scan_file() -> Generator[None, None, None]:
     The view proceeds to serializer validation and create.
     """
     with patch(
-        "core.filescan.scan_helpers.scan_file", return_value={"malware_detected": False}
+        "core.filescan.scan_helpers.scan_files",
+        side_effect=lambda uploads, **kwargs: (
+            [{"malware_detected": False}] * len(uploads)
+        ),
     ):
         yield
 
@@ -200,11 +203,8 @@ def test_content_image_upload_create_single_file_view(client: APIClient) -> None
     except ValueError:
         assert False, f"Filename is not a valid UUID: {uuid_filename}"
 
-    file_object = response_data[0]["fileObject"].split("/")[-1]
-    file_to_delete = os.path.join(settings.MEDIA_ROOT, "images", file_object)
-
-    if os.path.exists(file_to_delete):
-        os.remove(file_to_delete)
+    if os.path.exists(uploaded_file):
+        os.remove(uploaded_file)
 
 
 @pytest.mark.django_db
@@ -36,6 +36,10 @@ router.register(
 
 urlpatterns = [
     path("", include(router.urls)),
+    path(
+        "images/<uuid:id>/scan_status",
+        view=views.ImageScanStatusAPIView.as_view(),
+    ),
     path("resource_flags", view=views.ResourceFlagAPIView.as_view()),
     path(
         "resource_flags/<uuid:id>",
@@ -4,9 +4,12 @@
 API views for content management.
 """
 
-from typing import Any
+from collections.abc import Sequence
+from typing import Any, cast
 from uuid import UUID
 
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 from django.db import IntegrityError, OperationalError
 from django.db.models import Q
 from drf_spectacular.utils import OpenApiResponse, extend_schema
@@ -27,6 +30,7 @@ from content.models import (
     Resource,
     ResourceFlag,
     Topic,
+    compute_content_hash,
 )
 from content.serializers import (
     DiscussionEntrySerializer,
@@ -399,6 +403,58 @@ class ResourceFlagDetailAPIView(GenericAPIView[ResourceFlag]):
 # MARK: Image
 
 
+def _uploads_needing_scan(
+    uploads: Sequence[UploadedFile], content_hashes: Sequence[str]
+) -> dict[str, UploadedFile]:
+    """
+    Filter out uploads whose bytes match an already stored (and scanned) image.
+
+    Parameters
+    ----------
+    uploads : Sequence[UploadedFile]
+        The uploaded files from the request.
+
+    content_hashes : Sequence[str]
+        The SHA-256 hex digests of the uploads in the same order.
+
+    Returns
+    -------
+    dict[str, UploadedFile]
+        The uploads that have not been stored before and so need to be scanned,
+        keyed by their content hash.
+    """
+    known_hashes = set(
+        Image.objects.filter(content_hash__in=content_hashes)
+        .exclude(file_object="")
+        .values_list("content_hash", flat=True)
+    )
+
+    return {
+        content_hash: upload
+        for upload, content_hash in zip(uploads, content_hashes, strict=True)
+        if content_hash not in known_hashes
+    }
+
+
+def _use_async_scan(request: Request) -> bool:
+    """
+    Check whether the uploads of a request should be scanned in the background.
+
+    Parameters
+    ----------
+    request : Request
+        The upload request, which opts in with ``async_scan=true``.
+
+    Returns
+    -------
+    bool
+        True if deferred scanning is enabled and was requested.
+    """
+    requested = request.POST.get("async_scan", "").lower() == "true"
+
+    return bool(settings.IMAGE_UPLOAD_ASYNC_SCAN and requested)
+
+
 class ImageViewSet(viewsets.ModelViewSet[Image]):
     queryset = Image.objects.all()
     serializer_class = ImageSerializer
@@ -406,20 +462,37 @@ class ImageViewSet(viewsets.ModelViewSet[Image]):
 
     def create(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         files = request.FILES.getlist("file_object")
-        if err := scan_uploads_and_rewind(files or []):
+        content_hashes = [compute_content_hash(f) for f in files]
+        async_scan = _use_async_scan(request)
+        to_scan = {} if async_scan else _uploads_needing_scan(files, content_hashes)
+        if err := scan_uploads_and_rewind(to_scan.values(), profile="image"):
             return err
 
         serializer = self.get_serializer(
             data=request.data,
-            context={"request": request},
+            context={
+                "request": request,
+                "content_hashes": content_hashes,
+                # Uploads matching a stored image are scanned by the serializer
+                # if that image is gone by the time it runs.
+                "scanned_hashes": set(to_scan),
+                "async_scan": async_scan,
+            },
         )
         if serializer.is_valid():
-            images = serializer.save()  # returns a list of images
+            images = cast(list[Image], serializer.save())  # returns a list of images
 
             # We need to serialize the list of images.
             response_serializer = self.get_serializer(images, many=True)
 
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+            # Staged uploads are published once the background scan passes.
+            pending = any(
+                image.scan_status == Image.SCAN_STATUS_PENDING for image in images
+            )
+            return Response(
+                response_serializer.data,
+                status=status.HTTP_202_ACCEPTED if pending else status.HTTP_201_CREATED,
+            )
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -427,6 +500,26 @@ class ImageViewSet(viewsets.ModelViewSet[Image]):
     # The model uses a signal to delete the file from the filesystem when the Image instance is deleted.
 
 
+class ImageScanStatusAPIView(GenericAPIView[Image]):
+    queryset = Image.objects.all()
+    serializer_class = ImageSerializer
+
+    @extend_schema(
+        responses={
+            200: ImageSerializer,
+            404: OpenApiResponse(response={"detail": "Image not found."}),
+        }
+    )
+    def get(self, request: Request, id: str | UUID) -> Response:
+        image = Image.objects.filter(id=id).first()
+        if image is None:
+            return Response(
+                {"detail": "Image not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(ImageSerializer(image).data, status=status.HTTP_200_OK)
+
+
 # MARK: Icon
 
 
@@ -437,19 +530,34 @@ class ImageIconViewSet(viewsets.ModelViewSet[Image]):
 
     def create(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         upload = request.FILES.get("file_object")
-        if err := scan_uploads_and_rewind([upload] if upload else []):
+        files = [upload] if upload else []
+        content_hashes = [compute_content_hash(f) for f in files]
+        async_scan = _use_async_scan(request)
+        to_scan = {} if async_scan else _uploads_needing_scan(files, content_hashes)
+        if err := scan_uploads_and_rewind(to_scan.values(), profile="image"):
             return err
 
         serializer = self.get_serializer(
             data=request.data,
-            context={"request": request},
+            context={
+                "request": request,
+                "content_hashes": content_hashes,
+                # Uploads matching a stored image are scanned by the serializer
+                # if that image is gone by the time it runs.
+                "scanned_hashes": set(to_scan),
+                "async_scan": async_scan,
+            },
         )
         if serializer.is_valid():
             image = serializer.save()  # returns an image
 
             response_serializer = self.get_serializer(image)
 
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+            pending = image.scan_status == Image.SCAN_STATUS_PENDING
+            return Response(
+                response_serializer.data,
+                status=status.HTTP_202_ACCEPTED if pending else status.HTTP_201_CREATED,
+            )
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -5,6 +5,14 @@ Site variables for the admin panel.
 
 from django.contrib import admin
 
+from core.models import EmailOutbox, SecurityEvent, ThrottleBucket
+
 admin.site.site_header = "activist administration"
 admin.site.site_title = "activist admin"
 admin.site.index_title = "Backend administration"
+
+# MARK: Register
+
+admin.site.register(EmailOutbox)
+admin.site.register(SecurityEvent)
+admin.site.register(ThrottleBucket)
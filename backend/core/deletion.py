@@ -0,0 +1,243 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Background deletion of accounts and organizations in batches of bounded size.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import ForeignObjectRel, QuerySet
+from django.utils import timezone
+
+from authentication.models import UserModel
+from communities.organizations.models import Organization
+from core.models import DeletionJob
+
+logger = logging.getLogger(__name__)
+
+ENTITY_MODELS: dict[str, type[models.Model]] = {
+    DeletionJob.ENTITY_USER: UserModel,
+    DeletionJob.ENTITY_ORGANIZATION: Organization,
+}
+
+# Levels of dependents that are deleted in batches of their own; the dependents
+# below them are deleted by the cascade of the batch that deletes their parents.
+MAX_DEPTH = 2
+
+
+def _cascade_relations(model: type[models.Model]) -> list[ForeignObjectRel]:
+    """
+    Return the relations whose rows are deleted with the rows of a model.
+
+    Parameters
+    ----------
+    model : type[models.Model]
+        The model that is deleted.
+
+    Returns
+    -------
+    list[ForeignObjectRel]
+        The reverse foreign keys with ``on_delete=CASCADE``, including those of
+        the tables behind many-to-many fields.
+    """
+    return [
+        field
+        for field in model._meta.get_fields(include_hidden=True)
+        if isinstance(field, ForeignObjectRel)
+        and not field.many_to_many
+        and field.on_delete is models.CASCADE
+    ]
+
+
+def deletion_plan(
+    model: type[models.Model], queryset: QuerySet[Any], depth: int = 0
+) -> list[QuerySet[Any]]:
+    """
+    List the rows to delete with a queryset, dependents before their parents.
+
+    Parameters
+    ----------
+    model : type[models.Model]
+        The model of the queryset.
+
+    queryset : QuerySet[Any]
+        The rows to delete.
+
+    depth : int, default=0
+        How many levels of dependents are above the queryset.
+
+    Returns
+    -------
+    list[QuerySet[Any]]
+        The steps of the deletion, ending with the queryset itself.
+    """
+    steps: list[QuerySet[Any]] = []
+    if depth < MAX_DEPTH:
+        for relation in _cascade_relations(model):
+            related_model = relation.related_model
+            dependents = related_model._base_manager.filter(
+                **{
+                    f"{relation.field.name}__in": queryset.values(
+                        relation.field_name or "pk"
+                    )
+                }
+            )
+            steps += deletion_plan(related_model, dependents, depth + 1)
+
+    steps.append(queryset)
+    return steps
+
+
+def schedule_deletion(entity: UserModel | Organization) -> DeletionJob:
+    """
+    Deactivate an account or an organization and queue its deletion.
+
+    Parameters
+    ----------
+    entity : UserModel | Organization
+        The account or organization to delete.
+
+    Returns
+    -------
+    DeletionJob
+        The job that deletes the entity.
+
+    Notes
+    -----
+    A deactivated user can no longer sign in or authenticate with a token, and a
+    deactivated organization has a ``deletion_date``.
+    """
+    with transaction.atomic():
+        if isinstance(entity, UserModel):
+            entity.is_active = False
+            entity.save(update_fields=["is_active"])
+            entity_type = DeletionJob.ENTITY_USER
+
+        else:
+            entity.deletion_date = entity.deletion_date or timezone.now()
+            entity.save(update_fields=["deletion_date"])
+            entity_type = DeletionJob.ENTITY_ORGANIZATION
+
+        job = DeletionJob.schedule(entity_type, entity.pk)
+
+    logger.info(f"Scheduled the deletion of {entity_type} {entity.pk} as job {job.id}")
+    return job
+
+
+def run_deletion_job(job: DeletionJob, batch_size: int) -> None:
+    """
+    Delete the rows of a job in batches, starting at its current step.
+
+    Parameters
+    ----------
+    job : DeletionJob
+        The claimed job.
+
+    batch_size : int
+        The maximum number of rows deleted per transaction, without the rows of
+        models below ``MAX_DEPTH`` that the cascade deletes with them.
+    """
+    model = ENTITY_MODELS[job.entity_type]
+    steps = deletion_plan(model, model._base_manager.filter(pk=job.entity_id))
+    lease = timedelta(seconds=settings.DELETION_JOB_LEASE_SECONDS)
+    while job.step < len(steps):
+        queryset = steps[job.step]
+        with transaction.atomic():
+            ids = list(queryset.order_by().values_list("pk", flat=True)[:batch_size])
+            if ids:
+                job.deleted_count += queryset.model._base_manager.filter(
+                    pk__in=ids
+                ).delete()[0]
+
+            if len(ids) < batch_size:
+                job.step += 1
+
+            # Progress is committed with the batch, and renews the lease.
+            job.next_attempt_at = timezone.now() + lease
+            job.save(update_fields=["step", "deleted_count", "next_attempt_at"])
+
+    job.status = DeletionJob.STATUS_DONE
+    job.finished_at = timezone.now()
+    job.last_error = ""
+    job.save(update_fields=["status", "finished_at", "last_error"])
+    logger.info(
+        f"Deleted {job.entity_type} {job.entity_id}: {job.deleted_count} rows "
+        f"(job {job.id})"
+    )
+
+
+def _record_failure(job: DeletionJob, error: Exception) -> None:
+    """
+    Schedule the next attempt of a job or give up on it.
+
+    Parameters
+    ----------
+    job : DeletionJob
+        The job that failed.
+
+    error : Exception
+        Why it failed.
+    """
+    job.attempts += 1
+    job.last_error = str(error) or type(error).__name__
+    if job.attempts >= settings.DELETION_JOB_MAX_ATTEMPTS:
+        job.status = DeletionJob.STATUS_FAILED
+        logger.error(
+            f"Giving up on deletion job {job.id} after {job.attempts} attempts: {error}"
+        )
+
+    else:
+        delay = settings.DELETION_JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+        job.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        logger.warning(
+            f"Deletion job {job.id} failed at step {job.step} (attempt {job.attempts}), retrying in {delay:.0f}s: {error}"
+        )
+
+    job.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+
+
+def run_next_deletion_job(batch_size: int) -> DeletionJob | None:
+    """
+    Claim the next due deletion job and run it.
+
+    Parameters
+    ----------
+    batch_size : int
+        The maximum number of rows deleted per transaction.
+
+    Returns
+    -------
+    DeletionJob | None
+        The job that was run, None if no job was due.
+
+    Notes
+    -----
+    The job is claimed with ``SKIP LOCKED`` and a lease of
+    ``DELETION_JOB_LEASE_SECONDS``, so several workers can run side by side.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            DeletionJob.objects.select_for_update(skip_locked=True)
+            .filter(status=DeletionJob.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.next_attempt_at = now + timedelta(
+            seconds=settings.DELETION_JOB_LEASE_SECONDS
+        )
+        job.save(update_fields=["next_attempt_at"])
+
+    try:
+        run_deletion_job(job, batch_size)
+
+    except Exception as exc:
+        _record_failure(job, exc)
+
+    return job
@@ -2,7 +2,20 @@
 Filescan client package. Re-export the public API.
 """
 
-from core.filescan.filescan_client import FilescanError, scan_file
+from core.filescan.filescan_client import (
+    FilescanError,
+    get_metrics,
+    is_flagged,
+    scan_file,
+    scan_files,
+)
 from core.filescan.scan_helpers import scan_uploads_and_rewind
 
-__all__ = ["FilescanError", "scan_file", "scan_uploads_and_rewind"]
+__all__ = [
+    "FilescanError",
+    "get_metrics",
+    "is_flagged",
+    "scan_file",
+    "scan_files",
+    "scan_uploads_and_rewind",
+]
@@ -0,0 +1,132 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Thread-safe circuit breaker used to fail fast while the filescan service is down.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stop calling a dependency after repeated failures and probe it again after a cool-down.
+
+    Parameters
+    ----------
+    failure_threshold : int
+        Consecutive failures after which the circuit opens.
+
+    reset_timeout : float
+        Seconds the circuit stays open before a single trial call is let through.
+
+    clock : Callable[[], float], default=time.monotonic
+        Time source, replaceable in tests.
+
+    Notes
+    -----
+    - closed: calls pass through; failures are counted.
+    - open: calls are rejected without contacting the dependency.
+    - half_open: one trial call is allowed; success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.times_opened = 0
+        self.rejected_calls = 0
+
+    @property
+    def state(self) -> str:
+        """
+        The current state of the circuit.
+
+        Returns
+        -------
+        str
+            One of ``closed``, ``open`` or ``half_open``.
+        """
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        """
+        Compute the state, moving from open to half_open once the cool-down has passed.
+
+        Returns
+        -------
+        str
+            The current state. Must be called with the lock held.
+        """
+        if (
+            self._state == STATE_OPEN
+            and self._clock() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = STATE_HALF_OPEN
+            self._trial_in_flight = False
+
+        return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may be made now.
+
+        Returns
+        -------
+        bool
+            True if the call may proceed, False if it should fail fast.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == STATE_CLOSED:
+                return True
+
+            if state == STATE_HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            self.rejected_calls += 1
+            return False
+
+    def record_success(self) -> None:
+        """
+        Record a successful call and close the circuit.
+        """
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """
+        Record a failed call and open the circuit if the threshold is reached.
+        """
+        with self._lock:
+            self._consecutive_failures += 1
+            if (
+                self._state == STATE_HALF_OPEN
+                or self._consecutive_failures >= self.failure_threshold
+            ):
+                if self._state != STATE_OPEN:
+                    self.times_opened += 1
+
+                self._state = STATE_OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
@@ -3,19 +3,35 @@
 Small HTTP client for the filescan service used by the backend.
 
 This module is the single place where the backend knows how to call the
-``/scan`` endpoint. Code that needs to talk to the filescan service
-should import and use ``scan_file`` instead of reimplementing the
-protocol.
+``/scan`` and ``/scan/batch`` endpoints. Code that needs to talk to the filescan
+service should import and use ``scan_file`` or ``scan_files`` instead of
+reimplementing the protocol.
+
+A single pooled ``httpx.Client`` is shared by the process so that scans reuse
+keep-alive connections. Transient failures are retried with jittered
+exponential backoff and a circuit breaker makes uploads fail fast while the
+service is down instead of each one waiting out the full timeout. Responses are
+cached by content hash so that identical bytes are not uploaded again while the
+service's signature database is unchanged.
 """
 
 from __future__ import annotations
 
+import logging
 import os
+import random
+import threading
+import time
 from typing import IO, Any, cast
 
 import httpx
 from django.core.files.uploadedfile import UploadedFile
 
+from core.filescan.circuit_breaker import CircuitBreaker
+from core.filescan.verdict_cache import VerdictCache, hash_file
+
+logger = logging.getLogger(__name__)
+
 
 class FilescanError(Exception):
     """
@@ -48,8 +64,537 @@ def _build_scan_url() -> str:
 
 FILESCAN_URL = _build_scan_url()
 
+# Must not exceed FILESCAN_BATCH_MAX_FILES of the filescan service.
+FILESCAN_BATCH_MAX_FILES = int(os.getenv("FILESCAN_BATCH_MAX_FILES", "20"))
+
+FILESCAN_TIMEOUT = float(os.getenv("FILESCAN_TIMEOUT", "10"))
+FILESCAN_CONNECT_TIMEOUT = float(os.getenv("FILESCAN_CONNECT_TIMEOUT", "2"))
+FILESCAN_MAX_CONNECTIONS = int(os.getenv("FILESCAN_MAX_CONNECTIONS", "10"))
+FILESCAN_MAX_RETRIES = int(os.getenv("FILESCAN_MAX_RETRIES", "2"))
+FILESCAN_RETRY_BACKOFF = float(os.getenv("FILESCAN_RETRY_BACKOFF", "0.2"))
+FILESCAN_BREAKER_THRESHOLD = int(os.getenv("FILESCAN_BREAKER_THRESHOLD", "5"))
+FILESCAN_BREAKER_RESET_SECONDS = float(
+    os.getenv("FILESCAN_BREAKER_RESET_SECONDS", "30")
+)
+# Upper bound for waiting on the Retry-After of an overloaded service.
+FILESCAN_RETRY_AFTER_MAX = float(os.getenv("FILESCAN_RETRY_AFTER_MAX", "5"))
+
+# Scanning has no side effects for the caller, so these failures are safe to retry.
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+RETRYABLE_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+    httpx.RemoteProtocolError,
+)
+
+
+def is_flagged(result: dict[str, Any]) -> bool:
+    """
+    Whether a scan response means the upload must not be accepted.
+
+    Parameters
+    ----------
+    result : dict of str to Any
+        A response of the filescan service for one file.
+
+    Returns
+    -------
+    bool
+        True if malware was detected or the file was rejected, e.g. because its
+        content is not of a type the upload profile accepts.
+    """
+    return bool(result.get("malware_detected") or result.get("rejected"))
+
+
+def _cache_key(content_hash: str, profile: str | None) -> str:
+    """
+    Build the verdict cache key of a file.
+
+    Parameters
+    ----------
+    content_hash : str
+        The SHA-256 of the file.
+
+    profile : str | None
+        The upload profile, since the same bytes may be rejected under one profile
+        and accepted without.
+
+    Returns
+    -------
+    str
+        The key.
+    """
+    return f"{content_hash}:{profile}" if profile else content_hash
+
+
+def _auth_headers() -> dict[str, str]:
+    """
+    Build the authentication headers for requests to the filescan service.
+
+    Returns
+    -------
+    dict[str, str]
+        The ``X-Filescan-Token`` header if ``FILESCAN_INTERNAL_TOKEN`` is set.
+    """
+    headers: dict[str, str] = {}
+    if token := os.getenv("FILESCAN_INTERNAL_TOKEN"):
+        headers["X-Filescan-Token"] = token
+
+    return headers
+
+
+class FilescanClient:
+    """
+    Pooled, retrying HTTP client for the filescan service.
+
+    Parameters
+    ----------
+    url : str, default=FILESCAN_URL
+        The URL of the ``/scan`` endpoint.
+
+    batch_url : str | None, default=None
+        The URL of the ``/scan/batch`` endpoint; derived from ``url`` if not given.
+
+    transport : httpx.BaseTransport | None, default=None
+        Optional transport, used by tests to mock the service.
+
+    max_retries : int, default=FILESCAN_MAX_RETRIES
+        Retries after the first attempt for retryable failures.
+
+    retry_backoff : float, default=FILESCAN_RETRY_BACKOFF
+        Base delay in seconds for the jittered exponential backoff.
+
+    breaker : CircuitBreaker | None, default=None
+        The circuit breaker to use; one is created from the settings if not given.
+
+    verdict_cache : VerdictCache | None, default=None
+        The cache of scan responses; one is created from the settings if not given.
+    """
+
+    def __init__(
+        self,
+        url: str = FILESCAN_URL,
+        batch_url: str | None = None,
+        transport: httpx.BaseTransport | None = None,
+        max_retries: int = FILESCAN_MAX_RETRIES,
+        retry_backoff: float = FILESCAN_RETRY_BACKOFF,
+        breaker: CircuitBreaker | None = None,
+        verdict_cache: VerdictCache | None = None,
+    ) -> None:
+        self.url = url
+        self.batch_url = batch_url or url.rstrip("/") + "/batch"
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=FILESCAN_BREAKER_THRESHOLD,
+            reset_timeout=FILESCAN_BREAKER_RESET_SECONDS,
+        )
+        self.verdict_cache = verdict_cache or VerdictCache()
+        self._client = httpx.Client(
+            timeout=httpx.Timeout(FILESCAN_TIMEOUT, connect=FILESCAN_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=FILESCAN_MAX_CONNECTIONS,
+                max_keepalive_connections=FILESCAN_MAX_CONNECTIONS,
+                keepalive_expiry=30.0,
+            ),
+            transport=transport,
+        )
+        self._metrics_lock = threading.Lock()
+        self._requests = 0
+        self._connections_opened = 0
+        self._retries = 0
+        self._throttled = 0
+        self._failures = 0
+
+    # MARK: Metrics
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        """
+        Increment one of the metric counters.
+
+        Parameters
+        ----------
+        counter : str
+            The attribute name of the counter.
+
+        amount : int, default=1
+            The amount to add.
+        """
+        with self._metrics_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _trace(self, event_name: str, info: dict[str, Any]) -> None:
+        """
+        Count new connections using httpcore's request tracing.
+
+        Parameters
+        ----------
+        event_name : str
+            The trace event (e.g. ``connection.connect_tcp.complete``).
+
+        info : dict[str, Any]
+            Event details, unused.
+        """
+        if event_name.startswith("connection.connect_") and event_name.endswith(
+            ".complete"
+        ):
+            self._count("_connections_opened")
+
+    def metrics(self) -> dict[str, int | float | str]:
+        """
+        Return connection reuse, circuit breaker and verdict cache metrics for this client.
+
+        Returns
+        -------
+        dict[str, int | float | str]
+            Counters for requests, opened and reused connections, retries, requests
+            throttled by the service, failures, the breaker state and the verdict
+            cache hit rate.
+        """
+        with self._metrics_lock:
+            requests = self._requests
+            connections_opened = self._connections_opened
+            retries = self._retries
+            throttled = self._throttled
+            failures = self._failures
+
+        return {
+            "requests": requests,
+            "connections_opened": connections_opened,
+            "connections_reused": max(0, requests - connections_opened),
+            "retries": retries,
+            "throttled": throttled,
+            "failures": failures,
+            "breaker_state": self.breaker.state,
+            "breaker_times_opened": self.breaker.times_opened,
+            "breaker_rejected_calls": self.breaker.rejected_calls,
+            **self.verdict_cache.metrics(),
+        }
+
+    # MARK: Scanning
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """
+        Compute a full-jitter exponential backoff delay.
+
+        Parameters
+        ----------
+        attempt : int
+            The retry number, starting at 1.
+
+        Returns
+        -------
+        float
+            Seconds to wait before the retry.
+        """
+        return random.uniform(0, self.retry_backoff * (2 ** (attempt - 1)))
+
+    def _retry_after(self, response: httpx.Response) -> float | None:
+        """
+        Read how long an overloaded service asked the client to wait.
+
+        Parameters
+        ----------
+        response : httpx.Response
+            A 429 or 503 response of the filescan service.
+
+        Returns
+        -------
+        float | None
+            Seconds from the ``Retry-After`` header, capped at
+            ``FILESCAN_RETRY_AFTER_MAX``, or None if the header is missing or
+            not a number of seconds.
+        """
+        try:
+            retry_after = float(response.headers["Retry-After"])
+
+        except (KeyError, ValueError):
+            return None
+
+        return min(max(0.0, retry_after), FILESCAN_RETRY_AFTER_MAX)
+
+    def _post(
+        self,
+        url: str,
+        files: list[tuple[str, tuple[str | None, IO[bytes]]]],
+        data: dict[str, str] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Post files to the filescan service, retrying transient failures.
+
+        Parameters
+        ----------
+        url : str
+            The endpoint to call.
+
+        files : list[tuple[str, tuple[str | None, IO[bytes]]]]
+            The multipart file fields; each file is rewound before every attempt.
 
-def scan_file(upload: UploadedFile) -> dict[str, Any]:
+        data : dict[str, str] | None, default=None
+            Additional form fields.
+
+        Returns
+        -------
+        dict of str to Any
+            The JSON response of the service.
+
+        Raises
+        ------
+        FilescanError
+            If the circuit is open, on network error, on a non-200 response or on a
+            response that is not valid JSON.
+        """
+        if not self.breaker.allow_request():
+            raise FilescanError("Filescan service is unavailable (circuit open).")
+
+        headers = _auth_headers()
+        attempt = 0
+        while True:
+            for _, (_, file_obj) in files:
+                file_obj.seek(0)
+
+            self._count("_requests")
+            try:
+                response = self._client.post(
+                    url,
+                    files=files,
+                    data=data,
+                    headers=headers,
+                    extensions={"trace": self._trace},
+                )
+
+            except httpx.RequestError as exc:
+                error = FilescanError(f"Could not reach filescan service: {exc}")
+                retryable = isinstance(exc, RETRYABLE_ERRORS)
+                service_failure = True
+                retry_after = None
+
+            else:
+                if response.status_code == 200:
+                    try:
+                        result = response.json()
+
+                    except ValueError as exc:
+                        # A broken response body is a fault of the service.
+                        error = FilescanError(f"Filescan returned invalid JSON: {exc}")
+                        retryable = False
+                        service_failure = True
+                        retry_after = None
+
+                    else:
+                        self.breaker.record_success()
+                        return cast(dict[str, Any], result)
+
+                else:
+                    error = FilescanError(
+                        f"Filescan returned {response.status_code}: {response.text}"
+                    )
+                    retryable = response.status_code in RETRYABLE_STATUS_CODES
+                    # A full scan queue means the service is busy, not down.
+                    service_failure = response.status_code >= 500
+                    retry_after = self._retry_after(response)
+                    if retry_after is not None:
+                        self._count("_throttled")
+
+            if not retryable or attempt >= self.max_retries:
+                self._count("_failures")
+                if service_failure:
+                    self.breaker.record_failure()
+
+                else:
+                    # The service answered, so it is up even if it rejected the request.
+                    self.breaker.record_success()
+
+                raise error
+
+            attempt += 1
+            self._count("_retries")
+            logger.warning(f"Retrying filescan request (attempt {attempt}): {error}")
+            # Never retry sooner than an overloaded service asked for.
+            time.sleep(max(self._backoff_delay(attempt), retry_after or 0.0))
+
+    def scan(self, upload: UploadedFile, profile: str | None = None) -> dict[str, Any]:
+        """
+        Send an uploaded file to the filescan service and return its JSON response.
+
+        Parameters
+        ----------
+        upload : UploadedFile
+            The uploaded file to send to the filescan service.
+
+        profile : str | None, default=None
+            The upload profile whose file types and size limit the service applies,
+            e.g. ``image``.
+
+        Returns
+        -------
+        dict of str to Any
+            JSON response from the service (e.g. ``malware_detected``, ``detail``),
+            possibly served from the verdict cache without contacting the service.
+
+        Raises
+        ------
+        FilescanError
+            If the circuit is open, on network error or on a non-200 response.
+        """
+        file_obj = cast(IO[bytes], upload.file)
+        cache_key = _cache_key(hash_file(file_obj), profile)
+        if (cached := self.verdict_cache.get(cache_key)) is not None:
+            return cached
+
+        result = self._post(
+            self.url,
+            [("file", (upload.name, file_obj))],
+            data={"profile": profile} if profile else None,
+        )
+        self.verdict_cache.set(cache_key, result)
+        return result
+
+    def scan_many(
+        self,
+        uploads: list[UploadedFile],
+        stop_on_detection: bool = False,
+        profile: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Scan several uploads with as few requests to the filescan service as possible.
+
+        Parameters
+        ----------
+        uploads : list[UploadedFile]
+            The uploaded files to send to the filescan service.
+
+        stop_on_detection : bool, default=False
+            Skip the remaining files as soon as one file is flagged.
+
+        profile : str | None, default=None
+            The upload profile whose file types and size limit the service applies,
+            e.g. ``image``.
+
+        Returns
+        -------
+        list of dict of str to Any
+            The response for each upload in order. Uploads that were not scanned
+            because another one was flagged have ``skipped`` set.
+
+        Raises
+        ------
+        FilescanError
+            If the circuit is open, on network error or on a non-200 response.
+
+        Notes
+        -----
+        Cached verdicts are reused and identical files are sent once. The remaining
+        files are sent to ``/scan/batch`` in one request, or one request per
+        ``FILESCAN_BATCH_MAX_FILES`` files.
+        """
+        results: list[dict[str, Any] | None] = [None] * len(uploads)
+        pending: dict[str, list[int]] = {}
+        for index, upload in enumerate(uploads):
+            content_hash = _cache_key(hash_file(cast(IO[bytes], upload.file)), profile)
+            if (cached := self.verdict_cache.get(content_hash)) is not None:
+                results[index] = cached
+
+            else:
+                pending.setdefault(content_hash, []).append(index)
+
+        flagged = any(result and is_flagged(result) for result in results)
+        hashes = list(pending)
+        for start in range(0, len(hashes), FILESCAN_BATCH_MAX_FILES):
+            if stop_on_detection and flagged:
+                break
+
+            batch = hashes[start : start + FILESCAN_BATCH_MAX_FILES]
+            if len(batch) == 1:
+                batch_results = [self.scan(uploads[pending[batch[0]][0]], profile)]
+
+            else:
+                response = self._post(
+                    self.batch_url,
+                    [
+                        (
+                            "files",
+                            (
+                                uploads[pending[h][0]].name,
+                                cast(IO[bytes], uploads[pending[h][0]].file),
+                            ),
+                        )
+                        for h in batch
+                    ],
+                    data={
+                        "stop_on_detection": str(stop_on_detection).lower(),
+                        **({"profile": profile} if profile else {}),
+                    },
+                )
+                batch_results = cast(list[dict[str, Any]], response.get("results", []))
+                if len(batch_results) != len(batch):
+                    raise FilescanError(
+                        f"Filescan returned {len(batch_results)} results for {len(batch)} files."
+                    )
+
+            for content_hash, result in zip(batch, batch_results, strict=True):
+                if not result.get("skipped"):
+                    self.verdict_cache.set(content_hash, result)
+
+                for index in pending[content_hash]:
+                    results[index] = result
+
+                flagged = flagged or is_flagged(result)
+
+        return [
+            result
+            if result is not None
+            else {
+                "filename": upload.name,
+                "skipped": True,
+                "detail": "Not scanned because another file was flagged.",
+            }
+            for upload, result in zip(uploads, results, strict=True)
+        ]
+
+    def close(self) -> None:
+        """
+        Close the pooled connections.
+        """
+        self._client.close()
+
+
+_client: FilescanClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> FilescanClient:
+    """
+    Return the process-wide filescan client, creating it on first use.
+
+    Returns
+    -------
+    FilescanClient
+        The shared client.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = FilescanClient()
+
+    return _client
+
+
+def get_metrics() -> dict[str, int | float | str]:
+    """
+    Return connection reuse, circuit breaker and verdict cache metrics of the shared client.
+
+    Returns
+    -------
+    dict[str, int | float | str]
+        The metrics of the process-wide filescan client.
+    """
+    return get_client().metrics()
+
+
+def scan_file(upload: UploadedFile, profile: str | None = None) -> dict[str, Any]:
     """
     Call the filescan service with the uploaded file and return its JSON response.
 
@@ -58,35 +603,54 @@ def scan_file(upload: UploadedFile) -> dict[str, Any]:
     upload : UploadedFile
         The uploaded file to send to the filescan service.
 
+    profile : str | None, default=None
+        The upload profile whose file types and size limit the service applies,
+        e.g. ``image``.
+
     Returns
     -------
     dict of str to Any
-        JSON response from the service (e.g. ``malware_detected``, ``detail``).
+        JSON response from the service (e.g. ``malware_detected``, ``detail``),
+        possibly served from the verdict cache without contacting the service.
 
     Raises
     ------
     FilescanError
-        On network error or non-200 response.
+        If the circuit is open, on network error or on a non-200 response.
     """
-    try:
-        file_obj = cast(IO[bytes], upload.file)
-        headers: dict[str, str] = {}
-        if token := os.getenv("FILESCAN_INTERNAL_TOKEN"):
-            headers["X-Filescan-Token"] = token
-
-        response = httpx.post(
-            FILESCAN_URL,
-            files={"file": (upload.name, file_obj)},
-            headers=headers,
-            timeout=10.0,
-        )
+    return get_client().scan(upload, profile)
 
-    except httpx.RequestError as exc:
-        raise FilescanError(f"Could not reach filescan service: {exc}") from exc
 
-    if response.status_code != 200:
-        raise FilescanError(
-            f"Filescan returned {response.status_code}: {response.text}"
-        )
+def scan_files(
+    uploads: list[UploadedFile],
+    stop_on_detection: bool = False,
+    profile: str | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Scan several uploaded files with a single request to the filescan service.
+
+    Parameters
+    ----------
+    uploads : list[UploadedFile]
+        The uploaded files to send to the filescan service.
 
-    return cast(dict[str, Any], response.json())
+    stop_on_detection : bool, default=False
+        Skip the remaining files as soon as one file is flagged.
+
+    profile : str | None, default=None
+        The upload profile whose file types and size limit the service applies,
+        e.g. ``image``.
+
+    Returns
+    -------
+    list of dict of str to Any
+        The response for each upload in order; skipped uploads have ``skipped`` set.
+
+    Raises
+    ------
+    FilescanError
+        If the circuit is open, on network error or on a non-200 response.
+    """
+    return get_client().scan_many(
+        uploads, stop_on_detection=stop_on_detection, profile=profile
+    )
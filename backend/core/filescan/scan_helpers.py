@@ -9,14 +9,43 @@ from django.core.files.uploadedfile import UploadedFile
 from rest_framework import status
 from rest_framework.response import Response
 
-from core.filescan.filescan_client import FilescanError, scan_file
+from core.filescan.filescan_client import FilescanError, is_flagged, scan_files
 
 # User-facing messages for scan failures.
 FILESCAN_MSG_REJECTED = "The uploaded file was rejected by the security scan."
 FILESCAN_MSG_COULD_NOT_SCAN = "The file could not be scanned. Please try again later."
 
 
-def scan_uploads_and_rewind(uploads: Iterable[UploadedFile]) -> Response | None:
+def _any_upload_flagged(uploads: list[UploadedFile], profile: str | None) -> bool:
+    """
+    Scan uploads in a single request and stop as soon as one of them is flagged.
+
+    Parameters
+    ----------
+    uploads : list[UploadedFile]
+        Uploaded file objects to scan.
+
+    profile : str | None
+        The upload profile whose file types and size limit the service applies.
+
+    Returns
+    -------
+    bool
+        True if any upload was flagged or rejected by the filescan service.
+
+    Raises
+    ------
+    FilescanError
+        If any scan fails.
+    """
+    results = scan_files(uploads, stop_on_detection=True, profile=profile)
+
+    return any(is_flagged(result) for result in results)
+
+
+def scan_uploads_and_rewind(
+    uploads: Iterable[UploadedFile], profile: str | None = None
+) -> Response | None:
     """
     Scan uploads; return 400 Response on malware/scan error, else rewind and return None.
 
@@ -25,23 +54,31 @@ def scan_uploads_and_rewind(uploads: Iterable[UploadedFile]) -> Response | None:
     uploads : Iterable[UploadedFile]
         Uploaded file objects to scan (typically from ``request.FILES``).
 
+    profile : str | None, default=None
+        The upload profile, e.g. ``image``, so that the filescan service rejects
+        files of other types before running its expensive scanners.
+
     Returns
     -------
     Response or None
         None if all scans pass (and uploads are rewound); otherwise a 400 Response.
         Caller can then safely pass request.data to the serializer when None.
+
+    Notes
+    -----
+    Multiple uploads are sent to the filescan service in one batch request, which
+    scans them concurrently, so a request takes one round-trip instead of one per file.
     """
+    uploads = list(uploads)
     if not uploads:
         return None
 
     try:
-        for upload in uploads:
-            result = scan_file(upload)
-            if result.get("malware_detected"):
-                return Response(
-                    {"nonFieldErrors": [FILESCAN_MSG_REJECTED]},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        if _any_upload_flagged(uploads, profile):
+            return Response(
+                {"nonFieldErrors": [FILESCAN_MSG_REJECTED]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         for upload in uploads:
             upload.seek(0)
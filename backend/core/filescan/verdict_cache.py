@@ -0,0 +1,177 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Process-wide cache of filescan responses keyed by content hash and signature version.
+
+The filescan service reports the ClamAV signature database version with each scan.
+The client remembers the latest version it has seen and only reuses responses that
+were produced with it, so a signature update on the service invalidates the cache
+as soon as the backend receives its first response from the new database.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import IO, Any
+
+# Seconds a clean verdict is reused for the same signature database version.
+FILESCAN_VERDICT_CACHE_TTL = float(os.getenv("FILESCAN_VERDICT_CACHE_TTL", "3600"))
+FILESCAN_VERDICT_CACHE_SIZE = int(os.getenv("FILESCAN_VERDICT_CACHE_SIZE", "10000"))
+
+
+def hash_file(file_obj: IO[bytes], chunk_size: int = 64 * 1024) -> str:
+    """
+    Compute the SHA-256 hex digest of a file and rewind it.
+
+    Parameters
+    ----------
+    file_obj : IO[bytes]
+        The file to hash.
+
+    chunk_size : int, default=64 * 1024
+        Number of bytes read at a time.
+
+    Returns
+    -------
+    str
+        The hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    while chunk := file_obj.read(chunk_size):
+        digest.update(chunk)
+
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+class VerdictCache:
+    """
+    Thread-safe, bounded LRU cache of filescan responses.
+
+    Parameters
+    ----------
+    clean_ttl : float, default=FILESCAN_VERDICT_CACHE_TTL
+        Seconds a clean response is reused. Responses with ``malware_detected``
+        are kept until the signature version changes or they are evicted.
+
+    max_entries : int, default=FILESCAN_VERDICT_CACHE_SIZE
+        Maximum number of cached responses; 0 disables the cache.
+
+    clock : Callable[[], float], default=time.monotonic
+        Time source, replaceable in tests.
+    """
+
+    def __init__(
+        self,
+        clean_ttl: float = FILESCAN_VERDICT_CACHE_TTL,
+        max_entries: int = FILESCAN_VERDICT_CACHE_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.clean_ttl = clean_ttl
+        self.max_entries = max(0, max_entries)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[
+            tuple[str, str], tuple[float | None, dict[str, Any]]
+        ] = OrderedDict()
+        self.signature_version: str | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, content_hash: str) -> dict[str, Any] | None:
+        """
+        Return the cached response for a file scanned with the current signatures.
+
+        Parameters
+        ----------
+        content_hash : str
+            The hex SHA-256 digest of the file.
+
+        Returns
+        -------
+        dict[str, Any] | None
+            A copy of the cached response, or None on a miss.
+        """
+        with self._lock:
+            entry = None
+            if self.signature_version is not None and self.max_entries:
+                key = (content_hash, self.signature_version)
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] is not None:
+                    if entry[0] <= self._clock():
+                        del self._entries[key]
+                        entry = None
+
+                if entry is not None:
+                    self._entries.move_to_end(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return dict(entry[1])
+
+    def set(self, content_hash: str, response: dict[str, Any]) -> None:
+        """
+        Store a scan response and track the signature version it reports.
+
+        Parameters
+        ----------
+        content_hash : str
+            The hex SHA-256 digest of the scanned file.
+
+        response : dict[str, Any]
+            The JSON response of the filescan service. Responses without a
+            ``signature_version`` are not cached.
+        """
+        signature_version = response.get("signature_version")
+        if not signature_version or not self.max_entries:
+            return
+
+        expires_at = (
+            None if response.get("malware_detected") else self._clock() + self.clean_ttl
+        )
+        with self._lock:
+            if signature_version != self.signature_version:
+                # The service loaded new signatures: earlier verdicts may be wrong.
+                if self.signature_version is not None:
+                    self.invalidations += 1
+
+                self._entries.clear()
+                self.signature_version = signature_version
+
+            key = (content_hash, signature_version)
+            self._entries[key] = (expires_at, dict(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def metrics(self) -> dict[str, int | float]:
+        """
+        Return hit-rate and size metrics for the cache.
+
+        Returns
+        -------
+        dict[str, int | float]
+            Counters for hits, misses, evictions and invalidations, the hit rate
+            and the number of entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "cache_hit_rate": self.hits / lookups if lookups else 0.0,
+                "cache_entries": len(self._entries),
+                "cache_evictions": self.evictions,
+                "cache_invalidations": self.invalidations,
+            }
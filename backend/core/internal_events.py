@@ -9,7 +9,7 @@ import logging
 from typing import Any
 
 from django.conf import settings
-from django.core.mail import send_mail
+from django.db import transaction
 from django.http import HttpRequest
 from django.utils.dateparse import parse_datetime
 from rest_framework import status
@@ -18,6 +18,7 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.models import SecurityEvent
 from core.serializers import SecurityEventEnvelopeSerializer
 
 logger = logging.getLogger(__name__)
@@ -25,7 +26,7 @@ logger = logging.getLogger(__name__)
 
 class SecurityEventIngestView(APIView):
     """
-    Receive security events from internal services and dispatch notifications.
+    Receive security events from internal services and store them for alerting.
 
     Notes
     -----
@@ -65,19 +66,26 @@ class SecurityEventIngestView(APIView):
 
     def post(self, request: Request) -> Response:
         """
-        Handle a posted security event envelope.
+        Handle a posted security event envelope or a list of envelopes.
 
         Parameters
         ----------
         request : Request
-            DRF Request containing the JSON security event envelope in its body.
+            DRF Request containing a JSON security event envelope, or a list of up
+            to ``SECURITY_EVENTS_MAX_BATCH`` envelopes, in its body.
 
         Returns
         -------
         Response
             A DRF Response with an appropriate status code:
-            403 if unauthorized, 400 on validation errors, and 204 on success
-            for supported event types.
+            403 if unauthorized, 400 on validation errors, and 204 once the
+            events are stored. Events that were stored before are ignored.
+
+        Notes
+        -----
+        A list is validated as a whole: if one envelope is invalid nothing is
+        stored and the response names the index of that envelope. Operators are
+        alerted by digest emails queued by the ``send_outbox`` worker.
         """
         if not self._authenticate(request._request):
             return Response(
@@ -85,123 +93,99 @@ class SecurityEventIngestView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        body: dict[str, Any] = request.data
-
-        event_type = body.get("type")
-        occurred_at = body.get("occurred_at")
-        source = body.get("source")
-        payload = body.get("payload")
-
-        if (
-            not isinstance(event_type, str)
-            or not isinstance(source, str)
-            or not isinstance(payload, dict)
-        ):
+        body = request.data
+        envelopes = body if isinstance(body, list) else [body]
+        if not envelopes or len(envelopes) > settings.SECURITY_EVENTS_MAX_BATCH:
             return Response(
-                {"detail": "Invalid event envelope."},
+                {
+                    "detail": "Send between 1 and "
+                    f"{settings.SECURITY_EVENTS_MAX_BATCH} events per request."
+                },
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if occurred_at is None or parse_datetime(str(occurred_at)) is None:
-            return Response(
-                {"detail": "Invalid or missing occurred_at."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        # Keyed by quarantine_id so that repeated events in one batch count once.
+        events: dict[str, SecurityEvent] = {}
+        for index, envelope in enumerate(envelopes):
+            event = self._parse_envelope(envelope)
+            if isinstance(event, str):
+                error: dict[str, Any] = {"detail": event}
+                if isinstance(body, list):
+                    error["index"] = index
+
+                return Response(error, status=status.HTTP_400_BAD_REQUEST)
 
-        if event_type == "malware_quarantined":
-            return self._handle_malware_quarantined(body, payload)
+            events.setdefault(event.quarantine_id, event)
 
-        logger.warning("Received unsupported security event type=%s", event_type)
-        return Response(
-            {"detail": "Unsupported event type."},
-            status=status.HTTP_400_BAD_REQUEST,
+        with transaction.atomic():
+            known = set(
+                SecurityEvent.objects.filter(
+                    quarantine_id__in=list(events)
+                ).values_list("quarantine_id", flat=True)
+            )
+            SecurityEvent.objects.bulk_create(
+                [event for key, event in events.items() if key not in known],
+                ignore_conflicts=True,
+            )
+
+        logger.info(
+            "Stored %d security events (%d duplicates ignored)",
+            len(events) - len(known),
+            len(envelopes) - len(events) + len(known),
         )
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-    def _handle_malware_quarantined(
-        self,
-        envelope: dict[str, Any],
-        payload: dict[str, Any],
-    ) -> Response:
+    def _parse_envelope(self, envelope: Any) -> SecurityEvent | str:
         """
-        Handle a malware_quarantined event and send an operator alert email.
+        Validate a security event envelope and turn it into an unsaved event.
 
         Parameters
         ----------
-        envelope : dict of str to Any
-            The full security event envelope, including top-level metadata such
-            as ``type``, ``occurred_at``, and ``source``.
-        payload : dict of str to Any
-            The event payload containing malware-specific fields such as
-            filename, quarantine_id, signature, detail, and detected_by.
+        envelope : Any
+            One posted envelope with top-level metadata such as ``type``,
+            ``occurred_at`` and ``source``, and the event ``payload``.
 
         Returns
         -------
-        Response
-            A DRF Response indicating the outcome: 400 if required fields are
-            missing, 500 if alert dispatch fails, and 204 when the alert email
-            is sent successfully.
+        SecurityEvent | str
+            The event, or why the envelope is invalid.
         """
-        filename = payload.get("filename")
-        quarantine_id = payload.get("quarantine_id")
-        signature = payload.get("signature")
-        detail = payload.get("detail")
-        detected_by = payload.get("detected_by")
+        if not isinstance(envelope, dict):
+            return "Invalid event envelope."
 
-        if not filename or not quarantine_id:
-            return Response(
-                {"detail": "Missing filename or quarantine_id in payload."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        event_type = envelope.get("type")
+        occurred_at = envelope.get("occurred_at")
+        source = envelope.get("source")
+        payload = envelope.get("payload")
 
-        recipients = getattr(settings, "SECURITY_ALERT_RECIPIENTS", None)
-        from_email = getattr(settings, "SECURITY_ALERT_FROM_EMAIL", None)
+        if (
+            not isinstance(event_type, str)
+            or not isinstance(source, str)
+            or not isinstance(payload, dict)
+        ):
+            return "Invalid event envelope."
 
-        if not recipients or not from_email:
-            logger.error(
-                "Security alert email configuration is incomplete; "
-                "SECURITY_ALERT_RECIPIENTS or SECURITY_ALERT_FROM_EMAIL not set."
-            )
-            return Response(
-                {"detail": "Security alert email configuration is incomplete."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        occurred = parse_datetime(str(occurred_at)) if occurred_at else None
+        if occurred is None:
+            return "Invalid or missing occurred_at."
 
-        subject = "[activist] Malware quarantined"
-        lines = [
-            "A quarantined malware event was reported by the filescan service.",
-            "",
-            f"Filename: {filename}",
-            f"Quarantine ID: {quarantine_id}",
-            f"Detected by: {detected_by or envelope.get('source')}",
-        ]
-        if signature:
-            lines.append(f"Signature: {signature}")
-        if detail:
-            lines.append(f"Detail: {detail}")
-        occurred_at = envelope.get("occurred_at")
-        if occurred_at:
-            lines.append(f"Occurred at: {occurred_at}")
-
-        message = "\n".join(lines)
-
-        try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=from_email,
-                recipient_list=list(recipients),
-                fail_silently=False,
-            )
-        except Exception as exc:
-            logger.error("Failed to send malware_quarantined alert email: %s", exc)
-            return Response(
-                {"detail": "Failed to dispatch security alert."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        if event_type != "malware_quarantined":
+            logger.warning("Received unsupported security event type=%s", event_type)
+            return "Unsupported event type."
 
-        logger.info(
-            "Dispatched malware_quarantined alert email for filename=%s quarantine_id=%s",
-            filename,
-            quarantine_id,
+        filename = payload.get("filename")
+        quarantine_id = payload.get("quarantine_id")
+        if not filename or not quarantine_id:
+            return "Missing filename or quarantine_id in payload."
+
+        return SecurityEvent(
+            event_type=event_type,
+            source=source,
+            occurred_at=occurred,
+            quarantine_id=str(quarantine_id),
+            filename=str(filename),
+            signature=str(payload.get("signature") or ""),
+            detail=str(payload.get("detail") or ""),
+            detected_by=str(payload.get("detected_by") or ""),
+            payload=payload,
         )
-        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,297 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Classes controlling the CLI command to garbage collect unreferenced media files.
+"""
+
+import hashlib
+import os
+import shutil
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TypedDict, Unpack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from content.models import Image
+from core.storage import TEMP_FILE_PREFIX
+
+# MARK: Utils and Types
+
+
+class Options(TypedDict):
+    """
+    Options available to the gc_media management CLI command.
+    """
+
+    directory: list[str]
+    grace_hours: float
+    quarantine_dir: str
+    workers: int
+    batch_size: int
+    dry_run: bool
+    clear_dev: bool
+
+
+@dataclass
+class SweepStats:
+    """
+    Counters for a sweep over part of the media tree.
+    """
+
+    scanned: int = 0
+    orphaned: int = 0
+    reclaimed_bytes: int = 0
+    failed: int = 0
+
+    def merge(self, other: "SweepStats") -> None:
+        """
+        Add the counters of another sweep to this one.
+
+        Parameters
+        ----------
+        other : SweepStats
+            The stats of another sweep.
+        """
+        self.scanned += other.scanned
+        self.orphaned += other.orphaned
+        self.reclaimed_bytes += other.reclaimed_bytes
+        self.failed += other.failed
+
+
+def reference_key(name: str) -> bytes:
+    """
+    Return a compact, fixed size key for a media path relative to ``MEDIA_ROOT``.
+
+    Parameters
+    ----------
+    name : str
+        The storage name of a file (e.g. ``images/3f/a2/<uuid>.jpg``).
+
+    Returns
+    -------
+    bytes
+        A 16 byte digest of the name.
+    """
+    return hashlib.blake2b(name.encode(), digest_size=16).digest()
+
+
+# MARK: Command
+
+
+class Command(BaseCommand):
+    """
+    The gc_media CLI command for removing media files that no Image references.
+
+    Notes
+    -----
+    The command marks every ``Image.file_object`` path from the database and then
+    sweeps the media directories in parallel. Files that are not referenced and were
+    last modified before the grace period are deleted, or moved to a quarantine
+    directory for inspection. The grace period protects uploads whose database rows
+    have not yet been committed.
+    """
+
+    help = "Delete or quarantine media files that are not referenced by any Image"
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        """
+        Add arguments into the parser.
+
+        Parameters
+        ----------
+        parser : ArgumentParser
+            A parser for passing CLI arguments to the command.
+        """
+        parser.add_argument(
+            "--directory",
+            action="append",
+            default=None,
+            help="Media subdirectory to sweep (repeatable, defaults to 'images')",
+        )
+        parser.add_argument("--grace-hours", type=float, default=24)
+        parser.add_argument(
+            "--quarantine-dir",
+            type=str,
+            default="",
+            help="Move unreferenced files here instead of deleting them",
+        )
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report unreferenced files without deleting or moving them",
+        )
+        parser.add_argument(
+            "--clear-dev",
+            action="store_true",
+            help="Remove every uploaded file, referenced or not (development only)",
+        )
+
+    def handle(self, *args: str, **options: Unpack[Options]) -> None:
+        """
+        Handle arguments passed to the parser.
+
+        Parameters
+        ----------
+        *args : str
+            Optional string arguments.
+
+        **options : Unpack[Options]
+            Options that control what is swept and how orphans are handled.
+
+        Raises
+        ------
+        CommandError
+            If the quarantine directory is inside one of the swept directories, or
+            if ``--clear-dev`` is used outside of the development environment.
+        """
+        media_root = Path(settings.MEDIA_ROOT).resolve()
+        directories = [media_root / d for d in options["directory"] or ["images"]]
+        quarantine_dir = (
+            Path(options["quarantine_dir"]).resolve()
+            if options["quarantine_dir"]
+            else None
+        )
+        if quarantine_dir is not None and any(
+            quarantine_dir.is_relative_to(d) for d in directories
+        ):
+            raise CommandError("The quarantine directory cannot be swept itself.")
+
+        if options["clear_dev"] and os.environ.get("ENVIRONMENT") != "development":
+            raise CommandError("--clear-dev can only be used in development.")
+
+        self.media_root = media_root
+        self.quarantine_dir = quarantine_dir
+        self.dry_run = options["dry_run"]
+        self.cutoff = time.time() - options["grace_hours"] * 3600
+        self.referenced: set[bytes] = set()
+
+        # Clearing development uploads (the sharded counterpart of clear_dev_images.py)
+        # treats every file as unreferenced and does not need the database.
+        if options["clear_dev"]:
+            self.cutoff = time.time()
+
+        else:
+            # Mark: take the referenced paths before listing files so that a file is
+            # only ever considered orphaned after its reference was checked.
+            self.referenced = {
+                reference_key(name)
+                for name in Image.objects.exclude(file_object="")
+                .values_list("file_object", flat=True)
+                .order_by()
+                .iterator(chunk_size=options["batch_size"])
+            }
+
+        # Sweep: each top-level shard directory is walked by a worker.
+        stats = SweepStats()
+        subtrees: list[Path] = []
+        for directory in directories:
+            if not directory.is_dir():
+                self.stdout.write(f"Skipping missing directory: {directory}")
+                continue
+
+            stats.merge(self._sweep(directory, recursive=False))
+            subtrees += [Path(e.path) for e in os.scandir(directory) if e.is_dir()]
+
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as executor:
+            for subtree_stats in executor.map(self._sweep, subtrees):
+                stats.merge(subtree_stats)
+
+        action = "Would reclaim" if self.dry_run else "Reclaimed"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scanned {stats.scanned} files, {stats.orphaned} unreferenced. "
+                f"{action} {stats.reclaimed_bytes} bytes"
+                f"{' (quarantined)' if quarantine_dir else ''}"
+                f"{f', {stats.failed} failed' if stats.failed else ''}."
+            )
+        )
+
+    def _sweep(self, directory: Path, recursive: bool = True) -> SweepStats:
+        """
+        Remove unreferenced files below a directory.
+
+        Parameters
+        ----------
+        directory : Path
+            The directory to sweep.
+
+        recursive : bool, default=True
+            Whether to descend into subdirectories.
+
+        Returns
+        -------
+        SweepStats
+            The counters for the swept files.
+        """
+        stats = SweepStats()
+        pending = [directory]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending.append(Path(entry.path))
+
+                        continue
+
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+
+                    # Skip placeholder files like .keep but reclaim abandoned temp files.
+                    if entry.name.startswith(".") and not entry.name.startswith(
+                        TEMP_FILE_PREFIX
+                    ):
+                        continue
+
+                    stats.scanned += 1
+                    self._collect(entry, stats)
+
+        return stats
+
+    def _collect(self, entry: os.DirEntry[str], stats: SweepStats) -> None:
+        """
+        Delete or quarantine a single file if it is unreferenced and old enough.
+
+        Parameters
+        ----------
+        entry : os.DirEntry[str]
+            The directory entry of the file.
+
+        stats : SweepStats
+            The counters to update.
+        """
+        name = Path(entry.path).relative_to(self.media_root).as_posix()
+        if reference_key(name) in self.referenced:
+            return
+
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > self.cutoff:
+            return
+
+        stats.orphaned += 1
+        if self.dry_run:
+            self.stdout.write(f"[dry run] Unreferenced: {name}")
+            stats.reclaimed_bytes += stat.st_size
+            return
+
+        try:
+            if self.quarantine_dir is not None:
+                target = self.quarantine_dir / name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(entry.path, target)
+
+            else:
+                os.remove(entry.path)
+
+        except OSError as exc:
+            stats.failed += 1
+            self.stderr.write(f"Failed to reclaim {name}: {exc}")
+            return
+
+        stats.reclaimed_bytes += stat.st_size
@@ -0,0 +1,98 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Classes controlling the CLI command to delete expired one-time tokens.
+"""
+
+import time
+from argparse import ArgumentParser
+from typing import TypedDict, Unpack
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from authentication.models import OneTimeToken
+
+
+class Options(TypedDict):
+    """
+    Options available to the prune_one_time_tokens management CLI command.
+    """
+
+    batch_size: int
+    pause_seconds: float
+    dry_run: bool
+
+
+class Command(BaseCommand):
+    """
+    The prune_one_time_tokens CLI command that deletes expired OneTimeToken rows.
+
+    Notes
+    -----
+    Used tokens are deleted right away, but the tokens of links that were never
+    followed stay until they expire. This command deletes the expired ones in
+    batches through the index on ``expires_at``, each batch in its own short
+    transaction. Run it periodically, e.g. hourly from cron.
+    """
+
+    help = "Delete expired email verification and password reset tokens"
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        """
+        Add arguments into the parser.
+
+        Parameters
+        ----------
+        parser : ArgumentParser
+            A parser for passing CLI arguments to the command.
+        """
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause-seconds",
+            type=float,
+            default=0.0,
+            help="Pause between batches to leave room for other queries",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the tokens that would be deleted",
+        )
+
+    def handle(self, *args: str, **options: Unpack[Options]) -> None:
+        """
+        Handle arguments passed to the parser.
+
+        Parameters
+        ----------
+        *args : str
+            Optional string arguments.
+
+        **options : Unpack[Options]
+            Options that control the size of the batches.
+        """
+        expired = OneTimeToken.objects.filter(expires_at__lte=timezone.now())
+        if options["dry_run"]:
+            self.stdout.write(f"{expired.count()} one-time tokens have expired.")
+            return
+
+        batch_size = max(1, options["batch_size"])
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    expired.order_by("expires_at").values_list("id", flat=True)[
+                        :batch_size
+                    ]
+                )
+                if ids:
+                    deleted += OneTimeToken.objects.filter(id__in=ids).delete()[0]
+
+            if len(ids) < batch_size:
+                break
+
+            if options["pause_seconds"]:
+                time.sleep(options["pause_seconds"])
+
+        self.stdout.write(f"Deleted {deleted} expired one-time tokens.")
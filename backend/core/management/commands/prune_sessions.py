@@ -0,0 +1,114 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Classes controlling the CLI command to delete expired sign-in sessions.
+"""
+
+import time
+from argparse import ArgumentParser
+from datetime import timedelta
+from typing import TypedDict, Unpack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from authentication.models import SessionModel
+
+
+class Options(TypedDict):
+    """
+    Options available to the prune_sessions management CLI command.
+    """
+
+    older_than_days: float | None
+    batch_size: int
+    pause_seconds: float
+    dry_run: bool
+
+
+class Command(BaseCommand):
+    """
+    The prune_sessions CLI command that deletes expired SessionModel rows.
+
+    Notes
+    -----
+    ``SignInView`` adds a session row on every sign in. This command deletes the
+    rows created more than ``SESSION_RETENTION_DAYS`` ago, oldest first, in
+    batches that each run in their own short transaction, so no lock is held on
+    the table for the whole run. Run it periodically, e.g. daily from cron.
+    """
+
+    help = "Delete sign-in sessions older than SESSION_RETENTION_DAYS"
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        """
+        Add arguments into the parser.
+
+        Parameters
+        ----------
+        parser : ArgumentParser
+            A parser for passing CLI arguments to the command.
+        """
+        parser.add_argument(
+            "--older-than-days",
+            type=float,
+            default=None,
+            help="Delete sessions older than this (defaults to SESSION_RETENTION_DAYS)",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause-seconds",
+            type=float,
+            default=0.0,
+            help="Pause between batches to leave room for other queries",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the sessions that would be deleted",
+        )
+
+    def handle(self, *args: str, **options: Unpack[Options]) -> None:
+        """
+        Handle arguments passed to the parser.
+
+        Parameters
+        ----------
+        *args : str
+            Optional string arguments.
+
+        **options : Unpack[Options]
+            Options that control the retention and the size of the batches.
+        """
+        days = options["older_than_days"]
+        if days is None:
+            days = settings.SESSION_RETENTION_DAYS
+
+        cutoff = timezone.now() - timedelta(days=days)
+        expired = SessionModel.objects.filter(created_at__lt=cutoff)
+        if options["dry_run"]:
+            self.stdout.write(
+                f"{expired.count()} sessions are older than {days:g} days."
+            )
+            return
+
+        batch_size = max(1, options["batch_size"])
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    expired.order_by("created_at").values_list("id", flat=True)[
+                        :batch_size
+                    ]
+                )
+                if ids:
+                    deleted += SessionModel.objects.filter(id__in=ids).delete()[0]
+
+            if len(ids) < batch_size:
+                break
+
+            if options["pause_seconds"]:
+                time.sleep(options["pause_seconds"])
+
+        self.stdout.write(f"Deleted {deleted} sessions older than {days:g} days.")
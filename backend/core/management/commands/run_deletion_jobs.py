@@ -0,0 +1,96 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Classes controlling the CLI command to delete accounts and organizations in the background.
+"""
+
+import time
+from argparse import ArgumentParser
+from typing import TypedDict, Unpack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.deletion import run_next_deletion_job
+from core.models import DeletionJob
+
+
+class Options(TypedDict):
+    """
+    Options available to the run_deletion_jobs management CLI command.
+    """
+
+    batch_size: int | None
+    poll_seconds: float
+    once: bool
+
+
+class Command(BaseCommand):
+    """
+    The run_deletion_jobs CLI command that runs the deletion worker.
+
+    Notes
+    -----
+    Deleting an account or an organization deactivates it and queues a
+    ``DeletionJob``. This worker deletes the rows that depend on the entity in
+    batches, each in its own transaction, and then the entity itself, so no
+    request waits for the cascade and no lock is held on many tables at once.
+    Several workers can run at the same time.
+    """
+
+    help = "Delete the accounts and organizations queued for deletion"
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        """
+        Add arguments into the parser.
+
+        Parameters
+        ----------
+        parser : ArgumentParser
+            A parser for passing CLI arguments to the command.
+        """
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Rows deleted per transaction (defaults to DELETION_JOB_BATCH_SIZE)",
+        )
+        parser.add_argument("--poll-seconds", type=float, default=5)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the due jobs once instead of running continuously",
+        )
+
+    def handle(self, *args: str, **options: Unpack[Options]) -> None:
+        """
+        Handle arguments passed to the parser.
+
+        Parameters
+        ----------
+        *args : str
+            Optional string arguments.
+
+        **options : Unpack[Options]
+            Options that control the batch size and polling of the worker.
+        """
+        batch_size = options["batch_size"] or settings.DELETION_JOB_BATCH_SIZE
+        batch_size = max(1, batch_size)
+        while True:
+            job = run_next_deletion_job(batch_size=batch_size)
+            if job is not None:
+                if job.status == DeletionJob.STATUS_DONE:
+                    self.stdout.write(
+                        f"Deleted {job.entity_type} {job.entity_id} ({job.deleted_count} rows)."
+                    )
+
+                else:
+                    self.stdout.write(
+                        f"Deletion of {job.entity_type} {job.entity_id} failed at step {job.step}: {job.last_error}"
+                    )
+
+                continue
+
+            if options["once"]:
+                break
+
+            time.sleep(options["poll_seconds"])
@@ -0,0 +1,78 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Classes controlling the CLI command to scan image uploads staged for a deferred scan.
+"""
+
+import time
+from argparse import ArgumentParser
+from typing import TypedDict, Unpack
+
+from django.core.management.base import BaseCommand
+
+from content.image_scans import process_pending_scans
+
+
+class Options(TypedDict):
+    """
+    Options available to the scan_pending_images management CLI command.
+    """
+
+    batch_size: int
+    poll_seconds: float
+    once: bool
+
+
+class Command(BaseCommand):
+    """
+    The scan_pending_images CLI command that runs the deferred upload scan worker.
+
+    Notes
+    -----
+    Uploads sent with ``async_scan=true`` are stored in the staging area with a
+    pending ``scan_status``. This worker scans them and publishes clean images,
+    rejects flagged ones and retries scans that could not be completed. Several
+    workers can run at the same time.
+    """
+
+    help = "Scan staged image uploads and publish or reject them"
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        """
+        Add arguments into the parser.
+
+        Parameters
+        ----------
+        parser : ArgumentParser
+            A parser for passing CLI arguments to the command.
+        """
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--poll-seconds", type=float, default=2)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the pending uploads once instead of running continuously",
+        )
+
+    def handle(self, *args: str, **options: Unpack[Options]) -> None:
+        """
+        Handle arguments passed to the parser.
+
+        Parameters
+        ----------
+        *args : str
+            Optional string arguments.
+
+        **options : Unpack[Options]
+            Options that control the batch size and polling of the worker.
+        """
+        while True:
+            processed = process_pending_scans(limit=max(1, options["batch_size"]))
+            if processed:
+                self.stdout.write(f"Processed {processed} staged uploads.")
+
+            if options["once"]:
+                break
+
+            # Keep draining a backlog; only wait once the queue is empty.
+            if processed < options["batch_size"]:
+                time.sleep(options["poll_seconds"])
@@ -0,0 +1,89 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Classes controlling the CLI command to send the emails queued in the email outbox.
+"""
+
+import time
+from argparse import ArgumentParser
+from typing import TypedDict, Unpack
+
+from django.core.management.base import BaseCommand
+
+from core.outbox import send_pending_emails
+from core.security_events import queue_security_digest
+
+
+class Options(TypedDict):
+    """
+    Options available to the send_outbox management CLI command.
+    """
+
+    batch_size: int
+    poll_seconds: float
+    once: bool
+
+
+class Command(BaseCommand):
+    """
+    The send_outbox CLI command that runs the transactional email worker.
+
+    Notes
+    -----
+    Views queue emails in ``EmailOutbox`` instead of sending them during the
+    request. This worker sends each batch over one connection of the email
+    backend, retries failed emails with a backoff and records their delivery
+    state. Several workers can run at the same time. Before every batch it also
+    queues the security alert digest if one is due.
+    """
+
+    help = "Send the emails queued in the email outbox"
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        """
+        Add arguments into the parser.
+
+        Parameters
+        ----------
+        parser : ArgumentParser
+            A parser for passing CLI arguments to the command.
+        """
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--poll-seconds", type=float, default=2)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send the due emails once instead of running continuously",
+        )
+
+    def handle(self, *args: str, **options: Unpack[Options]) -> None:
+        """
+        Handle arguments passed to the parser.
+
+        Parameters
+        ----------
+        *args : str
+            Optional string arguments.
+
+        **options : Unpack[Options]
+            Options that control the batch size and polling of the worker.
+        """
+        batch_size = max(1, options["batch_size"])
+        while True:
+            if digested := queue_security_digest():
+                self.stdout.write(
+                    f"Queued a security alert digest of {digested} events."
+                )
+
+            counts = send_pending_emails(limit=batch_size)
+            processed = sum(counts.values())
+            if processed:
+                self.stdout.write(
+                    f"Sent {counts['sent']} emails, {counts['retried']} to retry, {counts['failed']} failed."
+                )
+
+            if options["once"]:
+                break
+
+            # Keep draining a backlog; only wait once no more emails are due.
+            if processed < batch_size:
+                time.sleep(options["poll_seconds"])
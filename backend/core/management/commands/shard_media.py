@@ -0,0 +1,171 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Classes controlling the CLI command to move existing media into the sharded storage layout.
+"""
+
+import os
+from argparse import ArgumentParser
+from typing import TypedDict, Unpack
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, CharField, Value, When
+
+from content.models import Image
+from core.storage import ShardedFileSystemStorage
+
+
+class Options(TypedDict):
+    """
+    Options available to the shard_media management CLI command.
+    """
+
+    batch_size: int
+    dry_run: bool
+
+
+class Command(BaseCommand):
+    """
+    The shard_media CLI command for moving flat media files into shard directories.
+
+    Notes
+    -----
+    Files are renamed within the media root, so each move is atomic. The image rows of
+    a batch are then updated with one statement. Re-running the command is safe: files
+    that were moved before an interruption are detected and only their rows are updated.
+    """
+
+    help = "Move existing media files into the sharded storage layout"
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        """
+        Add arguments into the parser.
+
+        Parameters
+        ----------
+        parser : ArgumentParser
+            A parser for passing CLI arguments to the command.
+        """
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the files that would be moved without changing anything",
+        )
+
+    def handle(self, *args: str, **options: Unpack[Options]) -> None:
+        """
+        Handle arguments passed to the parser.
+
+        Parameters
+        ----------
+        *args : str
+            Optional string arguments.
+
+        **options : Unpack[Options]
+            Options that control the batch size and whether changes are made.
+
+        Raises
+        ------
+        CommandError
+            If the default storage is not a ShardedFileSystemStorage.
+        """
+        storage = default_storage
+        if not isinstance(storage, ShardedFileSystemStorage):
+            raise CommandError(
+                "The default storage must be core.storage.ShardedFileSystemStorage."
+            )
+
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+
+        names = (
+            Image.objects.exclude(file_object="")
+            .values_list("file_object", flat=True)
+            .distinct()
+            .order_by()
+        )
+
+        moved = 0
+        missing = 0
+        batch: dict[str, str] = {}
+        for name in names.iterator(chunk_size=batch_size):
+            if storage.is_sharded(name):
+                continue
+
+            batch[name] = storage.shard_name(name)
+            if len(batch) >= batch_size:
+                batch_moved, batch_missing = self._move_batch(storage, batch, dry_run)
+                moved += batch_moved
+                missing += batch_missing
+                batch = {}
+
+        if batch:
+            batch_moved, batch_missing = self._move_batch(storage, batch, dry_run)
+            moved += batch_moved
+            missing += batch_missing
+
+        prefix = "[dry run] Would move" if dry_run else "Moved"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix} {moved} media files into shard directories ({missing} missing)."
+            )
+        )
+
+    def _move_batch(
+        self, storage: ShardedFileSystemStorage, batch: dict[str, str], dry_run: bool
+    ) -> tuple[int, int]:
+        """
+        Move a batch of files and point their image rows at the new names.
+
+        Parameters
+        ----------
+        storage : ShardedFileSystemStorage
+            The storage that the files are in.
+
+        batch : dict[str, str]
+            Mapping of current storage names to sharded storage names.
+
+        dry_run : bool
+            Whether to only report the moves.
+
+        Returns
+        -------
+        tuple[int, int]
+            The number of moved files and the number of files that were missing.
+        """
+        renamed: dict[str, str] = {}
+        missing = 0
+        for old_name, new_name in batch.items():
+            old_path = storage.path(old_name)
+            new_path = storage.path(new_name)
+
+            if os.path.exists(old_path) and not os.path.exists(new_path):
+                if not dry_run:
+                    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+                    os.rename(old_path, new_path)
+
+                renamed[old_name] = new_name
+
+            elif os.path.exists(new_path):
+                # Moved by a previous, interrupted run.
+                renamed[old_name] = new_name
+
+            else:
+                missing += 1
+                self.stdout.write(f"Missing media file: {old_name}")
+
+        if renamed and not dry_run:
+            with transaction.atomic():
+                Image.objects.filter(file_object__in=list(renamed)).update(
+                    file_object=Case(
+                        *[
+                            When(file_object=old, then=Value(new))
+                            for old, new in renamed.items()
+                        ],
+                        output_field=CharField(),
+                    )
+                )
+
+        return len(renamed), missing
@@ -0,0 +1,44 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+View for serving uploaded media through the configured storage backend.
+"""
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpRequest
+from django.http.response import HttpResponseBase
+
+
+def serve_media(request: HttpRequest, path: str) -> HttpResponseBase:
+    """
+    Serve a media file, delegating the transfer to the web server when configured.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The incoming request for the media file.
+
+    path : str
+        The storage name of the file relative to ``MEDIA_ROOT``.
+
+    Returns
+    -------
+    HttpResponseBase
+        A response with an ``X-Accel-Redirect``/``X-Sendfile`` header or the file contents.
+
+    Raises
+    ------
+    Http404
+        If the storage cannot serve files or the file does not exist.
+    """
+    serve = getattr(default_storage, "serve", None)
+    if serve is None:
+        raise Http404("File not found.")
+
+    try:
+        response: HttpResponseBase = serve(path)
+
+    except SuspiciousFileOperation as exc:
+        raise Http404("File not found.") from exc
+
+    return response
@@ -0,0 +1,272 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Models for the core app.
+"""
+
+from collections.abc import Sequence
+from typing import Any
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from django.utils import timezone
+
+# MARK: Email Outbox
+
+
+class EmailOutbox(models.Model):
+    """
+    A transactional email waiting to be sent by the ``send_outbox`` worker.
+
+    Notes
+    -----
+    Views write the email in the same transaction as the change that triggers it,
+    so an email is only sent if that change was committed and a change is never
+    committed without its email. The worker delivers pending emails in batches
+    over one SMTP connection and retries failures with an exponential backoff.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    recipients = ArrayField(models.CharField(max_length=255))
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    creation_date = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                name="email_outbox_pending_idx",
+                condition=models.Q(status="pending"),
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.subject} -> {', '.join(self.recipients)}"
+
+    @classmethod
+    def enqueue(
+        cls,
+        subject: str,
+        body: str,
+        from_email: str | None,
+        recipients: Sequence[str],
+        html_body: str = "",
+    ) -> "EmailOutbox":
+        """
+        Queue an email; call inside the transaction of the change that triggers it.
+
+        Parameters
+        ----------
+        subject : str
+            The subject line.
+
+        body : str
+            The plain text body.
+
+        from_email : str | None
+            The sender address, ``DEFAULT_FROM_EMAIL`` if not given.
+
+        recipients : Sequence[str]
+            The recipient addresses.
+
+        html_body : str, default=""
+            An optional HTML alternative of the body.
+
+        Returns
+        -------
+        EmailOutbox
+            The queued email.
+        """
+        return cls.objects.create(
+            subject=subject,
+            body=body,
+            html_body=html_body,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            recipients=list(recipients),
+        )
+
+
+# MARK: Security Event
+
+
+class SecurityEvent(models.Model):
+    """
+    A security event reported by an internal service, e.g. a quarantined file.
+
+    Notes
+    -----
+    Events are unique per ``quarantine_id`` so that an event the producer retries
+    after a lost response is only stored and reported once. Operators are alerted
+    through digest emails that group the events without ``notified_at`` by
+    signature, see ``core.security_events``.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    event_type = models.CharField(max_length=64)
+    source = models.CharField(max_length=64)
+    occurred_at = models.DateTimeField()
+    quarantine_id = models.CharField(max_length=255, unique=True)
+    filename = models.CharField(max_length=255)
+    signature = models.CharField(max_length=255, blank=True)
+    detail = models.TextField(blank=True)
+    detected_by = models.CharField(max_length=64, blank=True)
+    payload = models.JSONField(default=dict)
+    creation_date = models.DateTimeField(auto_now_add=True)
+    notified_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["occurred_at"], name="security_event_occurred_idx"),
+            models.Index(
+                fields=["signature", "occurred_at"],
+                name="security_event_signature_idx",
+            ),
+            models.Index(
+                fields=["creation_date"],
+                name="security_event_pending_idx",
+                condition=models.Q(notified_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.event_type}: {self.filename} ({self.quarantine_id})"
+
+
+# MARK: Throttle Bucket
+
+
+class ThrottleBucket(models.Model):
+    """
+    The requests a client made in one fixed window of an API throttle.
+
+    Notes
+    -----
+    ``core.throttling`` keeps one row per throttle key and window and estimates
+    the requests in the sliding window from the current and the previous row, so
+    the limits are shared by all workers and every check updates a single row.
+    """
+
+    key = models.CharField(max_length=255)
+    bucket = models.BigIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key", "bucket"], name="throttle_bucket_key_bucket_unique"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.key} [{self.bucket}]: {self.count}"
+
+
+# MARK: Deletion Job
+
+
+class DeletionJob(models.Model):
+    """
+    The deletion of an account or an organization and everything that depends on it.
+
+    Notes
+    -----
+    The entity is deactivated when the job is scheduled and the ``run_deletion_jobs``
+    worker deletes its dependents in batches, each in its own short transaction,
+    before deleting the entity itself. ``step`` and ``deleted_count`` record the
+    progress after every batch, so a job that was interrupted resumes where it
+    stopped. A running job pushes ``next_attempt_at`` forward as a lease; if its
+    worker dies, another worker takes the job over once the lease expired.
+    """
+
+    ENTITY_USER = "user"
+    ENTITY_ORGANIZATION = "organization"
+    ENTITY_CHOICES = [
+        (ENTITY_USER, "User"),
+        (ENTITY_ORGANIZATION, "Organization"),
+    ]
+
+    STATUS_PENDING = "pending"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    entity_type = models.CharField(max_length=32, choices=ENTITY_CHOICES)
+    entity_id = models.UUIDField()
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    step = models.PositiveIntegerField(default=0)
+    deleted_count = models.PositiveBigIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    creation_date = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["entity_type", "entity_id"],
+                name="deletion_job_pending_entity_unique",
+                condition=models.Q(status="pending"),
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                name="deletion_job_pending_idx",
+                condition=models.Q(status="pending"),
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"Delete {self.entity_type} {self.entity_id} ({self.status})"
+
+    @classmethod
+    def schedule(cls, entity_type: str, entity_id: Any) -> "DeletionJob":
+        """
+        Queue the deletion of an entity unless it is queued already.
+
+        Parameters
+        ----------
+        entity_type : str
+            ``ENTITY_USER`` or ``ENTITY_ORGANIZATION``.
+
+        entity_id : Any
+            The primary key of the entity.
+
+        Returns
+        -------
+        DeletionJob
+            The pending job of the entity.
+        """
+        job, _ = cls.objects.get_or_create(
+            entity_type=entity_type, entity_id=entity_id, status=cls.STATUS_PENDING
+        )
+        return job
@@ -0,0 +1,162 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Background delivery of the transactional emails queued in the email outbox.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def _build_message(
+    email: EmailOutbox, connection: BaseEmailBackend
+) -> EmailMultiAlternatives:
+    """
+    Turn a queued email into a message for the email backend.
+
+    Parameters
+    ----------
+    email : EmailOutbox
+        The queued email.
+
+    connection : BaseEmailBackend
+        The open connection the message is sent over.
+
+    Returns
+    -------
+    EmailMultiAlternatives
+        The message, with the HTML body as an alternative if there is one.
+    """
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.recipients,
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+
+    return message
+
+
+def _record_failure(email: EmailOutbox, error: Exception) -> None:
+    """
+    Schedule the next attempt of an email or give up on it.
+
+    Parameters
+    ----------
+    email : EmailOutbox
+        The email that could not be sent.
+
+    error : Exception
+        Why it could not be sent.
+    """
+    email.attempts += 1
+    email.last_error = str(error) or type(error).__name__
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = EmailOutbox.STATUS_FAILED
+        logger.error(
+            f"Giving up on email {email.id} after {email.attempts} attempts: {error}"
+        )
+        return
+
+    # Exponential backoff so a failing SMTP server is not hammered.
+    delay = min(
+        settings.EMAIL_OUTBOX_RETRY_BACKOFF * 2 ** (email.attempts - 1),
+        settings.EMAIL_OUTBOX_RETRY_MAX_DELAY,
+    )
+    email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    logger.warning(
+        f"Failed to send email {email.id} (attempt {email.attempts}), retrying in {delay:.0f}s: {error}"
+    )
+
+
+def send_pending_emails(limit: int) -> dict[str, int]:
+    """
+    Send up to ``limit`` due emails over a single connection of the email backend.
+
+    Parameters
+    ----------
+    limit : int
+        The maximum number of emails to send.
+
+    Returns
+    -------
+    dict[str, int]
+        The number of emails that were ``sent``, scheduled to be ``retried`` and
+        ``failed`` for good.
+
+    Notes
+    -----
+    The batch is locked with ``SKIP LOCKED`` while it is sent, so several workers
+    can run side by side without sending an email twice. Delivery is at least
+    once: an email that was sent just before the worker died is sent again.
+    """
+    counts = {"sent": 0, "retried": 0, "failed": 0}
+    with transaction.atomic():
+        emails = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(
+                status=EmailOutbox.STATUS_PENDING, next_attempt_at__lte=timezone.now()
+            )
+            .order_by("next_attempt_at")[:limit]
+        )
+        if not emails:
+            return counts
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+
+        except Exception as exc:
+            # Nothing can be sent without a connection; retry the whole batch.
+            for email in emails:
+                _record_failure(email, exc)
+
+        else:
+            try:
+                for email in emails:
+                    try:
+                        if not connection.send_messages(
+                            [_build_message(email, connection)]
+                        ):
+                            raise RuntimeError("The email backend did not send it.")
+
+                    except Exception as exc:
+                        _record_failure(email, exc)
+
+                    else:
+                        email.attempts += 1
+                        email.status = EmailOutbox.STATUS_SENT
+                        email.sent_at = timezone.now()
+                        email.last_error = ""
+
+            finally:
+                connection.close()
+
+        EmailOutbox.objects.bulk_update(
+            emails,
+            fields=["status", "attempts", "next_attempt_at", "last_error", "sent_at"],
+        )
+
+    for email in emails:
+        if email.status == EmailOutbox.STATUS_SENT:
+            counts["sent"] += 1
+
+        elif email.status == EmailOutbox.STATUS_FAILED:
+            counts["failed"] += 1
+
+        else:
+            counts["retried"] += 1
+
+    return counts
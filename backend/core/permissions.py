@@ -67,8 +67,10 @@ class IsAdminStaffCreatorOrReadOnly(BasePermission):
         if request.method in SAFE_METHODS:
             return True
 
+        # Compare the key so that the creator is not loaded from the database.
+        creator_id = getattr(obj, "created_by_id", None)
         return (
-            obj.created_by == request.user
+            (creator_id is not None and creator_id == request.user.pk)
             or request.user.is_staff
             or request.user.is_superuser
         )
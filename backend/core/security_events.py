@@ -0,0 +1,128 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Digest emails that alert operators of the security events reported by filescan.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import EmailOutbox, SecurityEvent
+
+logger = logging.getLogger(__name__)
+
+# Files listed per signature; the digest only counts the rest.
+DIGEST_FILES_PER_SIGNATURE = 20
+
+
+def _digest_body(events: list[SecurityEvent]) -> str:
+    """
+    Describe a list of security events grouped by signature.
+
+    Parameters
+    ----------
+    events : list[SecurityEvent]
+        The events, oldest first.
+
+    Returns
+    -------
+    str
+        The plain text body of the digest email.
+    """
+    by_signature: dict[str, list[SecurityEvent]] = defaultdict(list)
+    for event in events:
+        by_signature[event.signature or "Unknown signature"].append(event)
+
+    lines = [
+        f"{len(events)} quarantined malware events were reported by the filescan service "
+        f"between {events[0].occurred_at.isoformat()} and {events[-1].occurred_at.isoformat()}.",
+    ]
+    # Most frequent signatures first, so a wave of one malware family leads.
+    for signature, grouped in sorted(
+        by_signature.items(), key=lambda item: (-len(item[1]), item[0])
+    ):
+        lines += ["", f"Signature: {signature} ({len(grouped)} files)"]
+        for event in grouped[:DIGEST_FILES_PER_SIGNATURE]:
+            lines.append(
+                f"- {event.filename} (quarantine ID {event.quarantine_id}, "
+                f"detected by {event.detected_by or event.source} "
+                f"at {event.occurred_at.isoformat()})"
+            )
+
+        if len(grouped) > DIGEST_FILES_PER_SIGNATURE:
+            lines.append(
+                f"- ... and {len(grouped) - DIGEST_FILES_PER_SIGNATURE} more files"
+            )
+
+    return "\n".join(lines)
+
+
+def queue_security_digest(now: datetime | None = None) -> int:
+    """
+    Queue a digest of the security events operators were not alerted of yet.
+
+    Parameters
+    ----------
+    now : datetime | None, default=None
+        The current time, used by tests.
+
+    Returns
+    -------
+    int
+        The number of events in the queued digest, 0 if none was queued.
+
+    Notes
+    -----
+    At most one digest is queued per ``SECURITY_ALERT_DIGEST_WINDOW``: the first
+    event after a quiet period is reported right away and the events that follow
+    it are grouped into the next digest. The digest is written to the email
+    outbox in the same transaction that marks its events as notified.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        events = list(
+            SecurityEvent.objects.select_for_update(skip_locked=True)
+            .filter(notified_at__isnull=True)
+            .order_by("creation_date")[: settings.SECURITY_ALERT_DIGEST_MAX_EVENTS]
+        )
+        if not events:
+            return 0
+
+        last_digest = SecurityEvent.objects.aggregate(last=Max("notified_at"))["last"]
+        window = timedelta(seconds=settings.SECURITY_ALERT_DIGEST_WINDOW)
+        if last_digest is not None and now - last_digest < window:
+            return 0
+
+        recipients = getattr(settings, "SECURITY_ALERT_RECIPIENTS", None)
+        from_email = getattr(settings, "SECURITY_ALERT_FROM_EMAIL", None)
+        if not recipients or not from_email:
+            logger.error(
+                "Security alert email configuration is incomplete; "
+                "SECURITY_ALERT_RECIPIENTS or SECURITY_ALERT_FROM_EMAIL not set. "
+                f"{len(events)} security events are waiting for a digest."
+            )
+            return 0
+
+        events.sort(key=lambda event: event.occurred_at)
+        subject = (
+            "[activist] Malware quarantined"
+            if len(events) == 1
+            else f"[activist] {len(events)} malware files quarantined"
+        )
+        EmailOutbox.enqueue(
+            subject=subject,
+            body=_digest_body(events),
+            from_email=from_email,
+            recipients=list(recipients),
+        )
+        SecurityEvent.objects.filter(id__in=[event.id for event in events]).update(
+            notified_at=now
+        )
+
+    logger.info(f"Queued a security alert digest of {len(events)} events")
+    return len(events)
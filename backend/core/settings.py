@@ -180,6 +180,34 @@ STATIC_URL = "static/"
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "/media/"
 
+# MARK: Media Storage
+
+# "x-accel-redirect" (nginx) or "x-sendfile" (Apache, lighttpd) to let the web
+# server transfer media files. Leave empty to serve them via Django.
+MEDIA_SENDFILE_BACKEND = os.getenv("MEDIA_SENDFILE_BACKEND", "")
+
+STORAGES = {
+    "default": {
+        "BACKEND": "core.storage.ShardedFileSystemStorage",
+        "OPTIONS": {
+            "shard_depth": int(os.getenv("MEDIA_SHARD_DEPTH", 2)),
+            "shard_width": int(os.getenv("MEDIA_SHARD_WIDTH", 2)),
+            "sendfile_backend": MEDIA_SENDFILE_BACKEND,
+            "sendfile_prefix": os.getenv("MEDIA_SENDFILE_PREFIX", "/protected-media/"),
+        },
+    },
+    # Uploads waiting for a deferred scan; this location is never served.
+    "image_staging": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {
+            "location": os.getenv("IMAGE_UPLOAD_STAGING_ROOT", BASE_DIR / "staging"),
+        },
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
 # MARK: Primary Key
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -197,6 +225,22 @@ EMAIL_BACKEND = os.getenv(
     "EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend"
 )
 
+# Transactional emails are queued in EmailOutbox and sent by the send_outbox
+# worker; failed emails are retried after EMAIL_OUTBOX_RETRY_BACKOFF seconds,
+# doubling per attempt up to EMAIL_OUTBOX_RETRY_MAX_DELAY.
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 8))
+EMAIL_OUTBOX_RETRY_BACKOFF = float(os.getenv("EMAIL_OUTBOX_RETRY_BACKOFF", 30))
+EMAIL_OUTBOX_RETRY_MAX_DELAY = float(os.getenv("EMAIL_OUTBOX_RETRY_MAX_DELAY", 3600))
+
+# Accounts and organizations are deleted by the run_deletion_jobs worker, at most
+# DELETION_JOB_BATCH_SIZE rows per transaction. A worker holds a job for
+# DELETION_JOB_LEASE_SECONDS after each batch; failed jobs are retried after
+# DELETION_JOB_RETRY_BACKOFF seconds, doubling per attempt.
+DELETION_JOB_BATCH_SIZE = int(os.getenv("DELETION_JOB_BATCH_SIZE", 500))
+DELETION_JOB_LEASE_SECONDS = float(os.getenv("DELETION_JOB_LEASE_SECONDS", 300))
+DELETION_JOB_MAX_ATTEMPTS = int(os.getenv("DELETION_JOB_MAX_ATTEMPTS", 5))
+DELETION_JOB_RETRY_BACKOFF = float(os.getenv("DELETION_JOB_RETRY_BACKOFF", 60))
+
 # Security event alerts
 INTERNAL_EVENTS_TOKEN = os.getenv("INTERNAL_EVENTS_TOKEN")
 SECURITY_ALERT_RECIPIENTS = tuple(
@@ -205,16 +249,25 @@ SECURITY_ALERT_RECIPIENTS = tuple(
     if addr.strip()
 )
 SECURITY_ALERT_FROM_EMAIL = os.getenv("SECURITY_ALERT_FROM_EMAIL", EMAIL_HOST_USER)
+# Envelopes accepted in one request to the security event ingest endpoint.
+SECURITY_EVENTS_MAX_BATCH = int(os.getenv("SECURITY_EVENTS_MAX_BATCH", 500))
+# Operators get at most one alert digest per window (seconds); events reported
+# in between are grouped by signature into the next digest.
+SECURITY_ALERT_DIGEST_WINDOW = float(os.getenv("SECURITY_ALERT_DIGEST_WINDOW", 300))
+SECURITY_ALERT_DIGEST_MAX_EVENTS = int(
+    os.getenv("SECURITY_ALERT_DIGEST_MAX_EVENTS", 1000)
+)
 
 # MARK: REST Framework
 
 REST_FRAMEWORK = {
     # Disable throttling in development to avoid "Too Many Requests" during E2E tests.
+    # Request counts are kept in the database so that the limits hold across workers.
     "DEFAULT_THROTTLE_CLASSES": []
     if DEBUG
     else [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "core.throttling.SharedAnonRateThrottle",
+        "core.throttling.SharedUserRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {"anon": "150/min", "user": "200/min"},
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
@@ -222,7 +275,7 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_ORDERS_OBJECTS": False,
     "PAGE_SIZE": 20,
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "authentication.authentication.CachedJWTAuthentication",
     ),
     "EXCEPTION_HANDLER": "core.exception_handler.bad_request_logger",
     "DEFAULT_RENDERER_CLASSES": (
@@ -322,10 +375,30 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }
 
+# Seconds CachedJWTAuthentication keeps a snapshot of an authenticated user; saving
+# or deleting the user drops it right away in the process that made the change.
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 30))
+
+# Days a sign-in SessionModel row is kept before the prune_sessions command deletes it.
+SESSION_RETENTION_DAYS = float(os.getenv("SESSION_RETENTION_DAYS", 30))
+
+# Hours the one-time codes of email verification and password reset links are valid.
+EMAIL_VERIFICATION_TOKEN_LIFETIME_HOURS = float(
+    os.getenv("EMAIL_VERIFICATION_TOKEN_LIFETIME_HOURS", 72)
+)
+PASSWORD_RESET_TOKEN_LIFETIME_HOURS = float(
+    os.getenv("PASSWORD_RESET_TOKEN_LIFETIME_HOURS", 2)
+)
+
 # MARK: Image / Data Upload size limits
 IMAGE_UPLOAD_MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 
+# Allow uploads sent with async_scan=true to be staged and scanned by the
+# scan_pending_images worker instead of blocking the request on the scan.
+IMAGE_UPLOAD_ASYNC_SCAN = os.getenv("IMAGE_UPLOAD_ASYNC_SCAN") == "True"
+IMAGE_UPLOAD_SCAN_MAX_ATTEMPTS = int(os.getenv("IMAGE_UPLOAD_SCAN_MAX_ATTEMPTS", 5))
+
 # MARK: API Settings
 
 django.setup()
@@ -0,0 +1,337 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Sharded local filesystem storage for uploaded media.
+
+Files are spread over nested prefix directories (e.g. ``images/3f/a2/<name>``)
+so that no single directory holds every upload, written atomically through a
+temporary file and can be served by the web server via ``X-Accel-Redirect`` or
+``X-Sendfile`` instead of being streamed through Django.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+import os
+import posixpath
+from typing import Any
+from uuid import uuid4
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+from django.http import FileResponse, Http404, HttpResponse
+from django.http.response import HttpResponseBase
+from django.utils._os import safe_makedirs
+from django.utils.deconstruct import deconstructible
+from django.utils.encoding import filepath_to_uri
+
+SENDFILE_BACKEND_X_ACCEL_REDIRECT = "x-accel-redirect"
+SENDFILE_BACKEND_X_SENDFILE = "x-sendfile"
+
+# Prefix for files that are being written and not yet published under their final name.
+TEMP_FILE_PREFIX = ".tmp-"
+
+
+@deconstructible(path="core.storage.ShardedFileSystemStorage")
+class ShardedFileSystemStorage(FileSystemStorage):
+    """
+    Local filesystem storage that shards files into nested prefix directories.
+
+    Parameters
+    ----------
+    shard_depth : int, default=2
+        The number of nested shard directories between the upload directory and the file.
+
+    shard_width : int, default=2
+        The number of hex characters used for each shard directory name.
+
+    sendfile_backend : str, default=""
+        Either ``"x-accel-redirect"`` (nginx), ``"x-sendfile"`` (Apache, lighttpd)
+        or an empty string to stream files from Django.
+
+    sendfile_prefix : str, default="/protected-media/"
+        The internal location that ``X-Accel-Redirect`` paths are prefixed with.
+
+    allow_overwrite : bool, default=False
+        Whether saving replaces an existing file instead of choosing a new name.
+
+    **kwargs : Any
+        Additional arguments passed to ``FileSystemStorage``.
+
+    Notes
+    -----
+    The shard directories are derived from a SHA-256 of the file's base name, so the
+    layout is evenly distributed and a file's location can always be recomputed from
+    its name. Names that are already sharded are left untouched.
+    """
+
+    def __init__(
+        self,
+        shard_depth: int = 2,
+        shard_width: int = 2,
+        sendfile_backend: str = "",
+        sendfile_prefix: str = "/protected-media/",
+        allow_overwrite: bool = False,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(allow_overwrite=allow_overwrite, **kwargs)
+        self.allow_overwrite = allow_overwrite
+        self.shard_depth = shard_depth
+        self.shard_width = shard_width
+        self.sendfile_backend = sendfile_backend.lower()
+        self.sendfile_prefix = sendfile_prefix.rstrip("/") + "/"
+
+    # MARK: Naming
+
+    def shard_parts(self, basename: str) -> list[str]:
+        """
+        Return the shard directory names for a file's base name.
+
+        Parameters
+        ----------
+        basename : str
+            The name of the file without any directories.
+
+        Returns
+        -------
+        list[str]
+            The nested shard directory names, outermost first.
+        """
+        digest = hashlib.sha256(basename.encode()).hexdigest()
+        width = self.shard_width
+
+        return [digest[i * width : (i + 1) * width] for i in range(self.shard_depth)]
+
+    def is_sharded(self, name: str) -> bool:
+        """
+        Check whether a storage name already lives in its shard directories.
+
+        Parameters
+        ----------
+        name : str
+            The storage name relative to the media root.
+
+        Returns
+        -------
+        bool
+            True if the name's directories end with its expected shard parts.
+        """
+        directory, basename = posixpath.split(name)
+        parts = self.shard_parts(basename)
+
+        return directory.split("/")[-len(parts) :] == parts if parts else True
+
+    def shard_name(self, name: str) -> str:
+        """
+        Move a storage name into its shard directories.
+
+        Parameters
+        ----------
+        name : str
+            The storage name relative to the media root (e.g. ``images/<uuid>.jpg``).
+
+        Returns
+        -------
+        str
+            The sharded name (e.g. ``images/3f/a2/<uuid>.jpg``).
+        """
+        if self.is_sharded(name):
+            return name
+
+        directory, basename = posixpath.split(name)
+
+        return posixpath.join(directory, *self.shard_parts(basename), basename)
+
+    def get_available_name(self, name: str, max_length: int | None = None) -> str:
+        """
+        Return a free storage name, re-sharding any alternative name that is chosen.
+
+        Parameters
+        ----------
+        name : str
+            The desired storage name, sharded or not.
+
+        max_length : int | None, default=None
+            The maximum length of the returned name.
+
+        Returns
+        -------
+        str
+            The desired name if it is free, otherwise a suffixed name in the shard
+            directories of its own base name.
+
+        Raises
+        ------
+        SuspiciousFileOperation
+            If the name is unsafe or no free name fits in ``max_length``.
+        """
+        validate_file_name(name, allow_relative_path=True)
+        directory, basename = posixpath.split(self.shard_name(name))
+        if self.shard_depth:
+            directory = posixpath.join(
+                *directory.split("/")[: -self.shard_depth] or [""]
+            )
+
+        file_root, file_ext = posixpath.splitext(basename)
+        candidate = posixpath.join(directory, *self.shard_parts(basename), basename)
+        while self.exists(candidate):
+            alternative = self.get_alternative_name(file_root, file_ext)
+            candidate = posixpath.join(
+                directory, *self.shard_parts(alternative), alternative
+            )
+
+        if max_length is not None and len(candidate) > max_length:
+            raise SuspiciousFileOperation(
+                f'Storage can not find an available filename for "{name}". Please '
+                "make sure that the corresponding file field allows sufficient "
+                '"max_length".'
+            )
+
+        return candidate
+
+    def generate_filename(self, filename: str | os.PathLike[str]) -> str:
+        """
+        Validate the filename and place it in its shard directories.
+
+        Parameters
+        ----------
+        filename : str | os.PathLike[str]
+            The name produced by the field's ``upload_to``.
+
+        Returns
+        -------
+        str
+            The sharded name that the file will be saved under.
+        """
+        return self.shard_name(super().generate_filename(filename))
+
+    # MARK: Saving
+
+    def _save(self, name: str, content: File) -> str:
+        """
+        Write the content to a temporary file and atomically publish it under its name.
+
+        Parameters
+        ----------
+        name : str
+            The storage name to save the file under.
+
+        content : File
+            The file content to be written.
+
+        Returns
+        -------
+        str
+            The name the file was saved under relative to the media root.
+        """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        if self.directory_permissions_mode is not None:
+            safe_makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = os.path.join(directory, f"{TEMP_FILE_PREFIX}{uuid4().hex}")
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                for chunk in content.chunks():
+                    temp_file.write(
+                        chunk if isinstance(chunk, bytes) else chunk.encode()
+                    )
+
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+
+            while True:
+                try:
+                    self._publish(temp_path, full_path)
+
+                except FileExistsError:
+                    # Another writer claimed the name between get_available_name and now.
+                    # The alternative name lives in other shard directories.
+                    name = self.get_available_name(name)
+                    full_path = self.path(name)
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+                else:
+                    break
+
+        finally:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+
+        return os.path.relpath(full_path, self.location).replace("\\", "/")
+
+    def _publish(self, temp_path: str, full_path: str) -> None:
+        """
+        Atomically make a fully written temporary file visible under its final path.
+
+        Parameters
+        ----------
+        temp_path : str
+            The path of the completely written temporary file.
+
+        full_path : str
+            The final path of the file.
+
+        Raises
+        ------
+        FileExistsError
+            If overwriting is disabled and a file already exists at ``full_path``.
+        """
+        if self.allow_overwrite:
+            os.replace(temp_path, full_path)
+
+        else:
+            # Unlike rename, link never replaces an existing file.
+            os.link(temp_path, full_path)
+
+    # MARK: Serving
+
+    def serve(self, name: str) -> HttpResponseBase:
+        """
+        Build a response serving a stored file, delegating to the web server if configured.
+
+        Parameters
+        ----------
+        name : str
+            The storage name of the file to serve.
+
+        Returns
+        -------
+        HttpResponseBase
+            An empty response with a sendfile header or a streaming ``FileResponse``.
+
+        Raises
+        ------
+        Http404
+            If the file does not exist.
+        """
+        if not self.exists(name) or os.path.isdir(self.path(name)):
+            raise Http404("File not found.")
+
+        content_type, encoding = mimetypes.guess_type(name)
+        content_type = content_type or "application/octet-stream"
+
+        if self.sendfile_backend == SENDFILE_BACKEND_X_ACCEL_REDIRECT:
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = self.sendfile_prefix + filepath_to_uri(name)
+
+        elif self.sendfile_backend == SENDFILE_BACKEND_X_SENDFILE:
+            response = HttpResponse(content_type=content_type)
+            response["X-Sendfile"] = self.path(name)
+
+        else:
+            return FileResponse(open(self.path(name), "rb"), content_type=content_type)
+
+        if encoding:
+            response["Content-Encoding"] = encoding
+
+        return response
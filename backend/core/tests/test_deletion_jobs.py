@@ -0,0 +1,163 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the background deletion of accounts and organizations.
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from authentication.factories import UserFactory
+from authentication.models import SessionModel, UserModel
+from communities.groups.factories import GroupFactory
+from communities.groups.models import Group
+from communities.organizations.factories import (
+    OrganizationFactory,
+    OrganizationFlagFactory,
+)
+from communities.organizations.models import Organization, OrganizationFlag
+from core.deletion import (
+    deletion_plan,
+    run_next_deletion_job,
+    schedule_deletion,
+)
+from core.models import DeletionJob
+from events.factories import EventFactory
+from events.models import Event
+
+pytestmark = pytest.mark.django_db
+
+
+def _organizer() -> tuple[UserModel, Organization]:
+    user = UserFactory(username="organizer")
+    orgs = OrganizationFactory.create_batch(2, created_by=user)
+    GroupFactory.create_batch(3, org=orgs[0])
+    EventFactory(created_by=user, orgs=[orgs[1]], groups=[])
+    SessionModel.objects.create(user=user)
+    other_org = OrganizationFactory(created_by=UserFactory(username="bystander"))
+    OrganizationFlagFactory(org=other_org, created_by=user)
+    return user, other_org
+
+
+def test_schedule_deletion_deactivates_user_once() -> None:
+    user = UserFactory()
+
+    job = schedule_deletion(user)
+
+    user.refresh_from_db()
+    assert user.is_active is False
+    assert schedule_deletion(user) == job
+    assert DeletionJob.objects.count() == 1
+    assert job.entity_type == DeletionJob.ENTITY_USER
+    assert job.status == DeletionJob.STATUS_PENDING
+
+
+def test_run_deletion_jobs_deletes_user_and_dependents_in_batches() -> None:
+    user, other_org = _organizer()
+    job = schedule_deletion(user)
+
+    out = StringIO()
+    call_command("run_deletion_jobs", "--once", "--batch-size", "1", stdout=out)
+
+    assert f"Deleted user {user.id}" in out.getvalue()
+    assert not UserModel.objects.filter(id=user.id).exists()
+    assert list(Organization.objects.all()) == [other_org]
+    assert not Group.objects.exists()
+    assert not Event.objects.filter(created_by_id=user.id).exists()
+    assert not OrganizationFlag.objects.exists()
+    assert not SessionModel.objects.exists()
+
+    job.refresh_from_db()
+    assert job.status == DeletionJob.STATUS_DONE
+    assert job.finished_at is not None
+    assert job.step == len(
+        deletion_plan(UserModel, UserModel.objects.filter(pk=user.id))
+    )
+    assert job.deleted_count >= 9
+
+
+def test_run_deletion_job_resumes_after_failure(monkeypatch) -> None:
+    user, other_org = _organizer()
+    job = schedule_deletion(user)
+
+    calls = 0
+    delete = QuerySet.delete
+
+    def _failing_delete(self):
+        nonlocal calls
+        calls += 1
+        if calls == 3:
+            raise RuntimeError("Lost the connection")
+
+        return delete(self)
+
+    monkeypatch.setattr(QuerySet, "delete", _failing_delete)
+    assert run_next_deletion_job(batch_size=1) == job
+
+    job.refresh_from_db()
+    assert job.status == DeletionJob.STATUS_PENDING
+    assert job.attempts == 1
+    assert job.last_error == "Lost the connection"
+    assert job.step > 0
+    assert job.next_attempt_at > timezone.now()
+    progress = job.deleted_count
+    assert progress >= 2
+
+    # The job is not due until its retry, then it continues from its step.
+    assert run_next_deletion_job(batch_size=1) is None
+    DeletionJob.objects.filter(id=job.id).update(next_attempt_at=timezone.now())
+    monkeypatch.undo()
+    run_next_deletion_job(batch_size=1)
+
+    job.refresh_from_db()
+    assert job.status == DeletionJob.STATUS_DONE
+    assert job.deleted_count > progress
+    assert not UserModel.objects.filter(id=user.id).exists()
+    assert Organization.objects.filter(id=other_org.id).exists()
+
+
+def test_run_deletion_job_gives_up_after_max_attempts(settings, monkeypatch) -> None:
+    settings.DELETION_JOB_MAX_ATTEMPTS = 1
+    user = UserFactory()
+    job = schedule_deletion(user)
+
+    def _failing_delete(self):
+        raise RuntimeError("Boom")
+
+    monkeypatch.setattr(QuerySet, "delete", _failing_delete)
+    run_next_deletion_job(batch_size=10)
+
+    job.refresh_from_db()
+    assert job.status == DeletionJob.STATUS_FAILED
+    assert job.last_error == "Boom"
+    assert run_next_deletion_job(batch_size=10) is None
+
+
+def test_run_deletion_job_skips_leased_job() -> None:
+    job = schedule_deletion(UserFactory())
+    DeletionJob.objects.filter(id=job.id).update(
+        next_attempt_at=timezone.now() + timedelta(minutes=5)
+    )
+
+    assert run_next_deletion_job(batch_size=10) is None
+
+
+def test_run_deletion_jobs_deletes_organization() -> None:
+    org = OrganizationFactory()
+    GroupFactory.create_batch(2, org=org)
+    creator = org.created_by
+
+    job = schedule_deletion(org)
+    org.refresh_from_db()
+    assert org.deletion_date is not None
+    assert job.entity_type == DeletionJob.ENTITY_ORGANIZATION
+
+    call_command("run_deletion_jobs", "--once", stdout=StringIO())
+
+    assert not Organization.objects.filter(id=org.id).exists()
+    assert not Group.objects.filter(org_id=org.id).exists()
+    assert UserModel.objects.filter(id=creator.id).exists()
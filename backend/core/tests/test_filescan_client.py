@@ -0,0 +1,363 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the pooled filescan HTTP client.
+"""
+
+import httpx
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from core.filescan.circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+)
+from core.filescan.filescan_client import FilescanClient, FilescanError
+from core.filescan.verdict_cache import VerdictCache
+
+
+def _upload() -> SimpleUploadedFile:
+    return SimpleUploadedFile("logo.png", b"png-bytes", content_type="image/png")
+
+
+def _client(handler, **kwargs) -> FilescanClient:
+    return FilescanClient(
+        url="http://filescan/scan",
+        transport=httpx.MockTransport(handler),
+        retry_backoff=0,
+        **kwargs,
+    )
+
+
+def test_filescan_client_returns_json_and_sends_file() -> None:
+    bodies: list[bytes] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(request.read())
+        return httpx.Response(200, json={"malware_detected": False})
+
+    client = _client(handler)
+
+    assert client.scan(_upload()) == {"malware_detected": False}
+    assert client.scan(_upload()) == {"malware_detected": False}
+    assert all(b"png-bytes" in body for body in bodies)
+    assert client.metrics()["requests"] == 2
+    assert client.metrics()["breaker_state"] == STATE_CLOSED
+
+
+def test_filescan_client_retries_transient_failures() -> None:
+    responses = iter(
+        [
+            httpx.ConnectError("refused"),
+            httpx.Response(503, text="busy"),
+            httpx.Response(200, json={"malware_detected": True}),
+        ]
+    )
+    bodies: list[bytes] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(request.read())
+        result = next(responses)
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+    client = _client(handler, max_retries=2)
+
+    assert client.scan(_upload()) == {"malware_detected": True}
+    # Every attempt re-sends the whole file.
+    assert len(bodies) == 3
+    assert all(b"png-bytes" in body for body in bodies)
+    assert client.metrics()["retries"] == 2
+
+
+def test_filescan_client_does_not_retry_client_errors() -> None:
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(403, json={"detail": "Unauthorized"})
+
+    client = _client(handler, max_retries=3)
+
+    with pytest.raises(FilescanError, match="403"):
+        client.scan(_upload())
+
+    assert calls == 1
+    assert client.breaker.state == STATE_CLOSED
+
+
+def test_filescan_client_invalid_json_counts_as_failure() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b"<html>Bad gateway</html>")
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    client = _client(handler, max_retries=3, breaker=breaker)
+
+    with pytest.raises(FilescanError, match="invalid JSON"):
+        client.scan(_upload())
+
+    assert client.metrics()["requests"] == 1
+    assert client.breaker.state == STATE_OPEN
+
+
+def test_filescan_client_circuit_opens_and_fails_fast() -> None:
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        raise httpx.ConnectError("refused")
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    client = _client(handler, max_retries=0, breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(FilescanError, match="Could not reach"):
+            client.scan(_upload())
+
+    with pytest.raises(FilescanError, match="circuit open"):
+        client.scan(_upload())
+
+    assert calls == 2
+    metrics = client.metrics()
+    assert metrics["breaker_state"] == STATE_OPEN
+    assert metrics["breaker_rejected_calls"] == 1
+
+
+def test_filescan_client_circuit_half_open_allows_single_trial() -> None:
+    now = 0.0
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now)
+
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow_request()
+
+    now = 11.0
+    assert breaker.state == STATE_HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow_request()
+
+
+def test_filescan_client_reuses_cached_verdicts() -> None:
+    versions = iter(["27400", "27400", "27401"])
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(
+            200, json={"malware_detected": False, "signature_version": next(versions)}
+        )
+
+    client = _client(handler)
+
+    first = client.scan(_upload())
+    assert client.scan(_upload()) == first
+    assert calls == 1
+
+    other = SimpleUploadedFile("other.png", b"other-bytes")
+    client.scan(other)
+    assert calls == 2
+
+    metrics = client.metrics()
+    assert metrics["cache_hits"] == 1
+    assert metrics["cache_misses"] == 2
+    assert metrics["cache_entries"] == 2
+
+
+def test_filescan_client_verdict_cache_invalidated_by_signature_update() -> None:
+    versions = iter(["27400", "27401", "27401"])
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(
+            200, json={"malware_detected": False, "signature_version": next(versions)}
+        )
+
+    client = _client(handler)
+
+    client.scan(_upload())
+    # A different file reveals that the service loaded new signatures.
+    client.scan(SimpleUploadedFile("other.png", b"other-bytes"))
+    client.scan(_upload())
+    assert calls == 3
+    assert client.metrics()["cache_invalidations"] == 1
+
+
+def test_filescan_client_expires_clean_verdicts() -> None:
+    now = 0.0
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(
+            200, json={"malware_detected": False, "signature_version": "27400"}
+        )
+
+    client = _client(
+        handler, verdict_cache=VerdictCache(clean_ttl=60, clock=lambda: now)
+    )
+
+    client.scan(_upload())
+    client.scan(_upload())
+    now = 61
+    client.scan(_upload())
+    assert calls == 2
+
+
+def test_filescan_client_scans_many_files_in_one_batch_request() -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        body = request.read()
+        assert b'name="stop_on_detection"' in body
+        return httpx.Response(
+            200,
+            json={
+                "results": [
+                    {
+                        "filename": "a.png",
+                        "malware_detected": False,
+                        "signature_version": "27400",
+                    },
+                    {
+                        "filename": "b.png",
+                        "malware_detected": True,
+                        "signature_version": "27400",
+                    },
+                ],
+                "malware_detected": True,
+            },
+        )
+
+    client = _client(handler)
+    uploads = [
+        SimpleUploadedFile("a.png", b"a-bytes"),
+        SimpleUploadedFile("b.png", b"b-bytes"),
+        SimpleUploadedFile("a-copy.png", b"a-bytes"),
+    ]
+
+    results = client.scan_many(uploads)
+
+    assert len(requests) == 1
+    assert str(requests[0].url) == "http://filescan/scan/batch"
+    # Identical bytes are only sent once and share the verdict.
+    assert requests[0].read().count(b'name="files"') == 2
+    assert [result["malware_detected"] for result in results] == [False, True, False]
+
+    # The verdicts are cached for the next request.
+    assert client.scan(SimpleUploadedFile("again.png", b"b-bytes"))["malware_detected"]
+    assert len(requests) == 1
+
+
+def test_filescan_client_scan_many_skips_after_cached_detection() -> None:
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(
+            200, json={"malware_detected": True, "signature_version": "27400"}
+        )
+
+    client = _client(handler)
+    client.scan(SimpleUploadedFile("bad.png", b"bad-bytes"))
+
+    results = client.scan_many(
+        [
+            SimpleUploadedFile("bad.png", b"bad-bytes"),
+            SimpleUploadedFile("other.png", b"other-bytes"),
+        ],
+        stop_on_detection=True,
+    )
+
+    assert calls == 1
+    assert results[0]["malware_detected"] is True
+    assert results[1]["skipped"] is True
+
+
+def test_filescan_client_scan_many_rejects_mismatched_results() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"results": [], "malware_detected": False})
+
+    client = _client(handler)
+
+    with pytest.raises(FilescanError):
+        client.scan_many(
+            [SimpleUploadedFile("a.png", b"a"), SimpleUploadedFile("b.png", b"b")]
+        )
+
+
+def test_filescan_client_honours_retry_after_when_throttled(monkeypatch) -> None:
+    responses = iter(
+        [
+            httpx.Response(429, headers={"Retry-After": "3"}, json={}),
+            httpx.Response(503, headers={"Retry-After": "60"}, json={}),
+            httpx.Response(200, json={"malware_detected": False}),
+        ]
+    )
+    delays: list[float] = []
+    monkeypatch.setattr("core.filescan.filescan_client.time.sleep", delays.append)
+    monkeypatch.setattr("core.filescan.filescan_client.FILESCAN_RETRY_AFTER_MAX", 5)
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    client = _client(lambda request: next(responses), max_retries=2, breaker=breaker)
+
+    assert client.scan(_upload()) == {"malware_detected": False}
+    # The second Retry-After is capped so that an upload never waits for minutes.
+    assert delays == [3.0, 5]
+    metrics = client.metrics()
+    assert metrics["throttled"] == 2
+    assert metrics["retries"] == 2
+    assert metrics["breaker_state"] == STATE_CLOSED
+
+
+def test_filescan_client_throttled_request_does_not_open_circuit() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    client = _client(
+        lambda request: httpx.Response(429, headers={"Retry-After": "0"}, json={}),
+        max_retries=1,
+        breaker=breaker,
+    )
+
+    with pytest.raises(FilescanError, match="429"):
+        client.scan(_upload())
+
+    assert client.breaker.state == STATE_CLOSED
+
+
+def test_filescan_client_sends_profile_and_caches_per_profile() -> None:
+    bodies: list[bytes] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(request.read())
+        rejected = b'name="profile"' in bodies[-1]
+        return httpx.Response(
+            200,
+            json={
+                "malware_detected": False,
+                "rejected": rejected,
+                "signature_version": "27400",
+            },
+        )
+
+    client = _client(handler)
+
+    assert client.scan(_upload(), profile="image")["rejected"] is True
+    assert client.scan(_upload())["rejected"] is False
+    assert client.scan(_upload(), profile="image")["rejected"] is True
+    # The same bytes are cached separately per profile.
+    assert len(bodies) == 2
+    assert b"image" in bodies[0]
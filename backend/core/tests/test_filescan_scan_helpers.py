@@ -0,0 +1,78 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for batched scanning in scan_uploads_and_rewind.
+"""
+
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+
+from core.filescan.filescan_client import FilescanError
+from core.filescan.scan_helpers import (
+    FILESCAN_MSG_COULD_NOT_SCAN,
+    FILESCAN_MSG_REJECTED,
+    scan_uploads_and_rewind,
+)
+
+
+def _uploads(count: int) -> list[SimpleUploadedFile]:
+    return [
+        SimpleUploadedFile(f"image_{i}.png", b"png-bytes", content_type="image/png")
+        for i in range(count)
+    ]
+
+
+def test_scan_helpers_scans_uploads_in_one_batch_and_rewinds() -> None:
+    uploads = _uploads(4)
+    for upload in uploads:
+        upload.read()
+
+    with patch(
+        "core.filescan.scan_helpers.scan_files",
+        return_value=[{"malware_detected": False}] * 4,
+    ) as scan_files:
+        result = scan_uploads_and_rewind(uploads)
+
+    assert result is None
+    scan_files.assert_called_once_with(uploads, stop_on_detection=True, profile=None)
+    assert all(upload.tell() == 0 for upload in uploads)
+
+
+def test_scan_helpers_rejects_when_any_upload_is_flagged() -> None:
+    results = [
+        {"malware_detected": True},
+        {"skipped": True},
+        {"skipped": True},
+    ]
+    with patch("core.filescan.scan_helpers.scan_files", return_value=results):
+        response = scan_uploads_and_rewind(_uploads(3))
+
+    assert response is not None
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data == {"nonFieldErrors": [FILESCAN_MSG_REJECTED]}
+
+
+def test_scan_helpers_rejects_uploads_the_service_rejected() -> None:
+    results = [{"malware_detected": False, "rejected": True}]
+    with patch(
+        "core.filescan.scan_helpers.scan_files", return_value=results
+    ) as scan_files:
+        response = scan_uploads_and_rewind(_uploads(1), profile="image")
+
+    assert response is not None
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data == {"nonFieldErrors": [FILESCAN_MSG_REJECTED]}
+    assert scan_files.call_args.kwargs["profile"] == "image"
+
+
+def test_scan_helpers_maps_scan_errors_to_could_not_scan() -> None:
+    with patch(
+        "core.filescan.scan_helpers.scan_files",
+        side_effect=FilescanError("unavailable"),
+    ):
+        response = scan_uploads_and_rewind(_uploads(3))
+
+    assert response is not None
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data == {"nonFieldErrors": [FILESCAN_MSG_COULD_NOT_SCAN]}
@@ -0,0 +1,99 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the gc_media management command.
+"""
+
+import os
+import time
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from content.models import Image
+
+pytestmark = pytest.mark.django_db
+
+OLD_MTIME = time.time() - 3 * 24 * 3600
+
+
+def _write(path: Path, content: bytes, mtime: float = OLD_MTIME) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    os.utime(path, (mtime, mtime))
+
+    return path
+
+
+@pytest.fixture
+def media_root(settings, tmp_path: Path) -> Path:
+    settings.MEDIA_ROOT = str(tmp_path)
+    _write(tmp_path / "images" / ".keep", b"")
+
+    return tmp_path
+
+
+def test_gc_media_removes_only_old_unreferenced_files(media_root: Path) -> None:
+    referenced = _write(media_root / "images" / "ab" / "cd" / "kept.jpg", b"kept")
+    orphan = _write(media_root / "images" / "ef" / "01" / "orphan.jpg", b"orphan")
+    flat_orphan = _write(media_root / "images" / "flat.jpg", b"flat")
+    recent = _write(
+        media_root / "images" / "ef" / "02" / "recent.jpg", b"recent", time.time()
+    )
+    Image.objects.create(file_object="images/ab/cd/kept.jpg")
+
+    out = StringIO()
+    call_command("gc_media", stdout=out)
+
+    assert referenced.exists()
+    assert recent.exists()
+    assert (media_root / "images" / ".keep").exists()
+    assert not orphan.exists()
+    assert not flat_orphan.exists()
+    assert "4 files, 2 unreferenced" in out.getvalue()
+    assert f"Reclaimed {len(b'orphan') + len(b'flat')} bytes" in out.getvalue()
+
+
+def test_gc_media_dry_run_keeps_files(media_root: Path) -> None:
+    orphan = _write(media_root / "images" / "ef" / "01" / "orphan.jpg", b"orphan")
+
+    out = StringIO()
+    call_command("gc_media", "--dry-run", stdout=out)
+
+    assert orphan.exists()
+    assert "Would reclaim 6 bytes" in out.getvalue()
+
+
+def test_gc_media_quarantines_files(media_root: Path, tmp_path_factory) -> None:
+    quarantine_dir = tmp_path_factory.mktemp("quarantine")
+    orphan = _write(media_root / "images" / "ef" / "01" / "orphan.jpg", b"orphan")
+
+    call_command("gc_media", "--quarantine-dir", str(quarantine_dir), stdout=StringIO())
+
+    assert not orphan.exists()
+    assert (quarantine_dir / "images" / "ef" / "01" / "orphan.jpg").exists()
+
+
+def test_gc_media_clear_dev_removes_referenced_files(
+    media_root: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("ENVIRONMENT", "development")
+    referenced = _write(
+        media_root / "images" / "ab" / "cd" / "kept.jpg", b"kept", time.time()
+    )
+    Image.objects.create(file_object="images/ab/cd/kept.jpg")
+
+    call_command("gc_media", "--clear-dev", stdout=StringIO())
+
+    assert not referenced.exists()
+    assert (media_root / "images" / ".keep").exists()
+
+
+def test_gc_media_clear_dev_outside_development_fails(
+    media_root: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("ENVIRONMENT", "production")
+
+    with pytest.raises(CommandError):
+        call_command("gc_media", "--clear-dev", stdout=StringIO())
@@ -1,12 +1,19 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 
 import json
+from datetime import timedelta
 from typing import Any
 
 import pytest
+from django.core import mail
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.models import EmailOutbox, SecurityEvent
+from core.outbox import send_pending_emails
+from core.security_events import queue_security_digest
+
 pytestmark = pytest.mark.django_db
 
 
@@ -42,41 +49,127 @@ def test_security_events_ingest_rejects_without_token(
     assert response.status_code == status.HTTP_403_FORBIDDEN
 
 
-def test_security_events_ingest_sends_email_for_malware_quarantined(
-    api_client: APIClient, settings, monkeypatch
-) -> None:
+def _envelope(quarantine_id: str, signature: str = "EICAR-TEST") -> dict[str, Any]:
+    envelope = _base_envelope()
+    envelope["payload"] = {
+        **envelope["payload"],
+        "filename": f"{quarantine_id}.txt",
+        "quarantine_id": quarantine_id,
+        "signature": signature,
+    }
+    return envelope
+
+
+def _post(api_client: APIClient, data: Any) -> Any:
+    return api_client.post(
+        "/internal/security-events",
+        data=json.dumps(data),
+        content_type="application/json",
+        HTTP_X_INTERNAL_TOKEN="secret-token",
+    )
+
+
+@pytest.fixture
+def alert_settings(settings):
     settings.INTERNAL_EVENTS_TOKEN = "secret-token"
     settings.SECURITY_ALERT_RECIPIENTS = ("ops@example.com",)
     settings.SECURITY_ALERT_FROM_EMAIL = "alerts@example.com"
+    settings.SECURITY_ALERT_DIGEST_WINDOW = 300
+    return settings
 
-    sent: dict[str, Any] = {}
-
-    def fake_send_mail(
-        subject: str,
-        message: str,
-        from_email: str,
-        recipient_list,
-        fail_silently: bool = False,
-    ) -> int:
-        sent["subject"] = subject
-        sent["message"] = message
-        sent["from_email"] = from_email
-        sent["recipient_list"] = list(recipient_list)
-        return 1
 
-    monkeypatch.setattr("core.internal_events.send_mail", fake_send_mail)
+def test_security_events_ingest_sends_email_for_malware_quarantined(
+    api_client: APIClient, alert_settings
+) -> None:
+    response = _post(api_client, _base_envelope())
 
-    envelope = _base_envelope()
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    event = SecurityEvent.objects.get()
+    assert event.signature == "EICAR-TEST"
+    assert event.notified_at is None
+    assert len(mail.outbox) == 0
+
+    assert queue_security_digest() == 1
+    assert send_pending_emails(limit=10)["sent"] == 1
+    sent = mail.outbox[0]
+    assert sent.from_email == "alerts@example.com"
+    assert sent.subject == "[activist] Malware quarantined"
+    assert "eicar.txt" in sent.body
+    assert "abc123" in sent.body
+    assert sent.to == ["ops@example.com"]
+
+
+def test_security_events_ingest_accepts_a_batch_and_ignores_duplicates(
+    api_client: APIClient, alert_settings
+) -> None:
+    assert _post(api_client, [_envelope("q1")]).status_code == 204
 
-    response = api_client.post(
-        "/internal/security-events",
-        data=json.dumps(envelope),
-        content_type="application/json",
-        HTTP_X_INTERNAL_TOKEN="secret-token",
+    response = _post(
+        api_client, [_envelope("q1"), _envelope("q2"), _envelope("q2"), _envelope("q3")]
     )
 
     assert response.status_code == status.HTTP_204_NO_CONTENT
-    assert sent["from_email"] == "alerts@example.com"
-    assert "eicar.txt" in sent["message"]
-    assert "abc123" in sent["message"]
-    assert sent["recipient_list"] == ["ops@example.com"]
+    assert sorted(SecurityEvent.objects.values_list("quarantine_id", flat=True)) == [
+        "q1",
+        "q2",
+        "q3",
+    ]
+
+
+def test_security_events_ingest_rejects_the_whole_batch_on_an_invalid_envelope(
+    api_client: APIClient, alert_settings
+) -> None:
+    invalid = _envelope("q2")
+    del invalid["payload"]["quarantine_id"]
+
+    response = _post(api_client, [_envelope("q1"), invalid])
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["index"] == 1
+    assert not SecurityEvent.objects.exists()
+
+
+def test_security_events_ingest_rejects_batches_over_the_limit(
+    api_client: APIClient, alert_settings
+) -> None:
+    alert_settings.SECURITY_EVENTS_MAX_BATCH = 2
+
+    response = _post(api_client, [_envelope(f"q{i}") for i in range(3)])
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert _post(api_client, []).status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_security_events_digest_groups_events_by_signature_per_window(
+    api_client: APIClient, alert_settings
+) -> None:
+    now = timezone.now()
+    _post(api_client, [_envelope("q1")])
+    assert queue_security_digest(now=now) == 1
+
+    # A wave within the window waits for the next digest.
+    _post(
+        api_client,
+        [_envelope("q2"), _envelope("q3", signature="Win.Trojan"), _envelope("q4")],
+    )
+    assert queue_security_digest(now=now + timedelta(seconds=60)) == 0
+    assert queue_security_digest(now=now + timedelta(seconds=301)) == 3
+    assert queue_security_digest(now=now + timedelta(seconds=900)) == 0
+
+    send_pending_emails(limit=10)
+    digest = next(m for m in mail.outbox if "3 malware files" in m.subject)
+    assert "Signature: EICAR-TEST (2 files)" in digest.body
+    assert "Signature: Win.Trojan (1 files)" in digest.body
+    assert digest.body.index("EICAR-TEST") < digest.body.index("Win.Trojan")
+    assert "q3.txt" in digest.body
+
+
+def test_security_events_digest_waits_for_the_alert_configuration(
+    api_client: APIClient, alert_settings
+) -> None:
+    alert_settings.SECURITY_ALERT_RECIPIENTS = ()
+    _post(api_client, _base_envelope())
+
+    assert queue_security_digest() == 0
+    assert SecurityEvent.objects.filter(notified_at__isnull=True).count() == 1
+    assert not EmailOutbox.objects.exists()
@@ -0,0 +1,60 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the prune_one_time_tokens management command.
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from authentication.factories import UserFactory
+from authentication.models import OneTimeToken
+
+pytestmark = pytest.mark.django_db
+
+
+def _token(purpose: str, expires_in_hours: float) -> OneTimeToken:
+    user = UserFactory()
+    OneTimeToken.issue(user, purpose)
+    token = OneTimeToken.objects.get(user=user, purpose=purpose)
+    token.expires_at = timezone.now() + timedelta(hours=expires_in_hours)
+    token.save(update_fields=["expires_at"])
+    return token
+
+
+def test_prune_one_time_tokens_deletes_expired_tokens_in_batches() -> None:
+    for hours in (-5, -3, -1):
+        _token(OneTimeToken.Purpose.VERIFY_EMAIL, hours)
+
+    _token(OneTimeToken.Purpose.RESET_PASSWORD, -2)
+    valid = _token(OneTimeToken.Purpose.RESET_PASSWORD, 1)
+
+    out = StringIO()
+    call_command("prune_one_time_tokens", "--batch-size", "2", stdout=out)
+
+    assert "Deleted 4 expired one-time tokens." in out.getvalue()
+    assert list(OneTimeToken.objects.values_list("id", flat=True)) == [valid.id]
+
+
+def test_prune_one_time_tokens_dry_run() -> None:
+    _token(OneTimeToken.Purpose.VERIFY_EMAIL, -1)
+    _token(OneTimeToken.Purpose.VERIFY_EMAIL, 1)
+
+    out = StringIO()
+    call_command("prune_one_time_tokens", "--dry-run", stdout=out)
+
+    assert "1 one-time tokens have expired." in out.getvalue()
+    assert OneTimeToken.objects.count() == 2
+
+
+def test_one_time_token_consume_is_single_use() -> None:
+    user = UserFactory()
+    code = OneTimeToken.issue(user, OneTimeToken.Purpose.VERIFY_EMAIL)
+
+    assert OneTimeToken.consume(code, OneTimeToken.Purpose.RESET_PASSWORD) is None
+    assert OneTimeToken.consume(code, OneTimeToken.Purpose.VERIFY_EMAIL) == user
+    assert OneTimeToken.consume(code, OneTimeToken.Purpose.VERIFY_EMAIL) is None
+    assert OneTimeToken.consume("not-a-uuid", OneTimeToken.Purpose.VERIFY_EMAIL) is None
@@ -0,0 +1,55 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the prune_sessions management command.
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from authentication.factories import SessionFactory, UserFactory
+from authentication.models import SessionModel
+
+pytestmark = pytest.mark.django_db
+
+
+def _session(user, age_days: float) -> SessionModel:
+    session = SessionFactory(user=user)
+    # created_at is set on insert, so backdate it afterwards.
+    SessionModel.objects.filter(id=session.id).update(
+        created_at=timezone.now() - timedelta(days=age_days)
+    )
+    return session
+
+
+def test_prune_sessions_deletes_expired_sessions_in_batches(settings) -> None:
+    settings.SESSION_RETENTION_DAYS = 30
+    user = UserFactory()
+    for age in (40, 35, 31, 31, 31):
+        _session(user, age)
+
+    recent = _session(user, 1)
+
+    out = StringIO()
+    call_command("prune_sessions", "--batch-size", "2", stdout=out)
+
+    assert "Deleted 5 sessions older than 30 days." in out.getvalue()
+    assert list(SessionModel.objects.values_list("id", flat=True)) == [recent.id]
+
+
+def test_prune_sessions_dry_run_and_custom_age() -> None:
+    user = UserFactory()
+    _session(user, 10)
+    _session(user, 3)
+
+    out = StringIO()
+    call_command("prune_sessions", "--older-than-days", "5", "--dry-run", stdout=out)
+
+    assert "1 sessions are older than 5 days." in out.getvalue()
+    assert SessionModel.objects.count() == 2
+
+    call_command("prune_sessions", "--older-than-days", "5", stdout=StringIO())
+    assert SessionModel.objects.count() == 1
@@ -0,0 +1,125 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the email outbox and the send_outbox management command.
+"""
+
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+from core.models import EmailOutbox
+from core.outbox import send_pending_emails
+
+pytestmark = pytest.mark.django_db
+
+
+def _enqueue(subject: str = "Hello", **kwargs) -> EmailOutbox:
+    return EmailOutbox.enqueue(
+        subject=subject,
+        body="Plain body",
+        from_email="noreply@example.com",
+        recipients=["user@example.com"],
+        **kwargs,
+    )
+
+
+class _CountingBackend(EmailBackend):
+    opened = 0
+    fail_subjects: set[str] = set()
+
+    def open(self) -> bool:
+        type(self).opened += 1
+        return True
+
+    def send_messages(self, messages) -> int:
+        if any(m.subject in self.fail_subjects for m in messages):
+            raise OSError("550 mailbox unavailable")
+
+        return super().send_messages(messages)
+
+
+def test_send_outbox_sends_a_batch_over_one_connection(settings) -> None:
+    settings.EMAIL_BACKEND = "core.tests.test_send_outbox._CountingBackend"
+    _CountingBackend.opened = 0
+    _CountingBackend.fail_subjects = set()
+    first = _enqueue("First", html_body="<p>HTML body</p>")
+    _enqueue("Second")
+    later = _enqueue("Later")
+    later.next_attempt_at = timezone.now() + timedelta(minutes=5)
+    later.save()
+
+    out = StringIO()
+    call_command("send_outbox", "--once", stdout=out)
+
+    assert "Sent 2 emails, 0 to retry, 0 failed." in out.getvalue()
+    assert _CountingBackend.opened == 1
+    assert sorted(m.subject for m in mail.outbox) == ["First", "Second"]
+    sent = next(m for m in mail.outbox if m.subject == "First")
+    assert isinstance(sent, EmailMultiAlternatives)
+    assert sent.alternatives[0].content == "<p>HTML body</p>"
+
+    first.refresh_from_db()
+    assert first.status == EmailOutbox.STATUS_SENT
+    assert first.attempts == 1
+    assert first.sent_at is not None
+    assert EmailOutbox.objects.get(subject="Later").status == "pending"
+
+
+def test_send_outbox_retries_failed_emails_with_backoff(settings) -> None:
+    settings.EMAIL_BACKEND = "core.tests.test_send_outbox._CountingBackend"
+    settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+    settings.EMAIL_OUTBOX_RETRY_BACKOFF = 30
+    _CountingBackend.fail_subjects = {"Bounce"}
+    bounce = _enqueue("Bounce")
+    _enqueue("Fine")
+
+    before = timezone.now()
+    assert send_pending_emails(limit=10) == {"sent": 1, "retried": 1, "failed": 0}
+
+    bounce.refresh_from_db()
+    assert bounce.status == EmailOutbox.STATUS_PENDING
+    assert bounce.attempts == 1
+    assert bounce.last_error == "550 mailbox unavailable"
+    assert bounce.next_attempt_at >= before + timedelta(seconds=30)
+
+    # Not due yet.
+    assert send_pending_emails(limit=10) == {"sent": 0, "retried": 0, "failed": 0}
+
+    EmailOutbox.objects.filter(id=bounce.id).update(next_attempt_at=timezone.now())
+    assert send_pending_emails(limit=10) == {"sent": 0, "retried": 0, "failed": 1}
+    bounce.refresh_from_db()
+    assert bounce.status == EmailOutbox.STATUS_FAILED
+    assert bounce.attempts == 2
+
+
+def test_send_outbox_retries_the_batch_when_the_connection_fails() -> None:
+    _enqueue("One")
+    _enqueue("Two")
+
+    with patch("core.outbox.get_connection") as mock_get_connection:
+        mock_get_connection.return_value.open.side_effect = OSError("SMTP down")
+        counts = send_pending_emails(limit=10)
+
+    assert counts == {"sent": 0, "retried": 2, "failed": 0}
+    assert len(mail.outbox) == 0
+    assert set(EmailOutbox.objects.values_list("last_error", flat=True)) == {
+        "SMTP down"
+    }
+
+
+def test_email_outbox_defaults_to_the_default_from_email(settings) -> None:
+    settings.DEFAULT_FROM_EMAIL = "default@example.com"
+
+    email = EmailOutbox.enqueue(
+        subject="Hi", body="Body", from_email=None, recipients=("a@example.com",)
+    )
+
+    assert email.from_email == "default@example.com"
+    assert email.recipients == ["a@example.com"]
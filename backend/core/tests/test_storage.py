@@ -0,0 +1,141 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the sharded media storage and the shard_media command.
+"""
+
+import os
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.http import FileResponse, Http404
+
+from content.models import Image
+from core.storage import TEMP_FILE_PREFIX, ShardedFileSystemStorage
+
+
+def _storage(tmp_path: Path, **kwargs) -> ShardedFileSystemStorage:
+    return ShardedFileSystemStorage(location=str(tmp_path), **kwargs)
+
+
+def test_storage_shard_name_nests_files(tmp_path: Path) -> None:
+    storage = _storage(tmp_path)
+
+    name = storage.generate_filename("images/abc.jpg")
+    parts = name.split("/")
+
+    assert parts[0] == "images"
+    assert parts[-1] == "abc.jpg"
+    assert parts[1:3] == storage.shard_parts("abc.jpg")
+    assert all(len(part) == 2 for part in parts[1:3])
+    # Sharding an already sharded name does not nest it again.
+    assert storage.shard_name(name) == name
+    assert storage.is_sharded(name)
+    assert not storage.is_sharded("images/abc.jpg")
+
+
+def test_storage_save_is_atomic_and_keeps_existing_files(tmp_path: Path) -> None:
+    storage = _storage(tmp_path)
+
+    first = storage.save("images/logo.png", ContentFile(b"first"))
+    second = storage.save("images/logo.png", ContentFile(b"second"))
+
+    assert first != second
+    assert storage.open(first).read() == b"first"
+    assert storage.open(second).read() == b"second"
+
+    directory = os.path.dirname(storage.path(first))
+    assert not [f for f in os.listdir(directory) if f.startswith(TEMP_FILE_PREFIX)]
+    # The alternative name is moved into the shard of its own base name.
+    assert storage.is_sharded(second)
+
+
+def test_storage_save_reshards_name_claimed_by_another_writer(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    storage = _storage(tmp_path)
+    taken = storage.save("images/logo.png", ContentFile(b"first"))
+
+    # Simulate a writer publishing the name after it was checked to be free.
+    exists = storage.exists
+    monkeypatch.setattr(storage, "exists", lambda name: name != taken and exists(name))
+    name = storage.save("images/logo.png", ContentFile(b"second"))
+
+    assert name != taken
+    assert storage.is_sharded(name)
+    assert storage.open(taken).read() == b"first"
+    assert storage.open(name).read() == b"second"
+
+
+def test_storage_serve_x_accel_redirect(tmp_path: Path) -> None:
+    storage = _storage(
+        tmp_path, sendfile_backend="x-accel-redirect", sendfile_prefix="/internal"
+    )
+    name = storage.save("images/logo.png", ContentFile(b"png"))
+
+    response = storage.serve(name)
+
+    assert response["X-Accel-Redirect"] == f"/internal/{name}"
+    assert response["Content-Type"] == "image/png"
+
+
+def test_storage_serve_x_sendfile(tmp_path: Path) -> None:
+    storage = _storage(tmp_path, sendfile_backend="x-sendfile")
+    name = storage.save("images/logo.png", ContentFile(b"png"))
+
+    response = storage.serve(name)
+
+    assert response["X-Sendfile"] == storage.path(name)
+
+
+def test_storage_serve_streams_without_backend(tmp_path: Path) -> None:
+    storage = _storage(tmp_path)
+    name = storage.save("images/logo.png", ContentFile(b"png"))
+
+    response = storage.serve(name)
+
+    assert isinstance(response, FileResponse)
+    assert b"".join(response.streaming_content) == b"png"
+    response.file_to_stream.close()
+
+    with pytest.raises(Http404):
+        storage.serve("images/missing.png")
+
+
+@pytest.mark.django_db
+def test_storage_shard_media_command_moves_flat_files(settings, tmp_path: Path) -> None:
+    settings.MEDIA_ROOT = str(tmp_path)
+    flat_dir = tmp_path / "images"
+    flat_dir.mkdir()
+    (flat_dir / "legacy.jpg").write_bytes(b"jpg")
+
+    shared = Image.objects.create(file_object="images/legacy.jpg")
+    duplicate = Image.objects.create(file_object="images/legacy.jpg")
+    missing = Image.objects.create(file_object="images/missing.jpg")
+
+    out = StringIO()
+    call_command("shard_media", "--dry-run", stdout=out)
+    assert "Would move 1" in out.getvalue()
+    assert (flat_dir / "legacy.jpg").exists()
+
+    out = StringIO()
+    call_command("shard_media", stdout=out)
+
+    shared.refresh_from_db()
+    duplicate.refresh_from_db()
+    missing.refresh_from_db()
+
+    assert "Moved 1" in out.getvalue()
+    assert "1 missing" in out.getvalue()
+    assert shared.file_object.name != "images/legacy.jpg"
+    assert shared.file_object.name == duplicate.file_object.name
+    assert (tmp_path / shared.file_object.name).read_bytes() == b"jpg"
+    assert not (flat_dir / "legacy.jpg").exists()
+    assert missing.file_object.name == "images/missing.jpg"
+
+    # Deleting the image rows removes the moved file.
+    shared.delete()
+    duplicate.delete()
+    missing.delete()
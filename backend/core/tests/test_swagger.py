@@ -3,9 +3,13 @@
 Tests for the Swagger endpoints.
 """
 
+import pytest
 from rest_framework import status
 from rest_framework.test import APIClient
 
+# Requests are counted by the API throttles, which store their counts in the database.
+pytestmark = pytest.mark.django_db
+
 
 def test_swagger_download(api_client: APIClient) -> None:
     uri = "/v1/schema/"
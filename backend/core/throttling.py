@@ -0,0 +1,195 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+API throttles whose request counts are shared by all workers through the database.
+
+DRF's throttles keep the timestamps of every request in the default cache, which
+is local to each process, so every worker applies the limits on its own. These
+throttles count requests in fixed windows of the rate's duration instead, one
+``ThrottleBucket`` row per client and window, and estimate the requests in the
+sliding window as::
+
+    current + previous * (1 - elapsed share of the current window)
+
+A check reads the previous window and increments the current one with a single
+conditional upsert, so it costs the same however many requests a client made.
+"""
+
+from __future__ import annotations
+
+import random
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING
+
+from django.db import connection
+from rest_framework import throttling
+
+from core.models import ThrottleBucket
+
+if TYPE_CHECKING:
+    # DRF imports the throttle classes while loading its views.
+    from rest_framework.request import Request
+    from rest_framework.views import APIView
+
+# Share of checks that also delete the buckets of expired windows, like the culling
+# of the database cache backend.
+CULL_PROBABILITY = 0.001
+
+
+def _increment(key: str, bucket: int, cap: float, expires_at: datetime) -> bool:
+    """
+    Count a request in a window unless that would exceed the cap.
+
+    Parameters
+    ----------
+    key : str
+        The throttle key of the client.
+
+    bucket : int
+        The index of the current window.
+
+    cap : float
+        The number of requests the current window may hold.
+
+    expires_at : datetime
+        When the window no longer affects any check.
+
+    Returns
+    -------
+    bool
+        Whether the request was counted.
+    """
+    table = connection.ops.quote_name(ThrottleBucket._meta.db_table)
+    # The row is locked by the upsert, so concurrent workers cannot both take
+    # the last request of a window.
+    sql = (
+        f"INSERT INTO {table} (key, bucket, count, expires_at) VALUES (%s, %s, 1, %s) "
+        f"ON CONFLICT (key, bucket) DO UPDATE SET count = {table}.count + 1 "
+        f"WHERE {table}.count + 1 <= %s RETURNING count"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [key, bucket, expires_at, cap])
+        return cursor.fetchone() is not None
+
+
+def hit(key: str, num_requests: int, duration: int, now: float) -> float | None:
+    """
+    Count a request against a rate limit if the limit allows it.
+
+    Parameters
+    ----------
+    key : str
+        The throttle key of the client.
+
+    num_requests : int
+        The requests allowed per ``duration``.
+
+    duration : int
+        The length of the sliding window in seconds.
+
+    now : float
+        The current time as a Unix timestamp.
+
+    Returns
+    -------
+    float | None
+        None if the request is allowed, otherwise the seconds until it would be.
+    """
+    bucket, offset = divmod(now, duration)
+    bucket = int(bucket)
+    weight = 1 - offset / duration
+    previous = (
+        ThrottleBucket.objects.filter(key=key, bucket=bucket - 1)
+        .values_list("count", flat=True)
+        .first()
+        or 0
+    )
+    cap = num_requests - previous * weight
+    expires_at = datetime.fromtimestamp((bucket + 2) * duration, tz=UTC)
+    if random.random() < CULL_PROBABILITY:
+        ThrottleBucket.objects.filter(
+            expires_at__lt=datetime.fromtimestamp(now, UTC)
+        ).delete()
+
+    if cap >= 1 and _increment(key, bucket, cap, expires_at):
+        return None
+
+    current = (
+        ThrottleBucket.objects.filter(key=key, bucket=bucket)
+        .values_list("count", flat=True)
+        .first()
+        or 0
+    )
+    remaining = duration - offset
+    if current + 1 > num_requests or not previous:
+        # Only the next window frees requests.
+        return remaining
+
+    # The previous window's weight decays until one more request fits.
+    needed = 1 - (num_requests - current - 1) / previous
+    return max(0.0, min(remaining, (needed - (1 - weight)) * duration))
+
+
+class SharedRateThrottle(throttling.SimpleRateThrottle):
+    """
+    A rate throttle that counts requests in ``ThrottleBucket`` instead of the cache.
+
+    Notes
+    -----
+    Subclasses combine it with a DRF throttle that provides ``scope`` and
+    ``get_cache_key``, which is used as the key of the buckets.
+    """
+
+    # Set from the rate by ``SimpleRateThrottle.__init__``.
+    num_requests: int
+    duration: int
+
+    def allow_request(self, request: Request, view: APIView) -> bool:
+        """
+        Check whether a request is within the rate of its client.
+
+        Parameters
+        ----------
+        request : Request
+            The request.
+
+        view : APIView
+            The view that handles the request.
+
+        Returns
+        -------
+        bool
+            Whether the request may proceed.
+        """
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        self._wait = hit(self.key, self.num_requests, self.duration, self.now)
+        return self._wait is None
+
+    def wait(self) -> float | None:
+        """
+        Return the seconds until a throttled client may send a request again.
+
+        Returns
+        -------
+        float | None
+            The seconds, or None if the request was not throttled.
+        """
+        return getattr(self, "_wait", None)
+
+
+class SharedAnonRateThrottle(SharedRateThrottle, throttling.AnonRateThrottle):
+    """
+    Limit the requests of anonymous users per IP address across all workers.
+    """
+
+
+class SharedUserRateThrottle(SharedRateThrottle, throttling.UserRateThrottle):
+    """
+    Limit the requests of each user, or anonymous IP address, across all workers.
+    """
@@ -24,10 +24,11 @@ import os
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 from core.internal_events import SecurityEventIngestView
+from core.media import serve_media
 
 ADMIN_PATH = os.getenv("ADMIN_PATH")
 
@@ -89,4 +90,19 @@ urlpatterns = [
         SpectacularSwaggerView.as_view(url_name="schema-events"),
         name="swagger-ui-events",
     ),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+# MARK: Media
+
+if settings.MEDIA_SENDFILE_BACKEND:
+    # Django only sets the headers; the web server transfers the file itself.
+    urlpatterns += [
+        re_path(
+            rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>.*)$",
+            serve_media,
+            name="media",
+        )
+    ]
+
+else:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
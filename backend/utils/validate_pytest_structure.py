@@ -23,6 +23,7 @@ directories_to_check = [
 error_code_description_dict = {
     200: "ok",
     201: "created",
+    202: "accepted",
     204: "no_content",
     400: "bad_request",
     401: "unauthorized",
@@ -0,0 +1,274 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Admission control that bounds the number of scans running and waiting at once.
+
+Scans beyond ``FILESCAN_MAX_CONCURRENT_SCANS`` wait in a bounded queue. When the
+queue is full a request is rejected straight away with HTTP 429, and a request
+that waits longer than ``FILESCAN_QUEUE_TIMEOUT`` seconds is rejected with 503.
+Both carry a ``Retry-After`` estimate so that callers back off instead of piling
+more work onto an overloaded service.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+
+# Should match CLAMAV_MAX_THREADS: more concurrent scans only queue in clamd.
+FILESCAN_MAX_CONCURRENT_SCANS = int(os.getenv("FILESCAN_MAX_CONCURRENT_SCANS", "10"))
+FILESCAN_MAX_QUEUED_SCANS = int(os.getenv("FILESCAN_MAX_QUEUED_SCANS", "50"))
+# Should stay below FILESCAN_TIMEOUT of the backend so it gets a reply in time.
+FILESCAN_QUEUE_TIMEOUT = float(os.getenv("FILESCAN_QUEUE_TIMEOUT", "5"))
+
+# Weight of the latest scan in the moving average of scan durations.
+_DURATION_SMOOTHING = 0.2
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a scan cannot be admitted.
+
+    Parameters
+    ----------
+    status_code : int
+        429 if the wait queue is full, 503 if the scan waited too long.
+
+    detail : str
+        A message for the caller.
+
+    retry_after : int
+        Seconds the caller should wait before trying again.
+
+    queue_depth : int
+        The number of scans waiting when the request was rejected.
+    """
+
+    def __init__(
+        self, status_code: int, detail: str, retry_after: int, queue_depth: int
+    ) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+        self.queue_depth = queue_depth
+
+
+class AdmissionController:
+    """
+    Bounded concurrency limiter with a bounded wait queue.
+
+    Parameters
+    ----------
+    max_active : int, default=FILESCAN_MAX_CONCURRENT_SCANS
+        Scan slots that can be held at the same time.
+
+    max_queued : int, default=FILESCAN_MAX_QUEUED_SCANS
+        Requests that can wait for a slot; further requests are rejected with 429.
+
+    queue_timeout : float, default=FILESCAN_QUEUE_TIMEOUT
+        Seconds a request waits for a slot before it is rejected with 503.
+
+    clock : Callable[[], float], default=time.monotonic
+        Time source, replaceable in tests.
+
+    Notes
+    -----
+    Waiting requests are admitted in arrival order, so a large batch at the head of
+    the queue is not starved by single scans that would fit in the free slots.
+    """
+
+    def __init__(
+        self,
+        max_active: int = FILESCAN_MAX_CONCURRENT_SCANS,
+        max_queued: int = FILESCAN_MAX_QUEUED_SCANS,
+        queue_timeout: float = FILESCAN_QUEUE_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_active = max(1, max_active)
+        self.max_queued = max(0, max_queued)
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+        self._active = 0
+        self._waiters: list[tuple[int, asyncio.Future[None]]] = []
+        self._average_duration = 1.0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Return the number of requests waiting for a slot.
+
+        Returns
+        -------
+        int
+            The current length of the wait queue.
+        """
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """
+        Estimate how long a rejected caller should wait before trying again.
+
+        Returns
+        -------
+        int
+            Whole seconds, at least 1, for the queue to drain at the current pace.
+        """
+        waves = (self.queue_depth + self.max_active) / self.max_active
+        return max(1, math.ceil(waves * self._average_duration))
+
+    def _reject(self, status_code: int, detail: str) -> AdmissionRejected:
+        """
+        Build the rejection for a request that cannot be admitted.
+
+        Parameters
+        ----------
+        status_code : int
+            The HTTP status of the rejection.
+
+        detail : str
+            A message for the caller.
+
+        Returns
+        -------
+        AdmissionRejected
+            The exception to raise.
+        """
+        return AdmissionRejected(
+            status_code, detail, self.retry_after(), self.queue_depth
+        )
+
+    def _wake_waiters(self) -> None:
+        """
+        Hand free slots to the waiting requests in arrival order.
+        """
+        while self._waiters:
+            weight, waiter = self._waiters[0]
+            if self._active + weight > self.max_active:
+                return
+
+            self._waiters.pop(0)
+            if not waiter.done():
+                self._active += weight
+                waiter.set_result(None)
+
+    async def _acquire(self, weight: int) -> None:
+        """
+        Take ``weight`` slots, waiting in the queue if none are free.
+
+        Parameters
+        ----------
+        weight : int
+            The number of slots to take.
+
+        Raises
+        ------
+        AdmissionRejected
+            If the queue is full or the wait timed out.
+        """
+        if not self._waiters and self._active + weight <= self.max_active:
+            self._active += weight
+            return
+
+        if len(self._waiters) >= self.max_queued:
+            self.rejected_full += 1
+            raise self._reject(429, "The scan queue is full. Please retry later.")
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        item = (weight, waiter)
+        self._waiters.append(item)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+
+        except (TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slots were handed over just as the wait ended; give them back.
+                self._release(weight)
+
+            else:
+                waiter.cancel()
+                self._waiters.remove(item)
+                # A large request leaving the head of the queue may unblock others.
+                self._wake_waiters()
+
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+
+            self.rejected_timeout += 1
+            raise self._reject(
+                503, "Timed out waiting for a free scan slot. Please retry later."
+            ) from None
+
+    def _release(self, weight: int) -> None:
+        """
+        Return ``weight`` slots and admit waiting requests.
+
+        Parameters
+        ----------
+        weight : int
+            The number of slots to return.
+        """
+        self._active -= weight
+        self._wake_waiters()
+
+    @asynccontextmanager
+    async def slot(self, weight: int = 1) -> AsyncIterator[None]:
+        """
+        Hold scan slots for the duration of an ``async with`` block.
+
+        Parameters
+        ----------
+        weight : int, default=1
+            The number of scans the request runs at the same time; capped at
+            ``max_active`` so that a large batch can still be admitted.
+
+        Yields
+        ------
+        None
+            Control once the slots are held.
+
+        Raises
+        ------
+        AdmissionRejected
+            If the queue is full or no slot became free in time.
+        """
+        weight = min(max(1, weight), self.max_active)
+        await self._acquire(weight)
+        self.admitted += 1
+        started = self._clock()
+        try:
+            yield
+
+        finally:
+            # Average time a slot is held, used for the Retry-After estimate.
+            duration = (self._clock() - started) / weight
+            self._average_duration += _DURATION_SMOOTHING * (
+                duration - self._average_duration
+            )
+            self._release(weight)
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        Return the live load of the service.
+
+        Returns
+        -------
+        dict[str, int | float]
+            Active and queued scans, their limits, the admitted and rejected
+            requests and the current ``Retry-After`` estimate.
+        """
+        return {
+            "active": self._active,
+            "max_active": self.max_active,
+            "queue_depth": self.queue_depth,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "average_scan_seconds": round(self._average_duration, 3),
+            "retry_after": self.retry_after(),
+        }
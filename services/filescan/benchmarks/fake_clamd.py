@@ -0,0 +1,278 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+In-process stand-in for clamd that speaks its Unix socket protocol.
+
+It answers ``PING``, ``VERSION`` and ``INSTREAM``, both as single commands and
+inside ``IDSESSION`` sessions, with a configurable scan latency and verdict. Like
+clamd it runs at most ``max_threads`` scans at once and queues the rest, so the
+service under test sees the same back-pressure as with a real daemon, without
+loading signatures or needing a ClamAV container.
+"""
+
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from typing import IO
+
+# Marker that makes the default verdict report a detection.
+EICAR_MARKER = b"EICAR-STANDARD-ANTIVIRUS-TEST-FILE"
+SIGNATURE_VERSION = "ClamAV 1.4.1/27400/Tue Oct 14 08:34:45 2025"
+
+
+def eicar_verdict(data: bytes) -> str | None:
+    """
+    Detect the EICAR test string.
+
+    Parameters
+    ----------
+    data : bytes
+        The scanned stream.
+
+    Returns
+    -------
+    str | None
+        The signature name, or None if the stream is clean.
+    """
+    return "Eicar-Test-Signature" if EICAR_MARKER in data else None
+
+
+class FakeClamd:
+    """
+    A clamd double listening on a Unix socket in a background thread.
+
+    Parameters
+    ----------
+    latency : float, default=0.0
+        Seconds every scan takes regardless of its size.
+
+    latency_per_mib : float, default=0.0
+        Additional seconds per MiB scanned.
+
+    max_threads : int, default=10
+        Scans run at the same time, like ``MaxThreads`` in ``clamd.conf``.
+
+    verdict : Callable[[bytes], str | None], default=eicar_verdict
+        Returns the signature found in a stream, or None if it is clean.
+
+    socket_path : str | None, default=None
+        Where to listen; a temporary path if not given.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        latency_per_mib: float = 0.0,
+        max_threads: int = 10,
+        verdict: Callable[[bytes], str | None] = eicar_verdict,
+        socket_path: str | None = None,
+    ) -> None:
+        self.latency = latency
+        self.latency_per_mib = latency_per_mib
+        self.verdict = verdict
+        self._directory: str | None = None
+        if socket_path is None:
+            self._directory = tempfile.mkdtemp(prefix="fake-clamd-")
+            socket_path = os.path.join(self._directory, "clamd.sock")
+
+        self.socket_path = socket_path
+        self._threads = threading.BoundedSemaphore(max(1, max_threads))
+        self._server: socket.socket | None = None
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.scans = 0
+        self.scanned_bytes = 0
+
+    def start(self) -> "FakeClamd":
+        """
+        Start listening.
+
+        Returns
+        -------
+        FakeClamd
+            The started daemon.
+        """
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(128)
+        self._server = server
+        threading.Thread(target=self._accept, name="fake-clamd", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop listening and remove the socket.
+        """
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        if self._directory is not None:
+            os.rmdir(self._directory)
+            self._directory = None
+
+    def __enter__(self) -> "FakeClamd":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _accept(self) -> None:
+        """
+        Serve every connection in its own thread until the server is closed.
+        """
+        while self._server is not None:
+            try:
+                conn, _ = self._server.accept()
+
+            except OSError:
+                return
+
+            with self._lock:
+                self.connections += 1
+
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _scan(self, data: bytes) -> str:
+        """
+        Scan a stream on one of the scan threads.
+
+        Parameters
+        ----------
+        data : bytes
+            The stream.
+
+        Returns
+        -------
+        str
+            The reply, e.g. ``stream: OK``.
+        """
+        with self._threads:
+            time.sleep(self.latency + self.latency_per_mib * len(data) / 2**20)
+            signature = self.verdict(data)
+
+        with self._lock:
+            self.scans += 1
+            self.scanned_bytes += len(data)
+
+        return "stream: OK" if signature is None else f"stream: {signature} FOUND"
+
+    def _serve(self, conn: socket.socket) -> None:
+        """
+        Answer the commands of one connection.
+
+        Parameters
+        ----------
+        conn : socket.socket
+            The client connection.
+        """
+        with conn, conn.makefile("rb") as stream:
+            in_session = False
+            number = 0
+            while True:
+                command = _read_command(stream)
+                if command is None or command == "END":
+                    return
+
+                if command == "IDSESSION":
+                    in_session = True
+                    continue
+
+                if command == "PING":
+                    reply = "PONG"
+
+                elif command == "VERSION":
+                    reply = SIGNATURE_VERSION
+
+                elif command == "INSTREAM":
+                    reply = self._scan(_read_stream(stream))
+
+                else:
+                    reply = "UNKNOWN COMMAND"
+
+                number += 1
+                prefix = f"{number}: " if in_session else ""
+                try:
+                    conn.sendall(f"{prefix}{reply}\0".encode())
+
+                except OSError:
+                    return
+
+                if not in_session:
+                    return
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return what the daemon has served.
+
+        Returns
+        -------
+        dict[str, int]
+            Connections accepted, streams scanned and their total size.
+        """
+        with self._lock:
+            return {
+                "connections": self.connections,
+                "scans": self.scans,
+                "scanned_bytes": self.scanned_bytes,
+            }
+
+
+def _read_command(stream: IO[bytes]) -> str | None:
+    """
+    Read one ``z``-prefixed, null-terminated command.
+
+    Parameters
+    ----------
+    stream : IO[bytes]
+        The buffered connection.
+
+    Returns
+    -------
+    str | None
+        The command name, or None if the client closed the connection.
+    """
+    command = b""
+    while not command.endswith(b"\0"):
+        byte = stream.read(1)
+        if not byte:
+            return None
+
+        command += byte
+
+    return command[1:-1].decode()
+
+
+def _read_stream(stream: IO[bytes]) -> bytes:
+    """
+    Read the length-prefixed chunks of an ``INSTREAM`` command.
+
+    Parameters
+    ----------
+    stream : IO[bytes]
+        The buffered connection.
+
+    Returns
+    -------
+    bytes
+        The streamed data.
+    """
+    chunks: list[bytes] = []
+    while True:
+        header = stream.read(4)
+        if len(header) < 4:
+            break
+
+        size = struct.unpack("!L", header)[0]
+        if size == 0:
+            break
+
+        chunks.append(stream.read(size))
+
+    return b"".join(chunks)
@@ -0,0 +1,424 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Load test of the filescan scan path against an in-process fake clamd.
+
+Usage (from services/filescan)::
+
+    python -m benchmarks.load_test [--endpoint scan|batch] [--concurrency N]
+        [--requests N] [--sizes 4k:70,256k:25,4m:5] [--latency S] [--url URL]
+
+By default the service runs in this process behind ``FakeClamd``, so the numbers
+measure the service itself (upload parsing, checks, streaming, admission control)
+on any Linux machine. With ``--url`` the requests go to a running service, e.g.
+the Docker container with a real clamd, and ``FakeClamd`` is not started.
+
+The summary is printed as JSON: throughput, latency percentiles, HTTP statuses
+and the resident memory of this process.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import resource
+import tempfile
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+import httpx
+
+from benchmarks.fake_clamd import EICAR_MARKER, FakeClamd
+
+_SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024**2}
+
+
+def parse_size(value: str) -> int:
+    """
+    Parse a size such as ``512``, ``4k`` or ``2m``.
+
+    Parameters
+    ----------
+    value : str
+        The size with an optional ``b``, ``k`` or ``m`` suffix.
+
+    Returns
+    -------
+    int
+        The size in bytes.
+    """
+    value = value.strip().lower()
+    unit = value[-1] if value and value[-1] in _SIZE_UNITS else ""
+    return int(float(value[: len(value) - len(unit)]) * _SIZE_UNITS[unit])
+
+
+def parse_mix(value: str) -> list[tuple[int, float]]:
+    """
+    Parse a file size mix such as ``4k:70,256k:25,4m:5``.
+
+    Parameters
+    ----------
+    value : str
+        Comma-separated sizes, each with an optional relative weight (default 1).
+
+    Returns
+    -------
+    list[tuple[int, float]]
+        The sizes in bytes and their weights.
+    """
+    mix = []
+    for item in value.split(","):
+        size, _, weight = item.partition(":")
+        mix.append((parse_size(size), float(weight or 1)))
+
+    return mix
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Return a percentile by the nearest-rank method.
+
+    Parameters
+    ----------
+    values : list[float]
+        The sorted observations.
+
+    q : float
+        The percentile, e.g. 99.
+
+    Returns
+    -------
+    float
+        The observation at the percentile, 0 if there are none.
+    """
+    if not values:
+        return 0.0
+
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def rss_mib() -> tuple[float, float]:
+    """
+    Measure the resident memory of this process.
+
+    Returns
+    -------
+    tuple[float, float]
+        The current and the peak resident set size in MiB.
+    """
+    with open("/proc/self/statm", encoding="utf-8") as f_in:
+        pages = int(f_in.read().split()[1])
+
+    current = pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    # ru_maxrss is in KiB on Linux.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return round(current, 1), round(peak, 1)
+
+
+@dataclass(frozen=True)
+class Workload:
+    """
+    What the load test sends.
+
+    Parameters
+    ----------
+    endpoint : str
+        ``scan`` for one file per request or ``batch`` for ``/scan/batch``.
+
+    requests : int
+        Requests measured, after the warm-up.
+
+    concurrency : int
+        Requests in flight at the same time.
+
+    sizes : list[tuple[int, float]]
+        File sizes in bytes and their relative weights.
+
+    batch_size : int, default=4
+        Files per request for the ``batch`` endpoint.
+
+    malware_rate : float, default=0.0
+        Share of files that contain the test signature.
+
+    duplicate_rate : float, default=0.0
+        Share of files that repeat an earlier file, so the verdict cache can hit.
+
+    warmup : int, default=10
+        Requests sent first and left out of the results.
+    """
+
+    endpoint: str
+    requests: int
+    concurrency: int
+    sizes: list[tuple[int, float]]
+    batch_size: int = 4
+    malware_rate: float = 0.0
+    duplicate_rate: float = 0.0
+    warmup: int = 10
+
+
+class _Payloads:
+    """
+    Generate file contents for a workload.
+
+    Parameters
+    ----------
+    workload : Workload
+        The workload.
+
+    seed : int
+        Seed of the random generator, so runs can be repeated.
+    """
+
+    def __init__(self, workload: Workload, seed: int) -> None:
+        self._workload = workload
+        self._random = random.Random(seed)
+        self._sent: list[bytes] = []
+
+    def next(self) -> bytes:
+        """
+        Return the contents of the next file.
+
+        Returns
+        -------
+        bytes
+            Random bytes of a size drawn from the mix, possibly with the test
+            signature or repeating an earlier file.
+        """
+        if self._sent and self._random.random() < self._workload.duplicate_rate:
+            return self._random.choice(self._sent)
+
+        sizes, weights = zip(*self._workload.sizes, strict=True)
+        size = self._random.choices(sizes, weights)[0]
+        data = self._random.randbytes(size)
+        if self._random.random() < self._workload.malware_rate:
+            data = EICAR_MARKER + data[len(EICAR_MARKER) :]
+
+        if len(self._sent) < 100:
+            self._sent.append(data)
+
+        return data
+
+
+async def run_workload(
+    client: httpx.AsyncClient, workload: Workload, seed: int = 0
+) -> dict[str, object]:
+    """
+    Send a workload and measure the responses.
+
+    Parameters
+    ----------
+    client : httpx.AsyncClient
+        A client with the base URL of the service.
+
+    workload : Workload
+        What to send.
+
+    seed : int, default=0
+        Seed for the generated files.
+
+    Returns
+    -------
+    dict[str, object]
+        Requests and files sent, throughput, latency percentiles in milliseconds,
+        the count of each HTTP status and the resident memory in MiB.
+    """
+    payloads = _Payloads(workload, seed)
+    headers = {}
+    if token := os.getenv("FILESCAN_INTERNAL_TOKEN"):
+        headers["X-Filescan-Token"] = token
+
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+    sent_bytes = 0
+    files_per_request = workload.batch_size if workload.endpoint == "batch" else 1
+    path = "/scan/batch" if workload.endpoint == "batch" else "/scan"
+    field = "files" if workload.endpoint == "batch" else "file"
+    semaphore = asyncio.Semaphore(max(1, workload.concurrency))
+
+    async def _send(measured: bool) -> None:
+        nonlocal sent_bytes
+        async with semaphore:
+            # Generated once a slot is free, so pending requests hold no payloads.
+            files = [payloads.next() for _ in range(files_per_request)]
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    path,
+                    files=[
+                        (field, (f"file-{i}.bin", data, "application/octet-stream"))
+                        for i, data in enumerate(files)
+                    ],
+                    headers=headers,
+                )
+                status = str(response.status_code)
+
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+
+            elapsed = time.perf_counter() - started
+
+        if measured:
+            latencies.append(elapsed)
+            statuses[status] += 1
+            sent_bytes += sum(len(data) for data in files)
+
+    await asyncio.gather(*(_send(False) for _ in range(workload.warmup)))
+    started = time.perf_counter()
+    await asyncio.gather(*(_send(True) for _ in range(workload.requests)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    current_rss, peak_rss = rss_mib()
+    return {
+        "endpoint": workload.endpoint,
+        "concurrency": workload.concurrency,
+        "requests": workload.requests,
+        "files": workload.requests * files_per_request,
+        "duration_seconds": round(duration, 3),
+        "requests_per_second": round(workload.requests / duration, 1),
+        "files_per_second": round(workload.requests * files_per_request / duration, 1),
+        "mib_per_second": round(sent_bytes / 2**20 / duration, 2),
+        "latency_ms": {
+            name: round(percentile(latencies, q) * 1000, 2)
+            for name, q in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))
+        },
+        "statuses": dict(sorted(statuses.items())),
+        "rss_mib": current_rss,
+        "peak_rss_mib": peak_rss,
+    }
+
+
+@asynccontextmanager
+async def in_process_service(clamd: FakeClamd) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Run the service in this process against a fake clamd.
+
+    Parameters
+    ----------
+    clamd : FakeClamd
+        The started fake clamd.
+
+    Yields
+    ------
+    httpx.AsyncClient
+        A client that calls the application directly, without a network hop.
+    """
+    # Imported here so that importing this module does not configure the service.
+    import main
+    import scanners.clamav
+    from quarantine_store import QuarantineStore
+
+    scanners.clamav.CLAMAV_SOCKET = clamd.socket_path
+    with tempfile.TemporaryDirectory(prefix="filescan-bench-") as quarantine_dir:
+        main.quarantine_store = QuarantineStore(root=quarantine_dir)
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://filescan", timeout=60
+            ) as client:
+                yield client
+
+
+async def _run(args: argparse.Namespace) -> dict[str, object]:
+    """
+    Run the load test described by the command line arguments.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        The parsed arguments.
+
+    Returns
+    -------
+    dict[str, object]
+        The summary of the run.
+    """
+    workload = Workload(
+        endpoint=args.endpoint,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        sizes=parse_mix(args.sizes),
+        batch_size=args.batch_size,
+        malware_rate=args.malware_rate,
+        duplicate_rate=args.duplicate_rate,
+        warmup=args.warmup,
+    )
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            return await run_workload(client, workload, args.seed)
+
+    with FakeClamd(
+        latency=args.latency,
+        latency_per_mib=args.latency_per_mib,
+        max_threads=args.clamd_threads,
+    ) as clamd:
+        async with in_process_service(clamd) as client:
+            summary = await run_workload(client, workload, args.seed)
+
+        summary["clamd"] = clamd.stats()
+
+    return summary
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Run the load test and print its summary as JSON.
+
+    Parameters
+    ----------
+    argv : list[str] | None, default=None
+        Command line arguments; ``sys.argv`` is used if not given.
+
+    Returns
+    -------
+    int
+        The exit code.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--endpoint", choices=("scan", "batch"), default="scan")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--sizes",
+        default="4k:70,256k:25,4m:5",
+        help="File sizes with relative weights, e.g. 4k:70,256k:25,4m:5",
+    )
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--malware-rate", type=float, default=0.0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--latency", type=float, default=0.005, help="Seconds every fake scan takes"
+    )
+    parser.add_argument(
+        "--latency-per-mib",
+        type=float,
+        default=0.01,
+        help="Additional seconds per MiB of a fake scan",
+    )
+    parser.add_argument(
+        "--clamd-threads", type=int, default=10, help="MaxThreads of the fake clamd"
+    )
+    parser.add_argument(
+        "--url", default="", help="Load a running service instead of one in-process"
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Keep the per-request service logs"
+    )
+    args = parser.parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    print(json.dumps(asyncio.run(_run(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Command to compile text blocklists of SHA-256 and MD5 digests into a hash index.
+
+Usage (inside the filescan container)::
+
+    python build_hash_index.py [--output PATH] [--false-positive-rate P] LIST [LIST ...]
+
+The new index replaces the file at ``--output`` atomically; running services
+pick it up within ``FILESCAN_HASH_INDEX_RELOAD_INTERVAL`` seconds.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+
+from scanners.hash_index import (
+    DEFAULT_FALSE_POSITIVE_RATE,
+    FILESCAN_HASH_INDEX,
+    build_hash_index,
+    read_hash_list,
+)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Build the index and print its summary as JSON.
+
+    Parameters
+    ----------
+    argv : list[str] | None, default=None
+        Command line arguments; ``sys.argv`` is used if not given.
+
+    Returns
+    -------
+    int
+        The exit code.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "lists",
+        nargs="+",
+        metavar="LIST",
+        help="Text files with one digest and an optional signature name per line",
+    )
+    parser.add_argument("--output", default=FILESCAN_HASH_INDEX)
+    parser.add_argument(
+        "--false-positive-rate", type=float, default=DEFAULT_FALSE_POSITIVE_RATE
+    )
+    args = parser.parse_args(argv)
+    if not args.output:
+        parser.error("--output is required when FILESCAN_HASH_INDEX is not set")
+
+    if not 0 < args.false_positive_rate < 1:
+        parser.error("--false-positive-rate must be between 0 and 1")
+
+    logging.basicConfig(level=logging.INFO)
+    entries = itertools.chain.from_iterable(read_hash_list(path) for path in args.lists)
+    try:
+        summary = build_hash_index(entries, args.output, args.false_positive_rate)
+
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,58 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Command to apply the quarantine retention policy and compact its index.
+
+Usage (inside the filescan container)::
+
+    python compact_quarantine.py [--dry-run] [--max-bytes N] [--retention-days D]
+"""
+
+import argparse
+import json
+import logging
+
+from quarantine_store import (
+    QUARANTINE_DIR,
+    QUARANTINE_MAX_BYTES,
+    QUARANTINE_RETENTION_DAYS,
+    QuarantineStore,
+)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Run the compaction and print its summary as JSON.
+
+    Parameters
+    ----------
+    argv : list[str] | None, default=None
+        Command line arguments; ``sys.argv`` is used if not given.
+
+    Returns
+    -------
+    int
+        The exit code.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--root", default=QUARANTINE_DIR)
+    parser.add_argument("--max-bytes", type=int, default=QUARANTINE_MAX_BYTES)
+    parser.add_argument(
+        "--retention-days", type=float, default=QUARANTINE_RETENTION_DAYS
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what would be removed without deleting anything",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    store = QuarantineStore(
+        root=args.root, max_bytes=args.max_bytes, retention_days=args.retention_days
+    )
+    print(json.dumps(store.compact(dry_run=args.dry_run)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Health state of the filescan service, refreshed in the background.
+
+Docker and the backend probe ``/health`` every few seconds. Checking clamd on
+every probe would compete with real scans for clamd threads, so a background
+task asks clamd for its signature version every ``FILESCAN_HEALTH_INTERVAL``
+seconds and ``/health`` answers from the result. A state older than
+``FILESCAN_HEALTH_MAX_AGE`` seconds is reported as stale, since the task that
+should have refreshed it is stuck or gone.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+FILESCAN_HEALTH_INTERVAL = float(os.getenv("FILESCAN_HEALTH_INTERVAL", "10"))
+FILESCAN_HEALTH_MAX_AGE = float(os.getenv("FILESCAN_HEALTH_MAX_AGE", "30"))
+
+# Seconds a single probe may take before clamd is considered unavailable.
+_PROBE_TIMEOUT = 5.0
+
+
+class HealthMonitor:
+    """
+    Cached result of the last clamd liveness probe.
+
+    Parameters
+    ----------
+    probe : Callable[[], Awaitable[str | None]]
+        Checks clamd and returns its signature database version; raises
+        ``RuntimeError`` if the daemon is unavailable.
+
+    interval : float, default=FILESCAN_HEALTH_INTERVAL
+        Seconds between background probes.
+
+    max_age : float, default=FILESCAN_HEALTH_MAX_AGE
+        Seconds after which the state is reported as stale.
+
+    clock : Callable[[], float], default=time.monotonic
+        Time source, replaceable in tests.
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[], Awaitable[str | None]],
+        interval: float = FILESCAN_HEALTH_INTERVAL,
+        max_age: float = FILESCAN_HEALTH_MAX_AGE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._probe = probe
+        self.interval = interval
+        self.max_age = max_age
+        self._clock = clock
+        self._lock = asyncio.Lock()
+        self.clamav_ok = False
+        self.detail: str | None = "ClamAV has not been checked yet."
+        self.signature_version: str | None = None
+        self.checked_at: float | None = None
+        self.consecutive_failures = 0
+
+    async def refresh(self) -> None:
+        """
+        Probe clamd and record the result.
+
+        Concurrent callers share one probe instead of each sending their own.
+        """
+        if self._lock.locked():
+            async with self._lock:
+                return
+
+        async with self._lock:
+            try:
+                version = await asyncio.wait_for(self._probe(), _PROBE_TIMEOUT)
+
+            except (RuntimeError, TimeoutError) as exc:
+                if self.clamav_ok or self.checked_at is None:
+                    logger.warning(f"ClamAV health probe failed error={exc}")
+
+                self.clamav_ok = False
+                self.detail = str(exc) or "The ClamAV health probe timed out."
+                self.consecutive_failures += 1
+
+            else:
+                if not self.clamav_ok and self.checked_at is not None:
+                    logger.info("ClamAV health probe succeeded again")
+
+                self.clamav_ok = True
+                self.detail = None
+                self.signature_version = version
+                self.consecutive_failures = 0
+
+            self.checked_at = self._clock()
+
+    async def run(self) -> None:
+        """
+        Refresh the state every ``interval`` seconds until cancelled.
+        """
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> dict[str, str | bool | int | float | None]:
+        """
+        Return the cached state as reported by ``/health``.
+
+        Returns
+        -------
+        dict[str, str | bool | int | float | None]
+            ``status`` (``ok``, ``unavailable`` or ``stale``), the ClamAV state and
+            signature version, the age of the state in seconds, whether it is stale,
+            the failed probes in a row and, unless the status is ``ok``, a detail.
+        """
+        age = None if self.checked_at is None else self._clock() - self.checked_at
+        stale = age is None or age > self.max_age
+        detail = self.detail
+        if not self.clamav_ok:
+            status = "unavailable"
+
+        elif age is not None and age > self.max_age:
+            status = "stale"
+            detail = f"The health state was last refreshed {age:.0f} seconds ago."
+
+        else:
+            status = "ok"
+
+        return {
+            "status": status,
+            "clamav": "ok" if self.clamav_ok else "unavailable",
+            "signature_version": self.signature_version,
+            "age_seconds": None if age is None else round(age, 3),
+            "stale": stale,
+            "consecutive_failures": self.consecutive_failures,
+            "detail": detail,
+        }
@@ -6,79 +6,606 @@ The main application file for the filescan service.
 import asyncio
 import logging
 import os
-import uuid
-
-from fastapi import FastAPI, File, HTTPException, Request, UploadFile
-from fastapi.responses import JSONResponse
-
-from notification_helpers import notify_malware_quarantined
-from scanners.clamav import scan_with_clamav
+import time
+from collections.abc import AsyncIterator, Mapping
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from typing import IO, cast
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from admission import AdmissionController, AdmissionRejected
+from health import HealthMonitor
+from metrics import REQUESTS, SCANNED_BYTES, SCANNER_DURATION, SCANS, registry
+from notification_helpers import notify_malware_quarantined, security_events
+from quarantine_store import QuarantineStore
+from scanners.clamav import (
+    check_clamav,
+    clamav_pool_stats,
+    close_clamav_sessions,
+    get_clamav_signature_version,
+    scan_with_clamav,
+)
 from scanners.csam import scan_with_csam
+from scanners.hash_index import ReloadingHashIndex
+from scanners.prefilters import (
+    PROFILES,
+    check_file_type,
+    check_size,
+    known_bad_check,
+    might_be_image,
+    needs_clamav,
+)
+from scanners.registry import (
+    MAGIC_HEAD_SIZE,
+    Check,
+    FileInfo,
+    ScannerRegistry,
+    ScanResult,
+    StreamingScanner,
+    detect_file_type,
+)
+from upload_stream import ChunkFanout, digest_file, hash_file
+from verdict_cache import VerdictCache
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-QUARANTINE_DIR = os.getenv("FILESCAN_QUARANTINE_DIR", "/var/filescan/quarantine")
+# Seconds between runs of the quarantine retention policy.
+QUARANTINE_COMPACT_INTERVAL = float(
+    os.getenv("FILESCAN_QUARANTINE_COMPACT_INTERVAL", "86400")
+)
+
+# Files accepted by /scan/batch and how many of them are scanned at the same time.
+FILESCAN_BATCH_MAX_FILES = int(os.getenv("FILESCAN_BATCH_MAX_FILES", "20"))
+FILESCAN_BATCH_CONCURRENCY = int(os.getenv("FILESCAN_BATCH_CONCURRENCY", "4"))
+
+verdict_cache = VerdictCache()
+admission = AdmissionController()
+quarantine_store = QuarantineStore()
+hash_index = ReloadingHashIndex()
+health = HealthMonitor(lambda: check_clamav())
+
+# MARK: Scanners
+
+# Scanners are looked up on this module when called so that tests can patch them.
+scanner_registry = ScannerRegistry()
+scanner_registry.add_check(Check("size", check_size, cost=1))
+scanner_registry.add_check(Check("file_type", check_file_type, cost=2))
+scanner_registry.add_check(
+    Check(
+        "known_bad_hash",
+        known_bad_check(lambda digest: hash_index.lookup(digest)),
+        cost=10,
+        needs_hash=True,
+        applies_to=lambda info: hash_index.available,
+    )
+)
+scanner_registry.add_scanner(
+    StreamingScanner(
+        "clamav",
+        lambda chunks: scan_with_clamav(chunks),
+        tier=1,
+        cost=10,
+        applies_to=needs_clamav,
+    )
+)
+scanner_registry.add_scanner(
+    StreamingScanner(
+        "csam",
+        lambda chunks: scan_with_csam(chunks),
+        tier=1,
+        cost=20,
+        applies_to=might_be_image,
+    )
+)
+
+# MARK: Metrics
+
+# Read when /metrics is scraped, so the objects tests swap in are picked up.
+registry.callback(
+    "filescan_scans_active",
+    "Scan slots currently held.",
+    "gauge",
+    lambda: [({}, admission.stats()["active"])],
+)
+registry.callback(
+    "filescan_scan_queue_depth",
+    "Scan requests waiting for a free slot.",
+    "gauge",
+    lambda: [({}, admission.queue_depth)],
+)
+registry.callback(
+    "filescan_admission_rejected_total",
+    "Scan requests rejected by admission control, by reason.",
+    "counter",
+    lambda: [
+        ({"reason": "queue_full"}, admission.rejected_full),
+        ({"reason": "timeout"}, admission.rejected_timeout),
+    ],
+)
+registry.callback(
+    "filescan_clamd_sessions_opened_total",
+    "clamd connections opened, including reconnects after broken sessions.",
+    "counter",
+    lambda: [({}, clamav_pool_stats()["opened"])],
+)
+registry.callback(
+    "filescan_clamd_sessions_discarded_total",
+    "clamd sessions closed because they broke or sat idle for too long.",
+    "counter",
+    lambda: [({}, clamav_pool_stats()["discarded"])],
+)
+registry.callback(
+    "filescan_clamd_sessions_idle",
+    "Pooled clamd sessions ready for reuse.",
+    "gauge",
+    lambda: [({}, clamav_pool_stats()["idle"])],
+)
+registry.callback(
+    "filescan_security_events_queued",
+    "Security events waiting for delivery to the backend.",
+    "gauge",
+    lambda: [({}, security_events.stats()["queued"])],
+)
+registry.callback(
+    "filescan_security_events_total",
+    "Security events that left the queue, by outcome.",
+    "counter",
+    lambda: [
+        ({"outcome": "delivered"}, security_events.stats()["delivered"]),
+        ({"outcome": "failed"}, security_events.stats()["failed"]),
+    ],
+)
+registry.callback(
+    "filescan_clamd_up",
+    "Whether clamd answered the last background health probe.",
+    "gauge",
+    lambda: [({}, int(health.clamav_ok))],
+)
+registry.callback(
+    "filescan_hash_index_digests",
+    "Digests in the loaded known-bad hash index, by algorithm.",
+    "gauge",
+    lambda: [
+        ({"algorithm": "sha256"}, hash_index.stats()["sha256"]),
+        ({"algorithm": "md5"}, hash_index.stats()["md5"]),
+    ],
+)
+registry.callback(
+    "filescan_hash_index_matches_total",
+    "Files matched by the known-bad hash index.",
+    "counter",
+    lambda: [({}, hash_index.stats()["matches"])],
+)
+
+
+async def _compact_quarantine_periodically() -> None:
+    """
+    Apply the quarantine retention policy every ``QUARANTINE_COMPACT_INTERVAL`` seconds.
+    """
+    while True:
+        await asyncio.sleep(QUARANTINE_COMPACT_INTERVAL)
+        try:
+            summary = await asyncio.to_thread(quarantine_store.compact)
+            logger.info(f"quarantine compacted {summary}")
+
+        except OSError as exc:
+            logger.error(f"quarantine compaction failed error={exc}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Start the background tasks and release resources when the service shuts down.
+
+    Parameters
+    ----------
+    app : FastAPI
+        The application.
+
+    Yields
+    ------
+    None
+        Control while the application is running.
+    """
+    await security_events.start()
+    compaction = asyncio.create_task(_compact_quarantine_periodically())
+    health_probe = asyncio.create_task(health.run())
+    yield
+    health_probe.cancel()
+    compaction.cancel()
+    await security_events.stop()
+    close_clamav_sessions()
+
 
 app = FastAPI(
     title="File Scan Service",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 
 @app.get("/health")
-async def healthcheck() -> dict[str, str]:
+async def healthcheck(deep: bool = False) -> JSONResponse:
     """
     Liveness/readiness probe.
 
-    Returns 200 only when the ClamAV scanner is reachable and responding,
-    so callers (including Docker healthcheck and integration tests) can rely
-    on the filescan service being fully ready to handle /scan requests.
+    Answers from the state the background health task last recorded, so frequent
+    probes by Docker and the backend do not take clamd threads away from scans.
+    Returns 503 when ClamAV was unreachable at the last check or the state is
+    stale, so callers can rely on a 200 meaning the service can handle /scan.
+
+    Parameters
+    ----------
+    deep : bool, default=False
+        Check clamd now instead, including an empty scan through a clamd thread,
+        e.g. for integration tests or an operator debugging the service.
 
     Returns
     -------
-    dict[str, str]
-        ``{"status": "ok"}`` after a successful empty ClamAV scan confirms
-        the daemon is reachable.
+    JSONResponse
+        The ``status`` (``ok``, ``unavailable`` or ``stale``), the ClamAV state and
+        signature version, and the age of the state in seconds.
     """
-    try:
-        # Use a tiny, empty scan to verify that the ClamAV daemon is up.
-        # scan_with_clamav will raise RuntimeError if the daemon is unavailable.
-        await scan_with_clamav(b"")
+    if deep or health.checked_at is None:
+        # Also covers the first probes before the background task has run.
+        await health.refresh()
 
-    except RuntimeError as exc:
-        # Surface scanner unavailability as a 503 so orchestrators know
-        # the service is not yet ready.
-        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    state = health.snapshot()
+    if deep and state["status"] == "ok":
+        try:
+            await scan_with_clamav([])
 
-    return {"status": "ok"}
+        except RuntimeError as exc:
+            state.update(status="unavailable", clamav="unavailable", detail=str(exc))
 
+    if state["status"] == "ok":
+        del state["detail"]
+        return JSONResponse(state)
 
-@app.post("/scan")
-async def scan_file(
-    request: Request, file: UploadFile | None = File(None)
+    return JSONResponse(state, status_code=503)
+
+
+@app.get("/verdict-cache")
+async def verdict_cache_metrics() -> dict[str, int | float | str | None]:
+    """
+    Report hit-rate metrics of the scan verdict cache.
+
+    Returns
+    -------
+    dict[str, int | float | str | None]
+        Hits, misses, hit rate, entries, evictions, invalidations and the
+        signature database version the cached verdicts belong to.
+    """
+    return verdict_cache.metrics()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics() -> PlainTextResponse:
+    """
+    Report scan throughput, latency and load in the Prometheus text format.
+
+    Returns
+    -------
+    PlainTextResponse
+        Request and verdict counts, per-scanner latency histograms, bytes scanned,
+        queue depth, clamd sessions and security event delivery.
+    """
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/admission")
+async def admission_metrics() -> dict[str, int | float]:
+    """
+    Report the live load of the service so that callers can back off.
+
+    Returns
+    -------
+    dict[str, int | float]
+        Active and queued scans, their limits, rejected requests and the
+        current ``Retry-After`` estimate.
+    """
+    return admission.stats()
+
+
+def _respond(
+    endpoint: str,
+    content: Mapping[str, object],
+    status_code: int,
+    headers: dict[str, str] | None = None,
 ) -> JSONResponse:
     """
-    Scan a file that has been sent to the filescan service.
+    Build the response of a scan endpoint and count it.
 
     Parameters
     ----------
-    request : Request
-        The scan request from the activist backend.
+    endpoint : str
+        The endpoint label, ``scan`` or ``batch``.
 
-    file : UploadFile | None, default=File(None)
-        The file to be scanned.
+    content : Mapping[str, object]
+        The JSON body.
+
+    status_code : int
+        The HTTP status.
+
+    headers : dict[str, str] | None, default=None
+        Additional response headers.
 
     Returns
     -------
     JSONResponse
-        Successful scans return HTTP 200 with JSON including ``filename``,
-        ``malware_detected``, and ``detail``, plus optional ``signature``,
-        ``source``, ``quarantine_id``, and related fields when applicable.
+        The response.
+    """
+    REQUESTS.inc(endpoint=endpoint, status=str(status_code))
+    return JSONResponse(content=content, status_code=status_code, headers=headers)
 
-        Client or configuration errors may yield HTTP 400 (no file) or
-        403 (invalid ``X-Filescan-Token``). Scanner failures return HTTP
-        503 with an error ``detail``.
+
+def _rejection_response(endpoint: str, exc: AdmissionRejected) -> JSONResponse:
+    """
+    Turn a rejected admission into a response telling the caller when to retry.
+
+    Parameters
+    ----------
+    endpoint : str
+        The endpoint label, ``scan`` or ``batch``.
+
+    exc : AdmissionRejected
+        The rejection.
+
+    Returns
+    -------
+    JSONResponse
+        HTTP 429 or 503 with ``Retry-After`` and ``X-Filescan-Queue-Depth`` headers.
+    """
+    logger.warning(
+        f"scan request rejected status={exc.status_code} queue_depth={exc.queue_depth} retry_after={exc.retry_after}"
+    )
+    return _respond(
+        endpoint,
+        {"detail": exc.detail, "retry_after": exc.retry_after},
+        exc.status_code,
+        headers={
+            "Retry-After": str(exc.retry_after),
+            "X-Filescan-Queue-Depth": str(exc.queue_depth),
+        },
+    )
+
+
+def _verdict(result: ScanResult, source: str) -> dict[str, bool | str | None]:
+    """
+    Turn the result of the scanner that decided a file into a verdict.
+
+    Parameters
+    ----------
+    result : ScanResult
+        The result of the scanner.
+
+    source : str
+        The name of the scanner.
+
+    Returns
+    -------
+    dict[str, bool | str | None]
+        The verdict with ``malware_detected``, ``rejected``, ``detail``,
+        ``signature`` and ``source``.
+    """
+    detected, detail, signature = result
+    return {
+        "malware_detected": detected,
+        # Checks can turn a file away (e.g. wrong type) without it being malware.
+        "rejected": not detected,
+        "detail": detail,
+        "signature": signature,
+        "source": source,
+    }
+
+
+async def _run_checks(
+    file_obj: IO[bytes], info: FileInfo
+) -> tuple[dict[str, bool | str | None] | None, FileInfo]:
+    """
+    Run the cheap checks that apply to a file until one of them decides it.
+
+    Parameters
+    ----------
+    file_obj : IO[bytes]
+        The spooled upload, hashed only if a check needs it.
+
+    info : FileInfo
+        What is known about the file.
+
+    Returns
+    -------
+    tuple[dict[str, bool | str | None] | None, FileInfo]
+        The verdict, or None if the file passed every check, and the file info,
+        including the digests if they were computed.
+    """
+    for check in scanner_registry.checks_for(info):
+        if check.needs_hash and info.sha256 is None:
+            digests = await asyncio.to_thread(digest_file, file_obj, ("sha256", "md5"))
+            info = replace(info, sha256=digests["sha256"], md5=digests["md5"])
+
+        started = time.perf_counter()
+        result = check.run(info)
+        SCANNER_DURATION.observe(time.perf_counter() - started, scanner=check.name)
+        if result is not None:
+            return _verdict(result, check.name), info
+
+    return None, info
+
+
+async def _run_tier(
+    file_obj: IO[bytes], scanners: list[StreamingScanner]
+) -> tuple[dict[str, bool | str | None], str]:
+    """
+    Stream a file through the scanners of one tier and combine their results.
+
+    Parameters
+    ----------
+    file_obj : IO[bytes]
+        The spooled upload to be scanned.
+
+    scanners : list[StreamingScanner]
+        The scanners of the tier, in the order their detections are reported.
+
+    Returns
+    -------
+    tuple[dict[str, bool | str | None], str]
+        The verdict with ``malware_detected``, ``detail``, ``signature`` and
+        ``source``, and the SHA-256 of the file computed while it was streamed.
+
+    Raises
+    ------
+    RuntimeError
+        If a scanner is unavailable.
+    """
+    # The upload is read once; every scanner receives the same chunks.
+    fanout = ChunkFanout(file_obj, consumers=len(scanners))
+
+    async def _scan(index: int) -> ScanResult:
+        started = time.perf_counter()
+        try:
+            return await scanners[index].scan(fanout.chunks(index))
+
+        finally:
+            fanout.release(index)
+            SCANNER_DURATION.observe(
+                time.perf_counter() - started, scanner=scanners[index].name
+            )
+
+    reader = asyncio.create_task(asyncio.to_thread(fanout.run))
+    try:
+        results = await asyncio.gather(
+            *(_scan(index) for index in range(len(scanners)))
+        )
+
+    finally:
+        for index in range(len(scanners)):
+            fanout.release(index)
+
+        await reader
+        SCANNED_BYTES.inc(fanout.size)
+
+    for scanner, (detected, detail, signature) in zip(scanners, results, strict=True):
+        if detected:
+            return (
+                {
+                    "malware_detected": True,
+                    "detail": detail,
+                    "signature": signature,
+                    "source": scanner.name,
+                },
+                fanout.sha256,
+            )
+
+    return (
+        {
+            "malware_detected": False,
+            "detail": results[0][1],  # e.g. "No malware detected by ClamAV."
+            "signature": None,
+            "source": None,
+        },
+        fanout.sha256,
+    )
+
+
+async def _run_scanners(
+    file_obj: IO[bytes], info: FileInfo
+) -> tuple[dict[str, bool | str | None], str]:
+    """
+    Stream a file through the tiers of scanners that apply to it.
+
+    Parameters
+    ----------
+    file_obj : IO[bytes]
+        The spooled upload to be scanned.
+
+    info : FileInfo
+        What is known about the file.
+
+    Returns
+    -------
+    tuple[dict[str, bool | str | None], str]
+        The verdict with ``malware_detected``, ``detail``, ``signature`` and
+        ``source``, and the SHA-256 of the file.
+
+    Raises
+    ------
+    RuntimeError
+        If a scanner is unavailable.
+    """
+    detail: str | None = None
+    sha256 = info.sha256
+    for tier in scanner_registry.tiers_for(info):
+        verdict, sha256 = await _run_tier(file_obj, tier)
+        if verdict["malware_detected"]:
+            return verdict, sha256
+
+        # Later tiers only run for files the earlier ones found clean.
+        detail = detail or str(verdict["detail"])
+
+    if sha256 is None:
+        sha256 = await asyncio.to_thread(hash_file, file_obj)
+
+    return (
+        {
+            "malware_detected": False,
+            "detail": detail or "No scanner applies to this file.",
+            "signature": None,
+            "source": None,
+        },
+        sha256,
+    )
+
+
+def _file_info(file: UploadFile, profile: str | None) -> FileInfo:
+    """
+    Gather what the checks need to know about an upload without reading all of it.
+
+    Parameters
+    ----------
+    file : UploadFile
+        The upload.
+
+    profile : str | None
+        The upload profile the caller asked for.
+
+    Returns
+    -------
+    FileInfo
+        The name, size, detected type and profile of the upload.
+    """
+    file.file.seek(0)
+    head = file.file.read(MAGIC_HEAD_SIZE)
+    if (size := file.size) is None:
+        size = file.file.seek(0, os.SEEK_END)
+
+    file.file.seek(0)
+    return FileInfo(
+        filename=file.filename or "",
+        size=size,
+        file_type=detect_file_type(head),
+        profile=profile,
+    )
+
+
+def _check_token(request: Request) -> None:
+    """
+    Verify the internal token of a request if one is configured.
+
+    Parameters
+    ----------
+    request : Request
+        The scan request from the activist backend.
+
+    Raises
+    ------
+    HTTPException
+        With status 403 if ``X-Filescan-Token`` does not match ``FILESCAN_INTERNAL_TOKEN``.
     """
     if expected_token := os.getenv("FILESCAN_INTERNAL_TOKEN"):
         provided = request.headers.get("X-Filescan-Token")
@@ -88,65 +615,87 @@ async def scan_file(
             )
             raise HTTPException(status_code=403, detail="Unauthorized")
 
-    if file is None or not file.filename:
-        logger.warning("scan request rejected: no file or filename")
-        return JSONResponse(
-            content={
-                "detail": "No file was sent. Please include a file in the request."
-            },
-            status_code=400,
-        )
-
-    file_bytes = await file.read()
-    logger.info(
-        f"scan request received filename={file.filename} size={len(file_bytes)} content_type={getattr(file, 'content_type', None)}"
-    )
 
-    try:
-        clamav_result, csam_result = await asyncio.gather(
-            scan_with_clamav(file_bytes),
-            scan_with_csam(file_bytes),
-        )
+async def _scan_upload(
+    file: UploadFile, profile: str | None = None
+) -> dict[str, str | bool]:
+    """
+    Scan one uploaded file, quarantining and reporting it if it is flagged.
 
-    except RuntimeError as exc:
-        logger.error(f"scan failed: {exc}")
-        return JSONResponse(
-            content={"detail": str(exc)},
-            status_code=503,
-        )
+    Parameters
+    ----------
+    file : UploadFile
+        The file to be scanned.
 
-    # Use first positive result (ClamAV then CSAM).
-    malware_detected = False
-    detail = ""
-    signature: str | None = None
-    source: str | None = None
+    profile : str | None, default=None
+        The upload profile whose type and size limits apply, e.g. ``image``.
 
-    for (detected, d, sig), src in [(clamav_result, "clamav"), (csam_result, "csam")]:
-        if detected:
-            malware_detected = True
-            detail = d
-            signature = sig
-            source = src
-            break
+    Returns
+    -------
+    dict[str, str | bool]
+        The response for the file with ``filename``, ``malware_detected`` and
+        ``detail``, plus optional ``rejected``, ``signature``, ``source`` and
+        ``quarantine_id``.
+
+    Raises
+    ------
+    RuntimeError
+        If a scanner is unavailable.
+    """
+    # The upload stays in its spooled file; scanners read it in chunks.
+    logger.info(
+        f"scan request received filename={file.filename} size={file.size} content_type={getattr(file, 'content_type', None)}"
+    )
 
-    if not malware_detected:
-        detail = clamav_result[1]  # e.g. "No malware detected by ClamAV."
+    # Cheap checks first: most files are settled before clamd is contacted.
+    verdict, info = await _run_checks(file.file, _file_info(file, profile))
+    content_hash = info.sha256
+    signature_version: str | None = None
+    cached = False
+    if verdict is None:
+        # Identical bytes scanned with the same signature database get the same verdict.
+        signature_version = await get_clamav_signature_version()
+        if signature_version is not None:
+            verdict_cache.observe_signature_version(signature_version)
+            if content_hash is None:
+                content_hash = await asyncio.to_thread(hash_file, file.file)
+                info = replace(info, sha256=content_hash)
+
+            verdict = verdict_cache.get(content_hash, signature_version)
+
+        cached = verdict is not None
+        if verdict is None:
+            verdict, content_hash = await _run_scanners(file.file, info)
+
+            if signature_version is not None:
+                verdict_cache.set(content_hash, signature_version, verdict)
+
+    malware_detected = bool(verdict["malware_detected"])
+    rejected = bool(verdict.get("rejected"))
+    SCANS.inc(
+        verdict="malware" if malware_detected else "rejected" if rejected else "clean",
+        cached=str(cached).lower(),
+    )
+    detail = str(verdict["detail"])
+    signature = cast(str | None, verdict["signature"])
+    source = cast(str | None, verdict["source"])
 
     quarantine_id: str | None = None
     quarantine_path: str | None = None
+    sightings = 0
 
     if malware_detected:
-        safe_name = os.path.basename(file.filename or "") or "unnamed"
-        safe_name = safe_name.replace(os.sep, "_")
+        if content_hash is None:
+            content_hash = await asyncio.to_thread(hash_file, file.file)
+
+        # Stored once per content hash; resubmissions only add a sighting.
+        quarantine_path = quarantine_store.object_path(content_hash)
         try:
-            os.makedirs(QUARANTINE_DIR, exist_ok=True)
-            quarantine_id = uuid.uuid4().hex
-            quarantine_path = os.path.join(
-                QUARANTINE_DIR,
-                f"{quarantine_id}__{safe_name}",
+            entry = await quarantine_store.add(
+                file.file, content_hash, file.filename or "", signature, source
             )
-            with open(quarantine_path, "wb") as f_out:
-                f_out.write(file_bytes)
+            quarantine_id = entry.sha256
+            sightings = entry.sightings
 
         except OSError as exc:
             logger.error(
@@ -154,10 +703,17 @@ async def scan_file(
             )
 
     content: dict[str, str | bool] = {
-        "filename": file.filename,
+        "filename": file.filename or "",
         "malware_detected": malware_detected,
         "detail": detail,
+        "cached": cached,
     }
+    if rejected:
+        content["rejected"] = True
+
+    if signature_version is not None:
+        content["signature_version"] = signature_version
+
     if signature is not None:
         content["signature"] = signature
 
@@ -172,7 +728,7 @@ async def scan_file(
         logger.warning(
             f"scan response status=200 malware_detected={content['malware_detected']} "
             f"detail={content['detail']} source={content.get('source')} "
-            f"quarantine_id={quarantine_id} quarantine_path={quarantine_path}",
+            f"quarantine_id={quarantine_id} quarantine_path={quarantine_path} sightings={sightings}",
         )
         if quarantine_id is not None:
             event: dict[str, object] = {
@@ -180,13 +736,206 @@ async def scan_file(
                 "signature": signature,
                 "source": source,
                 "quarantine_id": quarantine_id,
+                "extra": {"sightings": sightings},
             }
-            notify_malware_quarantined(event=event)
+            await notify_malware_quarantined(event=event)
 
     else:
         logger.info(
-            f"scan response status=200 malware_detected={content['malware_detected']} "
-            f"detail={content['detail']} source={content.get('source')}"
+            f"scan response status=200 malware_detected={content['malware_detected']} rejected={rejected} "
+            f"detail={content['detail']} source={content.get('source')} cached={cached} sha256={content_hash}"
+        )
+
+    return content
+
+
+def _unknown_profile(profile: str | None) -> str | None:
+    """
+    Validate the upload profile of a scan request.
+
+    Parameters
+    ----------
+    profile : str | None
+        The requested profile.
+
+    Returns
+    -------
+    str | None
+        An error message if the profile is not known, else None.
+    """
+    if profile is None or profile in PROFILES:
+        return None
+
+    return (
+        f"Unknown profile {profile!r}; expected one of {', '.join(sorted(PROFILES))}."
+    )
+
+
+@app.post("/scan")
+async def scan_file(
+    request: Request,
+    file: UploadFile | None = File(None),
+    profile: str | None = Form(None),
+) -> JSONResponse:
+    """
+    Scan a file that has been sent to the filescan service.
+
+    Parameters
+    ----------
+    request : Request
+        The scan request from the activist backend.
+
+    file : UploadFile | None, default=File(None)
+        The file to be scanned.
+
+    profile : str | None, default=Form(None)
+        The upload profile, e.g. ``image``, whose file types and size limit apply.
+
+    Returns
+    -------
+    JSONResponse
+        Successful scans return HTTP 200 with JSON including ``filename``,
+        ``malware_detected``, and ``detail``, plus optional ``signature``,
+        ``source``, ``quarantine_id``, and related fields when applicable.
+        Files turned away by a cheap check, e.g. of a type the profile does
+        not accept, have ``rejected`` set.
+
+        Client or configuration errors may yield HTTP 400 (no file or unknown
+        profile) or
+        403 (invalid ``X-Filescan-Token``). Scanner failures return HTTP
+        503 with an error ``detail``. When the service is overloaded it
+        returns HTTP 429 (queue full) or 503 (queue wait timed out) with a
+        ``Retry-After`` header.
+    """
+    _check_token(request)
+
+    if file is None or not file.filename:
+        logger.warning("scan request rejected: no file or filename")
+        return _respond(
+            "scan",
+            {"detail": "No file was sent. Please include a file in the request."},
+            400,
+        )
+
+    if error := _unknown_profile(profile):
+        logger.warning(f"scan request rejected: {error}")
+        return _respond("scan", {"detail": error}, 400)
+
+    try:
+        async with admission.slot():
+            content = await _scan_upload(file, profile)
+
+    except AdmissionRejected as exc:
+        return _rejection_response("scan", exc)
+
+    except RuntimeError as exc:
+        logger.error(f"scan failed: {exc}")
+        return _respond("scan", {"detail": str(exc)}, 503)
+
+    return _respond("scan", content, 200)
+
+
+@app.post("/scan/batch")
+async def scan_batch(
+    request: Request,
+    files: list[UploadFile] | None = File(None),
+    stop_on_detection: bool = Form(False),
+    profile: str | None = Form(None),
+) -> JSONResponse:
+    """
+    Scan several files that have been sent to the filescan service in one request.
+
+    Parameters
+    ----------
+    request : Request
+        The scan request from the activist backend.
+
+    files : list[UploadFile] | None, default=File(None)
+        The files to be scanned.
+
+    stop_on_detection : bool, default=Form(False)
+        Skip the files that have not started scanning once one file is flagged
+        or rejected.
+
+    profile : str | None, default=Form(None)
+        The upload profile, e.g. ``image``, whose file types and size limit apply.
+
+    Returns
+    -------
+    JSONResponse
+        Successful scans return HTTP 200 with ``results``, the response of each
+        file as returned by ``/scan`` in the order the files were sent, and the
+        overall ``malware_detected``. Files skipped after a detection have
+        ``skipped`` set instead of a verdict.
+
+        Missing files, more than ``FILESCAN_BATCH_MAX_FILES`` files or an
+        unknown profile yield HTTP 400, an invalid ``X-Filescan-Token`` 403 and scanner failures 503.
+        Overload is reported as for ``/scan``; a batch takes one admission slot
+        per file it scans at the same time.
+    """
+    _check_token(request)
+
+    uploads = files or []
+    if not uploads or any(not upload.filename for upload in uploads):
+        logger.warning("batch scan request rejected: no files or missing filename")
+        return _respond(
+            "batch",
+            {"detail": "No files were sent. Please include files in the request."},
+            400,
         )
 
-    return JSONResponse(content=content, status_code=200)
+    if len(uploads) > FILESCAN_BATCH_MAX_FILES:
+        logger.warning(f"batch scan request rejected: {len(uploads)} files")
+        return _respond(
+            "batch",
+            {
+                "detail": f"At most {FILESCAN_BATCH_MAX_FILES} files can be scanned per request."
+            },
+            400,
+        )
+
+    if error := _unknown_profile(profile):
+        logger.warning(f"batch scan request rejected: {error}")
+        return _respond("batch", {"detail": error}, 400)
+
+    semaphore = asyncio.Semaphore(FILESCAN_BATCH_CONCURRENCY)
+    flagged = asyncio.Event()
+
+    async def _scan(upload: UploadFile) -> dict[str, str | bool]:
+        async with semaphore:
+            if stop_on_detection and flagged.is_set():
+                return {
+                    "filename": upload.filename or "",
+                    "skipped": True,
+                    "detail": "Not scanned because another file was flagged.",
+                }
+
+            content = await _scan_upload(upload, profile)
+
+        if content["malware_detected"] or content.get("rejected"):
+            flagged.set()
+
+        return content
+
+    try:
+        async with admission.slot(min(len(uploads), FILESCAN_BATCH_CONCURRENCY)):
+            results = await asyncio.gather(*(_scan(upload) for upload in uploads))
+
+    except AdmissionRejected as exc:
+        return _rejection_response("batch", exc)
+
+    except RuntimeError as exc:
+        logger.error(f"batch scan failed: {exc}")
+        return _respond("batch", {"detail": str(exc)}, 503)
+
+    malware_detected = any(result.get("malware_detected") for result in results)
+    logger.info(
+        f"batch scan response status=200 files={len(uploads)} malware_detected={malware_detected} "
+        f"rejected={sum(1 for result in results if result.get('rejected'))} "
+        f"skipped={sum(1 for result in results if result.get('skipped'))}"
+    )
+    return _respond(
+        "batch",
+        {"results": results, "malware_detected": malware_detected},
+        200,
+    )
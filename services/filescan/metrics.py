@@ -0,0 +1,446 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+In-process metrics of the filescan service in the Prometheus text format.
+
+Counters and histograms are plain numbers behind a lock, so recording a value
+costs a dictionary update. Values that other components already track, such as
+the queue depth or clamd session counters, are read by callbacks when
+``/metrics`` is scraped instead of being copied on every change.
+"""
+
+import bisect
+import math
+import threading
+from collections.abc import Callable, Iterable
+
+Labels = tuple[tuple[str, str], ...]
+Collector = Callable[[], Iterable[tuple[dict[str, str], float]]]
+
+# Seconds; scans of typical uploads take milliseconds, large archives seconds.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Seconds between queueing a security event and the backend accepting it.
+LAG_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 3600)
+
+
+def _labels(labels: dict[str, str]) -> Labels:
+    """
+    Turn label values into a hashable, ordered key.
+
+    Parameters
+    ----------
+    labels : dict[str, str]
+        Label names and values.
+
+    Returns
+    -------
+    Labels
+        The labels sorted by name.
+    """
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value: str) -> str:
+    """
+    Escape a label value for the text format.
+
+    Parameters
+    ----------
+    value : str
+        The label value.
+
+    Returns
+    -------
+    str
+        The value with backslashes, quotes and newlines escaped.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_number(value: float) -> str:
+    """
+    Format a sample value.
+
+    Parameters
+    ----------
+    value : float
+        The value.
+
+    Returns
+    -------
+    str
+        Integers without a decimal point, infinity as ``+Inf``.
+    """
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _sample(name: str, labels: Labels, value: float) -> str:
+    """
+    Format one sample line.
+
+    Parameters
+    ----------
+    name : str
+        The sample name.
+
+    labels : Labels
+        The labels of the sample.
+
+    value : float
+        The value.
+
+    Returns
+    -------
+    str
+        A line such as ``name{label="value"} 1``.
+    """
+    if not labels:
+        return f"{name} {_format_number(value)}"
+
+    rendered = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+    return f"{name}{{{rendered}}} {_format_number(value)}"
+
+
+class Counter:
+    """
+    A monotonically increasing value per label set.
+
+    Parameters
+    ----------
+    name : str
+        The metric name, ending in ``_total``.
+
+    documentation : str
+        The help text.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        Increase the counter.
+
+        Parameters
+        ----------
+        amount : float, default=1
+            The non-negative amount to add.
+
+        **labels : str
+            The label values.
+        """
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        """
+        Return the current value for a label set.
+
+        Parameters
+        ----------
+        **labels : str
+            The label values.
+
+        Returns
+        -------
+        float
+            The value, 0 if it was never increased.
+        """
+        with self._lock:
+            return self._values.get(_labels(labels), 0)
+
+    def samples(self) -> list[str]:
+        """
+        Render the sample lines.
+
+        Returns
+        -------
+        list[str]
+            One line per label set.
+        """
+        with self._lock:
+            values = sorted(self._values.items())
+
+        return [_sample(self.name, labels, value) for labels, value in values]
+
+
+class Histogram:
+    """
+    Counts of observed values in cumulative buckets per label set.
+
+    Parameters
+    ----------
+    name : str
+        The metric name.
+
+    documentation : str
+        The help text.
+
+    buckets : tuple[float, ...], default=DURATION_BUCKETS
+        Upper bounds of the buckets in increasing order; ``+Inf`` is implied.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: tuple[float, ...] = DURATION_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # Per label set: per-bucket counts (last one is +Inf), the sum and the count.
+        self._values: dict[Labels, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Record one observation.
+
+        Parameters
+        ----------
+        value : float
+            The observed value, e.g. a duration in seconds.
+
+        **labels : str
+            The label values.
+        """
+        key = _labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+
+            counts, total = self._values[key]
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        """
+        Return the number of observations for a label set.
+
+        Parameters
+        ----------
+        **labels : str
+            The label values.
+
+        Returns
+        -------
+        int
+            The number of observations.
+        """
+        with self._lock:
+            counts, _ = self._values.get(_labels(labels), ([0], [0.0]))
+            return sum(counts)
+
+    def samples(self) -> list[str]:
+        """
+        Render the bucket, sum and count lines.
+
+        Returns
+        -------
+        list[str]
+            The sample lines of every label set.
+        """
+        with self._lock:
+            values = sorted(
+                (labels, (list(counts), total[0]))
+                for labels, (counts, total) in self._values.items()
+            )
+
+        lines: list[str] = []
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += count
+                le = "+Inf" if math.isinf(bound) else _format_number(bound)
+                lines.append(
+                    _sample(f"{self.name}_bucket", (*labels, ("le", le)), cumulative)
+                )
+
+            lines.append(_sample(f"{self.name}_sum", labels, total))
+            lines.append(_sample(f"{self.name}_count", labels, cumulative))
+
+        return lines
+
+
+class CallbackMetric:
+    """
+    A counter or gauge whose values are read from a callback at scrape time.
+
+    Parameters
+    ----------
+    name : str
+        The metric name.
+
+    documentation : str
+        The help text.
+
+    kind : str
+        ``counter`` or ``gauge``.
+
+    collect : Collector
+        Returns pairs of label values and value.
+    """
+
+    def __init__(
+        self, name: str, documentation: str, kind: str, collect: Collector
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self) -> list[str]:
+        """
+        Render the sample lines.
+
+        Returns
+        -------
+        list[str]
+            One line per label set returned by the callback.
+        """
+        return [
+            _sample(self.name, _labels(labels), value)
+            for labels, value in self._collect()
+        ]
+
+
+class Registry:
+    """
+    The metrics exposed by ``/metrics``.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram | CallbackMetric] = {}
+
+    def _register(self, metric: Counter | Histogram | CallbackMetric) -> None:
+        """
+        Add a metric, replacing one registered earlier under the same name.
+
+        Parameters
+        ----------
+        metric : Counter | Histogram | CallbackMetric
+            The metric.
+        """
+        self._metrics[metric.name] = metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        """
+        Create and register a counter.
+
+        Parameters
+        ----------
+        name : str
+            The metric name, ending in ``_total``.
+
+        documentation : str
+            The help text.
+
+        Returns
+        -------
+        Counter
+            The new counter.
+        """
+        counter = Counter(name, documentation)
+        self._register(counter)
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        buckets: tuple[float, ...] = DURATION_BUCKETS,
+    ) -> Histogram:
+        """
+        Create and register a histogram.
+
+        Parameters
+        ----------
+        name : str
+            The metric name.
+
+        documentation : str
+            The help text.
+
+        buckets : tuple[float, ...], default=DURATION_BUCKETS
+            Upper bounds of the buckets.
+
+        Returns
+        -------
+        Histogram
+            The new histogram.
+        """
+        histogram = Histogram(name, documentation, buckets)
+        self._register(histogram)
+        return histogram
+
+    def callback(
+        self, name: str, documentation: str, kind: str, collect: Collector
+    ) -> None:
+        """
+        Register a counter or gauge that is read from a callback at scrape time.
+
+        Parameters
+        ----------
+        name : str
+            The metric name.
+
+        documentation : str
+            The help text.
+
+        kind : str
+            ``counter`` or ``gauge``.
+
+        collect : Collector
+            Returns pairs of label values and value.
+        """
+        self._register(CallbackMetric(name, documentation, kind, collect))
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns
+        -------
+        str
+            The exposition, ending in a newline.
+        """
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+SCANS = registry.counter(
+    "filescan_scans_total", "Files scanned, by verdict and whether it was cached."
+)
+REQUESTS = registry.counter(
+    "filescan_requests_total", "Scan requests, by endpoint and HTTP status."
+)
+SCANNED_BYTES = registry.counter(
+    "filescan_scanned_bytes_total", "Bytes streamed to the scanners."
+)
+SCANNER_DURATION = registry.histogram(
+    "filescan_scanner_duration_seconds", "Time each scanner took for one file."
+)
+SECURITY_EVENT_LAG = registry.histogram(
+    "filescan_security_event_delivery_lag_seconds",
+    "Time from queueing a security event to its delivery to the backend.",
+    buckets=LAG_BUCKETS,
+)
@@ -5,15 +5,39 @@ Helpers for notifications emitted by the filescan service.
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
 import os
+import random
+import time
+import uuid
 from datetime import datetime, timezone
 from typing import Any
 
 import httpx
 
+from metrics import SECURITY_EVENT_LAG
+
 logger = logging.getLogger(__name__)
 
+# Pending events are kept next to the quarantined files so they share its volume.
+ALERTS_SPOOL_DIR = os.getenv(
+    "FILESCAN_ALERTS_SPOOL_DIR",
+    os.path.join(
+        os.getenv("FILESCAN_QUARANTINE_DIR", "/var/filescan/quarantine"), ".alerts"
+    ),
+)
+ALERTS_SPOOL_MAX = int(os.getenv("FILESCAN_ALERTS_SPOOL_MAX", "1000"))
+ALERTS_MAX_ATTEMPTS = int(os.getenv("FILESCAN_ALERTS_MAX_ATTEMPTS", "5"))
+ALERTS_RETRY_BACKOFF = float(os.getenv("FILESCAN_ALERTS_RETRY_BACKOFF", "1"))
+# Events posted in one request; the backend accepts up to SECURITY_EVENTS_MAX_BATCH.
+ALERTS_BATCH_MAX = int(os.getenv("FILESCAN_ALERTS_BATCH_MAX", "100"))
+ALERTS_TIMEOUT = 5.0
+
+# Responses that mean the backend may accept the event later.
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
 
 def _build_malware_quarantined_envelope(event: dict[str, object]) -> dict[str, Any]:
     """
@@ -88,9 +112,23 @@ def _build_malware_quarantined_envelope(event: dict[str, object]) -> dict[str, A
     return envelope
 
 
-def _post_security_event(envelope: dict[str, Any]) -> None:
+def _alerts_enabled() -> bool:
+    """
+    Check whether security events should be sent to the backend.
+
+    Returns
+    -------
+    bool
+        True if ``FILESCAN_ALERTS_ENABLED`` is ``true``.
     """
-    Best-effort HTTP POST of a security event envelope to the backend.
+    return os.getenv("FILESCAN_ALERTS_ENABLED", "false").lower() == "true"
+
+
+async def _post_security_events(
+    client: httpx.AsyncClient, envelopes: list[dict[str, Any]]
+) -> bool:
+    """
+    Best-effort HTTP POST of a batch of security event envelopes to the backend.
 
     Reads configuration from environment at call time so that tests and
     different environments can control behavior via:
@@ -100,30 +138,31 @@ def _post_security_event(envelope: dict[str, Any]) -> None:
 
     Parameters
     ----------
-    envelope : dict[str, Any]
-        Security event envelope produced by the filescan service for a
-        malware quarantine.
+    client : httpx.AsyncClient
+        The pooled client used to reach the backend.
+
+    envelopes : list[dict[str, Any]]
+        Security event envelopes produced by the filescan service, posted as one
+        JSON array.
 
     Returns
     -------
-    None
-        No return value. When posting is enabled and configured, sends the
-        envelope to the backend; otherwise logs and returns early. HTTP and
-        transport outcomes are logged.
+    bool
+        False if the post failed in a way that is worth retrying (network error,
+        408, 429 or 5xx); True once the events are delivered or cannot be delivered.
     """
-    alerts_enabled = os.getenv("FILESCAN_ALERTS_ENABLED", "false").lower() == "true"
-    if not alerts_enabled:
+    if not _alerts_enabled():
         logger.info(
-            f"Security alerts disabled; not posting event type={envelope.get('type')}"
+            f"Security alerts disabled; not posting {len(envelopes)} security events"
         )
-        return
+        return True
 
     backend_url = os.getenv("ALERTS_BACKEND_URL")
     if not backend_url:
         logger.error(
-            "ALERTS_BACKEND_URL is not configured; cannot post security event."
+            "ALERTS_BACKEND_URL is not configured; cannot post security events."
         )
-        return
+        return True
 
     headers: dict[str, str] = {"Content-Type": "application/json"}
     token = os.getenv("ALERTS_BACKEND_TOKEN")
@@ -131,30 +170,329 @@ def _post_security_event(envelope: dict[str, Any]) -> None:
         headers["X-Internal-Token"] = token
 
     try:
-        response = httpx.post(backend_url, json=envelope, headers=headers, timeout=5.0)
-        if response.status_code >= 400:
-            logger.error(
-                f"Failed to post security event type={envelope.get('type')} "
-                f"status={response.status_code} body={response.text}"
+        response = await client.post(backend_url, json=envelopes, headers=headers)
+
+    except httpx.RequestError as exc:
+        logger.error(f"Error posting {len(envelopes)} security events error={exc}")
+        return False
+
+    if response.status_code >= 400:
+        logger.error(
+            f"Failed to post {len(envelopes)} security events "
+            f"status={response.status_code} body={response.text}"
+        )
+        return response.status_code not in RETRYABLE_STATUS_CODES
+
+    logger.info(
+        f"Posted {len(envelopes)} security events status={response.status_code}"
+    )
+    return True
+
+
+class SecurityEventQueue:
+    """
+    In-process queue that delivers security events to the backend in the background.
+
+    Parameters
+    ----------
+    spool_dir : str, default=ALERTS_SPOOL_DIR
+        Directory where pending events are kept until they are delivered.
+
+    max_spooled : int, default=ALERTS_SPOOL_MAX
+        Maximum number of events kept on disk; further events are only queued in memory.
+
+    max_attempts : int, default=ALERTS_MAX_ATTEMPTS
+        Delivery attempts per event before it is left for the next restart.
+
+    retry_backoff : float, default=ALERTS_RETRY_BACKOFF
+        Base delay in seconds for the jittered exponential backoff.
+
+    max_batch : int, default=ALERTS_BATCH_MAX
+        Maximum number of queued events posted to the backend in one request.
+
+    transport : httpx.AsyncBaseTransport | None, default=None
+        Optional transport, used by tests to mock the backend.
+
+    Notes
+    -----
+    Every event is written to the spool before it is queued and removed once it
+    has been delivered, so events that are pending when the service stops are
+    sent again by ``start`` after the next restart. Events that queue up while a
+    request is in flight, e.g. during a malware wave, are posted together in the
+    next request.
+    """
+
+    def __init__(
+        self,
+        spool_dir: str = ALERTS_SPOOL_DIR,
+        max_spooled: int = ALERTS_SPOOL_MAX,
+        max_attempts: int = ALERTS_MAX_ATTEMPTS,
+        retry_backoff: float = ALERTS_RETRY_BACKOFF,
+        max_batch: int = ALERTS_BATCH_MAX,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.spool_dir = spool_dir
+        self.max_spooled = max_spooled
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.max_batch = max(1, max_batch)
+        self._transport = transport
+        self._queue: asyncio.Queue[tuple[str, dict[str, Any]]] | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._client: httpx.AsyncClient | None = None
+        self.delivered = 0
+        self.failed = 0
+
+    # MARK: Spool
+
+    def _spool_path(self, event_id: str) -> str:
+        """
+        Return the path of a spooled event.
+
+        Parameters
+        ----------
+        event_id : str
+            The event identifier.
+
+        Returns
+        -------
+        str
+            The path of the event file.
+        """
+        return os.path.join(self.spool_dir, f"{event_id}.json")
+
+    def _write_spool(self, event_id: str, envelope: dict[str, Any]) -> None:
+        """
+        Persist an event so that it survives a restart.
+
+        Parameters
+        ----------
+        event_id : str
+            The event identifier.
+
+        envelope : dict[str, Any]
+            The security event envelope.
+        """
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            spooled = sum(
+                1 for name in os.listdir(self.spool_dir) if name.endswith(".json")
+            )
+            if spooled >= self.max_spooled:
+                logger.warning(
+                    f"Security event spool is full ({spooled} events); event {event_id} is only kept in memory"
+                )
+                return
+
+            path = self._spool_path(event_id)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f_out:
+                json.dump(envelope, f_out)
+
+            os.replace(f"{path}.tmp", path)
+
+        except OSError as exc:
+            logger.error(f"Failed to spool security event {event_id} error={exc}")
+
+    def _remove_spool(self, event_id: str) -> None:
+        """
+        Remove a delivered event from the spool.
+
+        Parameters
+        ----------
+        event_id : str
+            The event identifier.
+        """
+        try:
+            os.remove(self._spool_path(event_id))
+
+        except FileNotFoundError:
+            pass
+
+        except OSError as exc:
+            logger.error(f"Failed to remove spooled event {event_id} error={exc}")
+
+    def _load_spool(self) -> list[tuple[str, dict[str, Any]]]:
+        """
+        Read the events left in the spool, oldest first.
+
+        Returns
+        -------
+        list[tuple[str, dict[str, Any]]]
+            Pairs of event identifier and envelope.
+        """
+        try:
+            names = sorted(
+                name for name in os.listdir(self.spool_dir) if name.endswith(".json")
             )
 
-        else:
-            logger.info(
-                f"Posted security event type={envelope.get('type')} status={response.status_code}"
+        except OSError:
+            return []
+
+        events: list[tuple[str, dict[str, Any]]] = []
+        for name in names:
+            event_id = name.removesuffix(".json")
+            try:
+                with open(self._spool_path(event_id), encoding="utf-8") as f_in:
+                    events.append((event_id, json.load(f_in)))
+
+            except (OSError, ValueError) as exc:
+                logger.error(f"Skipping unreadable spooled event {name} error={exc}")
+
+        return events
+
+    # MARK: Delivery
+
+    async def start(self) -> None:
+        """
+        Start the delivery task and queue the events left in the spool.
+        """
+        if self._task is not None:
+            return
+
+        self._queue = asyncio.Queue()
+        self._client = httpx.AsyncClient(
+            timeout=ALERTS_TIMEOUT,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+            transport=self._transport,
+        )
+        pending = await asyncio.to_thread(self._load_spool)
+        for item in pending:
+            self._queue.put_nowait(item)
+
+        if pending:
+            logger.info(f"Redelivering {len(pending)} spooled security events")
+
+        self._task = asyncio.create_task(self._deliver_forever())
+
+    async def stop(self, timeout: float = ALERTS_TIMEOUT) -> None:
+        """
+        Give pending events a moment to be delivered, then stop the delivery task.
+
+        Parameters
+        ----------
+        timeout : float, default=ALERTS_TIMEOUT
+            Seconds to wait for the queue to drain; undelivered events stay spooled.
+        """
+        if self._task is None or self._queue is None:
+            return
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+
+        except TimeoutError:
+            logger.warning(
+                f"Stopping with {self._queue.qsize()} undelivered security events"
             )
 
-    except httpx.RequestError as exc:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+
+        self._task = None
+        self._queue = None
+        self._client = None
+
+    async def enqueue(self, envelope: dict[str, Any]) -> None:
+        """
+        Spool an event and hand it to the delivery task without waiting for delivery.
+
+        Parameters
+        ----------
+        envelope : dict[str, Any]
+            The security event envelope.
+        """
+        event_id = f"{time.time_ns():020d}-{uuid.uuid4().hex}"
+        await asyncio.to_thread(self._write_spool, event_id, envelope)
+        if self._queue is None:
+            logger.warning(
+                f"Security event queue is not running; event {event_id} stays spooled"
+            )
+            return
+
+        self._queue.put_nowait((event_id, envelope))
+
+    async def _deliver_forever(self) -> None:
+        """
+        Deliver queued events in batches of up to ``max_batch``, one after the other.
+        """
+        assert self._queue is not None
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._deliver(batch)
+
+            except Exception:
+                logger.exception(
+                    f"Unexpected error delivering {len(batch)} security events"
+                )
+
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _deliver(self, batch: list[tuple[str, dict[str, Any]]]) -> None:
+        """
+        Post a batch of events, retrying with jittered exponential backoff.
+
+        Parameters
+        ----------
+        batch : list[tuple[str, dict[str, Any]]]
+            Pairs of event identifier and security event envelope.
+        """
+        assert self._client is not None
+        envelopes = [envelope for _, envelope in batch]
+        for attempt in range(1, self.max_attempts + 1):
+            if await _post_security_events(self._client, envelopes):
+                delivered_at = time.time()
+                for event_id, _ in batch:
+                    await asyncio.to_thread(self._remove_spool, event_id)
+                    # Event ids start with the time the event was queued in nanoseconds.
+                    queued_at = int(event_id.partition("-")[0]) / 1e9
+                    SECURITY_EVENT_LAG.observe(max(0.0, delivered_at - queued_at))
+
+                self.delivered += len(batch)
+                return
+
+            if attempt < self.max_attempts:
+                await asyncio.sleep(
+                    random.uniform(0, self.retry_backoff * (2 ** (attempt - 1)))
+                )
+
+        self.failed += len(batch)
         logger.error(
-            f"Error posting security event type={envelope.get('type')} error={exc}"
+            f"Giving up on {len(batch)} security events after {self.max_attempts} attempts; "
+            "they stay spooled until the next restart"
         )
 
+    def stats(self) -> dict[str, int]:
+        """
+        Return delivery counters of the queue.
+
+        Returns
+        -------
+        dict[str, int]
+            Queued, delivered and failed events.
+        """
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "delivered": self.delivered,
+            "failed": self.failed,
+        }
+
 
-def notify_malware_quarantined(event: dict[str, object]) -> None:
+security_events = SecurityEventQueue()
+
+
+async def notify_malware_quarantined(event: dict[str, object]) -> None:
     """
     Hook for malware quarantine events.
 
-    Logs the raw event and, when enabled via configuration, emits a generic
-    security event envelope to the backend over HTTP so that the backend can
+    Logs the raw event and, when enabled via configuration, queues a generic
+    security event envelope for delivery to the backend so that the backend can
     fan-out notifications to operators or downstream systems.
 
     Parameters
@@ -165,8 +503,8 @@ def notify_malware_quarantined(event: dict[str, object]) -> None:
     Returns
     -------
     None
-        No return value. Builds and may POST an envelope when alerts are
-        enabled; logs envelope build failures and HTTP errors.
+        No return value. Builds and may queue an envelope when alerts are
+        enabled; logs envelope build failures. Delivery happens in the background.
     """
     logger.warning(f"malware quarantined event={event}.")
 
@@ -180,4 +518,10 @@ def notify_malware_quarantined(event: dict[str, object]) -> None:
         )
         return
 
-    _post_security_event(envelope)
+    if not _alerts_enabled():
+        logger.info(
+            f"Security alerts disabled; not posting event type={envelope.get('type')}"
+        )
+        return
+
+    await security_events.enqueue(envelope)
@@ -0,0 +1,605 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Content-addressed quarantine store for detected files.
+
+Files are stored once per SHA-256 under ``objects/<first two hex digits>/<sha256>``
+and every sighting is appended to ``index.jsonl``, a JSON-lines index with the
+size, filenames, signature and timestamps of each stored file. Records of the
+same file are merged when the index is read and collapsed by ``compact``.
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import IO, Any
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_DIR = os.getenv("FILESCAN_QUARANTINE_DIR", "/var/filescan/quarantine")
+
+# Retention: the oldest files are removed once the store grows beyond the size
+# limit, and files not seen for the retention period are removed on compaction.
+QUARANTINE_MAX_BYTES = int(os.getenv("FILESCAN_QUARANTINE_MAX_BYTES", str(1 << 30)))
+QUARANTINE_RETENTION_DAYS = float(os.getenv("FILESCAN_QUARANTINE_RETENTION_DAYS", "90"))
+
+# Distinct filenames remembered per file; bots often randomize names.
+MAX_FILENAMES = 20
+
+INDEX_NAME = "index.jsonl"
+LOCK_NAME = ".index.lock"
+OBJECTS_DIR = "objects"
+
+
+@dataclass
+class QuarantineEntry:
+    """
+    Metadata of one quarantined file.
+
+    Parameters
+    ----------
+    sha256 : str
+        The hex SHA-256 of the file, which is also its ``quarantine_id``.
+
+    size : int
+        The size of the file in bytes.
+
+    first_seen : float
+        Unix time of the first sighting.
+
+    last_seen : float
+        Unix time of the latest sighting.
+
+    sightings : int, default=1
+        Number of times the file was submitted.
+
+    filenames : list[str], default=[]
+        Distinct names the file was uploaded with.
+
+    signature : str | None, default=None
+        The signature of the latest detection.
+
+    source : str | None, default=None
+        The scanner of the latest detection.
+    """
+
+    sha256: str
+    size: int
+    first_seen: float
+    last_seen: float
+    sightings: int = 1
+    filenames: list[str] = field(default_factory=list)
+    signature: str | None = None
+    source: str | None = None
+
+    def merge(self, other: "QuarantineEntry") -> None:
+        """
+        Fold a later record of the same file into this entry.
+
+        Parameters
+        ----------
+        other : QuarantineEntry
+            The record to merge.
+        """
+        self.first_seen = min(self.first_seen, other.first_seen)
+        if other.last_seen >= self.last_seen:
+            self.last_seen = other.last_seen
+            self.signature = other.signature or self.signature
+            self.source = other.source or self.source
+
+        self.sightings += other.sightings
+        for name in other.filenames:
+            if name not in self.filenames and len(self.filenames) < MAX_FILENAMES:
+                self.filenames.append(name)
+
+
+class QuarantineStore:
+    """
+    Deduplicating on-disk store for quarantined files.
+
+    Parameters
+    ----------
+    root : str, default=QUARANTINE_DIR
+        The quarantine directory.
+
+    max_bytes : int, default=QUARANTINE_MAX_BYTES
+        Maximum total size of stored files; ``0`` disables the limit.
+
+    retention_days : float, default=QUARANTINE_RETENTION_DAYS
+        Days after the last sighting before ``compact`` removes a file; ``0``
+        keeps files forever.
+
+    clock : Callable[[], float], default=time.time
+        Time source, replaceable in tests.
+
+    Notes
+    -----
+    Several processes may share a store (e.g. the service and the compaction
+    command); writes to the index are serialized with a lock file and the
+    in-memory view is reloaded whenever another process replaced the index.
+    """
+
+    def __init__(
+        self,
+        root: str = QUARANTINE_DIR,
+        max_bytes: int = QUARANTINE_MAX_BYTES,
+        retention_days: float = QUARANTINE_RETENTION_DAYS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: dict[str, QuarantineEntry] | None = None
+        self._index_stat: tuple[int, int] | None = None
+
+    # MARK: Paths
+
+    @property
+    def index_path(self) -> str:
+        """
+        Return the path of the JSON-lines index.
+
+        Returns
+        -------
+        str
+            The index path.
+        """
+        return os.path.join(self.root, INDEX_NAME)
+
+    def object_path(self, sha256: str) -> str:
+        """
+        Return the path where a file with the given hash is stored.
+
+        Parameters
+        ----------
+        sha256 : str
+            The hex SHA-256 of the file.
+
+        Returns
+        -------
+        str
+            The path of the stored file.
+        """
+        return os.path.join(self.root, OBJECTS_DIR, sha256[:2], sha256)
+
+    # MARK: Index
+
+    @contextmanager
+    def _index_lock(self) -> Iterator[None]:
+        """
+        Hold the in-process lock and the cross-process index lock.
+
+        Yields
+        ------
+        None
+            Control while the locks are held.
+        """
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, LOCK_NAME), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _stat_index(self) -> tuple[int, int] | None:
+        """
+        Identify the current index file by inode and size.
+
+        Returns
+        -------
+        tuple[int, int] | None
+            The inode and size of the index, or None if it does not exist.
+        """
+        try:
+            stat = os.stat(self.index_path)
+
+        except FileNotFoundError:
+            return None
+
+        return (stat.st_ino, stat.st_size)
+
+    def _read_index(self) -> dict[str, QuarantineEntry]:
+        """
+        Read and merge the index records of files that are still stored.
+
+        Returns
+        -------
+        dict[str, QuarantineEntry]
+            The entries keyed by SHA-256.
+        """
+        entries: dict[str, QuarantineEntry] = {}
+        try:
+            with open(self.index_path, encoding="utf-8") as f_in:
+                for line in f_in:
+                    try:
+                        record = QuarantineEntry(**json.loads(line))
+
+                    except (TypeError, ValueError):
+                        logger.warning("Skipping malformed quarantine index record")
+                        continue
+
+                    if (entry := entries.get(record.sha256)) is not None:
+                        entry.merge(record)
+
+                    else:
+                        entries[record.sha256] = record
+
+        except FileNotFoundError:
+            pass
+
+        # Files removed by retention or by hand are dropped from the view.
+        return {
+            sha256: entry
+            for sha256, entry in entries.items()
+            if os.path.exists(self.object_path(sha256))
+        }
+
+    def _load(self) -> dict[str, QuarantineEntry]:
+        """
+        Return the in-memory view, reloading it if another process changed the index.
+
+        Returns
+        -------
+        dict[str, QuarantineEntry]
+            The entries keyed by SHA-256.
+        """
+        current = self._stat_index()
+        if self._entries is None or current != self._index_stat:
+            self._entries = self._read_index()
+            self._index_stat = current
+
+        return self._entries
+
+    def _append(self, record: QuarantineEntry) -> None:
+        """
+        Append a record to the index.
+
+        Parameters
+        ----------
+        record : QuarantineEntry
+            The record to append.
+        """
+        with open(self.index_path, "a", encoding="utf-8") as f_out:
+            f_out.write(json.dumps(asdict(record)) + "\n")
+            f_out.flush()
+            os.fsync(f_out.fileno())
+
+        self._index_stat = self._stat_index()
+
+    def _rewrite_index(self, entries: dict[str, QuarantineEntry]) -> None:
+        """
+        Atomically replace the index with one record per stored file.
+
+        Parameters
+        ----------
+        entries : dict[str, QuarantineEntry]
+            The entries to keep.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".index-", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f_out:
+            for entry in sorted(entries.values(), key=lambda e: e.first_seen):
+                f_out.write(json.dumps(asdict(entry)) + "\n")
+
+            f_out.flush()
+            os.fsync(f_out.fileno())
+
+        os.replace(tmp_path, self.index_path)
+        self._entries = entries
+        self._index_stat = self._stat_index()
+
+    # MARK: Storage
+
+    def _write_object(self, file_obj: IO[bytes], sha256: str) -> int:
+        """
+        Atomically store a file under its hash.
+
+        Parameters
+        ----------
+        file_obj : IO[bytes]
+            The file to store; it is read from the start.
+
+        sha256 : str
+            The hex SHA-256 of the file.
+
+        Returns
+        -------
+        int
+            The number of bytes written.
+        """
+        path = self.object_path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f_out:
+                file_obj.seek(0)
+                shutil.copyfileobj(file_obj, f_out)
+                f_out.flush()
+                os.fsync(f_out.fileno())
+                size = f_out.tell()
+
+            # A partially written file never appears under the final name.
+            os.replace(tmp_path, path)
+
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+            raise
+
+        return size
+
+    def _remove_object(self, sha256: str) -> None:
+        """
+        Delete a stored file.
+
+        Parameters
+        ----------
+        sha256 : str
+            The hex SHA-256 of the file.
+        """
+        try:
+            os.remove(self.object_path(sha256))
+
+        except FileNotFoundError:
+            pass
+
+    def _oversize(self, entries: dict[str, QuarantineEntry]) -> list[str]:
+        """
+        Select the least recently seen files to remove so the store fits ``max_bytes``.
+
+        Parameters
+        ----------
+        entries : dict[str, QuarantineEntry]
+            The current entries.
+
+        Returns
+        -------
+        list[str]
+            The hashes of the files over the size limit.
+        """
+        if self.max_bytes <= 0:
+            return []
+
+        total = sum(entry.size for entry in entries.values())
+        selected: list[str] = []
+        for entry in sorted(entries.values(), key=lambda e: e.last_seen):
+            if total <= self.max_bytes:
+                break
+
+            total -= entry.size
+            selected.append(entry.sha256)
+
+        return selected
+
+    def add_sync(
+        self,
+        file_obj: IO[bytes],
+        sha256: str,
+        filename: str,
+        signature: str | None = None,
+        source: str | None = None,
+    ) -> QuarantineEntry:
+        """
+        Store a detected file unless it is already stored and record the sighting.
+
+        Parameters
+        ----------
+        file_obj : IO[bytes]
+            The detected file.
+
+        sha256 : str
+            The hex SHA-256 of the file.
+
+        filename : str
+            The name the file was uploaded with.
+
+        signature : str | None, default=None
+            The matching signature.
+
+        source : str | None, default=None
+            The scanner that flagged the file.
+
+        Returns
+        -------
+        QuarantineEntry
+            The merged entry of the file.
+        """
+        safe_name = os.path.basename(filename).replace(os.sep, "_") or "unnamed"
+        now = self._clock()
+        with self._index_lock():
+            entries = self._load()
+            if os.path.exists(self.object_path(sha256)):
+                size = os.path.getsize(self.object_path(sha256))
+
+            else:
+                size = self._write_object(file_obj, sha256)
+
+            record = QuarantineEntry(
+                sha256=sha256,
+                size=size,
+                first_seen=now,
+                last_seen=now,
+                filenames=[safe_name],
+                signature=signature,
+                source=source,
+            )
+            self._append(record)
+            if (entry := entries.get(sha256)) is not None:
+                entry.merge(record)
+
+            else:
+                entry = entries[sha256] = QuarantineEntry(**asdict(record))
+
+            evicted = self._oversize(entries)
+            for evicted_sha256 in evicted:
+                self._remove_object(evicted_sha256)
+                del entries[evicted_sha256]
+
+            if evicted:
+                logger.warning(
+                    f"Quarantine exceeded {self.max_bytes} bytes; evicted {len(evicted)} files"
+                )
+
+            return entry
+
+    async def add(
+        self,
+        file_obj: IO[bytes],
+        sha256: str,
+        filename: str,
+        signature: str | None = None,
+        source: str | None = None,
+    ) -> QuarantineEntry:
+        """
+        Async wrapper that stores a detected file in a worker thread.
+
+        Parameters
+        ----------
+        file_obj : IO[bytes]
+            The detected file.
+
+        sha256 : str
+            The hex SHA-256 of the file.
+
+        filename : str
+            The name the file was uploaded with.
+
+        signature : str | None, default=None
+            The matching signature.
+
+        source : str | None, default=None
+            The scanner that flagged the file.
+
+        Returns
+        -------
+        QuarantineEntry
+            The merged entry of the file.
+        """
+        return await asyncio.to_thread(
+            self.add_sync, file_obj, sha256, filename, signature, source
+        )
+
+    def get(self, sha256: str) -> QuarantineEntry | None:
+        """
+        Return the metadata of a stored file.
+
+        Parameters
+        ----------
+        sha256 : str
+            The hex SHA-256 (``quarantine_id``) of the file.
+
+        Returns
+        -------
+        QuarantineEntry | None
+            The entry, or None if the file is not stored.
+        """
+        with self._index_lock():
+            return self._load().get(sha256)
+
+    # MARK: Maintenance
+
+    def compact(self, dry_run: bool = False) -> dict[str, int]:
+        """
+        Apply the retention policy and collapse the index to one record per file.
+
+        Parameters
+        ----------
+        dry_run : bool, default=False
+            Only report what would be removed.
+
+        Returns
+        -------
+        dict[str, int]
+            The number of expired, evicted and orphaned files that were (or would
+            be) removed, and the files and bytes kept.
+        """
+        with self._index_lock():
+            entries = dict(self._read_index())
+            expired = []
+            if self.retention_days > 0:
+                cutoff = self._clock() - self.retention_days * 86400
+                expired = [
+                    sha256
+                    for sha256, entry in entries.items()
+                    if entry.last_seen < cutoff
+                ]
+
+            for sha256 in expired:
+                del entries[sha256]
+
+            orphans = [
+                path
+                for path in self._iter_object_paths()
+                if os.path.basename(path) not in entries
+                and os.path.basename(path) not in expired
+            ]
+            evicted = self._oversize(entries)
+            if not dry_run:
+                for sha256 in expired + evicted:
+                    self._remove_object(sha256)
+
+                for path in orphans:
+                    os.remove(path)
+
+                for sha256 in evicted:
+                    del entries[sha256]
+
+                self._rewrite_index(entries)
+
+            kept = [entry for entry in entries.values() if entry.sha256 not in evicted]
+            return {
+                "expired": len(expired),
+                "evicted": len(evicted),
+                "orphans": len(orphans),
+                "files": len(kept),
+                "bytes": sum(entry.size for entry in kept),
+            }
+
+    def _iter_object_paths(self) -> Iterator[str]:
+        """
+        Iterate over the stored files and leftover temporary files.
+
+        Yields
+        ------
+        str
+            Paths below the objects directory.
+        """
+        objects_dir = os.path.join(self.root, OBJECTS_DIR)
+        if not os.path.isdir(objects_dir):
+            return
+
+        for shard in sorted(os.listdir(objects_dir)):
+            shard_dir = os.path.join(objects_dir, shard)
+            if os.path.isdir(shard_dir):
+                for name in sorted(os.listdir(shard_dir)):
+                    yield os.path.join(shard_dir, name)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Return the size of the store.
+
+        Returns
+        -------
+        dict[str, Any]
+            The number of stored files, their total size and the number of sightings.
+        """
+        with self._index_lock():
+            entries = self._load()
+            return {
+                "files": len(entries),
+                "bytes": sum(entry.size for entry in entries.values()),
+                "sightings": sum(entry.sightings for entry in entries.values()),
+            }
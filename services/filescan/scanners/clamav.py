@@ -1,26 +1,157 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """
 Methods for the ClamAV file scanner.
+
+Scans run on a dedicated thread pool sized to clamd's ``MaxThreads`` and reuse
+long-lived clamd sessions from a bounded pool.
 """
 
 import asyncio
-import io
 import os
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+from scanners.clamd_pool import ClamdSession, ClamdSessionError, ClamdSessionPool
 
-from clamav_client.clamd import ClamdUnixSocket
+T = TypeVar("T")
 
 # Socket path must match clamd.conf (and entrypoint.sh). Default matches Alpine.
 CLAMAV_SOCKET = os.environ.get("CLAMAV_SOCKET_PATH", "/run/clamav/clamd.sock")
 
+# Must match MaxThreads in clamd.conf (clamd's default is 10): more concurrent
+# scans than that only queue inside the daemon.
+CLAMAV_MAX_THREADS = int(os.environ.get("CLAMAV_MAX_THREADS", "10"))
+
+# Seconds the signature database version is reused before asking clamd again.
+SIGNATURE_VERSION_TTL = float(os.environ.get("FILESCAN_SIGNATURE_VERSION_TTL", "60"))
+
+_signature_version: str | None = None
+_signature_version_checked_at = float("-inf")
+
+
+def _open_session() -> ClamdSession:
+    """
+    Open a clamd session and verify that the daemon answers.
+
+    Returns
+    -------
+    ClamdSession
+        A new session.
+
+    Raises
+    ------
+    RuntimeError
+        If the ClamAV daemon is unavailable.
+    """
+    session = ClamdSession(CLAMAV_SOCKET)
+    try:
+        session.open()
+        # Only new connections are pinged; pooled sessions are used directly.
+        reply = session.command("PING")
+
+    except Exception as exc:  # noqa: BLE001
+        session.close()
+        raise RuntimeError(f"Unable to connect to ClamAV daemon: {exc}") from exc
+
+    if not reply.startswith("PONG"):
+        session.close()
+        raise RuntimeError("ClamAV daemon is not responding to ping()")
+
+    return session
+
+
+_pool = ClamdSessionPool(size=CLAMAV_MAX_THREADS, connect=_open_session)
+_executor = ThreadPoolExecutor(
+    max_workers=CLAMAV_MAX_THREADS, thread_name_prefix="clamav"
+)
 
-async def scan_with_clamav(file_bytes: bytes) -> tuple[bool, str, str | None]:
+
+def _with_session(
+    operation: Callable[[ClamdSession], T],
+    can_retry: Callable[[], bool] = lambda: True,
+) -> T:
     """
-    Async wrapper that scans file bytes with ClamAV in a worker thread.
+    Run an operation on a pooled session, reconnecting once if a reused session broke.
 
     Parameters
     ----------
-    file_bytes : bytes
-        The bytes of a file to be scanned with ClamAV.
+    operation : Callable[[ClamdSession], T]
+        The operation to run.
+
+    can_retry : Callable[[], bool], default=lambda: True
+        Whether the operation can still be repeated after a failure.
+
+    Returns
+    -------
+    T
+        The result of the operation.
+
+    Raises
+    ------
+    RuntimeError
+        If the ClamAV daemon is unavailable.
+    """
+    for attempt in range(2):
+        reused = False
+        try:
+            with _pool.session() as session:
+                reused = session.uses > 0
+                return operation(session)
+
+        except (OSError, ClamdSessionError) as exc:
+            # clamd may have dropped a pooled session; a new one settles it.
+            if reused and attempt == 0 and can_retry():
+                continue
+
+            raise RuntimeError(f"Unable to connect to ClamAV daemon: {exc}") from exc
+
+    raise RuntimeError("Unable to connect to ClamAV daemon")  # pragma: no cover
+
+
+def _parse_scan_reply(reply: str) -> tuple[bool, str, str | None]:
+    """
+    Turn an INSTREAM reply into a scan result.
+
+    Parameters
+    ----------
+    reply : str
+        The reply, e.g. ``stream: OK`` or ``stream: Eicar-Test-Signature FOUND``.
+
+    Returns
+    -------
+    tuple[bool, str, str | None]
+        A tuple of (malware detected, detail, signature or none).
+
+    Raises
+    ------
+    RuntimeError
+        If clamd could not scan the stream.
+    """
+    _, sep, result = reply.partition(": ")
+    signature, _, status = (result if sep else reply).rpartition(" ")
+    if status == "OK":
+        return (False, "No malware detected by ClamAV.", None)
+
+    if status == "ERROR":
+        raise RuntimeError(f"ClamAV could not scan the file: {reply}")
+
+    malware_detected = status == "FOUND"
+    detail = (
+        "Malware detected by ClamAV." if malware_detected else "Unexpected scan status."
+    )
+    return (malware_detected, detail, signature or None)
+
+
+async def scan_with_clamav(chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
+    """
+    Async wrapper that streams a file to ClamAV on the ClamAV thread pool.
+
+    Parameters
+    ----------
+    chunks : Iterable[bytes]
+        The contents of the file to be scanned, in INSTREAM sized chunks.
 
     Returns
     -------
@@ -32,17 +163,18 @@ async def scan_with_clamav(file_bytes: bytes) -> tuple[bool, str, str | None]:
     RuntimeError
         If the ClamAV daemon is unavailable.
     """
-    return await asyncio.to_thread(_scan_with_clamav_sync, file_bytes)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _scan_with_clamav_sync, chunks)
 
 
-def _scan_with_clamav_sync(file_bytes: bytes) -> tuple[bool, str, str | None]:
+def _scan_with_clamav_sync(chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
     """
-    Implementation used by the async wrapper to scan file bytes with ClamAV as well as unit tests.
+    Implementation used by the async wrapper to scan a file with ClamAV as well as unit tests.
 
     Parameters
     ----------
-    file_bytes : bytes
-        The bytes of a file to be scanned with ClamAV.
+    chunks : Iterable[bytes]
+        The contents of the file to be scanned, in INSTREAM sized chunks.
 
     Returns
     -------
@@ -54,29 +186,116 @@ def _scan_with_clamav_sync(file_bytes: bytes) -> tuple[bool, str, str | None]:
     RuntimeError
         If the ClamAV daemon is unavailable.
     """
-    client = ClamdUnixSocket(CLAMAV_SOCKET)
+    started = False
 
-    try:
-        # clamav-client returns the daemon reply (typically "PONG") on success.
-        if not client.ping().startswith("PONG"):
-            raise RuntimeError("ClamAV daemon is not responding to ping()")
+    def _tracked() -> Iterator[bytes]:
+        nonlocal started
+        started = True
+        yield from chunks
 
-    except Exception as exc:  # noqa: BLE001
-        raise RuntimeError(f"Unable to connect to ClamAV daemon: {exc}") from exc
+    # A stream that was already read from cannot be sent again on a new session.
+    reply = _with_session(
+        lambda session: session.instream(_tracked()), can_retry=lambda: not started
+    )
 
+    return _parse_scan_reply(reply)
+
+
+async def get_clamav_signature_version() -> str | None:
+    """
+    Return the version of the signature database loaded by ClamAV.
+
+    The version is cached for ``SIGNATURE_VERSION_TTL`` seconds so that it can be
+    checked on every scan without an extra round-trip to the daemon.
+
+    Returns
+    -------
+    str | None
+        The signature database version, or None if the daemon is unavailable or
+        has no database loaded.
+    """
+    global _signature_version, _signature_version_checked_at
+
+    now = time.monotonic()
+    if now - _signature_version_checked_at < SIGNATURE_VERSION_TTL:
+        return _signature_version
+
+    loop = asyncio.get_running_loop()
     try:
-        # INSTREAM scan: empty dict means clean; otherwise values are (status, signature).
-        result = client.instream(io.BytesIO(file_bytes))
+        version = await loop.run_in_executor(
+            _executor, _get_clamav_signature_version_sync
+        )
 
-    except Exception as exc:  # noqa: BLE001
-        raise RuntimeError(f"Unable to connect to ClamAV daemon: {exc}") from exc
+    except RuntimeError:
+        # Ask again on the next scan instead of caching the failure.
+        return None
 
-    if not result:
-        return (False, "No malware detected by ClamAV.", None)
+    _signature_version = version
+    _signature_version_checked_at = now
+    return version
 
-    _, (status, signature) = next(iter(result.items()))
-    malware_detected = status == "FOUND"
-    detail = (
-        "Malware detected by ClamAV." if malware_detected else "Unexpected scan status."
-    )
-    return (malware_detected, detail, signature)
+
+async def check_clamav() -> str | None:
+    """
+    Check that clamd answers and refresh the cached signature database version.
+
+    Unlike ``scan_with_clamav([])`` this sends a single ``VERSION`` command over a
+    pooled session, so it does not occupy a clamd scan thread.
+
+    Returns
+    -------
+    str | None
+        The signature database version, or None if no database is loaded.
+
+    Raises
+    ------
+    RuntimeError
+        If the ClamAV daemon is unavailable.
+    """
+    global _signature_version, _signature_version_checked_at
+
+    loop = asyncio.get_running_loop()
+    version = await loop.run_in_executor(_executor, _get_clamav_signature_version_sync)
+    _signature_version = version
+    _signature_version_checked_at = time.monotonic()
+    return version
+
+
+def _get_clamav_signature_version_sync() -> str | None:
+    """
+    Implementation used by the async wrapper to read the signature version as well as unit tests.
+
+    Returns
+    -------
+    str | None
+        The signature database version, or None if no database is loaded.
+
+    Raises
+    ------
+    RuntimeError
+        If the ClamAV daemon is unavailable.
+    """
+    # The reply looks like "ClamAV 1.4.1/27400/Tue Oct 14 08:34:45 2025".
+    reply = _with_session(lambda session: session.command("VERSION"))
+
+    parts = reply.strip().split("/")
+    return parts[1] if len(parts) > 2 and parts[1] else None
+
+
+def clamav_pool_stats() -> dict[str, int]:
+    """
+    Return the health counters of the clamd session pool.
+
+    Returns
+    -------
+    dict[str, int]
+        Opened, reused, discarded and idle sessions and the pool size.
+    """
+    return _pool.stats()
+
+
+def close_clamav_sessions() -> None:
+    """
+    Close the idle pooled clamd sessions, e.g. when the service shuts down.
+    """
+    _pool.close()
@@ -0,0 +1,301 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Long-lived clamd sessions and a bounded pool to share them between scans.
+
+A session is a single Unix socket connection in clamd's ``IDSESSION`` mode, which
+lets many commands reuse one connection instead of connecting (and pinging) for
+every scan.
+"""
+
+import os
+import socket
+import struct
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+
+# clamd's IdleTimeout defaults to 30s; sessions idle for longer than this are
+# reopened instead of reused so they are not closed under us by the daemon.
+CLAMAV_SESSION_MAX_IDLE = float(os.environ.get("CLAMAV_SESSION_MAX_IDLE", "20"))
+CLAMAV_SOCKET_TIMEOUT = float(os.environ.get("CLAMAV_SOCKET_TIMEOUT", "30"))
+
+
+class ClamdSessionError(Exception):
+    """
+    Raised when a clamd session is closed or returns an unreadable reply.
+    """
+
+
+class ClamdSession:
+    """
+    A connection to clamd in ``IDSESSION`` mode.
+
+    Parameters
+    ----------
+    socket_path : str
+        Path of the clamd Unix socket.
+
+    timeout : float, default=CLAMAV_SOCKET_TIMEOUT
+        Socket timeout in seconds.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = CLAMAV_SOCKET_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.last_used = time.monotonic()
+        self.uses = 0
+        self._sock: socket.socket | None = None
+        self._buffer = b""
+
+    def open(self) -> None:
+        """
+        Connect to clamd and start the session.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(b"zIDSESSION\0")
+
+        except OSError:
+            sock.close()
+            raise
+
+        self._sock = sock
+
+    def _send(self, data: bytes) -> None:
+        """
+        Send raw bytes over the session.
+
+        Parameters
+        ----------
+        data : bytes
+            The bytes to send.
+
+        Raises
+        ------
+        ClamdSessionError
+            If the session is not open.
+        """
+        if self._sock is None:
+            raise ClamdSessionError("clamd session is not open")
+
+        self._sock.sendall(data)
+
+    def _read_reply(self) -> str:
+        """
+        Read one null-terminated reply and strip its request number.
+
+        Returns
+        -------
+        str
+            The reply without the ``<n>: `` prefix clamd adds in session mode.
+
+        Raises
+        ------
+        ClamdSessionError
+            If clamd closed the connection.
+        """
+        if self._sock is None:
+            raise ClamdSessionError("clamd session is not open")
+
+        while b"\0" not in self._buffer:
+            data = self._sock.recv(4096)
+            if not data:
+                raise ClamdSessionError("clamd closed the session")
+
+            self._buffer += data
+
+        reply, _, self._buffer = self._buffer.partition(b"\0")
+        request_number, sep, body = reply.decode("utf-8", "replace").partition(": ")
+
+        return body if sep and request_number.isdigit() else reply.decode()
+
+    def command(self, name: str) -> str:
+        """
+        Run a simple command such as ``PING`` or ``VERSION``.
+
+        Parameters
+        ----------
+        name : str
+            The clamd command.
+
+        Returns
+        -------
+        str
+            The reply of clamd.
+        """
+        self._send(f"z{name}\0".encode())
+        return self._read_reply()
+
+    def instream(self, chunks: Iterable[bytes]) -> str:
+        """
+        Scan a stream of bytes with ``INSTREAM``.
+
+        Parameters
+        ----------
+        chunks : Iterable[bytes]
+            The file contents; each chunk must be smaller than clamd's StreamMaxLength.
+
+        Returns
+        -------
+        str
+            The scan reply, e.g. ``stream: OK`` or ``stream: <signature> FOUND``.
+        """
+        self._send(b"zINSTREAM\0")
+        for chunk in chunks:
+            if chunk:
+                self._send(struct.pack("!L", len(chunk)) + chunk)
+
+        self._send(struct.pack("!L", 0))
+        return self._read_reply()
+
+    def close(self) -> None:
+        """
+        End the session and close the socket.
+        """
+        if self._sock is None:
+            return
+
+        try:
+            self._sock.sendall(b"zEND\0")
+
+        except OSError:
+            pass
+
+        finally:
+            self._sock.close()
+            self._sock = None
+
+
+class ClamdSessionPool:
+    """
+    Bounded, thread-safe pool of clamd sessions that are opened on demand.
+
+    Parameters
+    ----------
+    size : int
+        Maximum number of sessions in use at the same time.
+
+    connect : Callable[[], ClamdSession]
+        Opens a new, verified session.
+
+    max_idle : float, default=CLAMAV_SESSION_MAX_IDLE
+        Seconds after which an idle session is reopened rather than reused.
+
+    clock : Callable[[], float], default=time.monotonic
+        Time source, replaceable in tests.
+
+    Notes
+    -----
+    A session that raises during use is closed and dropped, so the next scan
+    opens a fresh connection instead of failing on a broken one.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        connect: Callable[[], ClamdSession],
+        max_idle: float = CLAMAV_SESSION_MAX_IDLE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.size = max(1, size)
+        self.max_idle = max_idle
+        self._connect = connect
+        self._clock = clock
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._idle: list[ClamdSession] = []
+        self.sessions_opened = 0
+        self.sessions_reused = 0
+        self.sessions_discarded = 0
+
+    def _checkout(self) -> ClamdSession:
+        """
+        Take an idle session that is still fresh or open a new one.
+
+        Returns
+        -------
+        ClamdSession
+            A session ready for use.
+        """
+        stale: list[ClamdSession] = []
+        session: ClamdSession | None = None
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.pop()
+                if self._clock() - candidate.last_used > self.max_idle:
+                    stale.append(candidate)
+                    continue
+
+                session = candidate
+                self.sessions_reused += 1
+                break
+
+            self.sessions_discarded += len(stale)
+
+        for candidate in stale:
+            candidate.close()
+
+        if session is None:
+            session = self._connect()
+            with self._lock:
+                self.sessions_opened += 1
+
+        return session
+
+    @contextmanager
+    def session(self) -> Iterator[ClamdSession]:
+        """
+        Borrow a session for the duration of a ``with`` block.
+
+        Yields
+        ------
+        ClamdSession
+            The borrowed session; it is returned to the pool unless the block raised.
+        """
+        with self._slots:
+            session = self._checkout()
+            try:
+                yield session
+
+            except BaseException:
+                session.close()
+                with self._lock:
+                    self.sessions_discarded += 1
+
+                raise
+
+            session.uses += 1
+            session.last_used = self._clock()
+            with self._lock:
+                self._idle.append(session)
+
+    def close(self) -> None:
+        """
+        Close all idle sessions.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for session in idle:
+            session.close()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return counters describing the health of the pool.
+
+        Returns
+        -------
+        dict[str, int]
+            Opened, reused and discarded sessions and the number of idle sessions.
+        """
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "opened": self.sessions_opened,
+                "reused": self.sessions_reused,
+                "discarded": self.sessions_discarded,
+            }
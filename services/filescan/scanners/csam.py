@@ -7,16 +7,17 @@ Attn: The result of this scan is always "No CSAM detected.".
 """
 
 import asyncio
+from collections.abc import Iterable
 
 
-async def scan_with_csam(file_bytes: bytes) -> tuple[bool, str, str | None]:
+async def scan_with_csam(chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
     """
-    Async wrapper that scans file bytes for CSAM in a worker thread.
+    Async wrapper that scans a file for CSAM in a worker thread.
 
     Parameters
     ----------
-    file_bytes : bytes
-        The bytes of a file to be scanned with CSAM.
+    chunks : Iterable[bytes]
+        The contents of a file to be scanned with CSAM, in chunks.
 
     Returns
     -------
@@ -27,17 +28,17 @@ async def scan_with_csam(file_bytes: bytes) -> tuple[bool, str, str | None]:
     -----
     - Currently stubbed to always return clean.
     """
-    return await asyncio.to_thread(_scan_with_csam_sync, file_bytes)
+    return await asyncio.to_thread(_scan_with_csam_sync, chunks)
 
 
-def _scan_with_csam_sync(file_bytes: bytes) -> tuple[bool, str, str | None]:
+def _scan_with_csam_sync(chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
     """
-    Implementation used by the async wrapper to scan file bytes for CSAM as well as unit tests.
+    Implementation used by the async wrapper to scan a file for CSAM as well as unit tests.
 
     Parameters
     ----------
-    file_bytes : bytes
-        The bytes of a file to be scanned with CSAM.
+    chunks : Iterable[bytes]
+        The contents of a file to be scanned with CSAM, in chunks.
 
     Returns
     -------
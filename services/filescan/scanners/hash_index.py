@@ -0,0 +1,509 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Memory-mapped index of the SHA-256 and MD5 digests of known malicious files.
+
+Blocklists from threat feeds hold millions of digests, too many to load into a
+dictionary in every worker. They are compiled offline by ``build_hash_index.py``
+into one binary file that the workers map into memory, so the pages are shared
+through the page cache and a lookup allocates nothing but the digest it reads.
+
+The file consists of:
+
+- a header (``HEADER``) with the number of signatures, digests and Bloom filter
+  hash functions,
+- the signature names, each as a little-endian ``uint16`` length and UTF-8 bytes,
+- a Bloom filter over all digests; most files are not listed, and the filter
+  answers them from a few bits without touching the digest arrays,
+- the SHA-256 records, then the MD5 records, each sorted by digest and followed
+  by the ``uint16`` number of its signature, so a listed digest is found by a
+  binary search over fixed-width records.
+
+The builder writes a new file next to the old one and renames it over it, and
+``ReloadingHashIndex`` maps the new file on the next lookup after it notices the
+change. Lookups in progress keep using the old mapping until they finish.
+"""
+
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Path of the compiled index; an empty path or a missing file disables the lookup.
+FILESCAN_HASH_INDEX = os.getenv("FILESCAN_HASH_INDEX", "")
+# Seconds between checks of whether the index file was replaced.
+FILESCAN_HASH_INDEX_RELOAD_INTERVAL = float(
+    os.getenv("FILESCAN_HASH_INDEX_RELOAD_INTERVAL", "30")
+)
+
+MAGIC = b"FSHASHIX"
+VERSION = 1
+# Magic, version, Bloom hash functions, signatures, Bloom filter bytes, SHA-256
+# records and MD5 records.
+HEADER = struct.Struct("<8sHHIQQQ")
+SIGNATURE_ID = struct.Struct("<H")
+DIGEST_SIZES = {"sha256": 32, "md5": 16}
+DEFAULT_SIGNATURE = "Known-Bad-Hash"
+DEFAULT_FALSE_POSITIVE_RATE = 0.001
+
+
+def _bloom_positions(digest: bytes, hashes: int, bits: int) -> Iterator[int]:
+    """
+    Compute the Bloom filter bits of a digest.
+
+    Parameters
+    ----------
+    digest : bytes
+        A SHA-256 or MD5 digest.
+
+    hashes : int
+        The number of hash functions.
+
+    bits : int
+        The size of the filter in bits.
+
+    Yields
+    ------
+    int
+        The position of each bit.
+
+    Notes
+    -----
+    The digests are already uniformly distributed, so the hash functions are
+    derived from their first 16 bytes by double hashing instead of hashing again.
+    """
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:16], "little") | 1
+    for i in range(hashes):
+        yield (h1 + i * h2) % bits
+
+
+def bloom_parameters(entries: int, false_positive_rate: float) -> tuple[int, int]:
+    """
+    Size a Bloom filter.
+
+    Parameters
+    ----------
+    entries : int
+        The number of digests in the filter.
+
+    false_positive_rate : float
+        The share of unlisted digests the filter may let through to the search.
+
+    Returns
+    -------
+    tuple[int, int]
+        The size of the filter in bytes and the number of hash functions.
+    """
+    entries = max(1, entries)
+    bits = math.ceil(-entries * math.log(false_positive_rate) / math.log(2) ** 2)
+    size = max(8, math.ceil(bits / 8))
+    hashes = max(1, round(size * 8 / entries * math.log(2)))
+    return size, hashes
+
+
+def read_hash_list(path: str) -> Iterator[tuple[str, str]]:
+    """
+    Read a text blocklist.
+
+    Parameters
+    ----------
+    path : str
+        A file with one SHA-256 or MD5 hex digest per line, optionally followed by
+        a signature name; blank lines and lines starting with ``#`` are ignored.
+
+    Yields
+    ------
+    tuple[str, str]
+        The lower-cased digest and its signature, ``Known-Bad-Hash`` if the line
+        names none.
+
+    Raises
+    ------
+    ValueError
+        If a line does not start with a SHA-256 or MD5 digest.
+    """
+    with open(path, encoding="utf-8") as f_in:
+        for number, line in enumerate(f_in, start=1):
+            digest, _, signature = line.strip().partition(" ")
+            if not digest or digest.startswith("#"):
+                continue
+
+            if len(digest) not in (64, 32):
+                raise ValueError(f"{path}:{number}: not a SHA-256 or MD5 digest")
+
+            try:
+                bytes.fromhex(digest)
+
+            except ValueError:
+                raise ValueError(f"{path}:{number}: not a hex digest") from None
+
+            yield digest.lower(), signature.strip() or DEFAULT_SIGNATURE
+
+
+def build_hash_index(
+    entries: Iterable[tuple[str, str]],
+    path: str,
+    false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+) -> dict[str, int]:
+    """
+    Compile digests into an index file and atomically replace ``path`` with it.
+
+    Parameters
+    ----------
+    entries : Iterable[tuple[str, str]]
+        Hex digests and their signatures, e.g. from ``read_hash_list``. For a
+        digest listed more than once the last signature wins.
+
+    path : str
+        The index file to write.
+
+    false_positive_rate : float, default=DEFAULT_FALSE_POSITIVE_RATE
+        The share of unlisted digests the Bloom filter may let through.
+
+    Returns
+    -------
+    dict[str, int]
+        The number of SHA-256 and MD5 digests, signatures and Bloom filter bytes.
+
+    Raises
+    ------
+    ValueError
+        If there are more distinct signatures than fit the record format.
+    """
+    signature_ids: dict[str, int] = {}
+    records: dict[str, dict[bytes, int]] = {kind: {} for kind in DIGEST_SIZES}
+    for digest, signature in entries:
+        raw = bytes.fromhex(digest)
+        kind = "sha256" if len(raw) == DIGEST_SIZES["sha256"] else "md5"
+        records[kind][raw] = signature_ids.setdefault(signature, len(signature_ids))
+
+    if len(signature_ids) > 0xFFFF:
+        raise ValueError("An index can hold at most 65535 distinct signatures.")
+
+    total = sum(len(digests) for digests in records.values())
+    bloom_size, hashes = bloom_parameters(total, false_positive_rate)
+    bloom = bytearray(bloom_size)
+    for digests in records.values():
+        for raw in digests:
+            for bit in _bloom_positions(raw, hashes, bloom_size * 8):
+                bloom[bit >> 3] |= 1 << (bit & 7)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".hash-index-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f_out:
+            f_out.write(
+                HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    hashes,
+                    len(signature_ids),
+                    bloom_size,
+                    len(records["sha256"]),
+                    len(records["md5"]),
+                )
+            )
+            for signature in signature_ids:
+                encoded = signature.encode("utf-8")
+                f_out.write(SIGNATURE_ID.pack(len(encoded)) + encoded)
+
+            f_out.write(bloom)
+            for digests in records.values():
+                for raw in sorted(digests):
+                    f_out.write(raw + SIGNATURE_ID.pack(digests[raw]))
+
+            f_out.flush()
+            os.fsync(f_out.fileno())
+
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return {
+        "sha256": len(records["sha256"]),
+        "md5": len(records["md5"]),
+        "signatures": len(signature_ids),
+        "bloom_bytes": bloom_size,
+    }
+
+
+class HashIndex:
+    """
+    A read-only view of one index file.
+
+    Parameters
+    ----------
+    path : str
+        The index file.
+
+    Raises
+    ------
+    ValueError
+        If the file is not an index of a supported version or is truncated.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f_in:
+            self._map = mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"{path} is not a hash index.")
+
+        (
+            magic,
+            version,
+            self._hashes,
+            signature_count,
+            bloom_size,
+            sha256_count,
+            md5_count,
+        ) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} hash index.")
+
+        offset = HEADER.size
+        self.signatures: list[str] = []
+        for _ in range(signature_count):
+            (length,) = SIGNATURE_ID.unpack_from(self._map, offset)
+            offset += SIGNATURE_ID.size
+            self.signatures.append(self._map[offset : offset + length].decode())
+            offset += length
+
+        self._bloom_offset = offset
+        self._bloom_bits = bloom_size * 8
+        offset += bloom_size
+        # Per digest length: (offset of the first record, number of records).
+        self._sections: dict[int, tuple[int, int]] = {}
+        for kind, count in (("sha256", sha256_count), ("md5", md5_count)):
+            self._sections[DIGEST_SIZES[kind]] = (offset, count)
+            offset += count * (DIGEST_SIZES[kind] + SIGNATURE_ID.size)
+
+        if offset != len(self._map):
+            raise ValueError(f"{path} is truncated or corrupt.")
+
+        self.counts: dict[str, int] = {"sha256": sha256_count, "md5": md5_count}
+
+    def __len__(self) -> int:
+        return self.counts["sha256"] + self.counts["md5"]
+
+    def might_contain(self, digest: bytes) -> bool:
+        """
+        Check the Bloom filter for a digest.
+
+        Parameters
+        ----------
+        digest : bytes
+            A SHA-256 or MD5 digest.
+
+        Returns
+        -------
+        bool
+            False if the digest is certainly not listed.
+        """
+        bloom = self._map
+        start = self._bloom_offset
+        for bit in _bloom_positions(digest, self._hashes, self._bloom_bits):
+            if not bloom[start + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+
+        return True
+
+    def lookup(self, digest: str) -> str | None:
+        """
+        Find the signature of a listed digest.
+
+        Parameters
+        ----------
+        digest : str
+            A SHA-256 or MD5 hex digest.
+
+        Returns
+        -------
+        str | None
+            The signature, or None if the digest is not listed.
+        """
+        raw = bytes.fromhex(digest)
+        if len(raw) not in self._sections or not self.might_contain(raw):
+            return None
+
+        offset, count = self._sections[len(raw)]
+        size = len(raw) + SIGNATURE_ID.size
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            start = offset + middle * size
+            key = self._map[start : start + len(raw)]
+            if key < raw:
+                low = middle + 1
+
+            elif key > raw:
+                high = middle
+
+            else:
+                signature_id: int = SIGNATURE_ID.unpack_from(
+                    self._map, start + len(raw)
+                )[0]
+                return self.signatures[signature_id]
+
+        return None
+
+
+class ReloadingHashIndex:
+    """
+    The index at a path, mapped again whenever the file there is replaced.
+
+    Parameters
+    ----------
+    path : str, default=FILESCAN_HASH_INDEX
+        The index file; an empty path disables the lookup.
+
+    check_interval : float, default=FILESCAN_HASH_INDEX_RELOAD_INTERVAL
+        Seconds between checks of whether the file changed.
+
+    clock : Callable[[], float], default=time.monotonic
+        Time source, replaceable in tests.
+    """
+
+    def __init__(
+        self,
+        path: str = FILESCAN_HASH_INDEX,
+        check_interval: float = FILESCAN_HASH_INDEX_RELOAD_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.path = path
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._index: HashIndex | None = None
+        self._file_id: tuple[int, int, int] | None = None
+        self._checked_at: float | None = None
+        self.reloads = 0
+        self.lookups = 0
+        self.matches = 0
+
+    def _stat(self) -> tuple[int, int, int] | None:
+        """
+        Identify the file currently at the path.
+
+        Returns
+        -------
+        tuple[int, int, int] | None
+            The inode, size and modification time, or None if there is no file.
+        """
+        try:
+            stat = os.stat(self.path)
+
+        except FileNotFoundError:
+            return None
+
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def current(self) -> HashIndex | None:
+        """
+        Return the index, mapping the file again if it was replaced.
+
+        Returns
+        -------
+        HashIndex | None
+            The index, or None if there is no usable index file.
+        """
+        if not self.path:
+            return None
+
+        now = self._clock()
+        if (
+            self._checked_at is not None
+            and now - self._checked_at < self.check_interval
+        ):
+            return self._index
+
+        with self._lock:
+            self._checked_at = now
+            file_id = self._stat()
+            if file_id == self._file_id:
+                return self._index
+
+            try:
+                index = HashIndex(self.path) if file_id is not None else None
+
+            except (OSError, ValueError):
+                # Keep serving the previous index rather than none at all.
+                logger.exception("Could not load the hash index %s", self.path)
+                return self._index
+
+            # The old mapping is closed once the lookups holding it are done.
+            self._index, self._file_id = index, file_id
+            self.reloads += 1
+            logger.info(
+                "Loaded hash index %s with %d digests",
+                self.path,
+                len(index) if index is not None else 0,
+            )
+            return self._index
+
+    @property
+    def available(self) -> bool:
+        """
+        Whether an index with at least one digest is loaded.
+
+        Returns
+        -------
+        bool
+            True if lookups can match.
+        """
+        index = self.current()
+        return index is not None and len(index) > 0
+
+    def lookup(self, digest: str) -> str | None:
+        """
+        Find the signature of a listed digest.
+
+        Parameters
+        ----------
+        digest : str
+            A SHA-256 or MD5 hex digest.
+
+        Returns
+        -------
+        str | None
+            The signature, or None if the digest is not listed or there is no index.
+        """
+        index = self.current()
+        if index is None:
+            return None
+
+        self.lookups += 1
+        signature = index.lookup(digest)
+        if signature is not None:
+            self.matches += 1
+
+        return signature
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the size and usage of the index.
+
+        Returns
+        -------
+        dict[str, int]
+            The listed SHA-256 and MD5 digests, the times the file was loaded and
+            the lookups and matches since the service started.
+        """
+        index = self._index
+        counts = index.counts if index is not None else {"sha256": 0, "md5": 0}
+        return {
+            **counts,
+            "reloads": self.reloads,
+            "lookups": self.lookups,
+            "matches": self.matches,
+        }
@@ -0,0 +1,183 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Cheap checks that settle a file before it is streamed to the expensive scanners.
+"""
+
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from scanners.registry import FileInfo, ScanResult
+
+
+def _types(value: str) -> frozenset[str]:
+    """
+    Parse a comma-separated list of file types.
+
+    Parameters
+    ----------
+    value : str
+        E.g. ``png,jpeg``.
+
+    Returns
+    -------
+    frozenset[str]
+        The lower-cased, non-empty types.
+    """
+    return frozenset(t.strip().lower() for t in value.split(",") if t.strip())
+
+
+# clamd's StreamMaxLength defaults to 25 MiB; larger streams cannot be scanned.
+FILESCAN_MAX_FILE_SIZE = int(os.getenv("FILESCAN_MAX_FILE_SIZE", str(25 * 1024 * 1024)))
+
+# Must match the formats and IMAGE_UPLOAD_MAX_FILE_SIZE the backend accepts for images.
+FILESCAN_IMAGE_TYPES = _types(os.getenv("FILESCAN_IMAGE_TYPES", "png,jpeg,gif,webp"))
+FILESCAN_IMAGE_MAX_SIZE = int(
+    os.getenv("FILESCAN_IMAGE_MAX_SIZE", str(5 * 1024 * 1024))
+)
+
+# File types that are not sent to ClamAV. Empty by default: skipping the antivirus
+# for a type is a security decision an operator has to make explicitly.
+FILESCAN_CLAMAV_SKIP_TYPES = _types(os.getenv("FILESCAN_CLAMAV_SKIP_TYPES", ""))
+
+
+@dataclass(frozen=True)
+class UploadProfile:
+    """
+    Restrictions for the uploads of one kind of endpoint.
+
+    Parameters
+    ----------
+    allowed_types : frozenset[str]
+        File types detected from the leading bytes that are accepted.
+
+    max_size : int
+        The largest accepted file in bytes.
+    """
+
+    allowed_types: frozenset[str]
+    max_size: int
+
+
+PROFILES = {
+    "image": UploadProfile(
+        allowed_types=FILESCAN_IMAGE_TYPES, max_size=FILESCAN_IMAGE_MAX_SIZE
+    ),
+}
+
+
+def check_size(info: FileInfo) -> ScanResult | None:
+    """
+    Reject files larger than the service or the upload profile accepts.
+
+    Parameters
+    ----------
+    info : FileInfo
+        The file.
+
+    Returns
+    -------
+    ScanResult | None
+        A rejection, or None if the size is acceptable.
+    """
+    limit = FILESCAN_MAX_FILE_SIZE
+    if info.profile in PROFILES:
+        limit = min(limit, PROFILES[info.profile].max_size)
+
+    if info.size > limit:
+        return (False, f"The file is larger than {limit} bytes.", None)
+
+    return None
+
+
+def check_file_type(info: FileInfo) -> ScanResult | None:
+    """
+    Reject files whose content is not of a type the upload profile accepts.
+
+    Parameters
+    ----------
+    info : FileInfo
+        The file; files without a profile are not restricted.
+
+    Returns
+    -------
+    ScanResult | None
+        A rejection, or None if the type is acceptable.
+    """
+    if info.profile not in PROFILES:
+        return None
+
+    if info.file_type not in PROFILES[info.profile].allowed_types:
+        return (
+            False,
+            f"The file content ({info.file_type}) is not an accepted {info.profile} type.",
+            None,
+        )
+
+    return None
+
+
+def known_bad_check(
+    lookup: Callable[[str], str | None],
+) -> Callable[[FileInfo], ScanResult | None]:
+    """
+    Build a check that flags files whose hash is known to be malicious.
+
+    Parameters
+    ----------
+    lookup : Callable[[str], str | None]
+        Returns the signature recorded for a SHA-256 or MD5 hex digest, or None if
+        it is not known.
+
+    Returns
+    -------
+    Callable[[FileInfo], ScanResult | None]
+        The check; it needs ``FileInfo.sha256`` and ``FileInfo.md5``.
+    """
+
+    def _check(info: FileInfo) -> ScanResult | None:
+        for digest in (info.sha256, info.md5):
+            if digest is None:
+                continue
+
+            signature = lookup(digest)
+            if signature is not None:
+                return (True, "Matched a known malicious file.", signature)
+
+        return None
+
+    return _check
+
+
+def might_be_image(info: FileInfo) -> bool:
+    """
+    Whether a file is, or could be, an image.
+
+    Parameters
+    ----------
+    info : FileInfo
+        The file.
+
+    Returns
+    -------
+    bool
+        True for accepted image types and for files of unknown type.
+    """
+    return info.file_type in FILESCAN_IMAGE_TYPES or info.file_type == "unknown"
+
+
+def needs_clamav(info: FileInfo) -> bool:
+    """
+    Whether a file should be scanned by ClamAV.
+
+    Parameters
+    ----------
+    info : FileInfo
+        The file.
+
+    Returns
+    -------
+    bool
+        False only for types listed in ``FILESCAN_CLAMAV_SKIP_TYPES``.
+    """
+    return info.file_type not in FILESCAN_CLAMAV_SKIP_TYPES
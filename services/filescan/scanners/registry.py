@@ -0,0 +1,248 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Registry of the scanners a file passes through, ordered from cheap to expensive.
+
+There are two kinds of scanners:
+
+- Checks run on the metadata of a file (size, type detected from its first bytes
+  and, if asked for, its SHA-256 and MD5). They take microseconds and run one after the
+  other in order of cost; the first one that returns a result decides the verdict.
+- Streaming scanners read the whole file, e.g. ClamAV. They are grouped in tiers:
+  the scanners of a tier share one read of the file and run concurrently, and a
+  later tier only runs if the earlier ones found nothing.
+
+Every scanner declares its cost and which files it applies to, so a file only
+reaches clamd if the cheap checks could not settle it.
+"""
+
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+
+# (malware detected, detail, signature or None), as returned by every scanner.
+ScanResult = tuple[bool, str, str | None]
+
+# Leading bytes that identify a file type; checked in order.
+MAGIC_NUMBERS: tuple[tuple[str, bytes, int], ...] = (
+    ("png", b"\x89PNG\r\n\x1a\n", 0),
+    ("jpeg", b"\xff\xd8\xff", 0),
+    ("gif", b"GIF87a", 0),
+    ("gif", b"GIF89a", 0),
+    ("webp", b"WEBP", 8),
+    ("pdf", b"%PDF-", 0),
+    ("zip", b"PK\x03\x04", 0),
+    ("gzip", b"\x1f\x8b", 0),
+    ("pe", b"MZ", 0),
+    ("elf", b"\x7fELF", 0),
+)
+# Enough for every entry of MAGIC_NUMBERS.
+MAGIC_HEAD_SIZE = 16
+
+
+def detect_file_type(head: bytes) -> str:
+    """
+    Identify a file type from the first bytes of a file.
+
+    Parameters
+    ----------
+    head : bytes
+        At least the first ``MAGIC_HEAD_SIZE`` bytes of the file, if it has as many.
+
+    Returns
+    -------
+    str
+        The file type, e.g. ``png``, or ``unknown``.
+    """
+    for file_type, magic, offset in MAGIC_NUMBERS:
+        if head[offset : offset + len(magic)] == magic:
+            # WEBP is a RIFF container; the format is named at offset 8.
+            if file_type == "webp" and not head.startswith(b"RIFF"):
+                continue
+
+            return file_type
+
+    return "unknown"
+
+
+@dataclass(frozen=True)
+class FileInfo:
+    """
+    What the checks know about a file before it is read in full.
+
+    Parameters
+    ----------
+    filename : str
+        The name the file was uploaded with.
+
+    size : int
+        The size in bytes.
+
+    file_type : str
+        The type detected from the leading bytes, see ``detect_file_type``.
+
+    profile : str | None, default=None
+        The upload profile the caller asked for, e.g. ``image``.
+
+    sha256 : str | None, default=None
+        The hex SHA-256 of the file, only set for checks that need it.
+
+    md5 : str | None, default=None
+        The hex MD5 of the file, set together with ``sha256``.
+    """
+
+    filename: str
+    size: int
+    file_type: str
+    profile: str | None = None
+    sha256: str | None = None
+    md5: str | None = None
+
+
+def _always(info: FileInfo) -> bool:
+    """
+    Apply a scanner to every file.
+
+    Parameters
+    ----------
+    info : FileInfo
+        The file.
+
+    Returns
+    -------
+    bool
+        Always True.
+    """
+    return True
+
+
+@dataclass(frozen=True)
+class Check:
+    """
+    A cheap scanner that decides on the metadata of a file.
+
+    Parameters
+    ----------
+    name : str
+        The scanner name, reported as ``source`` when it decides the verdict.
+
+    run : Callable[[FileInfo], ScanResult | None]
+        Returns a verdict, or None to let the file through. A verdict without a
+        detection rejects the file without marking it as malware.
+
+    cost : int
+        Relative cost; cheaper checks run first.
+
+    needs_hash : bool, default=False
+        Whether ``FileInfo.sha256`` and ``FileInfo.md5`` must be set, which
+        requires reading the file.
+
+    applies_to : Callable[[FileInfo], bool], default=_always
+        Whether the check is relevant for a file.
+    """
+
+    name: str
+    run: Callable[[FileInfo], ScanResult | None]
+    cost: int
+    needs_hash: bool = False
+    applies_to: Callable[[FileInfo], bool] = field(default=_always)
+
+
+@dataclass(frozen=True)
+class StreamingScanner:
+    """
+    A scanner that reads the whole file.
+
+    Parameters
+    ----------
+    name : str
+        The scanner name, reported as ``source`` when it detects something.
+
+    scan : Callable[[Iterable[bytes]], Awaitable[ScanResult]]
+        Scans the chunks of a file.
+
+    tier : int
+        Scanners of lower tiers run first.
+
+    cost : int
+        Relative cost; within a tier, detections of cheaper scanners are reported first.
+
+    applies_to : Callable[[FileInfo], bool], default=_always
+        Whether the scanner is relevant for a file.
+    """
+
+    name: str
+    scan: Callable[[Iterable[bytes]], Awaitable[ScanResult]]
+    tier: int
+    cost: int
+    applies_to: Callable[[FileInfo], bool] = field(default=_always)
+
+
+class ScannerRegistry:
+    """
+    The checks and streaming scanners of the service.
+    """
+
+    def __init__(self) -> None:
+        self._checks: list[Check] = []
+        self._scanners: list[StreamingScanner] = []
+
+    def add_check(self, check: Check) -> None:
+        """
+        Register a check.
+
+        Parameters
+        ----------
+        check : Check
+            The check.
+        """
+        self._checks.append(check)
+
+    def add_scanner(self, scanner: StreamingScanner) -> None:
+        """
+        Register a streaming scanner.
+
+        Parameters
+        ----------
+        scanner : StreamingScanner
+            The scanner.
+        """
+        self._scanners.append(scanner)
+
+    def checks_for(self, info: FileInfo) -> list[Check]:
+        """
+        Return the checks that apply to a file in the order they should run.
+
+        Parameters
+        ----------
+        info : FileInfo
+            The file.
+
+        Returns
+        -------
+        list[Check]
+            Checks that do not need the hash first, then by cost.
+        """
+        return sorted(
+            (check for check in self._checks if check.applies_to(info)),
+            key=lambda check: (check.needs_hash, check.cost),
+        )
+
+    def tiers_for(self, info: FileInfo) -> list[list[StreamingScanner]]:
+        """
+        Return the streaming scanners that apply to a file, grouped by tier.
+
+        Parameters
+        ----------
+        info : FileInfo
+            The file.
+
+        Returns
+        -------
+        list[list[StreamingScanner]]
+            The tiers in the order they should run, each sorted by cost.
+        """
+        tiers: dict[int, list[StreamingScanner]] = {}
+        for scanner in sorted(self._scanners, key=lambda s: (s.tier, s.cost)):
+            if scanner.applies_to(info):
+                tiers.setdefault(scanner.tier, []).append(scanner)
+
+        return [tiers[tier] for tier in sorted(tiers)]
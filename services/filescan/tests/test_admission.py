@@ -0,0 +1,101 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the admission control of scans.
+"""
+
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def test_admission_controller_queues_then_rejects_when_full() -> None:
+    async def _run() -> None:
+        controller = AdmissionController(max_active=1, max_queued=1, queue_timeout=5)
+        release = asyncio.Event()
+        order: list[str] = []
+
+        async def _hold(name: str) -> None:
+            async with controller.slot():
+                order.append(name)
+                await release.wait()
+
+        first = asyncio.create_task(_hold("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(_hold("second"))
+        await asyncio.sleep(0)
+
+        assert controller.stats()["active"] == 1
+        assert controller.queue_depth == 1
+
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with controller.slot():
+                pass
+
+        assert excinfo.value.status_code == 429
+        assert excinfo.value.queue_depth == 1
+        assert excinfo.value.retry_after >= 1
+
+        release.set()
+        await asyncio.gather(first, second)
+
+        assert order == ["first", "second"]
+        stats = controller.stats()
+        assert stats["active"] == 0
+        assert stats["queue_depth"] == 0
+        assert stats["admitted"] == 2
+        assert stats["rejected_full"] == 1
+
+    asyncio.run(_run())
+
+
+def test_admission_controller_rejects_after_queue_timeout() -> None:
+    async def _run() -> None:
+        controller = AdmissionController(max_active=1, max_queued=5, queue_timeout=0.01)
+        async with controller.slot():
+            with pytest.raises(AdmissionRejected) as excinfo:
+                async with controller.slot():
+                    pass
+
+            assert excinfo.value.status_code == 503
+            assert controller.queue_depth == 0
+
+        # The slot is free again once the holder leaves.
+        async with controller.slot():
+            assert controller.stats()["active"] == 1
+
+        assert controller.stats()["rejected_timeout"] == 1
+
+    asyncio.run(_run())
+
+
+def test_admission_controller_admits_weighted_requests_in_order() -> None:
+    async def _run() -> None:
+        controller = AdmissionController(max_active=2, max_queued=5, queue_timeout=5)
+        release = asyncio.Event()
+        order: list[str] = []
+
+        async def _hold(name: str, weight: int) -> None:
+            async with controller.slot(weight):
+                order.append(name)
+                await release.wait()
+
+        tasks = [asyncio.create_task(_hold("single", 1))]
+        await asyncio.sleep(0)
+        # A batch larger than the limit is capped so that it can be admitted.
+        tasks.append(asyncio.create_task(_hold("batch", 5)))
+        await asyncio.sleep(0)
+        # Fits into the free slot, but must not overtake the waiting batch.
+        tasks.append(asyncio.create_task(_hold("late", 1)))
+        await asyncio.sleep(0)
+
+        assert order == ["single"]
+        assert controller.queue_depth == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        assert order == ["single", "batch", "late"]
+
+    asyncio.run(_run())
@@ -3,43 +3,67 @@
 Tests for the ClamAV scanner.
 """
 
-import io
+from collections.abc import Iterable
+
+import pytest
 
 from scanners import clamav
+from scanners.clamd_pool import ClamdSession, ClamdSessionPool
 
 
-class _FakeClamdClient:
+class _FakeClamdClient(ClamdSession):
     def __init__(
         self,
         ping_ok: bool,
         scan_result: dict | None,
         ping_raises: Exception | None = None,
     ) -> None:
+        super().__init__("/nonexistent.sock")
         self._ping_ok = ping_ok
         self._scan_result = scan_result
         self._ping_raises = ping_raises
+        self.version_reply = "ClamAV 1.4.1/27400/Tue Oct 14 08:34:45 2025"
+        self.scanned: list[bytes] = []
+
+    def open(self) -> None:
+        pass
+
+    def command(self, name: str) -> str:
+        if name == "VERSION":
+            return self.version_reply
 
-    def ping(self) -> str:
         if self._ping_raises is not None:
             raise self._ping_raises
         return "PONG" if self._ping_ok else ""
 
-    def instream(self, buff: io.BytesIO) -> dict:  # noqa: ARG002
-        return self._scan_result if self._scan_result is not None else {}
+    def instream(self, chunks: Iterable[bytes]) -> str:
+        self.scanned.append(b"".join(chunks))
+        if not self._scan_result:
+            return "stream: OK"
+
+        _, (status, signature) = next(iter(self._scan_result.items()))
+        return f"stream: {signature} {status}"
+
+    def close(self) -> None:
+        pass
 
 
 def _mock_clamd(monkeypatch, client: _FakeClamdClient) -> None:
     def _factory(_socket: str) -> _FakeClamdClient:  # noqa: ARG001
         return client
 
-    monkeypatch.setattr("scanners.clamav.ClamdUnixSocket", _factory)
+    monkeypatch.setattr("scanners.clamav.ClamdSession", _factory)
+    monkeypatch.setattr(
+        "scanners.clamav._pool",
+        ClamdSessionPool(size=2, connect=clamav._open_session),
+    )
 
 
 def test_scan_with_clamav_returns_clean_for_none_result(monkeypatch) -> None:
     client = _FakeClamdClient(ping_ok=True, scan_result=None)
     _mock_clamd(monkeypatch, client)
 
-    detected, detail, signature = clamav._scan_with_clamav_sync(b"dummy-bytes")
+    detected, detail, signature = clamav._scan_with_clamav_sync([b"dummy-bytes"])
 
     assert detected is False
     assert detail == "No malware detected by ClamAV."
@@ -53,7 +77,7 @@ def test_scan_with_clamav_detects_malware(monkeypatch) -> None:
     )
     _mock_clamd(monkeypatch, client)
 
-    detected, detail, signature = clamav._scan_with_clamav_sync(b"dummy-bytes")
+    detected, detail, signature = clamav._scan_with_clamav_sync([b"dummy-bytes"])
 
     assert detected is True
     assert detail == "Malware detected by ClamAV."
@@ -67,7 +91,7 @@ def test_scan_with_clamav_unexpected_status(monkeypatch) -> None:
     )
     _mock_clamd(monkeypatch, client)
 
-    detected, detail, signature = clamav._scan_with_clamav_sync(b"dummy-bytes")
+    detected, detail, signature = clamav._scan_with_clamav_sync([b"dummy-bytes"])
 
     assert detected is False
     assert detail == "Unexpected scan status."
@@ -79,7 +103,7 @@ def test_scan_with_clamav_raises_when_ping_false(monkeypatch) -> None:
     _mock_clamd(monkeypatch, client)
 
     try:
-        clamav._scan_with_clamav_sync(b"dummy-bytes")
+        clamav._scan_with_clamav_sync([b"dummy-bytes"])
 
     except RuntimeError as exc:
         assert "ClamAV daemon is not responding to ping()" in str(exc)
@@ -95,10 +119,79 @@ def test_scan_with_clamav_raises_when_ping_throws(monkeypatch) -> None:
     _mock_clamd(monkeypatch, client)
 
     try:
-        clamav._scan_with_clamav_sync(b"dummy-bytes")
+        clamav._scan_with_clamav_sync([b"dummy-bytes"])
 
     except RuntimeError as exc:
         assert "Unable to connect to ClamAV daemon" in str(exc)
 
     else:  # pragma: no cover - defensive
         assert False, "Expected RuntimeError when ping() raises"
+
+
+def test_get_clamav_signature_version_parses_reply(monkeypatch) -> None:
+    client = _FakeClamdClient(ping_ok=True, scan_result=None)
+    _mock_clamd(monkeypatch, client)
+
+    assert clamav._get_clamav_signature_version_sync() == "27400"
+
+    client.version_reply = "ClamAV 1.4.1"
+    assert clamav._get_clamav_signature_version_sync() is None
+
+
+def test_scan_with_clamav_reuses_pooled_session(monkeypatch) -> None:
+    client = _FakeClamdClient(ping_ok=True, scan_result=None)
+    _mock_clamd(monkeypatch, client)
+    payload = [b"x" * 1024, b"y" * 1024, b"z"]
+
+    clamav._scan_with_clamav_sync(payload)
+    clamav._scan_with_clamav_sync([b"dummy-bytes"])
+
+    assert client.scanned == [b"".join(payload), b"dummy-bytes"]
+    stats = clamav.clamav_pool_stats()
+    assert stats["opened"] == 1
+    assert stats["reused"] == 1
+    assert stats["idle"] == 1
+
+
+def test_scan_with_clamav_reconnects_broken_session(monkeypatch) -> None:
+    client = _FakeClamdClient(ping_ok=True, scan_result=None)
+    _mock_clamd(monkeypatch, client)
+    clamav._scan_with_clamav_sync([b"first"])
+
+    calls = 0
+    original = client.instream
+
+    def _flaky_instream(chunks: Iterable[bytes]) -> str:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise BrokenPipeError("clamd closed the session")
+
+        return original(chunks)
+
+    monkeypatch.setattr(client, "instream", _flaky_instream)
+
+    detected, _, _ = clamav._scan_with_clamav_sync([b"second"])
+
+    assert detected is False
+    assert calls == 2
+    stats = clamav.clamav_pool_stats()
+    assert stats["discarded"] == 1
+    assert stats["opened"] == 2
+
+
+def test_scan_with_clamav_does_not_replay_a_consumed_stream(monkeypatch) -> None:
+    client = _FakeClamdClient(ping_ok=True, scan_result=None)
+    _mock_clamd(monkeypatch, client)
+    clamav._scan_with_clamav_sync([b"first"])
+
+    def _broken_instream(chunks: Iterable[bytes]) -> str:
+        list(chunks)
+        raise BrokenPipeError("clamd closed the session")
+
+    monkeypatch.setattr(client, "instream", _broken_instream)
+
+    with pytest.raises(RuntimeError, match="Unable to connect to ClamAV daemon"):
+        clamav._scan_with_clamav_sync(iter([b"second"]))
+
+    assert clamav.clamav_pool_stats()["opened"] == 1
@@ -0,0 +1,119 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for clamd sessions and the session pool.
+"""
+
+import socket
+import struct
+import threading
+from pathlib import Path
+
+from scanners.clamd_pool import ClamdSession, ClamdSessionPool
+
+
+def _serve_session(server: socket.socket, requests: list[str]) -> None:
+    """
+    Answer IDSESSION commands like clamd until the client ends the session.
+    """
+    conn, _ = server.accept()
+    with conn, conn.makefile("rb") as stream:
+        number = 0
+        while True:
+            command = b""
+            while not command.endswith(b"\0"):
+                byte = stream.read(1)
+                if not byte:
+                    return
+                command += byte
+
+            name = command[1:-1].decode()
+            requests.append(name)
+            if name == "IDSESSION":
+                continue
+
+            if name == "END":
+                return
+
+            number += 1
+            if name == "PING":
+                reply = "PONG"
+
+            elif name == "INSTREAM":
+                data = b""
+                while size := struct.unpack("!L", stream.read(4))[0]:
+                    data += stream.read(size)
+                reply = (
+                    "stream: Eicar-Test-Signature FOUND"
+                    if b"EICAR" in data
+                    else "stream: OK"
+                )
+
+            else:
+                reply = "UNKNOWN COMMAND"
+
+            conn.sendall(f"{number}: {reply}\0".encode())
+
+
+def test_clamd_session_speaks_idsession(tmp_path: Path) -> None:
+    socket_path = str(tmp_path / "clamd.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+    requests: list[str] = []
+    thread = threading.Thread(target=_serve_session, args=(server, requests))
+    thread.start()
+
+    session = ClamdSession(socket_path, timeout=5)
+    session.open()
+    try:
+        assert session.command("PING") == "PONG"
+        assert session.instream([b"clean ", b"bytes"]) == "stream: OK"
+        assert (
+            session.instream([b"X5O!P%@AP EICAR"])
+            == "stream: Eicar-Test-Signature FOUND"
+        )
+
+    finally:
+        session.close()
+        thread.join(timeout=5)
+        server.close()
+
+    assert requests == ["IDSESSION", "PING", "INSTREAM", "INSTREAM", "END"]
+
+
+class _Session(ClamdSession):
+    def __init__(self) -> None:
+        super().__init__("/nonexistent.sock")
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_clamd_pool_reopens_idle_sessions() -> None:
+    now = 0.0
+    opened: list[_Session] = []
+
+    def _connect() -> _Session:
+        opened.append(_Session())
+        return opened[-1]
+
+    pool = ClamdSessionPool(size=2, connect=_connect, max_idle=10, clock=lambda: now)
+
+    with pool.session() as first:
+        pass
+    with pool.session() as second:
+        assert second is first
+
+    now = 11
+    with pool.session() as third:
+        assert third is not first
+
+    assert first.closed
+    assert pool.stats() == {
+        "size": 2,
+        "idle": 1,
+        "opened": 2,
+        "reused": 1,
+        "discarded": 1,
+    }
@@ -0,0 +1,156 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the memory-mapped known-bad hash index and its builder.
+"""
+
+import hashlib
+import json
+import os
+
+import pytest
+
+from build_hash_index import main as build_main
+from scanners.hash_index import (
+    HashIndex,
+    ReloadingHashIndex,
+    bloom_parameters,
+    build_hash_index,
+    read_hash_list,
+)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_hash_index_finds_listed_digests_and_rejects_others(tmp_path) -> None:
+    path = str(tmp_path / "index.bin")
+    entries = [(_sha256(str(i).encode()), f"Sig.{i % 3}") for i in range(2000)]
+    entries.append((hashlib.md5(b"md5-listed").hexdigest(), "Md5.Sig"))
+
+    summary = build_hash_index(entries, path)
+    index = HashIndex(path)
+
+    assert summary["sha256"] == 2000
+    assert summary["md5"] == 1
+    assert summary["signatures"] == 4
+    assert len(index) == 2001
+    assert index.lookup(_sha256(b"0")) == "Sig.0"
+    assert index.lookup(_sha256(b"1999").upper()) == "Sig.1"
+    assert index.lookup(hashlib.md5(b"md5-listed").hexdigest()) == "Md5.Sig"
+    assert index.lookup(hashlib.md5(b"0").hexdigest()) is None
+    assert index.lookup("ab" * 20) is None
+
+    unlisted = [_sha256(f"clean-{i}".encode()) for i in range(2000)]
+    assert all(index.lookup(digest) is None for digest in unlisted)
+    # The Bloom filter answers nearly all of them without a search.
+    passed = sum(index.might_contain(bytes.fromhex(d)) for d in unlisted)
+    assert passed < 20
+
+
+def test_hash_index_handles_an_empty_list(tmp_path) -> None:
+    path = str(tmp_path / "index.bin")
+    build_hash_index([], path)
+
+    index = HashIndex(path)
+
+    assert len(index) == 0
+    assert index.lookup(_sha256(b"anything")) is None
+
+
+def test_hash_index_rejects_foreign_and_truncated_files(tmp_path) -> None:
+    path = tmp_path / "index.bin"
+    path.write_bytes(b"not an index at all, just some bytes")
+    with pytest.raises(ValueError):
+        HashIndex(str(path))
+
+    build_hash_index([(_sha256(b"x"), "Sig")], str(path))
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        HashIndex(str(path))
+
+
+def test_bloom_parameters_scale_with_entries() -> None:
+    size, hashes = bloom_parameters(1_000_000, 0.001)
+
+    # About 14.4 bits and 10 hash functions per digest for a 0.1% rate.
+    assert 1_790_000 < size < 1_810_000
+    assert hashes == 10
+
+
+def test_read_hash_list_parses_digests_and_signatures(tmp_path) -> None:
+    path = tmp_path / "feed.txt"
+    path.write_text("# feed\n" + "A" * 64 + " Win.Trojan.Test\n" + "b" * 32 + "\n\n")
+
+    assert list(read_hash_list(str(path))) == [
+        ("a" * 64, "Win.Trojan.Test"),
+        ("b" * 32, "Known-Bad-Hash"),
+    ]
+
+    path.write_text("a" * 40 + "\n")
+    with pytest.raises(ValueError, match="feed.txt:1"):
+        list(read_hash_list(str(path)))
+
+
+def test_reloading_hash_index_swaps_in_a_rebuilt_file(tmp_path) -> None:
+    path = str(tmp_path / "index.bin")
+    clock = _Clock()
+    reloading = ReloadingHashIndex(path, check_interval=30, clock=clock)
+
+    assert not reloading.available
+    assert reloading.lookup(_sha256(b"old")) is None
+
+    clock.now += 31
+    build_hash_index([(_sha256(b"old"), "Old.Sig")], path)
+    assert reloading.lookup(_sha256(b"old")) == "Old.Sig"
+
+    build_hash_index([(_sha256(b"new"), "New.Sig")], path)
+    # The file is only checked again after the interval.
+    assert reloading.lookup(_sha256(b"new")) is None
+
+    clock.now += 31
+    assert reloading.lookup(_sha256(b"new")) == "New.Sig"
+    assert reloading.lookup(_sha256(b"old")) is None
+    assert reloading.stats() == {
+        "sha256": 1,
+        "md5": 0,
+        "reloads": 2,
+        "lookups": 4,
+        "matches": 2,
+    }
+
+
+def test_reloading_hash_index_keeps_serving_when_a_file_is_corrupt(tmp_path) -> None:
+    path = tmp_path / "index.bin"
+    build_hash_index([(_sha256(b"bad"), "Sig")], str(path))
+    clock = _Clock()
+    reloading = ReloadingHashIndex(str(path), check_interval=0, clock=clock)
+    assert reloading.lookup(_sha256(b"bad")) == "Sig"
+
+    tmp = tmp_path / "broken.bin"
+    tmp.write_bytes(b"garbage")
+    os.replace(tmp, path)
+
+    assert reloading.lookup(_sha256(b"bad")) == "Sig"
+
+
+def test_build_hash_index_command_writes_the_index_atomically(tmp_path, capsys) -> None:
+    feed = tmp_path / "feed.txt"
+    feed.write_text(_sha256(b"bad") + " Win.Test\n" + hashlib.md5(b"bad").hexdigest())
+    output = tmp_path / "index.bin"
+
+    assert build_main([str(feed), "--output", str(output)]) == 0
+
+    assert json.loads(capsys.readouterr().out)["sha256"] == 1
+    assert HashIndex(str(output)).lookup(hashlib.md5(b"bad").hexdigest()) == (
+        "Known-Bad-Hash"
+    )
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["feed.txt", "index.bin"]
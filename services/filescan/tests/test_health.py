@@ -0,0 +1,87 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the background-refreshed health state.
+"""
+
+import asyncio
+
+from health import HealthMonitor
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_health_monitor_caches_the_probe_result() -> None:
+    clock = _Clock()
+    replies: list[str | Exception] = ["27400", RuntimeError("clamd down"), "27401"]
+
+    async def _probe() -> str | None:
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+
+        return reply
+
+    monitor = HealthMonitor(_probe, max_age=30, clock=clock)
+    assert monitor.snapshot()["status"] == "unavailable"
+
+    asyncio.run(monitor.refresh())
+    clock.now += 5
+    assert monitor.snapshot() == {
+        "status": "ok",
+        "clamav": "ok",
+        "signature_version": "27400",
+        "age_seconds": 5,
+        "stale": False,
+        "consecutive_failures": 0,
+        "detail": None,
+    }
+
+    asyncio.run(monitor.refresh())
+    failed = monitor.snapshot()
+    assert failed["status"] == "unavailable"
+    assert failed["detail"] == "clamd down"
+    assert failed["consecutive_failures"] == 1
+    # The last known version is kept for operators.
+    assert failed["signature_version"] == "27400"
+
+    asyncio.run(monitor.refresh())
+    assert monitor.snapshot()["signature_version"] == "27401"
+
+
+def test_health_monitor_reports_stale_state() -> None:
+    clock = _Clock()
+
+    async def _probe() -> str | None:
+        return "27400"
+
+    monitor = HealthMonitor(_probe, max_age=30, clock=clock)
+    asyncio.run(monitor.refresh())
+    clock.now += 31
+
+    snapshot = monitor.snapshot()
+    assert snapshot["status"] == "stale"
+    assert snapshot["stale"] is True
+    assert snapshot["detail"] == "The health state was last refreshed 31 seconds ago."
+
+
+def test_health_monitor_shares_one_probe_between_concurrent_refreshes() -> None:
+    probes: list[int] = []
+
+    async def _probe() -> str | None:
+        probes.append(1)
+        await asyncio.sleep(0.01)
+        return "27400"
+
+    async def _main() -> None:
+        monitor = HealthMonitor(_probe)
+        await asyncio.gather(*(monitor.refresh() for _ in range(5)))
+
+    asyncio.run(_main())
+
+    assert len(probes) == 1
@@ -0,0 +1,84 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the fake clamd and the load test harness.
+"""
+
+import asyncio
+
+from benchmarks.fake_clamd import EICAR_MARKER, FakeClamd
+from benchmarks.load_test import (
+    Workload,
+    in_process_service,
+    parse_mix,
+    parse_size,
+    percentile,
+    run_workload,
+)
+from scanners.clamd_pool import ClamdSession
+from verdict_cache import VerdictCache
+
+
+def test_fake_clamd_speaks_the_session_protocol() -> None:
+    with FakeClamd(latency=0.001) as clamd:
+        session = ClamdSession(clamd.socket_path, timeout=5)
+        session.open()
+        assert session.command("PING") == "PONG"
+        assert session.command("VERSION").startswith("ClamAV 1.4.1/27400/")
+        assert session.instream([b"clean", b" bytes"]) == "stream: OK"
+        assert (
+            session.instream([b"x" + EICAR_MARKER])
+            == "stream: Eicar-Test-Signature FOUND"
+        )
+        session.close()
+
+        assert clamd.stats() == {
+            "connections": 1,
+            "scans": 2,
+            "scanned_bytes": len(b"clean bytes") + 1 + len(EICAR_MARKER),
+        }
+
+
+def test_load_test_parses_sizes_and_percentiles() -> None:
+    assert parse_size("512") == 512
+    assert parse_size("4k") == 4096
+    assert parse_size("1.5m") == 1536 * 1024
+    assert parse_mix("4k:70,1m") == [(4096, 70.0), (1024**2, 1.0)]
+
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 99) == 0
+
+
+def test_load_test_drives_the_service_against_the_fake_clamd(monkeypatch) -> None:
+    # Let the harness repoint the service; monkeypatch restores the originals.
+    monkeypatch.setattr("scanners.clamav.CLAMAV_SOCKET", "unset")
+    monkeypatch.setattr("main.quarantine_store", None)
+    monkeypatch.setattr("main.verdict_cache", VerdictCache())
+    monkeypatch.setattr("scanners.clamav._signature_version", None)
+    monkeypatch.setattr("scanners.clamav._signature_version_checked_at", float("-inf"))
+    workload = Workload(
+        endpoint="batch",
+        requests=6,
+        concurrency=3,
+        sizes=parse_mix("1k:3,64k:1"),
+        batch_size=2,
+        malware_rate=0.5,
+        warmup=2,
+    )
+
+    async def _main() -> dict[str, object]:
+        async with in_process_service(clamd) as client:
+            return await run_workload(client, workload, seed=1)
+
+    with FakeClamd() as clamd:
+        summary = asyncio.run(_main())
+        scans = clamd.stats()["scans"]
+
+    assert summary["requests"] == 6
+    assert summary["files"] == 12
+    assert summary["statuses"] == {"200": 6}
+    assert set(summary["latency_ms"]) == {"p50", "p90", "p99", "max"}
+    assert summary["peak_rss_mib"] > 0
+    # Warm-up files are scanned too, but left out of the summary.
+    assert scans == 16
@@ -0,0 +1,40 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the Prometheus metrics of the filescan service.
+"""
+
+from metrics import Registry
+
+
+def test_registry_renders_counters_histograms_and_callbacks() -> None:
+    registry = Registry()
+    scans = registry.counter("scans_total", "Files scanned.")
+    duration = registry.histogram(
+        "duration_seconds", "Scan duration.", buckets=(0.1, 1)
+    )
+    registry.callback("queue_depth", "Waiting scans.", "gauge", lambda: [({}, 3)])
+
+    scans.inc(verdict="clean")
+    scans.inc(2, verdict='with "quotes"')
+    duration.observe(0.05, scanner="clamav")
+    duration.observe(0.5, scanner="clamav")
+    duration.observe(7, scanner="clamav")
+
+    assert registry.render().splitlines() == [
+        "# HELP scans_total Files scanned.",
+        "# TYPE scans_total counter",
+        'scans_total{verdict="clean"} 1',
+        'scans_total{verdict="with \\"quotes\\""} 2',
+        "# HELP duration_seconds Scan duration.",
+        "# TYPE duration_seconds histogram",
+        'duration_seconds_bucket{scanner="clamav",le="0.1"} 1',
+        'duration_seconds_bucket{scanner="clamav",le="1"} 2',
+        'duration_seconds_bucket{scanner="clamav",le="+Inf"} 3',
+        'duration_seconds_sum{scanner="clamav"} 7.55',
+        'duration_seconds_count{scanner="clamav"} 3',
+        "# HELP queue_depth Waiting scans.",
+        "# TYPE queue_depth gauge",
+        "queue_depth 3",
+    ]
+    assert scans.value(verdict="clean") == 1
+    assert duration.count(scanner="clamav") == 3
@@ -0,0 +1,181 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the security event notifications of the filescan service.
+"""
+
+import asyncio
+import json
+
+import httpx
+
+import notification_helpers
+from metrics import SECURITY_EVENT_LAG
+from notification_helpers import SecurityEventQueue, notify_malware_quarantined
+
+EVENT = {
+    "filename": "eicar.txt",
+    "signature": "EICAR-TEST",
+    "source": "clamav",
+    "quarantine_id": "abc123",
+    "detail": "Malware detected by ClamAV.",
+}
+
+
+def _enable_alerts(monkeypatch) -> None:
+    monkeypatch.setenv("FILESCAN_ALERTS_ENABLED", "true")
+    monkeypatch.setenv("ALERTS_BACKEND_URL", "http://backend/internal/security-events")
+    monkeypatch.setenv("ALERTS_BACKEND_TOKEN", "secret-token")
+
+
+def _queue(tmp_path, handler, **kwargs) -> SecurityEventQueue:
+    return SecurityEventQueue(
+        spool_dir=str(tmp_path),
+        retry_backoff=0,
+        transport=httpx.MockTransport(handler),
+        **kwargs,
+    )
+
+
+def test_notify_malware_quarantined_builds_and_posts_event(
+    monkeypatch, tmp_path
+) -> None:
+    """
+    notify_malware_quarantined should queue a generic envelope that is POSTed
+    to the configured backend URL in the background when alerts are enabled.
+    """
+    _enable_alerts(monkeypatch)
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(204)
+
+    queue = _queue(tmp_path, handler)
+    monkeypatch.setattr(notification_helpers, "security_events", queue)
+
+    async def _run() -> None:
+        await queue.start()
+        await notify_malware_quarantined(
+            {**EVENT, "content_type": "text/plain", "size_bytes": 68}
+        )
+        await queue.stop()
+
+    asyncio.run(_run())
+
+    assert len(requests) == 1
+    sent = requests[0]
+    assert str(sent.url) == "http://backend/internal/security-events"
+    assert sent.headers["X-Internal-Token"] == "secret-token"
+    (envelope,) = json.loads(sent.read())
+    assert envelope["type"] == "malware_quarantined"
+    assert envelope["producer"] == "filescan"
+    assert envelope["payload"]["filename"] == "eicar.txt"
+    assert envelope["payload"]["quarantine_id"] == "abc123"
+    assert envelope["payload"]["content_type"] == "text/plain"
+    assert envelope["payload"]["size_bytes"] == 68
+    assert queue.stats()["delivered"] == 1
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_notify_malware_quarantined_retries_transient_failures(
+    monkeypatch, tmp_path
+) -> None:
+    _enable_alerts(monkeypatch)
+    responses = iter([httpx.Response(503), httpx.Response(204)])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return next(responses)
+
+    queue = _queue(tmp_path, handler)
+    monkeypatch.setattr(notification_helpers, "security_events", queue)
+    lag_before = SECURITY_EVENT_LAG.count()
+
+    async def _run() -> None:
+        await queue.start()
+        await notify_malware_quarantined(EVENT)
+        await queue.stop()
+
+    asyncio.run(_run())
+
+    assert queue.stats() == {"queued": 0, "delivered": 1, "failed": 0}
+    # The delivery lag is recorded once the event is accepted, not per attempt.
+    assert SECURITY_EVENT_LAG.count() == lag_before + 1
+
+
+def test_security_event_queue_redelivers_spooled_events_after_restart(
+    monkeypatch, tmp_path
+) -> None:
+    _enable_alerts(monkeypatch)
+    delivered: list[dict[str, object]] = []
+
+    def failing(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("backend down")
+
+    def working(request: httpx.Request) -> httpx.Response:
+        delivered.extend(json.loads(request.read()))
+        return httpx.Response(204)
+
+    first = _queue(tmp_path, failing, max_attempts=2)
+    monkeypatch.setattr(notification_helpers, "security_events", first)
+
+    async def _fail() -> None:
+        await first.start()
+        await notify_malware_quarantined(EVENT)
+        await first.stop()
+
+    asyncio.run(_fail())
+    assert first.stats()["failed"] == 1
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+    second = _queue(tmp_path, working)
+
+    async def _restart() -> None:
+        await second.start()
+        await second.stop()
+
+    asyncio.run(_restart())
+
+    assert [event["payload"]["quarantine_id"] for event in delivered] == ["abc123"]
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_security_event_queue_posts_queued_events_in_batches(
+    monkeypatch, tmp_path
+) -> None:
+    _enable_alerts(monkeypatch)
+    batches: list[list[str]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        batches.append(
+            [event["payload"]["quarantine_id"] for event in json.loads(request.read())]
+        )
+        return httpx.Response(204)
+
+    queue = _queue(tmp_path, handler, max_batch=2)
+    monkeypatch.setattr(notification_helpers, "security_events", queue)
+
+    async def _run() -> None:
+        # Spooled while the queue is stopped, so all of them are queued by start.
+        for i in range(5):
+            await notify_malware_quarantined({**EVENT, "quarantine_id": f"q{i}"})
+
+        await queue.start()
+        await queue.stop()
+
+    asyncio.run(_run())
+
+    assert batches == [["q0", "q1"], ["q2", "q3"], ["q4"]]
+    assert queue.stats() == {"queued": 0, "delivered": 5, "failed": 0}
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_notify_malware_quarantined_skips_queue_when_alerts_disabled(
+    monkeypatch, tmp_path
+) -> None:
+    monkeypatch.setenv("FILESCAN_ALERTS_ENABLED", "false")
+    queue = _queue(tmp_path, lambda request: httpx.Response(204))
+    monkeypatch.setattr(notification_helpers, "security_events", queue)
+
+    asyncio.run(notify_malware_quarantined(EVENT))
+
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,115 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the content-addressed quarantine store.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+
+from compact_quarantine import main as compact_main
+from quarantine_store import QuarantineStore
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _add(store: QuarantineStore, data: bytes, name: str = "bad.exe"):
+    sha256 = hashlib.sha256(data).hexdigest()
+    return store.add_sync(io.BytesIO(data), sha256, name, "Sig", "clamav")
+
+
+def test_quarantine_store_deduplicates_and_indexes_sightings(tmp_path) -> None:
+    clock = _Clock()
+    store = QuarantineStore(root=str(tmp_path), clock=clock)
+
+    first = asyncio.run(
+        store.add(
+            io.BytesIO(b"malware"),
+            hashlib.sha256(b"malware").hexdigest(),
+            "../../etc/bad.exe",
+        )
+    )
+    clock.now += 10
+    second = _add(store, b"malware", "other.exe")
+
+    assert first.sha256 == second.sha256
+    assert second.sightings == 2
+    assert second.filenames == ["bad.exe", "other.exe"]
+    assert second.last_seen - second.first_seen == 10
+    with open(store.object_path(first.sha256), "rb") as f_in:
+        assert f_in.read() == b"malware"
+
+    records = [json.loads(line) for line in open(store.index_path)]
+    assert len(records) == 2
+
+    # A fresh store rebuilds the same view from the index.
+    reloaded = QuarantineStore(root=str(tmp_path)).get(first.sha256)
+    assert reloaded == second
+
+
+def test_quarantine_store_evicts_least_recently_seen_beyond_size_limit(
+    tmp_path,
+) -> None:
+    clock = _Clock()
+    store = QuarantineStore(root=str(tmp_path), max_bytes=10, clock=clock)
+
+    old = _add(store, b"aaaaaa")
+    clock.now += 1
+    new = _add(store, b"bbbbbb")
+
+    assert store.get(old.sha256) is None
+    assert not os.path.exists(store.object_path(old.sha256))
+    assert store.get(new.sha256) is not None
+    assert store.stats() == {"files": 1, "bytes": 6, "sightings": 1}
+
+
+def test_quarantine_store_compact_applies_retention_and_collapses_index(
+    tmp_path,
+) -> None:
+    clock = _Clock()
+    store = QuarantineStore(root=str(tmp_path), retention_days=1, clock=clock)
+    expired = _add(store, b"expired")
+    clock.now += 2 * 86400
+    kept = _add(store, b"kept")
+    _add(store, b"kept")
+    orphan = tmp_path / "objects" / "ff" / "leftover.tmp"
+    orphan.parent.mkdir(exist_ok=True)
+    orphan.write_bytes(b"partial")
+
+    assert store.compact(dry_run=True)["expired"] == 1
+    assert os.path.exists(store.object_path(expired.sha256))
+
+    summary = store.compact()
+
+    assert summary == {
+        "expired": 1,
+        "evicted": 0,
+        "orphans": 1,
+        "files": 1,
+        "bytes": len(b"kept"),
+    }
+    assert not os.path.exists(store.object_path(expired.sha256))
+    assert not orphan.exists()
+    records = [json.loads(line) for line in open(store.index_path)]
+    assert [(r["sha256"], r["sightings"]) for r in records] == [(kept.sha256, 2)]
+
+
+def test_quarantine_store_reloads_after_external_compaction(tmp_path) -> None:
+    clock = _Clock()
+    service = QuarantineStore(root=str(tmp_path), clock=clock)
+    entry = _add(service, b"malware")
+    assert service.stats()["files"] == 1
+
+    os.remove(service.object_path(entry.sha256))
+    assert compact_main(["--root", str(tmp_path), "--retention-days", "0"]) == 0
+
+    assert service.stats()["files"] == 0
+    assert _add(service, b"malware").sightings == 1
@@ -3,13 +3,21 @@
 Tests for the filescan service endpoint.
 """
 
+from collections.abc import Iterable
+from hashlib import md5, sha256
 from pathlib import Path
-from typing import Any
 
 from fastapi.testclient import TestClient
 
-from main import app, notify_malware_quarantined
+from admission import AdmissionController, AdmissionRejected
+from health import HealthMonitor
+from main import app
+from metrics import REQUESTS, SCANNED_BYTES, SCANNER_DURATION, SCANS
+from quarantine_store import QuarantineStore
+from scanners.hash_index import ReloadingHashIndex, build_hash_index
 from tests.eicar_payload import eicar_test_fileobj
+from upload_stream import FILESCAN_CHUNK_SIZE
+from verdict_cache import VerdictCache
 
 BASE_DIR = Path(__file__).parent
 TEST_FILES_DIR = BASE_DIR / "test_files"
@@ -26,7 +34,7 @@ def _mock_scan_with_clamav(
     Patch main.scan_with_clamav to return a fixed result.
     """
 
-    async def _fake_scan(_file_bytes: bytes) -> tuple[bool, str, str | None]:
+    async def _fake_scan(_chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
         return result
 
     monkeypatch.setattr("main.scan_with_clamav", _fake_scan)
@@ -40,7 +48,7 @@ def _mock_scan_with_csam(
     Patch main.scan_with_csam to return a fixed result.
     """
 
-    async def _fake_scan(_file_bytes: bytes) -> tuple[bool, str, str | None]:
+    async def _fake_scan(_chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
         return result
 
     monkeypatch.setattr("main.scan_with_csam", _fake_scan)
@@ -50,14 +58,55 @@ CLEAN_RESULT = (False, "No malware detected by ClamAV.", None)
 CLEAN_RESULT_CSAM = (False, "No CSAM detected.", None)
 
 
+def _mock_health_probe(monkeypatch, error: str | None = None) -> list[int]:
+    probes: list[int] = []
+
+    async def _probe() -> str | None:
+        probes.append(1)
+        if error is not None:
+            raise RuntimeError(error)
+
+        return "27400"
+
+    monkeypatch.setattr("main.health", HealthMonitor(_probe))
+    return probes
+
+
 def test_healthcheck_returns_ok(monkeypatch) -> None:
     """
     Unit test: do not require a real ClamAV socket (CI has no clamd).
     """
-    _mock_scan_with_clamav(monkeypatch, CLEAN_RESULT)
+    probes = _mock_health_probe(monkeypatch)
     response = client.get("/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "ok"}
+    body = response.json()
+    assert body["status"] == "ok"
+    assert body["clamav"] == "ok"
+    assert body["signature_version"] == "27400"
+    assert body["stale"] is False
+
+    # Later probes are answered from the cached state.
+    assert client.get("/health").status_code == 200
+    assert len(probes) == 1
+
+
+def test_healthcheck_deep_runs_a_scan(monkeypatch) -> None:
+    probes = _mock_health_probe(monkeypatch)
+    scanned: list[int] = []
+
+    async def _fake_scan(_chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
+        scanned.append(1)
+        raise RuntimeError("ClamAV scan threads are exhausted")
+
+    monkeypatch.setattr("main.scan_with_clamav", _fake_scan)
+
+    assert client.get("/health").status_code == 200
+    response = client.get("/health", params={"deep": "true"})
+
+    assert response.status_code == 503
+    assert response.json()["detail"] == "ClamAV scan threads are exhausted"
+    assert len(probes) == 2
+    assert len(scanned) == 1
 
 
 def test_scan_without_file_returns_400() -> None:
@@ -99,7 +148,7 @@ def test_scan_eicar_file_detects_malware(monkeypatch, tmp_path) -> None:
     Use a writable quarantine dir: default /var/filescan/quarantine is not
     writable on CI runners.
     """
-    monkeypatch.setattr("main.QUARANTINE_DIR", str(tmp_path))
+    monkeypatch.setattr("main.quarantine_store", QuarantineStore(root=str(tmp_path)))
 
     _mock_scan_with_clamav(
         monkeypatch,
@@ -125,6 +174,32 @@ def test_scan_eicar_file_detects_malware(monkeypatch, tmp_path) -> None:
     assert isinstance(body["quarantine_id"], str) and body["quarantine_id"]
 
 
+def test_scan_quarantines_resubmitted_malware_once(monkeypatch, tmp_path) -> None:
+    store = QuarantineStore(root=str(tmp_path))
+    monkeypatch.setattr("main.quarantine_store", store)
+    _mock_scan_with_clamav(
+        monkeypatch,
+        (True, "Malware detected by ClamAV.", "Eicar-Test-Signature"),
+    )
+    _mock_scan_with_csam(monkeypatch, CLEAN_RESULT_CSAM)
+
+    bodies = [
+        client.post(
+            "/scan", files={"file": (name, eicar_test_fileobj(), "text/plain")}
+        ).json()
+        for name in ("eicar.txt", "invoice.pdf")
+    ]
+
+    # The quarantine_id is the content hash, so both uploads share one stored file.
+    assert bodies[0]["quarantine_id"] == bodies[1]["quarantine_id"]
+    assert len(bodies[0]["quarantine_id"]) == 64
+    entry = store.get(bodies[0]["quarantine_id"])
+    assert entry is not None
+    assert entry.sightings == 2
+    assert entry.filenames == ["eicar.txt", "invoice.pdf"]
+    assert store.stats()["files"] == 1
+
+
 def test_scan_csam_detected(monkeypatch) -> None:
     """When CSAM scanner returns positive, response has malware_detected True and source csam."""
     _mock_scan_with_clamav(monkeypatch, CLEAN_RESULT)
@@ -180,60 +255,12 @@ def test_scan_fake_binary_image_treated_as_clean(monkeypatch) -> None:
     assert body["malware_detected"] is False
 
 
-def test_notify_malware_quarantined_builds_and_posts_event(monkeypatch) -> None:
-    """
-    notify_malware_quarantined should build a generic envelope and POST it
-    to the configured backend URL when alerts are enabled.
-    """
-    posted: list[dict[str, Any]] = []
-
-    class DummyResponse:
-        def __init__(self) -> None:
-            self.status_code = 200
-            self.text = ""
-
-    def fake_post(
-        url: str, json: dict[str, Any], headers: dict[str, str], timeout: float
-    ) -> DummyResponse:
-        posted.append(
-            {"url": url, "json": json, "headers": headers, "timeout": timeout}
-        )
-        return DummyResponse()
-
-    monkeypatch.setenv("FILESCAN_ALERTS_ENABLED", "true")
-    monkeypatch.setenv("ALERTS_BACKEND_URL", "http://backend/internal/security-events")
-    monkeypatch.setenv("ALERTS_BACKEND_TOKEN", "secret-token")
-    monkeypatch.setattr("notification_helpers.httpx.post", fake_post)
-
-    event = {
-        "filename": "eicar.txt",
-        "signature": "EICAR-TEST",
-        "source": "clamav",
-        "quarantine_id": "abc123",
-        "detail": "Malware detected by ClamAV.",
-    }
-
-    notify_malware_quarantined(event)
-
-    assert posted, "Expected notify_malware_quarantined to POST an event"
-    sent = posted[0]
-    assert sent["url"] == "http://backend/internal/security-events"
-    assert sent["headers"]["X-Internal-Token"] == "secret-token"
-    envelope = sent["json"]
-    assert envelope["type"] == "malware_quarantined"
-    assert envelope["producer"] == "filescan"
-    assert envelope["payload"]["filename"] == "eicar.txt"
-    assert envelope["payload"]["quarantine_id"] == "abc123"
-
-
 def test_healthcheck_returns_503_when_clamav_unavailable(monkeypatch) -> None:
-    async def _fake_scan(_file_bytes: bytes) -> tuple[bool, str, str | None]:
-        raise RuntimeError("ClamAV daemon is not responding")
-
-    monkeypatch.setattr("main.scan_with_clamav", _fake_scan)
+    _mock_health_probe(monkeypatch, error="ClamAV daemon is not responding")
 
     response = client.get("/health")
     assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
     assert "ClamAV" in response.json()["detail"]
 
 
@@ -253,7 +280,7 @@ def test_scan_returns_403_when_token_invalid(monkeypatch) -> None:
 
 
 def test_scan_returns_503_when_scanner_raises(monkeypatch) -> None:
-    async def _fake_scan(_file_bytes: bytes) -> tuple[bool, str, str | None]:
+    async def _fake_scan(_chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
         raise RuntimeError("scanner failure")
 
     monkeypatch.setattr("main.scan_with_clamav", _fake_scan)
@@ -267,42 +294,320 @@ def test_scan_returns_503_when_scanner_raises(monkeypatch) -> None:
     assert response.json()["detail"] == "scanner failure"
 
 
-def test_notify_malware_quarantined_optional_payload_fields(monkeypatch) -> None:
-    posted: list[dict[str, Any]] = []
+def test_scan_reuses_cached_verdict(monkeypatch) -> None:
+    scanned: list[bytes] = []
 
-    class DummyResponse:
-        def __init__(self) -> None:
-            self.status_code = 200
-            self.text = ""
+    async def _fake_scan(chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
+        scanned.append(b"".join(chunks))
+        return CLEAN_RESULT
 
-    def fake_post(
-        url: str, json: dict[str, Any], headers: dict[str, str], timeout: float
-    ) -> DummyResponse:
-        posted.append(
-            {"url": url, "json": json, "headers": headers, "timeout": timeout}
-        )
-        return DummyResponse()
-
-    monkeypatch.setenv("FILESCAN_ALERTS_ENABLED", "true")
-    monkeypatch.setenv("ALERTS_BACKEND_URL", "http://backend/internal/security-events")
-    monkeypatch.setenv("ALERTS_BACKEND_TOKEN", "secret-token")
-    monkeypatch.setattr("notification_helpers.httpx.post", fake_post)
-
-    event = {
-        "filename": "eicar.txt",
-        "signature": "EICAR-TEST",
-        "source": "clamav",
-        "quarantine_id": "abc123",
-        "detail": "Malware detected by ClamAV.",
-        "content_type": "text/plain",
-        "size_bytes": 68,
-        "extra": {"note": "test"},
-    }
-
-    notify_malware_quarantined(event)
-
-    assert posted
-    payload = posted[0]["json"]["payload"]
-    assert payload["content_type"] == "text/plain"
-    assert payload["size_bytes"] == 68
-    assert payload["extra"] == {"note": "test"}
+    async def _fake_version() -> str:
+        return "27400"
+
+    monkeypatch.setattr("main.scan_with_clamav", _fake_scan)
+    monkeypatch.setattr("main.get_clamav_signature_version", _fake_version)
+    monkeypatch.setattr("main.verdict_cache", VerdictCache())
+    _mock_scan_with_csam(monkeypatch, CLEAN_RESULT_CSAM)
+
+    bodies = [
+        client.post("/scan", files={"file": ("logo.png", b"same", "image/png")}).json()
+        for _ in range(2)
+    ]
+
+    assert scanned == [b"same"]
+    assert [body["cached"] for body in bodies] == [False, True]
+    assert all(body["malware_detected"] is False for body in bodies)
+    assert bodies[1]["signature_version"] == "27400"
+
+    metrics = client.get("/verdict-cache").json()
+    assert metrics["hits"] == 1
+    assert metrics["hit_rate"] == 0.5
+
+
+def test_scan_streams_upload_to_scanners_and_quarantines_from_spool(
+    monkeypatch, tmp_path
+) -> None:
+    monkeypatch.setattr("main.quarantine_store", QuarantineStore(root=str(tmp_path)))
+    received: dict[str, list[bytes]] = {}
+
+    def _recording_scan(name: str, result: tuple[bool, str, str | None]):
+        async def _fake_scan(chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
+            received[name] = list(chunks)
+            return result
+
+        return _fake_scan
+
+    monkeypatch.setattr(
+        "main.scan_with_clamav",
+        _recording_scan("clamav", (True, "Malware detected by ClamAV.", "Test-Sig")),
+    )
+    monkeypatch.setattr(
+        "main.scan_with_csam", _recording_scan("csam", CLEAN_RESULT_CSAM)
+    )
+
+    payload = b"x" * (FILESCAN_CHUNK_SIZE * 2 + 100)
+    response = client.post(
+        "/scan", files={"file": ("big.bin", payload, "application/octet-stream")}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["malware_detected"] is True
+    assert received["clamav"] == received["csam"]
+    assert [len(chunk) for chunk in received["clamav"]] == [
+        FILESCAN_CHUNK_SIZE,
+        FILESCAN_CHUNK_SIZE,
+        100,
+    ]
+
+    quarantined = list((tmp_path / "objects").rglob("*"))
+    assert [path.name for path in quarantined if path.is_file()] == [
+        body["quarantine_id"]
+    ]
+    assert (
+        Path(
+            QuarantineStore(root=str(tmp_path)).object_path(body["quarantine_id"])
+        ).read_bytes()
+        == payload
+    )
+
+
+def test_scan_batch_returns_verdicts_in_order(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr("main.quarantine_store", QuarantineStore(root=str(tmp_path)))
+
+    async def _fake_scan(chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
+        if b"".join(chunks) == b"bad":
+            return (True, "Malware detected by ClamAV.", "Test-Sig")
+
+        return CLEAN_RESULT
+
+    monkeypatch.setattr("main.scan_with_clamav", _fake_scan)
+    _mock_scan_with_csam(monkeypatch, CLEAN_RESULT_CSAM)
+
+    response = client.post(
+        "/scan/batch",
+        files=[
+            ("files", ("a.png", b"good", "image/png")),
+            ("files", ("b.png", b"bad", "image/png")),
+            ("files", ("c.png", b"also-good", "image/png")),
+        ],
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["malware_detected"] is True
+    assert [result["filename"] for result in body["results"]] == [
+        "a.png",
+        "b.png",
+        "c.png",
+    ]
+    assert [result["malware_detected"] for result in body["results"]] == [
+        False,
+        True,
+        False,
+    ]
+    assert body["results"][1]["quarantine_id"]
+
+
+def test_scan_batch_stops_on_detection(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr("main.quarantine_store", QuarantineStore(root=str(tmp_path)))
+    monkeypatch.setattr("main.FILESCAN_BATCH_CONCURRENCY", 1)
+    _mock_scan_with_clamav(monkeypatch, (True, "Malware detected by ClamAV.", "Sig"))
+    _mock_scan_with_csam(monkeypatch, CLEAN_RESULT_CSAM)
+
+    response = client.post(
+        "/scan/batch",
+        files=[("files", (f"{i}.png", b"bad", "image/png")) for i in range(3)],
+        data={"stop_on_detection": "true"},
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["malware_detected"] is True
+    assert all(result["skipped"] for result in results[1:])
+    assert all("malware_detected" not in result for result in results[1:])
+
+
+def test_scan_batch_rejects_missing_and_too_many_files(monkeypatch) -> None:
+    assert client.post("/scan/batch").status_code == 400
+
+    monkeypatch.setattr("main.FILESCAN_BATCH_MAX_FILES", 2)
+    response = client.post(
+        "/scan/batch",
+        files=[("files", (f"{i}.png", b"x", "image/png")) for i in range(3)],
+    )
+    assert response.status_code == 400
+
+
+def test_scan_batch_returns_503_when_scanner_raises(monkeypatch) -> None:
+    async def _fake_scan(_chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
+        raise RuntimeError("scanner failure")
+
+    monkeypatch.setattr("main.scan_with_clamav", _fake_scan)
+    _mock_scan_with_csam(monkeypatch, CLEAN_RESULT_CSAM)
+
+    response = client.post(
+        "/scan/batch", files=[("files", ("a.png", b"x", "image/png"))]
+    )
+
+    assert response.status_code == 503
+    assert response.json()["detail"] == "scanner failure"
+
+
+def test_scan_returns_429_with_retry_after_when_queue_is_full(monkeypatch) -> None:
+    async def _rejecting_acquire(weight: int) -> None:
+        raise AdmissionRejected(429, "The scan queue is full.", 7, 50)
+
+    controller = AdmissionController()
+    monkeypatch.setattr(controller, "_acquire", _rejecting_acquire)
+    monkeypatch.setattr("main.admission", controller)
+
+    response = client.post(
+        "/scan", files={"file": ("file.txt", b"content", "text/plain")}
+    )
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+    assert response.headers["X-Filescan-Queue-Depth"] == "50"
+    assert response.json()["retry_after"] == 7
+
+    response = client.post(
+        "/scan/batch",
+        files=[
+            ("files", ("a.txt", b"a", "text/plain")),
+            ("files", ("b.txt", b"b", "text/plain")),
+        ],
+    )
+
+    assert response.status_code == 429
+
+
+def test_admission_reports_live_load(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "main.admission", AdmissionController(max_active=3, max_queued=9)
+    )
+    _mock_scan_with_clamav(monkeypatch, CLEAN_RESULT)
+    _mock_scan_with_csam(monkeypatch, CLEAN_RESULT_CSAM)
+
+    client.post("/scan", files={"file": ("file.txt", b"content", "text/plain")})
+    response = client.get("/admission")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["active"] == 0
+    assert body["queue_depth"] == 0
+    assert body["max_active"] == 3
+    assert body["max_queued"] == 9
+    assert body["admitted"] == 1
+
+
+def test_metrics_reports_scans_in_prometheus_format(monkeypatch) -> None:
+    _mock_scan_with_clamav(monkeypatch, CLEAN_RESULT)
+    _mock_scan_with_csam(monkeypatch, CLEAN_RESULT_CSAM)
+    monkeypatch.setattr("main.verdict_cache", VerdictCache(max_entries=0))
+    requests_before = REQUESTS.value(endpoint="scan", status="200")
+    scans_before = SCANS.value(verdict="clean", cached="false")
+    bytes_before = SCANNED_BYTES.value()
+    clamav_before = SCANNER_DURATION.count(scanner="clamav")
+
+    client.post("/scan", files={"file": ("file.txt", b"content", "text/plain")})
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert REQUESTS.value(endpoint="scan", status="200") == requests_before + 1
+    assert SCANS.value(verdict="clean", cached="false") == scans_before + 1
+    assert SCANNED_BYTES.value() == bytes_before + len(b"content")
+    assert SCANNER_DURATION.count(scanner="clamav") == clamav_before + 1
+    for name in (
+        "filescan_requests_total",
+        "filescan_scanner_duration_seconds_bucket",
+        "filescan_scan_queue_depth 0",
+        "filescan_clamd_sessions_opened_total",
+        "filescan_security_events_queued",
+    ):
+        assert name in response.text
+
+
+def _fail_if_scanned(monkeypatch) -> None:
+    async def _unexpected(_chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
+        raise AssertionError("The file should not reach the streaming scanners")
+
+    async def _no_version() -> None:
+        raise AssertionError("clamd should not be contacted")
+
+    monkeypatch.setattr("main.scan_with_clamav", _unexpected)
+    monkeypatch.setattr("main.scan_with_csam", _unexpected)
+    monkeypatch.setattr("main.get_clamav_signature_version", _no_version)
+
+
+def test_scan_image_profile_rejects_other_types_before_scanning(monkeypatch) -> None:
+    _fail_if_scanned(monkeypatch)
+
+    response = client.post(
+        "/scan",
+        files={"file": ("logo.png", b"MZ\x90\x00not-an-image", "image/png")},
+        data={"profile": "image"},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["malware_detected"] is False
+    assert body["rejected"] is True
+    assert body["source"] == "file_type"
+    assert "quarantine_id" not in body
+
+
+def test_scan_rejects_unknown_profile() -> None:
+    response = client.post(
+        "/scan",
+        files={"file": ("logo.png", b"content", "image/png")},
+        data={"profile": "video"},
+    )
+
+    assert response.status_code == 400
+    assert "Unknown profile" in response.json()["detail"]
+
+
+def test_scan_flags_known_bad_hash_without_streaming(monkeypatch, tmp_path) -> None:
+    payload = b"\x89PNG\r\n\x1a\nknown-bad"
+    _fail_if_scanned(monkeypatch)
+    index_path = str(tmp_path / "hash_index.bin")
+    build_hash_index([(md5(payload).hexdigest(), "Img.Exploit.Test")], index_path)
+    monkeypatch.setattr("main.hash_index", ReloadingHashIndex(index_path))
+    monkeypatch.setattr("main.quarantine_store", QuarantineStore(root=str(tmp_path)))
+
+    response = client.post(
+        "/scan",
+        files={"file": ("logo.png", payload, "image/png")},
+        data={"profile": "image"},
+    )
+
+    body = response.json()
+    assert body["malware_detected"] is True
+    assert body["signature"] == "Img.Exploit.Test"
+    assert body["source"] == "known_bad_hash"
+    assert body["quarantine_id"] == sha256(payload).hexdigest()
+
+
+def test_scan_skips_csam_scanner_for_files_that_are_not_images(monkeypatch) -> None:
+    scanned: list[str] = []
+
+    async def _clamav(_chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
+        scanned.append("clamav")
+        return CLEAN_RESULT
+
+    async def _csam(_chunks: Iterable[bytes]) -> tuple[bool, str, str | None]:
+        scanned.append("csam")
+        return CLEAN_RESULT_CSAM
+
+    monkeypatch.setattr("main.scan_with_clamav", _clamav)
+    monkeypatch.setattr("main.scan_with_csam", _csam)
+
+    client.post("/scan", files={"file": ("doc.pdf", b"%PDF-1.7", "application/pdf")})
+    client.post(
+        "/scan", files={"file": ("logo.png", b"\x89PNG\r\n\x1a\n", "image/png")}
+    )
+
+    assert scanned.count("clamav") == 2
+    assert scanned.count("csam") == 1
@@ -0,0 +1,107 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the scanner registry and the cheap pre-filter checks.
+"""
+
+from scanners.prefilters import (
+    check_file_type,
+    check_size,
+    known_bad_check,
+    might_be_image,
+)
+from scanners.registry import (
+    Check,
+    FileInfo,
+    ScannerRegistry,
+    StreamingScanner,
+    detect_file_type,
+)
+
+PNG_HEAD = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+
+
+def _info(file_type: str = "png", size: int = 100, **kwargs) -> FileInfo:
+    return FileInfo(filename="file", size=size, file_type=file_type, **kwargs)
+
+
+async def _clean(chunks):
+    return (False, "clean", None)
+
+
+def test_detect_file_type_from_magic_bytes() -> None:
+    assert detect_file_type(PNG_HEAD) == "png"
+    assert detect_file_type(b"\xff\xd8\xff\xe0\x00\x10JFIF") == "jpeg"
+    assert detect_file_type(b"GIF89a\x01\x00") == "gif"
+    assert detect_file_type(b"RIFF\x24\x00\x00\x00WEBPVP8 ") == "webp"
+    assert detect_file_type(b"RIFF\x24\x00\x00\x00WAVEfmt ") == "unknown"
+    assert detect_file_type(b"MZ\x90\x00") == "pe"
+    assert detect_file_type(b"") == "unknown"
+
+
+def test_prefilter_checks_apply_profile_limits() -> None:
+    assert check_file_type(_info("png", profile="image")) is None
+    assert check_file_type(_info("pe")) is None
+
+    rejected = check_file_type(_info("pe", profile="image"))
+    assert rejected is not None
+    assert rejected[0] is False
+    assert "pe" in rejected[1]
+
+    assert check_size(_info(size=5 * 1024 * 1024, profile="image")) is None
+    assert check_size(_info(size=5 * 1024 * 1024 + 1, profile="image")) is not None
+    assert check_size(_info(size=5 * 1024 * 1024 + 1)) is None
+
+    assert might_be_image(_info("jpeg"))
+    assert might_be_image(_info("unknown"))
+    assert not might_be_image(_info("pdf"))
+
+
+def test_known_bad_check_flags_listed_sha256_or_md5() -> None:
+    hashes = {"a" * 64: "Win.Trojan.Test", "b" * 32: "Known-Bad-Hash"}
+    check = known_bad_check(hashes.get)
+
+    assert check(_info(sha256="a" * 64, md5="c" * 32)) == (
+        True,
+        "Matched a known malicious file.",
+        "Win.Trojan.Test",
+    )
+    assert check(_info(sha256="c" * 64, md5="b" * 32)) == (
+        True,
+        "Matched a known malicious file.",
+        "Known-Bad-Hash",
+    )
+    assert check(_info(sha256="c" * 64, md5="c" * 32)) is None
+    assert check(_info()) is None
+
+
+def test_scanner_registry_orders_checks_and_tiers_by_cost() -> None:
+    registry = ScannerRegistry()
+    registry.add_check(Check("hash", lambda info: None, cost=1, needs_hash=True))
+    registry.add_check(Check("type", lambda info: None, cost=5))
+    registry.add_check(Check("size", lambda info: None, cost=2))
+    registry.add_scanner(StreamingScanner("sandbox", _clean, tier=2, cost=1))
+    registry.add_scanner(StreamingScanner("csam", _clean, tier=1, cost=20))
+    registry.add_scanner(
+        StreamingScanner(
+            "clamav",
+            _clean,
+            tier=1,
+            cost=10,
+            applies_to=lambda info: info.file_type != "png",
+        )
+    )
+
+    # Checks that need the hash run last, since hashing reads the whole file.
+    assert [check.name for check in registry.checks_for(_info())] == [
+        "size",
+        "type",
+        "hash",
+    ]
+    assert [[s.name for s in tier] for tier in registry.tiers_for(_info("pdf"))] == [
+        ["clamav", "csam"],
+        ["sandbox"],
+    ]
+    assert [[s.name for s in tier] for tier in registry.tiers_for(_info("png"))] == [
+        ["csam"],
+        ["sandbox"],
+    ]
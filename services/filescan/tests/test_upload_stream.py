@@ -0,0 +1,70 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for streaming spooled uploads to the scanners.
+"""
+
+import hashlib
+import io
+import threading
+
+import pytest
+
+from upload_stream import ChunkFanout, hash_file
+
+PAYLOAD = bytes(range(256)) * 40
+
+
+def _run_in_thread(fanout: ChunkFanout) -> threading.Thread:
+    reader = threading.Thread(target=fanout.run)
+    reader.start()
+    return reader
+
+
+def test_chunk_fanout_feeds_every_consumer_and_hashes_in_one_pass() -> None:
+    fanout = ChunkFanout(io.BytesIO(PAYLOAD), consumers=2, chunk_size=1000)
+    received: list[list[bytes]] = [[], []]
+
+    def _consume(index: int) -> None:
+        received[index].extend(fanout.chunks(index))
+
+    consumers = [threading.Thread(target=_consume, args=(i,)) for i in range(2)]
+    for consumer in consumers:
+        consumer.start()
+
+    _run_in_thread(fanout).join(timeout=5)
+    for consumer in consumers:
+        consumer.join(timeout=5)
+
+    assert received[0] == received[1]
+    assert b"".join(received[0]) == PAYLOAD
+    assert max(len(chunk) for chunk in received[0]) == 1000
+    assert fanout.size == len(PAYLOAD)
+    assert fanout.sha256 == hashlib.sha256(PAYLOAD).hexdigest()
+    assert hash_file(io.BytesIO(PAYLOAD)) == fanout.sha256
+
+
+def test_chunk_fanout_does_not_wait_for_released_consumer() -> None:
+    fanout = ChunkFanout(
+        io.BytesIO(PAYLOAD), consumers=2, chunk_size=100, queue_depth=1
+    )
+    fanout.release(1)
+    reader = _run_in_thread(fanout)
+
+    assert b"".join(fanout.chunks(0)) == PAYLOAD
+    reader.join(timeout=5)
+    assert not reader.is_alive()
+
+    with pytest.raises(RuntimeError, match="closed"):
+        next(fanout.chunks(1))
+
+
+def test_chunk_fanout_reports_read_errors_to_consumers() -> None:
+    class _BrokenFile(io.BytesIO):
+        def read(self, size: int | None = -1) -> bytes:
+            raise OSError("disk gone")
+
+    fanout = ChunkFanout(_BrokenFile(), consumers=1)
+    _run_in_thread(fanout).join(timeout=5)
+
+    with pytest.raises(RuntimeError, match="Unable to read the upload"):
+        list(fanout.chunks(0))
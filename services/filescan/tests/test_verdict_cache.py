@@ -0,0 +1,65 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the scan verdict cache.
+"""
+
+from verdict_cache import VerdictCache
+
+CLEAN = {"malware_detected": False, "detail": "No malware detected by ClamAV."}
+INFECTED = {"malware_detected": True, "detail": "Malware detected by ClamAV."}
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_verdict_cache_expires_clean_verdicts_only() -> None:
+    clock = _Clock()
+    cache = VerdictCache(clean_ttl=10, max_entries=10, clock=clock)
+    cache.observe_signature_version("27400")
+    cache.set("clean-hash", "27400", CLEAN)
+    cache.set("infected-hash", "27400", INFECTED)
+
+    assert cache.get("clean-hash", "27400") == CLEAN
+    assert cache.get("clean-hash", "27399") is None
+
+    clock.now = 11
+    assert cache.get("clean-hash", "27400") is None
+    assert cache.get("infected-hash", "27400") == INFECTED
+
+    metrics = cache.metrics()
+    assert metrics["hits"] == 2
+    assert metrics["misses"] == 2
+    assert metrics["hit_rate"] == 0.5
+    assert metrics["entries"] == 1
+
+
+def test_verdict_cache_invalidates_on_signature_update() -> None:
+    cache = VerdictCache(clean_ttl=10, max_entries=10)
+    cache.observe_signature_version("27400")
+    cache.set("infected-hash", "27400", INFECTED)
+
+    cache.observe_signature_version("27401")
+
+    assert cache.get("infected-hash", "27400") is None
+    # Verdicts from the previous database are not stored any more.
+    cache.set("clean-hash", "27400", CLEAN)
+    assert cache.metrics()["entries"] == 0
+    assert cache.metrics()["invalidations"] == 1
+
+
+def test_verdict_cache_evicts_least_recently_used() -> None:
+    cache = VerdictCache(clean_ttl=10, max_entries=2)
+    cache.observe_signature_version("1")
+    cache.set("a", "1", CLEAN)
+    cache.set("b", "1", CLEAN)
+    cache.get("a", "1")
+    cache.set("c", "1", CLEAN)
+
+    assert cache.get("a", "1") is not None
+    assert cache.get("b", "1") is None
+    assert cache.metrics()["evictions"] == 1
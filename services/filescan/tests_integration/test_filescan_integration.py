@@ -26,7 +26,10 @@ def test_health_integration_ok() -> None:
 
     response = httpx.get(f"{BASE_URL}/health", timeout=2.0)
     assert response.status_code == 200
-    assert response.json() == {"status": "ok"}
+    body = response.json()
+    assert body["status"] == "ok"
+    assert body["clamav"] == "ok"
+    assert body["stale"] is False
 
 
 def test_scan_empty_file_integration() -> None:
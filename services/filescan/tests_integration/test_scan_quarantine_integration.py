@@ -35,7 +35,8 @@ def test_infected_file_includes_quarantine_id() -> None:
         quarantine_id = body["quarantine_id"]
         assert isinstance(quarantine_id, str) and quarantine_id
 
-        quarantine_path = quarantine_dir / f"{quarantine_id}__eicar.txt"
+        # Files are stored once per content hash, sharded by its first two characters.
+        quarantine_path = quarantine_dir / "objects" / quarantine_id[:2] / quarantine_id
         assert quarantine_path.exists(), (
             f"Expected quarantine file at {quarantine_path} to exist"
         )
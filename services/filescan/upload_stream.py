@@ -0,0 +1,228 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Streaming of spooled uploads to the scanners without buffering whole files.
+"""
+
+import hashlib
+import os
+import queue
+import threading
+from collections.abc import Iterator
+from typing import IO, cast
+
+# Bytes read from the spooled upload at a time; also the size of each INSTREAM
+# chunk, so it must stay below StreamMaxLength in clamd.conf.
+FILESCAN_CHUNK_SIZE = int(os.getenv("FILESCAN_CHUNK_SIZE", str(64 * 1024)))
+
+# Chunks buffered per scanner before the reader waits for the slowest one.
+FILESCAN_CHUNK_QUEUE_DEPTH = 4
+
+_END = object()
+
+
+def iter_file_chunks(
+    file_obj: IO[bytes], chunk_size: int = FILESCAN_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Read a file from the start in chunks.
+
+    Parameters
+    ----------
+    file_obj : IO[bytes]
+        The file to read.
+
+    chunk_size : int, default=FILESCAN_CHUNK_SIZE
+        Number of bytes read at a time.
+
+    Yields
+    ------
+    bytes
+        Consecutive chunks of the file.
+    """
+    file_obj.seek(0)
+    while chunk := file_obj.read(chunk_size):
+        yield chunk
+
+
+def digest_file(file_obj: IO[bytes], algorithms: tuple[str, ...]) -> dict[str, str]:
+    """
+    Compute several digests of a file in one read without loading it into memory.
+
+    Parameters
+    ----------
+    file_obj : IO[bytes]
+        The file to hash.
+
+    algorithms : tuple[str, ...]
+        ``hashlib`` algorithm names, e.g. ``("sha256", "md5")``.
+
+    Returns
+    -------
+    dict[str, str]
+        The hex digest of the file contents per algorithm.
+    """
+    digests = {name: hashlib.new(name) for name in algorithms}
+    for chunk in iter_file_chunks(file_obj):
+        for digest in digests.values():
+            digest.update(chunk)
+
+    return {name: digest.hexdigest() for name, digest in digests.items()}
+
+
+def hash_file(file_obj: IO[bytes]) -> str:
+    """
+    Compute the SHA-256 hex digest of a file without loading it into memory.
+
+    Parameters
+    ----------
+    file_obj : IO[bytes]
+        The file to hash.
+
+    Returns
+    -------
+    str
+        The hex digest of the file contents.
+    """
+    return digest_file(file_obj, ("sha256",))["sha256"]
+
+
+class ChunkFanout:
+    """
+    Read a file once and hand every chunk to several consumers while hashing it.
+
+    Parameters
+    ----------
+    file_obj : IO[bytes]
+        The spooled upload to read.
+
+    consumers : int
+        Number of consumers, each reading from ``chunks(index)``.
+
+    chunk_size : int, default=FILESCAN_CHUNK_SIZE
+        Number of bytes read at a time.
+
+    queue_depth : int, default=FILESCAN_CHUNK_QUEUE_DEPTH
+        Chunks buffered per consumer.
+
+    Notes
+    -----
+    ``run`` reads the file on a worker thread and blocks while a consumer's queue
+    is full, so at most ``consumers * queue_depth`` chunks are held in memory.
+    A consumer that stops early must call ``release`` so that the reader does
+    not wait for it.
+    """
+
+    def __init__(
+        self,
+        file_obj: IO[bytes],
+        consumers: int,
+        chunk_size: int = FILESCAN_CHUNK_SIZE,
+        queue_depth: int = FILESCAN_CHUNK_QUEUE_DEPTH,
+    ) -> None:
+        self.file_obj = file_obj
+        self.chunk_size = chunk_size
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._queues: list[queue.Queue[object]] = [
+            queue.Queue(maxsize=queue_depth) for _ in range(consumers)
+        ]
+        self._released = [threading.Event() for _ in range(consumers)]
+
+    @property
+    def sha256(self) -> str:
+        """
+        Return the hex digest of the bytes read so far.
+
+        Returns
+        -------
+        str
+            The SHA-256 of the whole file once ``run`` has finished.
+        """
+        return self._digest.hexdigest()
+
+    def chunks(self, index: int) -> Iterator[bytes]:
+        """
+        Iterate over the chunks read for one consumer.
+
+        Parameters
+        ----------
+        index : int
+            The consumer index.
+
+        Yields
+        ------
+        bytes
+            Consecutive chunks of the file.
+
+        Raises
+        ------
+        RuntimeError
+            If the upload could not be read or the consumer was released.
+        """
+        while True:
+            try:
+                item = self._queues[index].get(timeout=0.1)
+
+            except queue.Empty:
+                if self._released[index].is_set():
+                    raise RuntimeError("The upload stream was closed") from None
+
+                continue
+
+            if item is _END:
+                return
+
+            if isinstance(item, OSError):
+                # Not an OSError, so scanners do not mistake it for a broken connection.
+                raise RuntimeError(f"Unable to read the upload: {item}") from item
+
+            yield cast(bytes, item)
+
+    def release(self, index: int) -> None:
+        """
+        Stop feeding a consumer, e.g. once its scanner has returned or failed.
+
+        Parameters
+        ----------
+        index : int
+            The consumer index.
+        """
+        self._released[index].set()
+
+    def _put(self, index: int, item: object) -> None:
+        """
+        Hand an item to a consumer unless it has been released.
+
+        Parameters
+        ----------
+        index : int
+            The consumer index.
+
+        item : object
+            A chunk, the end marker or the error that stopped the reader.
+        """
+        while not self._released[index].is_set():
+            try:
+                self._queues[index].put(item, timeout=0.1)
+                return
+
+            except queue.Full:
+                continue
+
+    def run(self) -> None:
+        """
+        Read the file and feed its chunks to all consumers that are still reading.
+        """
+        end: object = _END
+        try:
+            for chunk in iter_file_chunks(self.file_obj, self.chunk_size):
+                self._digest.update(chunk)
+                self.size += len(chunk)
+                for index in range(len(self._queues)):
+                    self._put(index, chunk)
+
+        except OSError as exc:
+            end = exc
+
+        for index in range(len(self._queues)):
+            self._put(index, end)
@@ -0,0 +1,166 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+In-memory cache of scan verdicts keyed by content hash and signature version.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+# Seconds a clean verdict is trusted for the same signature database version.
+VERDICT_CACHE_TTL = float(os.getenv("FILESCAN_VERDICT_CACHE_TTL", "3600"))
+VERDICT_CACHE_SIZE = int(os.getenv("FILESCAN_VERDICT_CACHE_SIZE", "10000"))
+
+
+class VerdictCache:
+    """
+    Bounded LRU cache of scan verdicts.
+
+    Parameters
+    ----------
+    clean_ttl : float, default=VERDICT_CACHE_TTL
+        Seconds a clean verdict stays valid. Positive verdicts stay valid until the
+        signature database changes or the entry is evicted.
+
+    max_entries : int, default=VERDICT_CACHE_SIZE
+        Maximum number of cached verdicts; the least recently used one is evicted.
+
+    clock : Callable[[], float], default=time.monotonic
+        Time source, replaceable in tests.
+
+    Notes
+    -----
+    Entries are keyed by ``(sha256, signature_version)``. When a new signature
+    database version is observed every cached verdict is dropped, as a newer
+    database may detect files that were previously clean.
+    """
+
+    def __init__(
+        self,
+        clean_ttl: float = VERDICT_CACHE_TTL,
+        max_entries: int = VERDICT_CACHE_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.clean_ttl = clean_ttl
+        self.max_entries = max(0, max_entries)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[
+            tuple[str, str], tuple[float | None, dict[str, Any]]
+        ] = OrderedDict()
+        self.signature_version: str | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def observe_signature_version(self, signature_version: str) -> None:
+        """
+        Record the current signature version, dropping all verdicts if it changed.
+
+        Parameters
+        ----------
+        signature_version : str
+            The signature database version reported by the scanner.
+        """
+        with self._lock:
+            if signature_version == self.signature_version:
+                return
+
+            if self.signature_version is not None:
+                self.invalidations += 1
+
+            self._entries.clear()
+            self.signature_version = signature_version
+
+    def get(self, content_hash: str, signature_version: str) -> dict[str, Any] | None:
+        """
+        Return the cached verdict for a file, if any.
+
+        Parameters
+        ----------
+        content_hash : str
+            The hex SHA-256 digest of the file.
+
+        signature_version : str
+            The signature database version the verdict must have been made with.
+
+        Returns
+        -------
+        dict[str, Any] | None
+            A copy of the cached verdict, or None on a miss.
+        """
+        key = (content_hash, signature_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def set(
+        self, content_hash: str, signature_version: str, verdict: dict[str, Any]
+    ) -> None:
+        """
+        Store the verdict for a file.
+
+        Parameters
+        ----------
+        content_hash : str
+            The hex SHA-256 digest of the file.
+
+        signature_version : str
+            The signature database version the file was scanned with.
+
+        verdict : dict[str, Any]
+            The verdict; clean verdicts must have a false ``malware_detected``.
+        """
+        if self.max_entries == 0:
+            return
+
+        expires_at = (
+            None if verdict.get("malware_detected") else self._clock() + self.clean_ttl
+        )
+        key = (content_hash, signature_version)
+        with self._lock:
+            # Verdicts from an older database would never be read again.
+            if signature_version != self.signature_version:
+                return
+
+            self._entries[key] = (expires_at, dict(verdict))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def metrics(self) -> dict[str, int | float | str | None]:
+        """
+        Return hit-rate and size metrics for the cache.
+
+        Returns
+        -------
+        dict[str, int | float | str | None]
+            Counters for hits, misses, evictions and invalidations, the hit rate,
+            the number of entries and the current signature version.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "signature_version": self.signature_version,
+            }